@@ -0,0 +1,168 @@
+"""
+Benchmark: linear Shapely collision loop vs GlyphCollisionIndex.
+
+Lays fixed-size glyph boxes along every archetype arc (scaled onto an 11x14
+design) with the same place / 1px-bump / phrase-rollback loop that
+draw_text_on_curve uses, once with the old `rendered_boxes + all_rendered_boxes`
+scan and once with the grid index, and checks both give the same placements.
+Glyph sizes are fixed so the numbers only reflect collision cost, not Pango.
+
+Usage:
+    python bench/bench_collision.py
+    python bench/bench_collision.py --font-pt 6 --lanes 12 --repeat 3
+"""
+
+import argparse
+import math
+import os
+
+import numpy as np
+from shapely.affinity import rotate as shapely_rotate
+import shapely.affinity
+from shapely.geometry import Polygon
+
+from bench_utils import CURRENT_DPI, archetype_paths, best_of, load_archetype_story, scaled_component_arcs
+from glyph_collision import GlyphCollisionIndex
+
+SAMPLE_TEXT = "Meets Fairy Godmother. Loses Slipper. Prince Searches. Happily Ever After. "
+
+
+class LinearBoxes:
+    """The pre-index behaviour: one flat list, rescanned for every candidate."""
+
+    def __init__(self):
+        self.all_boxes = []
+        self.arc_boxes = []
+
+    def start_arc(self):
+        self.arc_boxes = []
+
+    def mark(self):
+        return len(self.arc_boxes)
+
+    def rollback(self, mark):
+        drop = len(self.arc_boxes) - mark
+        if drop:
+            del self.arc_boxes[mark:]
+            del self.all_boxes[len(self.all_boxes) - drop:]
+
+    def intersects_any(self, box):
+        for other_box in self.arc_boxes + self.all_boxes:
+            if box.intersects(other_box):
+                return True
+        return False
+
+    def insert(self, box):
+        self.arc_boxes.append(box)
+        self.all_boxes.append(box)
+
+
+class IndexedBoxes:
+    def __init__(self):
+        self.index = GlyphCollisionIndex()
+
+    def start_arc(self):
+        pass
+
+    def mark(self):
+        return self.index.mark()
+
+    def rollback(self, mark):
+        self.index.rollback(mark)
+
+    def intersects_any(self, box):
+        return self.index.intersects_any(box)
+
+    def insert(self, box):
+        self.index.insert(box)
+
+
+def layout_arc(xs, ys, text, char_w, char_h, boxes):
+    """draw_text_on_curve's placement loop with fixed glyph metrics."""
+    cumulative = np.insert(np.cumsum(np.hypot(np.diff(xs), np.diff(ys))), 0, 0)
+    placements = []
+    idx = 0
+    distance = 0.0
+    phrases = [p for p in text.replace(". ", ".|").split("|") if p.strip()]
+    for phrase in phrases:
+        mark = boxes.mark()
+        saved = (idx, distance, len(placements))
+        phrase_fits = True
+        for _char in phrase:
+            while idx < len(cumulative) - 1:
+                seg = cumulative[idx + 1] - cumulative[idx]
+                if seg == 0:
+                    idx += 1
+                    continue
+                ratio = (distance - cumulative[idx]) / seg
+                if ratio < 0 or ratio > 1:
+                    idx += 1
+                    continue
+                x = xs[idx] + ratio * (xs[idx + 1] - xs[idx])
+                y = ys[idx] + ratio * (ys[idx + 1] - ys[idx])
+                i0, i1 = max(idx - 1, 0), min(idx + 1, len(xs) - 1)
+                angle = math.atan2(ys[i1] - ys[i0], xs[i1] - xs[i0])
+                box = Polygon([(-char_w / 2, -char_h / 2), (char_w / 2, -char_h / 2),
+                               (char_w / 2, char_h / 2), (-char_w / 2, char_h / 2)])
+                box = shapely.affinity.translate(shapely_rotate(box, math.degrees(angle), origin=(0, 0)), xoff=x, yoff=y)
+                if boxes.intersects_any(box):
+                    distance += 1
+                    continue
+                boxes.insert(box)
+                placements.append((round(x, 6), round(y, 6)))
+                distance += char_w
+                break
+            else:
+                phrase_fits = False
+                break
+        if not phrase_fits:
+            idx, distance, keep = saved
+            del placements[keep:]
+            boxes.rollback(mark)
+            break
+    return placements
+
+
+def layout_story(arcs, char_w, char_h, lanes, boxes):
+    placements = []
+    for lane in range(lanes):
+        offset = lane * char_h * 2.5
+        for xs, ys in arcs:
+            boxes.start_arc()
+            length = float(np.sum(np.hypot(np.diff(xs), np.diff(ys))))
+            n_chars = max(1, int(length / char_w))
+            text = (SAMPLE_TEXT * (n_chars // len(SAMPLE_TEXT) + 1))[:n_chars]
+            placements.extend(layout_arc(xs, [y - offset for y in ys], text, char_w, char_h, boxes))
+    return placements
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--font-pt", type=float, default=8)
+    parser.add_argument("--lanes", type=int, default=6, help="parallel copies of each arc, to reach a few thousand glyphs")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    char_h = args.font_pt * CURRENT_DPI / 72 * 1.2
+    char_w = char_h * 0.5
+
+    print(f"{'story':<22}{'glyphs':>8}{'linear s':>11}{'index s':>10}{'speedup':>9}")
+    total_linear = total_index = 0.0
+    for path in archetype_paths():
+        name = os.path.splitext(os.path.basename(path))[0]
+        arcs = scaled_component_arcs(load_archetype_story(path))
+
+        t_linear, linear = best_of(lambda: layout_story(arcs, char_w, char_h, args.lanes, LinearBoxes()), args.repeat)
+        t_index, indexed = best_of(lambda: layout_story(arcs, char_w, char_h, args.lanes, IndexedBoxes()), args.repeat)
+        if linear != indexed:
+            raise SystemExit(f"{name}: indexed placements differ from the linear scan")
+
+        total_linear += t_linear
+        total_index += t_index
+        print(f"{name:<22}{len(indexed):>8}{t_linear:>11.3f}{t_index:>10.3f}{t_linear / t_index:>8.1f}x")
+
+    print(f"{'TOTAL':<22}{'':>8}{total_linear:>11.3f}{total_index:>10.3f}{total_linear / total_index:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
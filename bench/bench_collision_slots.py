@@ -0,0 +1,128 @@
+"""
+Benchmark: 1px collision bumps vs glyph_collision.next_free_slot().
+
+Stress case for the collision step of draw_text_on_curve: steep, tightly
+wound synthetic arcs (a sine with big amplitude over a narrow band, so the
+tangent swings hard and neighbouring turns nearly touch) that all cross the
+same region, drawn one after another into one GlyphCollisionIndex the way the
+components of a design are. Every arc after the first keeps running into
+glyphs that are already there.
+
+The placement loop is draw_text_on_curve's (place / on collision move along
+the path / roll back a phrase that runs off the end) with fixed glyph sizes,
+run twice: once bumping 1px and rebuilding the Shapely box each time, and
+once jumping to next_free_slot(). Both must give the same placements.
+
+Usage:
+    python bench/bench_collision_slots.py
+    python bench/bench_collision_slots.py --arcs 8 --turns 6 --font-pt 10 --repeat 2
+"""
+
+import argparse
+import math
+
+import numpy as np
+
+from bench_utils import CURRENT_DPI, best_of
+from curve_path import CurvePath
+from glyph_collision import GlyphCollisionIndex, glyph_box, next_free_slot
+
+SAMPLE_TEXT = "Meets Fairy Godmother. Loses Slipper. Prince Searches. Happily Ever After. "
+
+
+def steep_arcs(count, turns, points=400):
+    """`count` steep sine arcs across the same 4in band, each shifted and phased a little."""
+    width = 4 * CURRENT_DPI
+    arcs = []
+    for i in range(count):
+        t = np.linspace(0, 1, points)
+        xs = 300 + t * width + i * 7
+        ys = 1200 + 450 * np.sin(2 * math.pi * turns * t + i * 0.35) + i * 11
+        arcs.append((xs.tolist(), ys.tolist()))
+    return arcs
+
+
+def layout_arc(curve, text, char_w, char_h, index, exact):
+    """draw_text_on_curve's placement loop; returns (placements, 1px bumps taken)."""
+    placements = []
+    steps = 0
+    idx = 0
+    distance = 0.0
+    phrases = [p for p in text.replace(". ", ".|").split("|") if p.strip()]
+    for phrase in phrases:
+        mark = index.mark()
+        saved = (idx, distance, len(placements))
+        phrase_fits = True
+        for char in phrase:
+            w = char_w * 0.6 if char == " " else char_w
+            segment = curve.segment_containing(distance, idx)
+            placed = False
+            while segment < curve.end_index:
+                x, y, angle = (float(v[0]) for v in curve.points([distance], [segment]))
+                idx = segment
+                box = glyph_box(x, y, angle, w, char_h)
+                if index.intersects_any(box):
+                    if exact:
+                        distance, segment, x, y, angle, box = next_free_slot(index, curve, distance, idx, w, char_h)
+                        if segment >= curve.end_index:
+                            break
+                        idx = segment
+                    else:
+                        distance += 1
+                        steps += 1
+                        segment = curve.segment_containing(distance, idx)
+                        continue
+                index.insert(box)
+                placements.append((x, y, angle))
+                distance += w
+                placed = True
+                break
+            if not placed:
+                phrase_fits = False
+                break
+        if not phrase_fits:
+            idx, distance, keep = saved
+            del placements[keep:]
+            index.rollback(mark)
+            break
+    return placements, steps
+
+
+def layout_all(arcs, char_w, char_h, exact):
+    index = GlyphCollisionIndex()
+    placements, steps = [], 0
+    for curve in arcs:
+        n_chars = max(1, int(curve.length / char_w))
+        text = (SAMPLE_TEXT * (n_chars // len(SAMPLE_TEXT) + 1))[:n_chars]
+        placed, taken = layout_arc(curve, text, char_w, char_h, index, exact)
+        placements.append(placed)
+        steps += taken
+    return placements, steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--arcs", type=int, default=5)
+    parser.add_argument("--turns", type=float, default=5, help="sine periods per arc (higher = steeper)")
+    parser.add_argument("--font-pt", type=float, default=10)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    char_h = args.font_pt * CURRENT_DPI / 72 * 1.2
+    char_w = char_h * 0.5
+    arcs = [CurvePath(xs, ys) for xs, ys in steep_arcs(args.arcs, args.turns)]
+
+    t_bump, (bumped, steps) = best_of(lambda: layout_all(arcs, char_w, char_h, False), args.repeat)
+    t_slot, (slotted, _) = best_of(lambda: layout_all(arcs, char_w, char_h, True), args.repeat)
+    if bumped != slotted:
+        raise SystemExit("next_free_slot placements differ from the 1px bumps")
+
+    glyphs = sum(len(p) for p in slotted)
+    print(f"{args.arcs} arcs, {glyphs} glyphs placed, {steps} 1px bumps past collisions")
+    print(f"1px bumps        {t_bump:>8.3f}s")
+    print(f"next_free_slot   {t_slot:>8.3f}s")
+    print(f"speedup          {t_bump / t_slot:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Benchmark: walking the arc per glyph vs one CurvePath lookup per phrase.
+
+For every component arc of every archetype (scaled onto an 11x14 design)
+this runs the spacing optimizer's workload: BINARY_SEARCH_ITERATIONS fit
+tests of the arc's text at different space multipliers. Once the way
+test_text_fit_on_curve used to do it (rebuild the cumulative lengths, walk
+an index forward glyph by glyph) and once with a CurvePath built once per
+arc and every glyph located in one searchsorted. It also lays the glyph
+centres out with draw_text_on_curve's rule both ways. Both must give the
+same statuses and positions. Glyph widths are fixed so only the curve
+lookup is timed, not Pango.
+
+Usage:
+    python bench/bench_curve_path.py
+    python bench/bench_curve_path.py --font-pt 6 --repeat 5
+"""
+
+import argparse
+import math
+import os
+
+import numpy as np
+
+from bench_utils import CURRENT_DPI, archetype_paths, best_of, load_archetype_story, scaled_component_arcs
+from curve_path import CurvePath
+
+SAMPLE_TEXT = "Meets Fairy Godmother. Loses Slipper. Prince Searches. Happily Ever After. "
+ITERATIONS = 12  # spacing_optimizer.BINARY_SEARCH_ITERATIONS
+MARGIN = 0.625 * CURRENT_DPI
+DESIGN_W, DESIGN_H = 11 * CURRENT_DPI, 14 * CURRENT_DPI
+
+
+def widths_for(text, char_w, multiplier):
+    return [char_w * 0.6 * multiplier if c == " " else char_w for c in text]
+
+
+def fit_walk(xs, ys, widths, char_h):
+    """test_text_fit_on_curve's old per-glyph loop."""
+    x_arr, y_arr = np.array(xs), np.array(ys)
+    segment_lengths = np.hypot(np.diff(x_arr), np.diff(y_arr))
+    total = np.sum(segment_lengths)
+    cumulative = np.insert(np.cumsum(segment_lengths), 0, 0)
+    distance, idx = 0.0, 0
+    for w in widths:
+        if distance + w > total:
+            return "too_long", distance
+        target = distance + w / 2
+        while idx < len(cumulative) - 1:
+            if cumulative[idx + 1] >= target:
+                break
+            idx += 1
+        if idx >= len(cumulative) - 1:
+            return "too_long", distance
+        span = cumulative[idx + 1] - cumulative[idx]
+        if span > 1e-6:
+            ratio = max(0, min(1, (target - cumulative[idx]) / span))
+            x = x_arr[idx] + ratio * (x_arr[idx + 1] - x_arr[idx])
+            y = y_arr[idx] + ratio * (y_arr[idx + 1] - y_arr[idx])
+            if (x - w / 2 < MARGIN or x + w / 2 > DESIGN_W - MARGIN or
+                    y - char_h / 2 < MARGIN or y + char_h / 2 > DESIGN_H - MARGIN):
+                return "too_long", distance
+        distance += w
+    return "done", distance
+
+
+def fit_curve(curve, widths, char_h):
+    """The same test with every glyph located at once."""
+    widths = np.asarray(widths)
+    starts = np.cumsum(np.concatenate(([0.0], widths)))[:-1]
+    failed = starts + widths > curve.length
+    target = starts + widths / 2
+    segments = curve.segments_reaching(target)
+    failed |= segments >= curve.end_index
+    checked = np.flatnonzero(~failed)
+    checked = checked[curve.spans[segments[checked]] > 1e-6]
+    if len(checked):
+        x, y, _ = curve.points(target[checked], segments[checked], clip=True)
+        half_w = widths[checked] / 2
+        failed[checked] = ((x - half_w < MARGIN) | (x + half_w > DESIGN_W - MARGIN) |
+                           (y - char_h / 2 < MARGIN) | (y + char_h / 2 > DESIGN_H - MARGIN))
+    first = np.flatnonzero(failed)
+    if len(first):
+        return "too_long", float(starts[first[0]])
+    return "done", float(starts[-1] + widths[-1]) if len(widths) else 0.0
+
+
+def layout_walk(xs, ys, widths):
+    """draw_text_on_curve's old segment walk (no collisions)."""
+    cumulative = np.insert(np.cumsum(np.hypot(np.diff(xs), np.diff(ys))), 0, 0)
+    out, idx, distance = [], 0, 0.0
+    for w in widths:
+        while idx < len(cumulative) - 1:
+            span = cumulative[idx + 1] - cumulative[idx]
+            if span == 0:
+                idx += 1
+                continue
+            ratio = (distance - cumulative[idx]) / span
+            if ratio < 0 or ratio > 1:
+                idx += 1
+                continue
+            i0, i1 = (idx, idx + 1) if idx == 0 else (idx - 1, idx + 1)
+            out.append((xs[idx] + ratio * (xs[idx + 1] - xs[idx]), ys[idx] + ratio * (ys[idx + 1] - ys[idx]),
+                        math.atan2(ys[i1] - ys[i0], xs[i1] - xs[i0])))
+            distance += w
+            break
+        else:
+            break
+    return out
+
+
+def layout_curve(curve, widths):
+    distances = np.cumsum([0.0] + list(widths[:-1]))
+    segments = curve.segments_containing(distances)
+    on = segments < curve.end_index
+    n = int(np.argmin(on)) if not on.all() else len(on)
+    x, y, angle = curve.points(distances[:n], segments[:n])
+    return [(float(a), float(b), float(c)) for a, b, c in zip(x, y, angle)]
+
+
+def run_story(arcs, char_w, char_h, use_curve):
+    results = []
+    for xs, ys in arcs:
+        length = float(np.sum(np.hypot(np.diff(xs), np.diff(ys))))
+        n_chars = max(1, int(length / char_w))
+        text = (SAMPLE_TEXT * (n_chars // len(SAMPLE_TEXT) + 1))[:n_chars]
+        curve = CurvePath(xs, ys) if use_curve else None
+        for i in range(ITERATIONS):
+            widths = widths_for(text, char_w, 0.8 + 0.55 * i / ITERATIONS)
+            results.append(fit_curve(curve, widths, char_h) if use_curve else fit_walk(xs, ys, widths, char_h))
+        widths = widths_for(text, char_w, 1.0)
+        results.append(layout_curve(curve, widths) if use_curve else layout_walk(xs, ys, widths))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--font-pt", type=float, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    char_h = args.font_pt * CURRENT_DPI / 72 * 1.2
+    char_w = char_h * 0.5
+
+    print(f"{'story':<22}{'arcs':>6}{'walk s':>10}{'curve s':>10}{'speedup':>9}")
+    total_walk = total_curve = 0.0
+    for path in archetype_paths():
+        name = os.path.splitext(os.path.basename(path))[0]
+        arcs = [(list(map(float, xs)), list(map(float, ys))) for xs, ys in scaled_component_arcs(load_archetype_story(path))]
+
+        t_walk, walked = best_of(lambda: run_story(arcs, char_w, char_h, False), args.repeat)
+        t_curve, looked_up = best_of(lambda: run_story(arcs, char_w, char_h, True), args.repeat)
+        if walked != looked_up:
+            raise SystemExit(f"{name}: CurvePath results differ from the walk")
+
+        total_walk += t_walk
+        total_curve += t_curve
+        print(f"{name:<22}{len(arcs):>6}{t_walk:>10.3f}{t_curve:>10.3f}{t_walk / t_curve:>8.1f}x")
+
+    print(f"{'TOTAL':<22}{'':>6}{total_walk:>10.3f}{total_curve:>10.3f}{total_walk / total_curve:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
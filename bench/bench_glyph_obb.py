@@ -0,0 +1,132 @@
+"""
+Benchmark: per-glyph Shapely polygons vs GlyphBox + the vectorized SAT test.
+
+Fills a design with glyph boxes laid along steep synthetic arcs, then probes
+candidate glyph positions (half along the arcs, shifted a little so most of
+them collide, and half anywhere in the band the arcs cover) the two ways the
+layout loop can ask "is this spot taken?":
+
+    shapely   build a Polygon, rotate it, translate it, and intersects() it
+              against the Shapely boxes in the same grid cells (what the
+              collision index did before GlyphBox)
+    obb       glyph_box() + GlyphCollisionIndex.intersects_any(): one
+              separating-axis call against every box in the cells
+
+It reports time per probe and how many answers differ (there should be
+none: exact ties are handed to Shapely, see glyph_obb.TOUCH_TOLERANCE).
+
+Usage:
+    python bench/bench_glyph_obb.py
+    python bench/bench_glyph_obb.py --arcs 10 --probes 50000 --repeat 3
+"""
+
+import argparse
+import math
+from collections import defaultdict
+
+import numpy as np
+from shapely.affinity import rotate as shapely_rotate
+import shapely.affinity
+from shapely.geometry import Polygon
+
+from bench_utils import CURRENT_DPI, best_of
+from bench_collision_slots import steep_arcs
+from curve_path import CurvePath
+from glyph_collision import DEFAULT_CELL_SIZE, GlyphCollisionIndex
+from glyph_obb import glyph_box
+
+
+class ShapelyGrid:
+    """The pre-GlyphBox index: Shapely polygons in the same uniform grid."""
+
+    def __init__(self, boxes, cell_size=DEFAULT_CELL_SIZE):
+        self.cell_size = cell_size
+        self.boxes = boxes
+        self.cells = defaultdict(list)
+        for box_id, box in enumerate(boxes):
+            for cell in self._cells(box.bounds):
+                self.cells[cell].append(box_id)
+
+    def _cells(self, bounds):
+        min_x, min_y, max_x, max_y = bounds
+        c0, c1 = math.floor(min_x / self.cell_size), math.floor(max_x / self.cell_size)
+        r0, r1 = math.floor(min_y / self.cell_size), math.floor(max_y / self.cell_size)
+        return [(c, r) for c in range(c0, c1 + 1) for r in range(r0, r1 + 1)]
+
+    def intersects_any(self, box):
+        min_x, min_y, max_x, max_y = box.bounds
+        seen = set()
+        for cell in self._cells(box.bounds):
+            for box_id in self.cells.get(cell, ()):
+                if box_id in seen:
+                    continue
+                seen.add(box_id)
+                o_min_x, o_min_y, o_max_x, o_max_y = self.boxes[box_id].bounds
+                if o_min_x <= max_x and min_x <= o_max_x and o_min_y <= max_y and min_y <= o_max_y:
+                    if box.intersects(self.boxes[box_id]):
+                        return True
+        return False
+
+
+def shapely_box(x, y, angle, char_width, char_height):
+    box = Polygon([
+        (-char_width / 2, -char_height / 2),
+        (char_width / 2, -char_height / 2),
+        (char_width / 2, char_height / 2),
+        (-char_width / 2, char_height / 2)
+    ])
+    rotated_box = shapely_rotate(box, angle * (180 / math.pi), origin=(0, 0), use_radians=False)
+    return shapely.affinity.translate(rotated_box, xoff=x, yoff=y)
+
+
+def glyph_spots(curve, char_w, offset):
+    distances = np.arange(offset, curve.length, char_w)
+    segments = curve.segments_containing(distances)
+    distances = distances[segments < curve.end_index]
+    segments = segments[segments < curve.end_index]
+    x, y, angle = curve.points(distances, segments)
+    return list(zip(x.tolist(), y.tolist(), angle.tolist()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--arcs", type=int, default=6)
+    parser.add_argument("--turns", type=float, default=5)
+    parser.add_argument("--font-pt", type=float, default=10)
+    parser.add_argument("--probes", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    char_h = args.font_pt * CURRENT_DPI / 72 * 1.2
+    char_w = char_h * 0.5
+    arcs = [CurvePath(xs, ys) for xs, ys in steep_arcs(args.arcs, args.turns)]
+
+    index = GlyphCollisionIndex()
+    for curve in arcs[::2]:
+        for x, y, angle in glyph_spots(curve, char_w, 0.0):
+            index.insert(glyph_box(x, y, angle, char_w, char_h))
+    grid = ShapelyGrid(index.to_shapely())
+
+    # half along the arcs (mostly taken), half anywhere in the band they cover
+    rng = np.random.default_rng(0)
+    along = [spot for curve in arcs for spot in glyph_spots(curve, char_w / 3, char_w / 7)]
+    along = [along[i] for i in rng.integers(0, len(along), args.probes // 2)]
+    x0, y0, x1, y1 = np.min([b.bounds for b in index], axis=0)[:2].tolist() + np.max([b.bounds for b in index], axis=0)[2:].tolist()
+    anywhere = zip(rng.uniform(x0, x1, args.probes - len(along)).tolist(), rng.uniform(y0, y1, args.probes - len(along)).tolist(),
+                   rng.uniform(-math.pi, math.pi, args.probes - len(along)).tolist())
+    probes = along + list(anywhere)
+
+    t_shapely, shapely_hits = best_of(
+        lambda: [grid.intersects_any(shapely_box(x, y, a, char_w, char_h)) for x, y, a in probes], args.repeat)
+    t_obb, obb_hits = best_of(
+        lambda: [index.intersects_any(glyph_box(x, y, a, char_w, char_h)) for x, y, a in probes], args.repeat)
+
+    differ = sum(a != b for a, b in zip(shapely_hits, obb_hits))
+    print(f"{len(index)} rendered boxes, {len(probes)} probes, {sum(obb_hits)} collide, {differ} answers differ")
+    print(f"shapely   {t_shapely:>8.3f}s  {t_shapely / len(probes) * 1e6:>7.1f}us/probe")
+    print(f"obb       {t_obb:>8.3f}s  {t_obb / len(probes) * 1e6:>7.1f}us/probe")
+    print(f"speedup   {t_shapely / t_obb:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Benchmark: product_mockups.place_artworks, full-frame vs slot-region compositing.
+
+place_artworks used to warp each artwork onto a canvas the size of the whole
+@BIG template, build full-size polygon / lip / sharpen masks and
+alpha-composite the whole frame once per slot. legacy_place_artworks() below
+is a reference copy of that version. For every entry in MOCKUPS this renders
+the same art with both versions, each in a fresh process, and reports
+per-mockup latency (with and without the final PNG save, which both
+versions share), peak RSS and the largest pixel difference between the two
+outputs. The region version warps with coefficients relative to the slot's
+region, so a few hundred pixels come out +-1 before sharpening; anything
+above a handful is a real difference.
+
+The templates live on the design machine; when a template path doesn't
+exist (and isn't found in --template-dir) a synthetic template just big
+enough for the slots is used instead, which keeps the timings comparable
+even if they aren't the real sizes.
+
+Usage:
+    python bench/bench_mockups.py
+    python bench/bench_mockups.py --template-dir ~/mockup_templates --art design.png --repeat 3
+"""
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from bench_utils import best_of, peak_rss_mb  # also puts src/ on sys.path
+
+
+def legacy_place_artworks(mockup_path, output_path, slots, artwork_paths, default_mode="fill",
+                          lip_width_px=5, lip_feather=0.8, supersample=2, sharpen=True, unsharp=(1.0, 150, 2)):
+    """The pre-region place_artworks, kept for comparison."""
+    from PIL import Image, ImageDraw, ImageFilter
+    from product_mockups import (avg_aspect_from_quad, crop_to_aspect, fit_to_aspect_canvas,
+                                 overlay_inner_lip, polygon_mask, warp_art_into_quad)
+
+    base = Image.open(mockup_path).convert("RGBA")
+    W0, H0 = base.size
+    ss = max(1, int(round(supersample)))
+    arts = [Image.open(p).convert("RGBA") for p in artwork_paths]
+
+    work_slots = []
+    for slot in slots:
+        s = dict(slot)
+        if "rect" in s and "quad" not in s:
+            x, y, w, h = s.pop("rect")
+            s["quad"] = [(x, y), (x + w, y), (x + w, y + h), (x, y + h)]
+        s["quad"] = [(qx * ss, qy * ss) for (qx, qy) in s["quad"]]
+        work_slots.append(s)
+    if ss > 1:
+        base = base.resize((W0 * ss, H0 * ss), Image.LANCZOS)
+
+    comp = base.copy()
+    union_mask = Image.new("L", base.size, 0)
+    poly_feather = 0.7 * ss if ss > 1 else 0.7
+    lip_w = max(1, int(round(lip_width_px * ss)))
+    lip_f = float(lip_feather) * ss if ss > 1 else float(lip_feather)
+
+    for i, slot in enumerate(work_slots):
+        quad = slot["quad"]
+        art = arts[slot.get("art_idx", i if i < len(arts) else len(arts) - 1)]
+        opening_aspect = avg_aspect_from_quad(quad)
+        mode = slot.get("mode", default_mode)
+        if mode == "fill":
+            art_prepped = crop_to_aspect(art, opening_aspect)
+        elif mode == "fit":
+            art_prepped = fit_to_aspect_canvas(art, opening_aspect)
+        else:
+            art_prepped = art
+        warped = warp_art_into_quad(base.size, art_prepped, quad)
+        mask = polygon_mask(base.size, quad, feather=poly_feather)
+        comp = Image.alpha_composite(comp, Image.composite(warped, Image.new("RGBA", base.size, (0, 0, 0, 0)), mask))
+        ImageDraw.Draw(union_mask, "L").polygon(quad, fill=255)
+        comp = overlay_inner_lip(comp, quad, width_px=lip_w, feather=lip_f)
+
+    if sharpen:
+        radius, percent, thresh = unsharp
+        sharpened = comp.filter(ImageFilter.UnsharpMask(radius=radius, percent=percent, threshold=thresh))
+        comp = Image.composite(sharpened, comp, union_mask)
+    if ss > 1:
+        comp = comp.resize((W0, H0), Image.LANCZOS)
+
+    if os.path.splitext(output_path)[1].lower() in (".jpg", ".jpeg"):
+        comp.convert("RGB").save(output_path, "JPEG", quality=95, optimize=True)
+    else:
+        comp.save(output_path, "PNG", optimize=True)
+    return output_path
+
+
+# -------------------- inputs --------------------
+
+def synthetic_template(path, slots):
+    """A textured stand-in template sized to fit the slots with a margin."""
+    import numpy as np
+    from PIL import Image
+
+    max_x = max(x for slot in slots for x, _ in slot["quad"])
+    max_y = max(y for slot in slots for _, y in slot["quad"])
+    W, H = int(max_x * 1.15) + 64, int(max_y * 1.1) + 64
+    rng = np.random.default_rng(0)
+    yy, xx = np.mgrid[0:H, 0:W]
+    rgb = np.stack([(xx * 255 // W), (yy * 255 // H), ((xx + yy) % 256)], axis=-1).astype(np.int16)
+    rgb += rng.integers(-12, 12, size=rgb.shape, dtype=np.int16)
+    Image.fromarray(np.clip(rgb, 0, 255).astype(np.uint8), "RGB").save(path)
+    return path
+
+
+def synthetic_art(path, size=(3300, 4200)):
+    """Light background with dark strokes, roughly what an 11x14 design looks like."""
+    from PIL import Image, ImageDraw
+
+    art = Image.new("RGB", size, (236, 228, 210))
+    d = ImageDraw.Draw(art)
+    for i in range(0, size[0], 40):
+        d.line([(i, size[1] * 0.3), (i + 20, size[1] * 0.7 - (i % 400))], fill=(30, 40, 60), width=6)
+    for row in range(120, size[1], 180):
+        d.text((140, row), "Home. Journey. Trial. Return. " * 6, fill=(20, 20, 20))
+    art.save(path)
+    return path
+
+
+def resolve_template(mockup, template_dir, work_dir, name):
+    path = mockup["mockup_template_path"]
+    if os.path.exists(path):
+        return path, "template"
+    if template_dir:
+        candidate = os.path.join(os.path.expanduser(template_dir), os.path.basename(path))
+        if os.path.exists(candidate):
+            return candidate, "template"
+    return synthetic_template(os.path.join(work_dir, f"{name}-template.png"), mockup["slots"]), "synthetic"
+
+
+# -------------------- measuring --------------------
+
+def _measure(impl, kwargs, repeat, result_queue):
+    # runs in a fresh process so the peak RSS is this implementation's alone
+    from PIL import Image
+    import product_mockups
+    fn = legacy_place_artworks if impl == "legacy" else product_mockups.place_artworks
+    best, _ = best_of(lambda: fn(**kwargs), repeat)
+    peak_mb = peak_rss_mb()
+    # time the save on its own so the compositing cost can be read separately
+    out = Image.open(kwargs["output_path"])
+    out.load()
+    save_s, _ = best_of(lambda: out.save(kwargs["output_path"], "PNG", optimize=True), 1)
+    result_queue.put((best, best - save_s, peak_mb))
+
+
+def measure(impl, kwargs, repeat):
+    ctx = multiprocessing.get_context("spawn")
+    result_queue = ctx.Queue()
+    proc = ctx.Process(target=_measure, args=(impl, kwargs, repeat, result_queue))
+    proc.start()
+    result = result_queue.get()
+    proc.join()
+    return result
+
+
+def max_pixel_diff(path_a, path_b):
+    import numpy as np
+    from PIL import Image
+
+    a = np.asarray(Image.open(path_a).convert("RGBA"), dtype=np.int16)
+    b = np.asarray(Image.open(path_b).convert("RGBA"), dtype=np.int16)
+    if a.shape != b.shape:
+        return None
+    return int(np.abs(a - b).max())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--template-dir", default=None, help="where to look for templates missing from their MOCKUPS path")
+    parser.add_argument("--art", action="append", default=None, help="design image(s); default is a synthetic 11x14 design")
+    parser.add_argument("--repeat", type=int, default=2)
+    parser.add_argument("--supersample", type=int, default=1, help="create_mockups uses 1")
+    parser.add_argument("--mockup", action="append", default=None, help="only these MOCKUPS keys")
+    args = parser.parse_args()
+
+    from product_mockups import MOCKUPS
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        art_paths = args.art or [synthetic_art(os.path.join(work_dir, "art.png"))]
+        names = args.mockup or list(MOCKUPS)
+
+        print(f"{'mockup':<24}{'source':<11}{'legacy s':>10}{'region s':>10}"
+              f"{'legacy comp s':>15}{'region comp s':>15}{'speedup':>9}{'legacy MB':>11}{'region MB':>11}{'max diff':>10}")
+        for name in names:
+            mockup = MOCKUPS[name]
+            template_path, source = resolve_template(mockup, args.template_dir, work_dir, name)
+            results = {}
+            for impl in ("legacy", "region"):
+                kwargs = {
+                    "mockup_path": template_path,
+                    "output_path": os.path.join(work_dir, f"{name}-{impl}.png"),
+                    "slots": mockup["slots"],
+                    "artwork_paths": art_paths,
+                    "supersample": args.supersample,
+                    "sharpen": True,
+                    "unsharp": (0.7, 200, 0),  # what create_mockups passes
+                    "lip_width_px": 5,
+                    "lip_feather": 0.8,
+                }
+                results[impl] = measure(impl, kwargs, args.repeat)
+            diff = max_pixel_diff(os.path.join(work_dir, f"{name}-legacy.png"), os.path.join(work_dir, f"{name}-region.png"))
+            (legacy_s, legacy_comp_s, legacy_mb), (region_s, region_comp_s, region_mb) = results["legacy"], results["region"]
+            print(f"{name:<24}{source:<11}{legacy_s:>10.2f}{region_s:>10.2f}{legacy_comp_s:>15.2f}{region_comp_s:>15.2f}"
+                  f"{legacy_comp_s / max(region_comp_s, 1e-3):>8.1f}x{legacy_mb:>11.0f}{region_mb:>11.0f}{str(diff):>10}")
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    main()
+    print(f"done in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,419 @@
+"""
+Benchmark suite: create_shape over every archetype at the sizes and fonts we sell.
+
+Each case is one story (archetypes_data/*.json, plus any --story files)
+rendered at one size (8x10, 11x14, 12x12) in one font, with the print
+settings create_product_data uses. Every render runs in a fresh process
+and records:
+
+    wall_s        create_shape wall time (imports excluded)
+    passes        create_shape passes until it completed (from RenderProfiler)
+    peak_rss_mb   the process's peak RSS
+    hash          sha256 of the PNG it wrote
+    sections      RenderProfiler's time per section, to see what moved
+
+No LLM calls: the descriptors come from llm.py's "fake" provider. The first
+time a case runs, an untimed render lets the fake provider write the arc
+text and the result is kept in --arc-text (bench/render_suite_arc_text.json).
+Timed renders start from that text, reset to the state right after the
+text was written, so every run lays out the same text and only the
+layout / fit loop is measured.
+
+--incremental renders with create_shape's incremental_mode on and
+--predictive-fit with predictive_fit on; compare either against a baseline
+saved without it to check the output hashes still match.
+
+--save-baseline writes the results to a baseline file. --compare checks a
+run against one and exits 1 if a case got slower or used more memory than
+--threshold allows, took more passes, stopped completing, or wrote a
+different image (pass --allow-output-change when that is the point of the
+change). Baselines only mean something on the machine that recorded them,
+so none is committed: run --save-baseline first (on the tree before the
+change you want to measure), then --compare after it.
+
+Usage:
+    python bench/bench_render_suite.py --save-baseline
+    python bench/bench_render_suite.py --compare --threshold 0.15
+    python bench/bench_render_suite.py --compare --incremental
+    python bench/bench_render_suite.py --compare --predictive-fit
+    python bench/bench_render_suite.py --archetype man_in_hole --size 11x14 --font Lora --repeat 3
+    python bench/bench_render_suite.py --story ~/story_data/the-stranger-meursault.json --compare
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import random
+import sys
+import tempfile
+import time
+
+from bench_utils import REPO_ROOT, archetype_paths, load_archetype_story, peak_rss_mb  # also puts src/ on sys.path
+
+BENCH_DIR = os.path.join(REPO_ROOT, "bench")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "render_baseline.json")
+DEFAULT_ARC_TEXT = os.path.join(BENCH_DIR, "render_suite_arc_text.json")
+
+# (width, height, max_num_steps): create_shape's note is 2 for 8x10 and 3 for 12x12, prints use 2 at 11x14
+SIZES = {
+    "8x10": (8, 10, 2),
+    "11x14": (11, 14, 2),
+    "12x12": (12, 12, 3),
+}
+FONTS = ("Playfair Display", "Cormorant Garamond", "Lora", "Merriweather")
+
+# what a story brings before any render has touched it
+BASE_COMPONENT_KEYS = ("end_time", "description", "arc", "end_fortune_score", "end_emotional_score",
+                       "modified_end_time", "modified_end_fortune_score")
+# what the descriptor step leaves on a component (kept in --arc-text)
+ARC_TEXT_KEYS = ("arc_text", "arc_text_attempts", "arc_text_valid", "arc_text_valid_message",
+                 "actual_arc_text_chars", "target_arc_text_chars", "target_arc_text_chars_with_net")
+
+
+# -------------------- cases --------------------
+
+def slug(text):
+    return text.lower().replace(" ", "-")
+
+
+def build_cases(story_paths, sizes, fonts):
+    return [{"id": f"{os.path.splitext(os.path.basename(path))[0]}/{size}/{slug(font)}",
+             "story_path": path, "size": size, "font": font}
+            for path in story_paths for size in sizes for font in fonts]
+
+
+def base_story(path):
+    story = load_archetype_story(path)
+    components = [{key: component[key] for key in BASE_COMPONENT_KEYS if key in component}
+                  for component in story["story_components"]]
+    return {"title": story["title"], "protagonist": story["protagonist"], "author": story.get("author", ""),
+            "story_components": components}
+
+
+def with_arc_text(story, arc_text):
+    """`story` with the saved arc text on each component, spacing reset like a freshly generated text."""
+    story = json.loads(json.dumps(story))
+    for component, saved in zip(story["story_components"][1:], arc_text):
+        component.update(saved)
+        if "arc_text" not in saved:
+            continue
+        spaces = saved["arc_text"].count(" ")
+        component.update({
+            "spaces_in_arc_text": spaces,
+            "spaces_width_multiplier": {space_index: 1.0 for space_index in range(spaces)},
+            "space_to_modify": 0,
+            "spacing_adjustment_attempts": 0,
+            "spacing_factor": 1,
+            "adjust_spacing": False,
+            "spacing_optimized": False,
+        })
+    return story
+
+
+def render_kwargs(case, story, story_path, work_dir, config_path, max_loops, options):
+    """create_shape arguments: create_product_data's print settings at this case's size and font, plus `options`."""
+    width, height, max_num_steps = SIZES[case["size"]]
+    font = case["font"]
+    font_color = "#1F4534"
+    return dict(
+        config_path=config_path,
+        output_dir=work_dir,
+        story_data_dir=work_dir,
+        story_data_path=story_path,
+        product="print",
+        x_delta=0.015,
+        step_k=6,
+        max_num_steps=max_num_steps,
+        line_type="char",
+        line_thickness=38,
+        line_color=font_color,
+        font_style=font,
+        font_size=12,
+        font_color=font_color,
+        background_type="solid",
+        background_value="#F5F0E6",
+        has_title="YES",
+        title_font_style=font,
+        title_font_size=25,
+        title_font_color=font_color,
+        title_padding=0,
+        gap_above_title=102,
+        protagonist_text=story["protagonist"],
+        protagonist_font_style=font,
+        protagonist_font_size=15,
+        protagonist_font_color=font_color,
+        author_text=story["author"],
+        author_font_style=font,
+        author_font_size=15,
+        author_font_color=font_color,
+        top_text=story["author"],
+        top_text_font_style=font,
+        top_text_font_size=12,
+        top_text_font_color=font_color,
+        bottom_text_font_size=12,
+        top_and_bottom_text_band=1,
+        border=True,
+        border_thickness=0.5,
+        border_color="#FFFFFF",
+        width_in_inches=width,
+        height_in_inches=height,
+        wrap_in_inches=0,
+        wrap_background_color="#FFFFFF",
+        fixed_margin_in_inches=0.85,
+        recursive_mode=True,
+        recursive_loops=max_loops,
+        llm_provider="fake",
+        llm_model="fake-descriptors",
+        output_format="png",
+        **options,
+    )
+
+
+# -------------------- child processes --------------------
+
+def _start_child(verbose):
+    # create_shape prints every pass; keep the table readable
+    if not verbose:
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, 1)
+        sys.stdout = open(1, "w", closefd=False)
+    # the fit loop draws random nudges; seed so runs are comparable
+    import numpy as np
+    random.seed(0)
+    np.random.seed(0)
+
+
+def _prefill(case, story, story_path, work_dir, config_path, max_loops, options, verbose, result_queue):
+    try:
+        _start_child(verbose)
+        from product_shape import create_shape
+        data_path, _ = create_shape(**render_kwargs(case, story, story_path, work_dir, config_path, max_loops, options))
+        with open(data_path, "r", encoding="utf-8") as f:
+            rendered = json.load(f)
+        rendered = rendered.get("story_plot_data", rendered)
+        arc_text = [{key: component[key] for key in ARC_TEXT_KEYS if key in component}
+                    for component in rendered["story_components"][1:]]
+        if not all("arc_text" in saved for saved in arc_text):
+            result_queue.put({"error": f"prefill render ended '{rendered.get('status')}' without arc text"})
+        else:
+            result_queue.put({"arc_text": arc_text})
+    except Exception as e:
+        result_queue.put({"error": f"prefill: {type(e).__name__}: {e}"})
+
+
+def _render(case, story, story_path, work_dir, config_path, max_loops, options, verbose, result_queue):
+    try:
+        _start_child(verbose)
+        from product_shape import create_shape
+        from render_profiler import RenderProfiler
+
+        profiler = RenderProfiler(label=case["id"])
+        start = time.perf_counter()
+        _, shape_path = create_shape(**render_kwargs(case, story, story_path, work_dir, config_path, max_loops, options),
+                                     profile=profiler)
+        wall_s = time.perf_counter() - start
+        with open(shape_path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        summary = profiler.summary()
+        result_queue.put({
+            "wall_s": wall_s,
+            "passes": summary["passes"],
+            "status": summary["final_status"],
+            "peak_rss_mb": peak_rss_mb(),
+            "hash": digest,
+            "sections": {name: section["s"] for name, section in summary["sections"].items()},
+        })
+    except Exception as e:
+        result_queue.put({"error": f"render: {type(e).__name__}: {e}"})
+
+
+def run_child(target, *args):
+    ctx = multiprocessing.get_context("spawn")
+    result_queue = ctx.Queue()
+    proc = ctx.Process(target=target, args=args + (result_queue,))
+    proc.start()
+    while True:
+        try:
+            result = result_queue.get(timeout=1)
+            break
+        except queue.Empty:
+            if not proc.is_alive():
+                result = {"error": f"child exited with code {proc.exitcode}"}
+                break
+    proc.join()
+    return result
+
+
+# -------------------- measuring --------------------
+
+def load_json(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def create_shape_options(args):
+    """create_shape modes switched by the command line."""
+    return {"incremental_mode": args.incremental, "predictive_fit": args.predictive_fit}
+
+
+def measure_case(case, args, work_dir, config_path, arc_texts):
+    story = base_story(case["story_path"])
+    case_dir = tempfile.mkdtemp(prefix=slug(case["id"]).replace("/", "_") + "-", dir=work_dir)
+
+    if case["id"] not in arc_texts:
+        story_path = os.path.join(case_dir, "story.json")
+        save_json(story_path, story)
+        prefill_dir = tempfile.mkdtemp(prefix="prefill-", dir=case_dir)
+        prefilled = run_child(_prefill, case, story, story_path, prefill_dir, config_path, args.max_loops,
+                              create_shape_options(args), args.verbose)
+        if "error" in prefilled:
+            return prefilled
+        arc_texts[case["id"]] = prefilled["arc_text"]
+        save_json(args.arc_text, arc_texts)
+
+    story = with_arc_text(story, arc_texts[case["id"]])
+    story_path = os.path.join(case_dir, "story-with-arc-text.json")
+    save_json(story_path, story)
+
+    runs = []
+    for _ in range(args.repeat):
+        # a fresh data dir each time, or create_shape picks up the last run's converged product data
+        run_dir = tempfile.mkdtemp(prefix="run-", dir=case_dir)
+        run = run_child(_render, case, story, story_path, run_dir, config_path, args.max_loops,
+                        create_shape_options(args), args.verbose)
+        if "error" in run:
+            return run
+        runs.append(run)
+
+    result = dict(min(runs, key=lambda run: run["wall_s"]))
+    result["peak_rss_mb"] = min(run["peak_rss_mb"] for run in runs)
+    result["deterministic"] = len({(run["hash"], run["passes"]) for run in runs}) == 1
+    return result
+
+
+# -------------------- comparing --------------------
+
+def compare(results, baseline, threshold, allow_output_change):
+    """Print each case against the baseline; return the regressions as (case id, reason)."""
+    regressions = []
+    print(f"\n{'case':<44}{'wall s':>9}{'base s':>9}{'Δ':>8}{'MB':>8}{'base MB':>9}{'passes':>8}{'base':>6}  output")
+    for case_id, result in results.items():
+        base = baseline.get(case_id)
+        if base is None or "error" in base:
+            print(f"{case_id:<44}  (not in baseline)")
+            continue
+        if "error" in result:
+            regressions.append((case_id, result["error"]))
+            print(f"{case_id:<44}  ❌ {result['error']}")
+            continue
+        wall_change = result["wall_s"] / base["wall_s"] - 1 if base["wall_s"] else 0.0
+        rss_change = result["peak_rss_mb"] / base["peak_rss_mb"] - 1 if base["peak_rss_mb"] else 0.0
+        same_output = result["hash"] == base["hash"]
+        reasons = []
+        if wall_change > threshold:
+            reasons.append(f"wall time +{wall_change:.0%}")
+        if rss_change > threshold:
+            reasons.append(f"peak RSS +{rss_change:.0%}")
+        if result["passes"] > base["passes"]:
+            reasons.append(f"passes {base['passes']} → {result['passes']}")
+        if base["status"] == "completed" and result["status"] != "completed":
+            reasons.append(f"status {result['status']}")
+        if not same_output and not allow_output_change:
+            reasons.append("output changed")
+        regressions.extend((case_id, reason) for reason in reasons)
+        print(f"{case_id:<44}{result['wall_s']:>9.2f}{base['wall_s']:>9.2f}{wall_change:>+8.0%}"
+              f"{result['peak_rss_mb']:>8.0f}{base['peak_rss_mb']:>9.0f}{result['passes']:>8}{base['passes']:>6}  "
+              f"{'same' if same_output else 'CHANGED'}{'  ⚠️ ' + ', '.join(reasons) if reasons else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--archetype", action="append", default=None, help="only these archetypes (file name without .json)")
+    parser.add_argument("--story", action="append", default=[], help="story data file(s) to add to the suite")
+    parser.add_argument("--size", action="append", choices=sorted(SIZES), default=None)
+    parser.add_argument("--font", action="append", default=None)
+    parser.add_argument("--repeat", type=int, default=1, help="renders per case; the fastest is kept")
+    parser.add_argument("--max-loops", type=int, default=500, help="create_shape recursive_loops")
+    parser.add_argument("--arc-text", default=DEFAULT_ARC_TEXT, help="pre-filled arc text per case (written on first use)")
+    parser.add_argument("--save-baseline", nargs="?", const=DEFAULT_BASELINE, default=None)
+    parser.add_argument("--compare", nargs="?", const=DEFAULT_BASELINE, default=None)
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative growth in wall time / peak RSS")
+    parser.add_argument("--allow-output-change", action="store_true")
+    parser.add_argument("--incremental", action="store_true", help="render with create_shape's incremental_mode on")
+    parser.add_argument("--predictive-fit", action="store_true", help="render with create_shape's predictive_fit on")
+    parser.add_argument("--verbose", action="store_true", help="show create_shape's output")
+    args = parser.parse_args()
+
+    story_paths = [path for path in archetype_paths()
+                   if args.archetype is None or os.path.splitext(os.path.basename(path))[0] in args.archetype]
+    story_paths += [os.path.expanduser(path) for path in args.story]
+    cases = build_cases(story_paths, args.size or list(SIZES), args.font or list(FONTS))
+    arc_texts = load_json(args.arc_text, {})
+    baseline = load_json(args.compare, None) if args.compare else None
+    if args.compare and baseline is None:
+        parser.error(f"no baseline at {args.compare}; record one first with --save-baseline "
+                     f"(baselines are per machine, none is committed)")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        config_path = os.path.join(work_dir, "config.yaml")
+        with open(config_path, "w", encoding="utf-8") as f:
+            json.dump({"llm_cache": {"mode": "off"}, "fake_seed": 0}, f)  # JSON is valid YAML
+
+        print(f"{len(cases)} cases, {args.repeat} render(s) each")
+        print(f"{'case':<44}{'status':<12}{'passes':>7}{'wall s':>9}{'peak MB':>9}  {'hash':<14}top sections")
+        for case in cases:
+            result = measure_case(case, args, work_dir, config_path, arc_texts)
+            results[case["id"]] = result
+            if "error" in result:
+                print(f"{case['id']:<44}❌ {result['error']}")
+                continue
+            top = sorted(result["sections"].items(), key=lambda kv: -kv[1])[:3]
+            print(f"{case['id']:<44}{str(result['status']):<12}{result['passes']:>7}{result['wall_s']:>9.2f}"
+                  f"{result['peak_rss_mb']:>9.0f}  {result['hash'][:12]:<14}"
+                  + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in top)
+                  + ("" if result["deterministic"] else "  ⚠️ runs differ"))
+
+    if args.save_baseline:
+        previous = load_json(args.save_baseline, {}).get("cases", {})
+        previous.update(results)
+        save_json(args.save_baseline, {
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "machine": f"{platform.node()} {platform.platform()} python {platform.python_version()}",
+            "max_loops": args.max_loops,
+            "repeat": args.repeat,
+            "cases": previous,
+        })
+        print(f"\n💾 baseline: {args.save_baseline} ({len(results)} cases updated)")
+
+    if baseline is not None:
+        regressions = compare(results, baseline["cases"], args.threshold, args.allow_output_change)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for case_id, reason in regressions:
+                print(f"   {case_id}: {reason}")
+            sys.exit(1)
+        print(f"\n✅ no regressions beyond {args.threshold:.0%}")
+
+    if any("error" in result for result in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    main()
+    print(f"done in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,116 @@
+"""
+Benchmark: plain requests.post vs the shared ShopifyGraphQLClient.
+
+Runs against shopify_stub with a small cost bucket so throttling actually
+happens. N metafieldsSet mutations (and a few queries) are sent from a
+handful of threads:
+
+    plain   what the shopify_* modules used to do: requests.post per call,
+            no connection reuse, no look at extensions.cost; a THROTTLED
+            response is a failed call
+    client  ShopifyGraphQLClient: pooled keep-alive sessions, leaky bucket
+            fed by extensions.cost, retry on THROTTLED
+
+and prints wall time, failures and the client's metrics.
+
+Usage:
+    python bench/bench_shopify_client.py
+    python bench/bench_shopify_client.py --calls 200 --threads 8 --bucket 200 --restore-rate 40
+"""
+
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bench_utils  # noqa: F401  (puts src/ on sys.path)
+
+MUTATION = """
+mutation metafieldsSet($metafields: [MetafieldsSetInput!]!) {
+  metafieldsSet(metafields: $metafields) {
+    metafields { id }
+    userErrors { field message }
+  }
+}
+"""
+QUERY = "query { shop { name } }"
+
+
+def calls(n):
+    out = []
+    for i in range(n):
+        if i % 5 == 4:
+            out.append((QUERY, {}))
+        else:
+            out.append((MUTATION, {"metafields": [{"ownerId": f"gid://shopify/ProductVariant/{i}", "namespace": "bench",
+                                                   "key": "n", "type": "number_integer", "value": str(i)}]}))
+    return out
+
+
+def run_plain(endpoint, work, threads):
+    import requests
+
+    headers = {"X-Shopify-Access-Token": "stub-token", "Content-Type": "application/json"}
+
+    def one(call):
+        query, variables = call
+        r = requests.post(endpoint, headers=headers, json={"query": query, "variables": variables})
+        r.raise_for_status()
+        return "errors" not in r.json()
+
+    with ThreadPoolExecutor(threads) as pool:
+        ok = list(pool.map(one, work))
+    return ok.count(False)
+
+
+def run_client(client, work, threads):
+    def one(call):
+        try:
+            client.execute(*call)
+            return True
+        except RuntimeError:
+            return False
+
+    with ThreadPoolExecutor(threads) as pool:
+        ok = list(pool.map(one, work))
+    return ok.count(False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=120)
+    parser.add_argument("--threads", type=int, default=6)
+    parser.add_argument("--bucket", type=float, default=100)
+    parser.add_argument("--restore-rate", type=float, default=50)
+    parser.add_argument("--gql-latency-s", type=float, default=0.03)
+    args = parser.parse_args()
+
+    from shopify_client import ShopifyGraphQLClient
+    from shopify_stub import ShopifyStub
+
+    work = calls(args.calls)
+    # at the restore rate alone the work can't finish faster than this
+    total_cost = sum(10 if q is MUTATION else 2 for q, _ in work)
+    floor_s = max(0.0, total_cost - args.bucket) / args.restore_rate
+    print(f"{args.calls} calls ({total_cost:.0f} points), {args.threads} threads, bucket {args.bucket:.0f} "
+          f"@ {args.restore_rate:.0f}/s (throughput floor {floor_s:.1f}s)")
+
+    for name in ("plain", "client"):
+        with ShopifyStub(gql_latency_s=args.gql_latency_s, bucket_size=args.bucket,
+                         restore_rate=args.restore_rate) as stub:
+            start = time.perf_counter()
+            if name == "plain":
+                failed = run_plain(stub.endpoint, work, args.threads)
+                metrics = None
+            else:
+                client = ShopifyGraphQLClient(stub.shop_domain, "stub-token", endpoint=stub.endpoint)
+                failed = run_client(client, work, args.threads)
+                metrics = client.metrics()
+            elapsed = time.perf_counter() - start
+            print(f"{name:<8}{elapsed:>7.2f}s  failed {failed:>4}  server THROTTLED {stub.stats.get('THROTTLED', 0)}")
+            if metrics:
+                print(json.dumps({k: v for k, v in metrics.items() if k != "operations"}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark: metafield writes, one metafieldsSet per owner vs MetafieldBatch.
+
+Runs against shopify_stub. A sheet run of P products, each with its product
+metafields (~16) and V variants with a few metafields each plus the two
+mockup metafields, is written three ways:
+
+    per-owner  what the build used to do: one metafieldsSet per product, per
+               variant and per mockup metafield
+    batched    one metafield_batch() around the run: 25 per metafieldsSet
+    rerun      the same run again with the snapshot from `batched`; nothing
+               changed, so nothing should be sent
+
+and prints wall time plus metafieldsSet calls and metafields written.
+
+Usage:
+    python bench/bench_shopify_metafields.py
+    python bench/bench_shopify_metafields.py --products 10 --variants 12
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import bench_utils  # noqa: F401  (puts src/ on sys.path)
+
+
+def run_writes(products, variants):
+    """MetafieldsSetInput lists, grouped the way the build writes them."""
+    groups = []
+    for p in range(products):
+        pid = f"gid://shopify/Product/{p}"
+        product = [{"ownerId": pid, "namespace": "story", "key": f"field_{i}", "type": "single_line_text_field",
+                    "value": f"product {p} value {i}"} for i in range(16)]
+        groups.append(product)
+        for v in range(variants):
+            vid = f"gid://shopify/ProductVariant/{p}-{v}"
+            groups.append([{"ownerId": vid, "namespace": "product", "key": key, "type": "single_line_text_field",
+                            "value": f"{key} {p}-{v}"} for key in ("size", "paper", "frame")])
+            groups.append([{"ownerId": vid, "namespace": "mockup", "key": "primary", "type": "url",
+                            "value": f"https://cdn.example.com/{p}-{v}-0.png"}])
+            groups.append([{"ownerId": vid, "namespace": "mockup", "key": "gallery", "type": "list.url",
+                            "value": json.dumps([f"https://cdn.example.com/{p}-{v}-{i}.png" for i in range(3)])}])
+    return groups
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=5)
+    parser.add_argument("--variants", type=int, default=8)
+    parser.add_argument("--gql-latency-s", type=float, default=0.05)
+    args = parser.parse_args()
+
+    from shopify_client import ShopifyGraphQLClient
+    from shopify_metafield_batch import MUT_METAFIELDS_SET, metafield_batch, set_metafields
+    from shopify_stub import ShopifyStub
+
+    groups = run_writes(args.products, args.variants)
+    total = sum(len(g) for g in groups)
+    print(f"{args.products} products x {args.variants} variants: {total} metafields in {len(groups)} writes")
+
+    with tempfile.TemporaryDirectory() as work_dir, ShopifyStub(gql_latency_s=args.gql_latency_s) as stub:
+        client = ShopifyGraphQLClient(stub.shop_domain, "stub-token", endpoint=stub.endpoint)
+        snapshot_path = os.path.join(work_dir, "metafields.json")
+
+        def per_owner():
+            for g in groups:
+                res = client.execute(MUT_METAFIELDS_SET, {"metafields": g})["metafieldsSet"]
+                assert not res["userErrors"], res["userErrors"]
+
+        def batched():
+            with metafield_batch(execute=client.execute, snapshot_path=snapshot_path):
+                for g in groups:
+                    set_metafields(g, execute=client.execute)
+
+        for name, fn in (("per-owner", per_owner), ("batched", batched), ("rerun", batched)):
+            stub.reset_stats()
+            before = dict(stub.metafields)
+            start = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - start
+            print(f"{name:<10}{elapsed:>7.2f}s   metafieldsSet calls {stub.stats.get('metafieldsSet', 0):>4}")
+            if name == "rerun":
+                assert stub.metafields == before
+            assert len(stub.metafields) == total
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Benchmark: publishing a story to Shopify, first time vs re-publish.
+
+Runs the real publish steps (create_shopify_product,
+create_shopify_product_variant, add_shopify_product_variant_mockups for every
+variant, all inside one metafield_batch()) against shopify_stub for a
+synthetic story with V variants and M mockups each, three times:
+
+    publish      nothing on Shopify yet
+    republish    same story again: shopify_sync should plan nothing
+    one change   one variant's print details and one of its mockups changed
+
+and prints wall time plus the write calls (mutations and staged uploads)
+the stub saw. republish has to make zero.
+
+The shopify_* modules read config.yaml on import, so this still needs the
+usual config file (the credentials in it are never used). The state file
+and metafield snapshot are written to a temp dir.
+
+Usage:
+    python bench/bench_shopify_sync.py
+    python bench/bench_shopify_sync.py --variants 8 --mockups 4
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import bench_utils  # noqa: F401  (puts src/ on sys.path)
+
+READS = {"nodes", "product", "productMedia", "productVariantMedia", "productAndVariantMetafields",
+         "variantInventoryItem", "shop", "THROTTLED"}
+
+
+def synthetic_story(work_dir, variants, mockups):
+    from PIL import Image
+
+    story_path = os.path.join(work_dir, "the-stranger-meursault.json")
+    products = {}
+    for v in range(variants):
+        slug = f"print-11x14-font-{v}"
+        paths = []
+        for m, view in zip(range(mockups), ("poster", "table", "wall", "3x_wall") * mockups):
+            path = os.path.join(work_dir, f"{slug}-{m}-{view}.png")
+            Image.new("RGB", (400, 500), (200, 40 * v % 255, 30 * m % 255)).save(path)
+            paths.append(path)
+        variant_path = os.path.join(work_dir, f"{slug}.json")
+        variant = {
+            "sku": f"TSOS-STRANGER-{v:03d}", "story_data_path": story_path, "product_type": "print",
+            "product_size": "11x14", "border_thickness": 150, "border_color_hex": "#FFFFFF",
+            "line_style": "storybeats" if v % 2 else "classic",
+            "background_color_hex": "#FFFFFF", "background_color_name": "White",
+            "background_color_details": {"family": "Neutral", "shade": "Light"},
+            "font_color_hex": "#000000", "font_color_name": f"Ink {v}",
+            "font_color_details": {"family": "Neutral", "shade": "Dark"},
+            "font_style": "Helvetica Neue", "product_description_print_details_html": "<p>Matte print</p>",
+            "printify_blueprint_id": 1, "printify_provider_id": 2, "printify_variant_id": 100 + v,
+            "mockup_paths": paths,
+        }
+        with open(variant_path, "w", encoding="utf-8") as f:
+            json.dump(variant, f)
+        products[slug] = {"file_path": variant_path, "sku": variant["sku"]}
+
+    story = {
+        "title": "The Stranger", "protagonist": "Meursault", "author": "Albert Camus", "year": 1942,
+        "story_type": "Literature", "story_slug": "the-stranger-meursault",
+        "story_full_product_description_html": "<p>Meursault's arc.</p>",
+        "shape_symbolic_representation": "↓↑↓", "shape_archetype": "Icarus",
+        "metadata": {"genres": ["Novel"], "themes": ["Absurdism"], "settings": ["Algiers"],
+                     "associated_countries": ["Algeria"], "series_or_universe": [], "awards": [],
+                     "primary_isbns": ["9780679720201"]},
+        "products": {"print": products},
+    }
+    with open(story_path, "w", encoding="utf-8") as f:
+        json.dump(story, f)
+    return story_path, [p["file_path"] for p in products.values()]
+
+
+def publish(story_path, variant_paths, snapshot_path):
+    from shopify_create_product import create_shopify_product
+    from shopify_create_product_variant import create_shopify_product_variant
+    from shopify_metafield_batch import metafield_batch
+    from shopify_product_variant_mockups import add_shopify_product_variant_mockups
+
+    with metafield_batch(snapshot_path=snapshot_path):
+        create_shopify_product(story_path, "print")
+        create_shopify_product_variant(story_path, product_type="print", product_slug="ALL")
+        for path in variant_paths:
+            add_shopify_product_variant_mockups(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--variants", type=int, default=4)
+    parser.add_argument("--mockups", type=int, default=3)
+    parser.add_argument("--gql-latency-s", type=float, default=0.03)
+    args = parser.parse_args()
+
+    import shopify_client
+    from shopify_stub import ShopifyStub
+
+    with tempfile.TemporaryDirectory() as work_dir, \
+            ShopifyStub(gql_latency_s=args.gql_latency_s, upload_latency_s=0.05, processing_s=0.2) as stub:
+        for version in (shopify_client.API_VERSION, "2024-07"):
+            shopify_client.use_client(shopify_client.ShopifyGraphQLClient(
+                stub.shop_domain, "stub-token", api_version=version, endpoint=stub.endpoint), version)
+        story_path, variant_paths = synthetic_story(work_dir, args.variants, args.mockups)
+        snapshot_path = os.path.join(work_dir, "metafields.json")
+
+        def change_one():
+            with open(variant_paths[0], encoding="utf-8") as f:
+                variant = json.load(f)
+            variant["product_description_print_details_html"] = "<p>Matte print, 250gsm</p>"
+            with open(variant_paths[0], "w", encoding="utf-8") as f:
+                json.dump(variant, f)
+            from PIL import Image
+            Image.new("RGB", (400, 500), (10, 200, 10)).save(variant["mockup_paths"][-1])
+
+        results = []
+        for name, before in (("publish", None), ("republish", None), ("one change", change_one)):
+            if before:
+                before()
+            stub.reset_stats()
+            start = time.perf_counter()
+            publish(story_path, variant_paths, snapshot_path)
+            elapsed = time.perf_counter() - start
+            writes = {op: n for op, n in sorted(stub.stats.items()) if op not in READS}
+            reads = sum(n for op, n in stub.stats.items() if op in READS and op != "THROTTLED")
+            results.append((name, elapsed, writes, reads))
+
+        print(f"\n{args.variants} variants x {args.mockups} mockups")
+        for name, elapsed, writes, reads in results:
+            detail = ", ".join(f"{op} {n}" for op, n in writes.items()) or "-"
+            print(f"{name:<11}{elapsed:>7.2f}s  writes {sum(writes.values()):>3}  reads {reads:>3}   {detail}")
+
+        assert sum(results[1][2].values()) == 0, results[1][2]
+        assert len(stub.products) == 1
+        product = next(iter(stub.products.values()))
+        assert len(product["variants"]) == args.variants, product["variants"]
+        assert len(stub.media) == args.variants * args.mockups, len(stub.media)
+
+
+if __name__ == "__main__":
+    main()
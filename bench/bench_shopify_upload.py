@@ -0,0 +1,105 @@
+"""
+Benchmark: ShopifyMockups media upload, one at a time vs pipelined.
+
+Runs against shopify_stub (no network, no Shopify store), so the numbers
+only reflect round trips and the stub's simulated latencies, not real S3 or
+Shopify processing times. For N synthetic mockup PNGs it times:
+
+    serial     what add_shopify_product_variant_mockups used to do per mockup:
+               normalize_for_shopify, upload_product_image (staged upload,
+               productCreateMedia, wait for its preview), next mockup
+    pipelined  upload_product_images: prepare_for_upload + staged upload on a bounded
+               pool, batched productCreateMedia, one multiplexed status poll
+
+and prints wall time plus the stub's per-operation call counts.
+
+shopify_product_variant_mockups reads config.yaml on import, so this still
+needs the usual config file (the credentials in it are never used).
+
+Usage:
+    python bench/bench_shopify_upload.py
+    python bench/bench_shopify_upload.py --images 12 --workers 6 --processing-s 2 --upload-latency-s 0.5
+"""
+
+import argparse
+import functools
+import os
+import tempfile
+import time
+
+import bench_utils  # noqa: F401  (puts src/ on sys.path)
+
+
+def synthetic_mockups(work_dir, count, size=(1600, 2000)):
+    from PIL import Image, ImageDraw
+
+    paths = []
+    for i in range(count):
+        img = Image.new("RGB", size, (230 - i * 7 % 60, 220, 200))
+        d = ImageDraw.Draw(img)
+        for x in range(0, size[0], 50):
+            d.line([(x, 0), (size[0] - x, size[1])], fill=(40, 40 + i, 60), width=4)
+        path = os.path.join(work_dir, f"mockup-{i}-poster.png")
+        img.save(path)
+        paths.append(path)
+    return paths
+
+
+def run_serial(sdk, product_id, paths):
+    from shopify_product_variant_mockups import normalize_for_shopify
+
+    urls = []
+    for i, path in enumerate(paths):
+        normalize_for_shopify(path)
+        _, url, _ = sdk.upload_product_image(product_id, path, alt_text=f"Serial mockup {i}")
+        urls.append(url)
+    return urls
+
+
+def run_pipelined(sdk, product_id, paths, workers, cache_dir):
+    from upload_prep import prepare_for_upload
+
+    items = [{"image_path": path, "alt": f"Pipelined mockup {i}"} for i, path in enumerate(paths)]
+    prepare = functools.partial(prepare_for_upload, cache_dir=cache_dir)
+    uploaded = sdk.upload_product_images(product_id, items, prepare=prepare, max_workers=workers)
+    return [u["image_url"] for u in uploaded]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--gql-latency-s", type=float, default=0.08)
+    parser.add_argument("--upload-latency-s", type=float, default=0.4)
+    parser.add_argument("--processing-s", type=float, default=1.5)
+    args = parser.parse_args()
+
+    from shopify_product_variant_mockups import ShopifyMockups
+    from shopify_stub import ShopifyStub
+
+    with tempfile.TemporaryDirectory() as work_dir, \
+            ShopifyStub(gql_latency_s=args.gql_latency_s, upload_latency_s=args.upload_latency_s,
+                        processing_s=args.processing_s) as stub:
+        sdk = ShopifyMockups(stub.shop_domain, "stub-token", endpoint=stub.endpoint)
+        paths = synthetic_mockups(work_dir, args.images)
+
+        print(f"{args.images} images, gql {args.gql_latency_s}s, upload {args.upload_latency_s}s, "
+              f"processing {args.processing_s}s, {args.workers} workers")
+        for name, fn in (("serial", lambda pid: run_serial(sdk, pid, paths)),
+                         ("pipelined", lambda pid: run_pipelined(sdk, pid, paths, args.workers,
+                                                                   os.path.join(work_dir, "prep-cache")))):
+            stub.reset_stats()
+            product_id = f"gid://shopify/Product/{name}"
+            start = time.perf_counter()
+            urls = fn(product_id)
+            elapsed = time.perf_counter() - start
+            assert len(urls) == args.images and all(urls), urls
+            # gallery order has to match the input order
+            alts = [stub.media[m]["alt"] for m in stub.product_media[product_id]]
+            assert alts == [f"{name.capitalize()} mockup {i}" for i in range(args.images)], alts
+            calls = ", ".join(f"{op} {n}" for op, n in sorted(stub.stats.items()))
+            print(f"{name:<10}{elapsed:>8.2f}s   {calls}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Benchmark: fetching story metadata, one source after another vs side by side.
+
+story_metadata.fetch_sources() asks OpenLibrary (then its Work), Google
+Books and Wikidata for a title. This records the answers for S synthetic
+stories from a fake network into a fixture file, then replays them through
+http_cache.Fetcher with a fake round trip per request (--latency-s, still
+subject to the per-host politeness limits) and times:
+
+    serial       max_workers=1: the sources one after another, like before
+    concurrent   max_workers=SOURCE_WORKERS
+
+plus consolidate() over every result. Both runs must produce the same
+metadata. Goodreads is left out (the fake network has no HTML pages).
+
+To replay real answers instead, record them once on a machine with network:
+
+    get_story_metadata(story_path, fixtures="metadata_fixtures.json", fixture_mode="record")
+
+and pass --fixtures metadata_fixtures.json --story story.json.
+
+Usage:
+    python bench/bench_story_metadata.py
+    python bench/bench_story_metadata.py --stories 5 --latency-s 0.25
+"""
+
+import argparse
+import json
+import os
+import re
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+import bench_utils  # noqa: F401  (puts src/ on sys.path)
+
+
+# -------------------- fake network (for recording synthetic fixtures) --------------------
+
+class _FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self.status_code = status_code
+        self.text = json.dumps(payload)
+
+
+class FakeSession:
+    """Just enough of requests.Session for Fetcher: canned OpenLibrary / Google Books / Wikipedia / Wikidata JSON."""
+
+    def __init__(self):
+        self.headers = {}
+
+    def mount(self, prefix, adapter):
+        pass
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        params = params or {}
+        host, path = urlsplit(url).netloc, urlsplit(url).path
+        if host == "openlibrary.org" and path == "/search.json":
+            n = _story_number(params["title"])
+            return _FakeResponse({"docs": [{
+                "key": f"/works/OL{n}W", "title": params["title"], "author_name": [params.get("author")],
+                "first_publish_year": 1900 + n, "subject": ["Fiction", f"Subject {n}"],
+                "place": [f"City {n}"], "time": ["19th century"], "isbn": [f"978000000{n:04d}"],
+            }]})
+        if host == "openlibrary.org":
+            n = int(re.search(r"OL(\d+)W", path).group(1))
+            return _FakeResponse({"subjects": ["Classics", f"Work subject {n}"], "subject_places": [f"Region {n}"]})
+        if host == "www.googleapis.com":
+            title = re.search(r'"([^"]+)"', params["q"]).group(1)
+            n = _story_number(title)
+            return _FakeResponse({"items": [{"volumeInfo": {
+                "title": title, "authors": [f"Author {n}"], "categories": ["Fiction / Literary"],
+                "description": f"A synthetic description of story {n}. " * 5, "publishedDate": f"{1900 + n}-01-01",
+                "industryIdentifiers": [{"type": "ISBN_13", "identifier": f"978000000{n:04d}"}],
+            }}]})
+        if host == "en.wikipedia.org" and params.get("list") == "search":
+            n = _story_number(params["srsearch"])
+            return _FakeResponse({"query": {"search": [{"title": f"Story {n}", "pageid": 1000 + n}]}})
+        if host == "en.wikipedia.org":
+            n = int(params["pageids"]) - 1000
+            return _FakeResponse({"query": {"pages": {str(1000 + n): {"pageprops": {"wikibase_item": f"Q{n}"}}}}})
+        if host == "www.wikidata.org" and "EntityData" in path:
+            qid = re.search(r"(Q\d+)\.json", path).group(1)
+            n = int(qid[1:])
+            claim = lambda *ids: [{"mainsnak": {"datavalue": {"value": {"id": q}}}} for q in ids]
+            return _FakeResponse({"entities": {qid: {
+                "id": qid, "labels": {"en": {"value": f"Story {n}"}},
+                "claims": {"P31": claim("Q7725634"), "P50": claim(f"Q{90000 + n}"), "P136": claim("Q8261"),
+                           "P840": claim(f"Q{80000 + n}"), "P495": claim("Q30"), "P921": claim("Q11"),
+                           "P577": [{"mainsnak": {"datavalue": {"value": {"time": f"+{1900 + n}-01-01T00:00:00Z"}}}}]},
+            }}})
+        if host == "www.wikidata.org":
+            labels = {}
+            for q in params["ids"].split("|"):
+                n = int(q[1:])
+                label = (f"Author {n - 90000}" if n >= 90000 else f"Place {n - 80000}" if n >= 80000
+                         else {"Q8261": "novel", "Q30": "United States", "Q11": "identity"}.get(q, q))
+                labels[q] = {"labels": {"en": {"value": label}}}
+            return _FakeResponse({"entities": labels})
+        return _FakeResponse({}, status_code=404)
+
+
+def _story_number(text):
+    return int(re.search(r"Story (\d+)", text).group(1))
+
+
+def synthetic_stories(count):
+    return [{"title": f"Story {n}", "author": f"Author {n}", "year": 1900 + n} for n in range(1, count + 1)]
+
+
+def record_synthetic(fixtures_path, stories):
+    import story_metadata
+    from http_cache import Fetcher, HttpCache
+
+    cache = HttpCache(os.path.join(os.path.dirname(fixtures_path), "record.sqlite3"))
+    fetcher = Fetcher(session_factory=FakeSession, cache=cache, mode="record", fixtures_path=fixtures_path,
+                      policies={}, ttl_s=3600)
+    fetcher.limiter.default = {"max_concurrent": 100, "min_interval_s": 0.0}  # nothing to be polite to
+    with story_metadata.use_fetcher(fetcher):
+        for story in stories:
+            story_metadata.fetch_sources(story["title"], story["author"], story["year"], goodreads=False)
+    fetcher.save_fixtures()
+    return len(fetcher.fixtures)
+
+
+# -------------------- timing --------------------
+
+def run(fixtures_path, stories, latency_s, max_workers):
+    import story_metadata
+    from http_cache import Fetcher
+
+    fetcher = Fetcher(mode="replay", fixtures_path=fixtures_path, replay_latency_s=latency_s)
+    results = []
+    start = time.perf_counter()
+    with story_metadata.use_fetcher(fetcher):
+        for story in stories:
+            sources = story_metadata.fetch_sources(story["title"], story.get("author"), story.get("year"),
+                                                   goodreads=False, max_workers=max_workers)
+            results.append(sources)
+    fetched_s = time.perf_counter() - start
+    start = time.perf_counter()
+    consolidated = [story_metadata.consolidate(s["openlibrary"], s["openlibrary_work"], s["googlebooks"],
+                                               s["wikidata"]) for s in results]
+    return fetched_s, time.perf_counter() - start, fetcher.stats["replayed"], consolidated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stories", type=int, default=3)
+    parser.add_argument("--latency-s", type=float, default=0.15, help="fake round trip per request")
+    parser.add_argument("--fixtures", help="replay these recorded responses instead of synthetic ones")
+    parser.add_argument("--story", help="story_data.json whose title/author/year the --fixtures were recorded for")
+    args = parser.parse_args()
+
+    import story_metadata
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        if args.fixtures:
+            with open(args.story, "r", encoding="utf-8") as f:
+                story = json.load(f)
+            stories = [{"title": story.get("title"), "author": story.get("author"), "year": story.get("year")}]
+            fixtures_path = args.fixtures
+        else:
+            stories = synthetic_stories(args.stories)
+            fixtures_path = os.path.join(work_dir, "fixtures.json")
+            count = record_synthetic(fixtures_path, stories)
+            print(f"Recorded {count} synthetic responses for {len(stories)} stories")
+
+        rows = []
+        for name, workers in (("serial", 1), ("concurrent", story_metadata.SOURCE_WORKERS)):
+            rows.append((name,) + run(fixtures_path, stories, args.latency_s, workers))
+
+    print(f"\n{len(stories)} stories, {args.latency_s * 1000:.0f}ms per request")
+    for name, fetched_s, consolidate_s, requests_made, _ in rows:
+        print(f"{name:<11}fetch {fetched_s:>6.2f}s  consolidate {consolidate_s * 1000:>6.1f}ms  requests {requests_made}")
+    print(f"speedup     {rows[0][1] / rows[1][1]:.2f}x")
+    assert rows[0][4] == rows[1][4], "serial and concurrent runs disagree"
+
+
+if __name__ == "__main__":
+    main()
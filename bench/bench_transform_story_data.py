@@ -0,0 +1,141 @@
+"""
+Benchmark: transform_story_data component pairing, pandas vs plain lists.
+
+transform_story_data runs on every create_shape loop. Until recently it
+built a pandas DataFrame (twice), sorted it and read it back with df.loc to
+pair adjacent story components. legacy_pandas_pairs() below is a reference
+copy of that code; the benchmark checks it produces exactly the same pairs
+as product_shape.get_story_component_pairs() and reports per-call latency of
+both, plus the full transform_story_data call and the one-off cost of
+importing pandas in a fresh interpreter.
+
+Usage:
+    python bench/bench_transform_story_data.py
+    python bench/bench_transform_story_data.py --calls 2000 --repeat 5
+"""
+
+import argparse
+import copy
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from bench_utils import archetype_paths, best_of, load_archetype_story
+
+
+def legacy_pandas_pairs(data):
+    """The pre-list pairing from transform_story_data, kept for comparison."""
+    import pandas as pd
+    from product_shape import scale_plot_points
+
+    components_for_df_creation = []
+    for component_data_item in data['story_components']:
+        if not isinstance(component_data_item, dict):
+            continue
+        mod_end_time = component_data_item.get('modified_end_time')
+        mod_emo_score = component_data_item.get('modified_end_fortune_score')
+        arc_type = component_data_item.get('arc')
+        description = component_data_item.get('description', '#N/A')
+        if mod_end_time is None or mod_emo_score is None:
+            continue
+        if arc_type is None:
+            arc_type = "#N/A"
+        components_for_df_creation.append({
+            'title': data.get('title', 'Unknown Title'),
+            'protagonist': data.get('protagonist', 'Unknown Protagonist'),
+            'story_component_arc': arc_type,
+            'story_component_description': description,
+            'story_component_modified_end_time': mod_end_time,
+            'story_component_modified_end_fortune_score': mod_emo_score,
+        })
+
+    if len(components_for_df_creation) < 2:
+        return None
+
+    # the old code really did build it twice
+    df = pd.DataFrame(components_for_df_creation)
+    df = pd.DataFrame(components_for_df_creation)
+
+    df['story_component_end_time'] = df['story_component_modified_end_time']
+    df['story_component_end_fortune_score'] = df['story_component_modified_end_fortune_score']
+    df = df[['title', 'protagonist', 'story_component_end_time', 'story_component_end_fortune_score', 'story_component_arc', 'story_component_description']]
+    df = df.sort_values(by='story_component_end_time', ascending=True)
+
+    x_original = np.array(df['story_component_end_time'].tolist())
+    x_scale = np.array(scale_plot_points(x_original, 1, 10))
+    x_dict = dict(zip(x_original, x_scale))
+
+    array_of_dicts = []
+    for i in range(len(df) - 1):
+        array_of_dicts.append({
+            'story_component_times': [x_dict[df.loc[i, 'story_component_end_time']], x_dict[df.loc[i + 1, 'story_component_end_time']]],
+            'story_component_end_fortune_scores': [df.loc[i, 'story_component_end_fortune_score'], df.loc[i + 1, 'story_component_end_fortune_score']],
+            'arc': df.loc[i + 1, 'story_component_arc'],
+        })
+    return x_scale, array_of_dicts
+
+
+def same_pairs(a, b):
+    (x_a, pairs_a), (x_b, pairs_b) = a, b
+    if sorted(x_a.tolist()) != sorted(x_b.tolist()) or len(pairs_a) != len(pairs_b):
+        return False
+    for pair_a, pair_b in zip(pairs_a, pairs_b):
+        if (pair_a['arc'] != pair_b['arc']
+                or [float(v) for v in pair_a['story_component_times']] != [float(v) for v in pair_b['story_component_times']]
+                or [float(v) for v in pair_a['story_component_end_fortune_scores']] != [float(v) for v in pair_b['story_component_end_fortune_scores']]):
+            return False
+    return True
+
+
+def per_call_us(fn, stories, calls, repeat):
+    def run():
+        for i in range(calls):
+            fn(stories[i % len(stories)])
+    best, _ = best_of(run, repeat)
+    return best / calls * 1e6
+
+
+def pandas_import_seconds():
+    code = "import time; t = time.perf_counter(); import pandas; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return float(out.stdout.strip())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=500, help="calls per timing run, cycling over the archetypes")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--x-delta", type=float, default=0.015)
+    args = parser.parse_args()
+
+    from product_shape import get_story_component_pairs, transform_story_data
+
+    stories = [load_archetype_story(path) for path in archetype_paths()]
+
+    for path, story in zip(archetype_paths(), stories):
+        if not same_pairs(legacy_pandas_pairs(story), get_story_component_pairs(story['story_components'])):
+            raise SystemExit(f"{os.path.basename(path)}: list pairing differs from the pandas version")
+
+    legacy_us = per_call_us(legacy_pandas_pairs, stories, args.calls, args.repeat)
+    lists_us = per_call_us(lambda story: get_story_component_pairs(story['story_components']), stories, args.calls, args.repeat)
+
+    def full_transform(story):
+        return transform_story_data(copy.deepcopy(story), args.x_delta, 15, 3)
+
+    start = time.perf_counter()
+    full_transform(stories[0])
+    first_call_s = time.perf_counter() - start
+    full_us = per_call_us(full_transform, stories, max(1, args.calls // 10), args.repeat)
+
+    print(f"{len(stories)} archetypes, {args.calls} calls x best of {args.repeat}")
+    print(f"{'pairing, pandas (legacy)':<34}{legacy_us:>10.1f} us/call")
+    print(f"{'pairing, lists':<34}{lists_us:>10.1f} us/call   ({legacy_us / lists_us:.0f}x)")
+    print(f"{'transform_story_data, full':<34}{full_us:>10.1f} us/call   (first call {first_call_s * 1e3:.1f} ms)")
+    print(f"{'import pandas (fresh process)':<34}{pandas_import_seconds() * 1e3:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Shared helpers for the render benchmarks in bench/.
+
+The archetype files in archetypes_data/ predate the "fortune" rename, so
+load_archetype_story() maps their *_emotional_score keys onto the
+*_fortune_score keys the renderer expects. It also takes real story data
+files (the ones create_shape reads, plot under "story_plot_data").
+"""
+
+import glob
+import json
+import os
+import resource
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(REPO_ROOT, "src")
+ARCHETYPES_DIR = os.path.join(REPO_ROOT, "archetypes_data")
+
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+CURRENT_DPI = 300
+
+
+def archetype_paths():
+    return sorted(glob.glob(os.path.join(ARCHETYPES_DIR, "*.json")))
+
+
+def load_archetype_story(path):
+    with open(path, "r", encoding="utf-8") as f:
+        story_data = json.load(f)
+    # product/story data files wrap the plot the same way create_shape expects
+    if "story_plot_data" in story_data:
+        story_data = story_data["story_plot_data"]
+
+    for component in story_data["story_components"]:
+        if "end_fortune_score" not in component and "end_emotional_score" in component:
+            component["end_fortune_score"] = component["end_emotional_score"]
+        if "modified_end_fortune_score" not in component:
+            component["modified_end_fortune_score"] = component.get(
+                "modified_end_emotional_score", component["end_fortune_score"])
+        if "modified_end_time" not in component:
+            component["modified_end_time"] = component["end_time"]
+
+    story_data.setdefault("author", "")
+    return story_data
+
+
+def scaled_component_arcs(story_data, width_in_inches=11, height_in_inches=14,
+                          margin_in_inches=0.625, x_delta=0.015, step_k=15, max_num_steps=3):
+    """
+    Run transform_story_data and map each component arc onto the design in
+    pixels, the same way create_shape_single_pass does (minus the title band).
+
+    Returns:
+        list of (arc_x_values_scaled, arc_y_values_scaled) tuples
+    """
+    from product_shape import transform_story_data
+
+    story_data = transform_story_data(story_data, x_delta, step_k, max_num_steps)
+    if story_data is None:
+        raise ValueError("transform_story_data couldn't transform this story (see the message above)")
+
+    x_values = story_data["x_values"]
+    y_values = story_data["y_values"]
+    x_min, x_max = min(x_values), max(x_values)
+    y_min, y_max = min(y_values), max(y_values)
+
+    margin = round(margin_in_inches * CURRENT_DPI)
+    drawable_w = width_in_inches * CURRENT_DPI - 2 * margin
+    drawable_h = height_in_inches * CURRENT_DPI - 2 * margin
+    scale_x = drawable_w / (x_max - x_min) if x_max != x_min else 1
+    scale_y = drawable_h / (y_max - y_min) if y_max != y_min else 1
+
+    arcs = []
+    for component in story_data["story_components"][1:]:
+        xs = component.get("arc_x_values", [])
+        ys = component.get("arc_y_values", [])
+        if not xs:
+            continue
+        arcs.append((
+            [(x - x_min) * scale_x + margin for x in xs],
+            [(margin + drawable_h) - (y - y_min) * scale_y for y in ys],
+        ))
+    return arcs
+
+
+def best_of(fn, repeat=3):
+    """Run fn() `repeat` times; return (best seconds, last result)."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def peak_rss_mb():
+    """This process's peak resident set size in MB."""
+    # VmHWM resets on exec; ru_maxrss on Linux carries over the parent's peak
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
@@ -0,0 +1,287 @@
+"""
+Batch Mockup Engine for The Shapes of Stories
+=============================================
+
+create_mockups renders one product's mockups one after another, re-reading
+the design PNG for every mockup type, so regenerating the catalog after a
+template tweak is hours of single-core PIL time. This renders N products x M
+mockup types in one run:
+
+    - every (product, mockup) pair is a job on a process pool; jobs are
+      queued product by product so a design's mockups run side by side
+    - templates, clips and designs are decoded once and memory-mapped
+      (mockup_templates), so workers share them instead of each decoding
+      its own copy; a design's buffer is dropped once all its jobs finish
+    - each mockup is written to disk as soon as its job finishes (PNG or
+      JPEG), with progress and per-job timings printed and appended to a
+      JSONL report
+    - if a worker dies (segfault / OOM) the unfinished jobs are resubmitted
+      to a fresh pool, up to MAX_CRASH_RETRIES times each
+    - mockups already newer than their design and template are skipped
+      unless --force, so an interrupted run picks up where it stopped
+    - each product's mockup_paths is updated once its jobs are done, same as
+      create_mockups
+
+Usage:
+  python batch_mockups.py --products /path/to/product_data/*.json
+  python batch_mockups.py --products-file products.txt --mockups 11x14_poster 3x_11x14_wall --workers 6
+  python batch_mockups.py --products a.json b.json --format jpg --force --report /tmp/mockups.jsonl
+"""
+
+import argparse
+import functools
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+from paths import PATHS
+import mockup_templates
+from product_mockups import (MOCKUPS, mockup_artwork_paths, mockup_clips, mockup_output_path,
+                             render_mockup, save_product_mockup_paths)
+
+# ----------------------- CONFIG -----------------------
+DEFAULT_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+MAX_CRASH_RETRIES = 2  # times a job is resubmitted after its worker process died
+DEFAULT_MOCKUPS = ["11x14_poster_with_cover", "11x14_poster", "11x14_wall", "11x14_table", "3x_11x14_wall"]
+# -------------------------------------------------------
+
+
+# -------------------- Planning --------------------
+
+def load_products(product_data_paths):
+    """Product JSONs that have a design on disk, as dicts with their path and data."""
+    products = []
+    for product_data_path in product_data_paths:
+        try:
+            with open(product_data_path, "r", encoding="utf-8") as f:
+                product_data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"❌ {product_data_path}: can't read product data ({e}). Skipping.")
+            continue
+        design_path = product_data.get("product_design_path", "")
+        if not design_path or not os.path.exists(design_path):
+            print(f"❌ {product_data_path}: design not found ({design_path}). Skipping.")
+            continue
+        products.append({"product_data_path": product_data_path, "product_data": product_data, "design_path": design_path})
+    return products
+
+
+def _up_to_date(output_path, input_paths):
+    if not os.path.exists(output_path):
+        return False
+    output_mtime = os.path.getmtime(output_path)
+    return all(not os.path.exists(p) or os.path.getmtime(p) <= output_mtime for p in input_paths)
+
+
+def plan_jobs(products, mockup_types, output_dir, output_format="png", force=False):
+    """
+    One job per (product, mockup type), product by product.
+
+    Returns:
+        tuple: (jobs to run, jobs skipped because their output is up to date)
+    """
+    jobs, skipped = [], []
+    for product in products:
+        product_data = product["product_data"]
+        for mockup_type in mockup_types:
+            art_paths = mockup_artwork_paths(product_data, product["design_path"], mockup_type)
+            clips = mockup_clips(mockup_type, (product_data.get("cover_data") or {}).get("cover_path_file")) or []
+            shared_clip_paths = {clip.path for clip in mockup_clips(mockup_type) or []}
+            job = {
+                "product_data_path": product["product_data_path"],
+                "product_slug": product_data.get("product_slug"),
+                "mockup_type": mockup_type,
+                "design_path": product["design_path"],
+                "art_paths": art_paths,
+                "cover_paths": [clip.path for clip in clips if clip.path not in shared_clip_paths],
+                "output_path": mockup_output_path(output_dir, product_data.get("product_slug"), mockup_type, output_format),
+            }
+            inputs = art_paths + [MOCKUPS[mockup_type]["mockup_template_path"]] + [clip.path for clip in clips]
+            if not force and _up_to_date(job["output_path"], inputs):
+                skipped.append(job)
+            else:
+                jobs.append(job)
+    return jobs, skipped
+
+
+# -------------------- Worker --------------------
+
+def run_mockup_job(job, design_cache_dir):
+    """Runs in a worker process. Never raises; failures come back in the result."""
+    start = time.perf_counter()
+    result = {"product_slug": job["product_slug"], "mockup_type": job["mockup_type"], "output_path": job["output_path"]}
+    try:
+        with open(job["product_data_path"], "r", encoding="utf-8") as f:
+            product_data = json.load(f)
+        load_image = functools.partial(mockup_templates.load_rgba, cache_dir=design_cache_dir)
+        timings = render_mockup(product_data, job["design_path"], job["mockup_type"], job["output_path"], load_image=load_image)
+        result.update(status="done", timings={step: round(seconds, 3) for step, seconds in timings.items()})
+    except Exception as e:
+        traceback.print_exc()
+        result.update(status="failed", error=f"{type(e).__name__}: {e}")
+    result["seconds"] = round(time.perf_counter() - start, 2)
+    return result
+
+
+# -------------------- Pool --------------------
+
+def _append_report(report_path, entry):
+    if not report_path:
+        return
+    with open(report_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(dict(entry, ts=datetime.now().isoformat(timespec="seconds")), ensure_ascii=False) + "\n")
+
+
+def render_mockup_batch(product_data_paths, mockup_types=None, output_dir=PATHS['product_mockups'],
+                        workers=DEFAULT_WORKERS, output_format="png", force=False, report_path=None,
+                        update_product_data=True):
+    """
+    Render every mockup type for every product on a pool of `workers` processes.
+
+    Returns:
+        dict: counts per status (done / failed / skipped) plus wall / job seconds
+    """
+    mockup_types = mockup_types or DEFAULT_MOCKUPS
+    unknown = [m for m in mockup_types if m not in MOCKUPS]
+    if unknown:
+        raise ValueError(f"Unknown mockup types: {unknown}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    products = load_products(product_data_paths)
+    jobs, skipped = plan_jobs(products, mockup_types, output_dir, output_format, force)
+    counts = {"done": 0, "failed": 0, "skipped": len(skipped)}
+    for job in skipped:
+        _append_report(report_path, {"product_slug": job["product_slug"], "mockup_type": job["mockup_type"],
+                                     "output_path": job["output_path"], "status": "skipped"})
+    print(f"{len(products)} products x {len(mockup_types)} mockups: {len(jobs)} to render, "
+          f"{len(skipped)} up to date, {workers} workers")
+
+    # templates and clips are decoded here once so workers only ever map them
+    mockup_templates.preload(sorted({MOCKUPS[m]["mockup_template_path"] for m in mockup_types}))
+    mockup_templates.preload(sorted({path for job in jobs for path in _clip_paths(job)}))
+
+    # designs and covers go in a batch-only cache and are dropped once nothing else needs them
+    design_cache_dir = tempfile.mkdtemp(prefix="shapes-mockup-designs-")
+    design_refs = {}
+    for job in jobs:
+        for path in _product_image_paths(job):
+            design_refs[path] = design_refs.get(path, 0) + 1
+    product_jobs_left = {}
+    for job in jobs:
+        product_jobs_left[job["product_data_path"]] = product_jobs_left.get(job["product_data_path"], 0) + 1
+    product_mockup_types = {}
+    for job in jobs + skipped:
+        product_mockup_types.setdefault(job["product_data_path"], []).append((job["mockup_type"], job["output_path"]))
+
+    batch_start = time.perf_counter()
+    job_seconds = 0.0
+    finished = 0
+    crashes = {id(job): 0 for job in jobs}
+    pending = list(jobs)
+    try:
+        # spawn, not fork, same as batch_render
+        mp_context = multiprocessing.get_context("spawn")
+        while pending:
+            retry = []
+            with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as pool:
+                futures = {pool.submit(run_mockup_job, job, design_cache_dir): job for job in pending}
+                for future in as_completed(futures):
+                    job = futures[future]
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool as e:
+                        # a worker died (segfault / OOM) and took the pool with it; like
+                        # batch_render, everything still in flight gets another go in a fresh pool
+                        crashes[id(job)] += 1
+                        if crashes[id(job)] <= MAX_CRASH_RETRIES:
+                            retry.append(job)
+                            continue
+                        result = {"product_slug": job["product_slug"], "mockup_type": job["mockup_type"],
+                                  "output_path": job["output_path"], "status": "failed",
+                                  "error": f"worker process crashed ({type(e).__name__})"}
+                    except Exception as e:
+                        result = {"product_slug": job["product_slug"], "mockup_type": job["mockup_type"],
+                                  "output_path": job["output_path"], "status": "failed", "error": f"{type(e).__name__}: {e}"}
+                    finished += 1
+                    counts[result["status"]] += 1
+                    job_seconds += result.get("seconds", 0)
+                    _append_report(report_path, result)
+
+                    steps = " ".join(f"{step} {seconds:.1f}s" for step, seconds in result.get("timings", {}).items())
+                    elapsed = time.perf_counter() - batch_start
+                    eta = elapsed / finished * (len(jobs) - finished)
+                    print(f"[{finished}/{len(jobs)}] {job['product_slug']} {job['mockup_type']}: {result['status']} "
+                          f"{result.get('seconds', '-')}s ({steps or result.get('error', '')}) | elapsed {elapsed:.0f}s, eta {eta:.0f}s")
+
+                    for path in _product_image_paths(job):
+                        design_refs[path] -= 1
+                        if design_refs[path] == 0:
+                            mockup_templates.discard(path, design_cache_dir)
+
+                    product_jobs_left[job["product_data_path"]] -= 1
+                    if update_product_data and product_jobs_left[job["product_data_path"]] == 0:
+                        mockup_paths = [output_path for _, output_path in product_mockup_types[job["product_data_path"]]
+                                        if os.path.exists(output_path)]
+                        save_product_mockup_paths(job["product_data_path"], mockup_paths)
+            if retry:
+                print(f"⚠️ A worker crashed; retrying {len(retry)} unfinished mockups in a fresh pool")
+            pending = retry
+    finally:
+        shutil.rmtree(design_cache_dir, ignore_errors=True)
+
+    counts["wall_seconds"] = round(time.perf_counter() - batch_start, 1)
+    counts["job_seconds"] = round(job_seconds, 1)
+    print(f"Batch finished: {counts}")
+    return counts
+
+
+def _product_image_paths(job):
+    # per-product images: the designs and the story cover
+    return job["art_paths"] + job["cover_paths"]
+
+
+def _clip_paths(job):
+    # the clips are the same for every product except the cover, which is per product
+    clips = mockup_clips(job["mockup_type"]) or []
+    return [clip.path for clip in clips if os.path.exists(clip.path)]
+
+
+def _read_products_file(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render mockups for many products in parallel.")
+    parser.add_argument("--products", nargs="*", default=[], help="product data JSON files")
+    parser.add_argument("--products-file", default=None, help="text file with one product data JSON path per line")
+    parser.add_argument("--mockups", nargs="*", default=None, help=f"MOCKUPS keys (default: {' '.join(DEFAULT_MOCKUPS)})")
+    parser.add_argument("--output-dir", default=PATHS['product_mockups'])
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--format", choices=["png", "jpg"], default="png")
+    parser.add_argument("--force", action="store_true", help="re-render mockups even if they're up to date")
+    parser.add_argument("--report", default=None, help="append a JSONL line per job here")
+    parser.add_argument("--no-update-product-data", action="store_true", help="don't write mockup_paths back")
+    args = parser.parse_args()
+
+    product_data_paths = list(args.products)
+    if args.products_file:
+        product_data_paths += _read_products_file(args.products_file)
+    if not product_data_paths:
+        parser.error("no products given (--products or --products-file)")
+
+    counts = render_mockup_batch(product_data_paths, args.mockups, output_dir=args.output_dir, workers=args.workers,
+                                 output_format=args.format, force=args.force, report_path=args.report,
+                                 update_product_data=not args.no_update_product_data)
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,341 @@
+"""
+Batch Renderer for The Shapes of Stories
+========================================
+
+build_product_from_sheet.py and build_full_from_sheet.py walk the sheet one
+row at a time, and every row spends minutes in create_shape (Cairo / Pango /
+Shapely, all CPU bound). This runs the same rows through a process pool:
+
+    - each row is a job run in its own worker process; an exception (or a
+      worker dying) only fails that row
+    - every job start / finish / failure / skip is appended to a JSONL ledger,
+      and each job's printed output goes to its own log file
+    - product rows whose product JSON and design PNG already exist are
+      skipped, so a restarted run picks up where the last one stopped
+    - full rows record each full_create stage in the ledger as it finishes; a
+      row is skipped only once its last stage (the Shopify mockups) is
+      recorded, and a re-run resumes after the last finished stage, so a
+      Printify product is never created twice
+    - a job whose worker died is run again in a fresh pool, except a full row
+      that had already begun: Printify / Shopify calls aren't idempotent, so
+      it's left failed for the next run to resume
+    - rows can come from the Google Sheet or from a local CSV / JSONL file with
+      the same column names, so it also runs offline
+
+Usage:
+  python batch_render.py --source sheet --mode product --workers 4
+  python batch_render.py --source rows.csv --mode product
+  python batch_render.py --source rows.jsonl --mode full --ledger /tmp/ledger.jsonl
+"""
+
+import argparse
+import contextlib
+import csv
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+from paths import PATHS
+
+# ----------------------- CONFIG -----------------------
+SHEET_ID = "16tmqmaXRN_a_TV4iWdkHkJb4XPgc7dKKZZzd7dVtQs4"
+WORKSHEETS = {"product": "Create Product", "full": "Create Full"}
+DEFAULT_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+DEFAULT_LEDGER_PATH = os.path.join(os.path.dirname(PATHS['product_data']), 'batch_render_ledger.jsonl')
+MAX_CRASH_RETRIES = 2  # times a job is resubmitted after its worker process died
+# -------------------------------------------------------
+
+
+# -------------------- Input sources --------------------
+
+def rows_from_sheet(worksheet_name, sheet_id=SHEET_ID):
+    # imported here so CSV / JSONL runs don't need gspread or sheet credentials
+    import gspread
+    import yaml
+    from google.oauth2.service_account import Credentials
+
+    with open(PATHS['config'], "r") as yaml_file:
+        creds_data = yaml.safe_load(yaml_file)["google_sheets"]
+    SCOPES = ["https://www.googleapis.com/auth/spreadsheets",
+              "https://www.googleapis.com/auth/drive"]
+    credentials = Credentials.from_service_account_info(creds_data, scopes=SCOPES)
+    client = gspread.authorize(credentials)
+    return client.open_by_key(sheet_id).worksheet(worksheet_name).get_all_records()
+
+
+def rows_from_csv(path):
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def rows_from_jsonl(path):
+    rows = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                rows.append(json.loads(line))
+    return rows
+
+
+def load_rows(source, mode):
+    """
+    source is "sheet" (the mode's worksheet), "sheet:<worksheet name>", or a
+    path to a .csv / .jsonl file whose columns match the sheet's.
+    """
+    if source == "sheet":
+        return rows_from_sheet(WORKSHEETS[mode])
+    if source.startswith("sheet:"):
+        return rows_from_sheet(source[len("sheet:"):])
+    if source.lower().endswith(".csv"):
+        return rows_from_csv(source)
+    if source.lower().endswith(".jsonl"):
+        return rows_from_jsonl(source)
+    raise ValueError(f"Unsupported row source: {source}")
+
+
+# -------------------- Jobs --------------------
+
+def _product_details(value):
+    # sheets give "" for an empty cell; local files may hold a JSON object or string
+    if value in (None, ""):
+        return {}
+    if isinstance(value, str):
+        return json.loads(value)
+    return value
+
+
+def _is_true(value):
+    return value is True or str(value).upper() == "TRUE"
+
+
+def _story_data_path_for(story_title, story_protagonist):
+    # same name full_create looks for when skip_story_create is set
+    story_data_file_name = story_title.lower().replace(' ', '-') + "-" + story_protagonist.lower().replace(' ', '-')
+    return os.path.join(PATHS['story_data'], story_data_file_name + ".json")
+
+
+def job_from_row(row, mode, row_number):
+    """Turn a sheet/CSV/JSONL row into a job dict, or None if required fields are missing."""
+    if mode == "product":
+        story_data_path = row.get("story_data_path", "")
+        product_type = row.get("product_type", "")
+        if story_data_path == "" or product_type == "":
+            return None
+        kwargs = {
+            "story_data_path": story_data_path,
+            "product_type": product_type,
+            "product_details": _product_details(row.get("product_details")),
+        }
+    elif mode == "full":
+        required = ["story_type", "story_title", "story_author", "story_protagonist", "story_year", "story_summary_path", "product_type"]
+        if any(row.get(field, "") == "" for field in required):
+            return None
+        kwargs = {field: row.get(field) for field in required}
+        kwargs["story_year"] = str(kwargs["story_year"])
+        kwargs["story_cover_path"] = row.get("cover_path", "") or ""
+        kwargs["product_details"] = _product_details(row.get("product_details"))
+        kwargs["skip_story_create"] = _is_true(row.get("skip_story_create"))
+        kwargs["build_story_summary"] = _is_true(row.get("build_story_summary"))
+        story_data_path = _story_data_path_for(kwargs["story_title"], kwargs["story_protagonist"])
+    else:
+        raise ValueError(f"Unknown mode: {mode}")
+
+    key = json.dumps({"mode": mode, "kwargs": kwargs}, sort_keys=True, ensure_ascii=False)
+    return {
+        "job_id": hashlib.sha1(key.encode("utf-8")).hexdigest()[:16],
+        "row": row_number,
+        "mode": mode,
+        "story_data_path": story_data_path,
+        "product_type": kwargs["product_type"],
+        "product_details": kwargs["product_details"],
+        "kwargs": kwargs,
+    }
+
+
+def expected_outputs(job):
+    from create_product_data import get_product_output_paths
+    return get_product_output_paths(job["story_data_path"], job["product_type"], job["product_details"])
+
+
+def already_rendered(job):
+    product_data_path, product_design_path = expected_outputs(job)
+    return bool(product_data_path and os.path.exists(product_data_path) and os.path.exists(product_design_path))
+
+
+# -------------------- Ledger --------------------
+
+def append_ledger(ledger_path, entry):
+    entry = dict(entry, ts=datetime.now().isoformat(timespec="seconds"))
+    with open(ledger_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def read_ledger(ledger_path):
+    """
+    Last ledger entry per job_id, with "stages": the full_create stages
+    finished so far (a "started" entry resets them to the ones it resumed from).
+    """
+    latest = {}
+    stages = {}
+    if not os.path.exists(ledger_path):
+        return latest
+    with open(ledger_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # half-written line from a killed run
+            job_id = entry.get("job_id")
+            done = stages.setdefault(job_id, [])
+            if entry.get("status") == "started":
+                done[:] = entry.get("resumed_stages", [])
+            elif entry.get("status") == "stage" and entry.get("stage") not in done:
+                done.append(entry.get("stage"))
+            latest[job_id] = dict(entry, stages=list(done))
+    return latest
+
+
+# -------------------- Worker --------------------
+
+def run_job(job, log_dir, ledger_path):
+    """Runs in a worker process. Never raises; failures come back in the result."""
+    start = time.perf_counter()
+    log_path = os.path.join(log_dir, f"{job['job_id']}.log")
+    result = {"job_id": job["job_id"], "row": job["row"], "log_path": log_path}
+    # tells render_batch this job had begun if the pool breaks under it
+    append_ledger(ledger_path, {"job_id": job["job_id"], "row": job["row"], "status": "running"})
+    with open(log_path, "a", encoding="utf-8") as log, contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        try:
+            if job["mode"] == "product":
+                from create_product_data import create_product_data
+                product_data_path = create_product_data(**job["kwargs"])
+                ok = bool(product_data_path)
+                error = "render finished without writing product data (see log)"
+            else:
+                from build_full_from_sheet import full_create
+                ok = full_create(**job["kwargs"], completed_stages=job["completed_stages"],
+                                 on_stage=lambda stage: append_ledger(ledger_path, {
+                                     "job_id": job["job_id"], "row": job["row"], "status": "stage", "stage": stage}))
+                error = "full_create stopped before publishing (see log)"
+            product_data_path, product_design_path = expected_outputs(job)
+            result.update(
+                status="done" if ok else "failed",
+                product_data_path=product_data_path,
+                product_design_path=product_design_path,
+            )
+            if not ok:
+                result["error"] = error
+        except Exception as e:
+            traceback.print_exc()
+            result.update(status="failed", error=f"{type(e).__name__}: {e}")
+    result["seconds"] = round(time.perf_counter() - start, 2)
+    return result
+
+
+# -------------------- Pool --------------------
+
+def render_batch(rows, mode="product", workers=DEFAULT_WORKERS, ledger_path=DEFAULT_LEDGER_PATH, force=False):
+    """
+    Render every row with a pool of `workers` processes.
+
+    Returns:
+        dict: counts per status (done / failed / skipped / invalid)
+    """
+    log_dir = os.path.splitext(ledger_path)[0] + "_logs"
+    os.makedirs(log_dir, exist_ok=True)
+    counts = {"done": 0, "failed": 0, "skipped": 0, "invalid": 0}
+
+    previous = read_ledger(ledger_path)
+    if mode == "full":
+        from build_full_from_sheet import FULL_STAGES
+    jobs = []
+    for row_number, row in enumerate(rows, start=1):
+        job = job_from_row(row, mode, row_number)
+        if job is None:
+            print(f"Row {row_number}: skipping, missing required fields")
+            counts["invalid"] += 1
+            continue
+        last = previous.get(job["job_id"], {})
+        if mode == "full":
+            job["completed_stages"] = [] if force else last.get("stages", [])
+            finished = FULL_STAGES[-1] in job["completed_stages"]
+        else:
+            finished = not force and already_rendered(job)
+        if finished:
+            print(f"Row {row_number}: already {'published' if mode == 'full' else 'rendered'}, skipping")
+            append_ledger(ledger_path, {"job_id": job["job_id"], "row": row_number, "status": "skipped",
+                                        "story_data_path": job["story_data_path"],
+                                        "resumed_stages": job.get("completed_stages", [])})
+            counts["skipped"] += 1
+            continue
+        if last.get("status") in ("started", "running", "stage", "failed"):
+            print(f"Row {row_number}: re-running, last run ended '{last['status']}'")
+        if job.get("completed_stages"):
+            print(f"Row {row_number}: resuming after {job['completed_stages'][-1]}")
+        jobs.append(job)
+
+    print(f"Rendering {len(jobs)} rows with {workers} workers (ledger: {ledger_path})")
+    crashes = {job["job_id"]: 0 for job in jobs}
+    pending = list(jobs)
+    # spawn, not fork: Cairo/Pango state doesn't survive being forked
+    mp_context = multiprocessing.get_context("spawn")
+    while pending:
+        retry = []
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as pool:
+            futures = {}
+            for job in pending:
+                append_ledger(ledger_path, {"job_id": job["job_id"], "row": job["row"], "status": "started",
+                                            "story_data_path": job["story_data_path"],
+                                            "resumed_stages": job.get("completed_stages", [])})
+                futures[pool.submit(run_job, job, log_dir, ledger_path)] = job
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    # a worker died (segfault / OOM); we can't tell whose job it was,
+                    # so everything still in flight gets another go in a fresh pool.
+                    # Not a full row that had begun: it may be half way through
+                    # publishing, so the next run resumes it from the ledger instead
+                    began = read_ledger(ledger_path).get(job["job_id"], {}).get("status") != "started"
+                    crashes[job["job_id"]] += 1
+                    if crashes[job["job_id"]] <= MAX_CRASH_RETRIES and not (mode == "full" and began):
+                        retry.append(job)
+                        continue
+                    error = "worker process crashed"
+                    if mode == "full" and began:
+                        error += " mid-publish; not retried, the next run resumes after its last finished stage"
+                    result = {"job_id": job["job_id"], "row": job["row"], "status": "failed", "error": error}
+                result["story_data_path"] = job["story_data_path"]
+                append_ledger(ledger_path, result)
+                counts[result["status"]] += 1
+                print(f"Row {job['row']}: {result['status']} ({result.get('seconds', '-')}s) {result.get('error', '')}")
+        pending = retry
+
+    print(f"Batch finished: {counts}")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render story products in parallel.")
+    parser.add_argument("--source", default="sheet", help='"sheet", "sheet:<worksheet>", or a .csv / .jsonl file')
+    parser.add_argument("--mode", choices=["product", "full"], default="product",
+                        help="product = create_product_data rows, full = build_full_from_sheet rows")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--ledger", default=DEFAULT_LEDGER_PATH)
+    parser.add_argument("--force", action="store_true", help="re-render rows even if their outputs exist")
+    args = parser.parse_args()
+
+    rows = load_rows(args.source, args.mode)
+    counts = render_batch(rows, mode=args.mode, workers=args.workers, ledger_path=args.ledger, force=args.force)
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,11 +1,12 @@
 from paths import PATHS
 from create_story_data               import create_story_data
-from create_product_data             import create_product_data
+from create_product_data             import create_product_data, get_product_output_paths
 from printify_publish_product        import publish_product_on_printify
 from shopify_create_product          import create_shopify_product
 from shopify_create_product_variant  import create_shopify_product_variant
 from shopify_product_variant_mockups import add_shopify_product_variant_mockups
 from create_product_support_data     import create_product_support_data
+from shopify_metafield_batch         import metafield_batch
 
 
 import yaml
@@ -16,47 +17,93 @@ from google.oauth2.service_account import Credentials
 
 
 
-def full_create(story_type, story_title, story_author, story_protagonist, story_year, story_summary_path, product_type, product_details, skip_story_create=False, build_story_summary=True, story_cover_path=""):
+# full_create's stages in order; batch_render records each one in its ledger as it finishes
+FULL_STAGES = ("story", "product", "support", "printify", "shopify_product", "shopify_variants", "mockups")
 
-    if skip_story_create == False:
-        story_data_path = create_story_data(story_type=story_type, 
-                        story_title=story_title, 
-                        story_author=story_author,
-                        story_protagonist=story_protagonist, 
-                        story_year=story_year, 
-                        story_summary_path=story_summary_path,
-                        build_story_summary=build_story_summary,
-                        story_cover_path=story_cover_path)
-    else:
-        print("Skipping Story Create for ", story_title, " - ", story_protagonist)
-        print("Finding Story Data...")
-        story_data_file_name = story_title.lower().replace(' ', '-') + "-" + story_protagonist.lower().replace(' ', '-')
-        story_data_path = os.path.join(PATHS['story_data'], story_data_file_name + ".json")
-        if os.path.exists(story_data_path):
-            print("Story Data Found!")
-        else:
-            print("❌ Could not find Story Data. Skipping.")
-            return 
 
-    print(story_data_path)
+def full_create(story_type, story_title, story_author, story_protagonist, story_year, story_summary_path, product_type, product_details, skip_story_create=False, build_story_summary=True, story_cover_path="", completed_stages=(), on_stage=None):
+    """
+    Story data -> product data -> Printify -> Shopify for one sheet row.
 
-    product_data_path = create_product_data(story_data_path=story_data_path,
-                        product_type=product_type, 
-                        product_details=product_details)
-    
+    completed_stages: FULL_STAGES a previous run already finished. They're skipped,
+    so resuming a row doesn't create its Printify product a second time.
+    on_stage: called with each stage's name as soon as it finishes.
+
+    Returns True once every stage has finished, False if one failed (it prints why).
+    """
+    def finished(stage):
+        if on_stage is not None:
+            on_stage(stage)
 
-    create_product_support_data(product_data_path=product_data_path)
+    story_data_file_name = story_title.lower().replace(' ', '-') + "-" + story_protagonist.lower().replace(' ', '-')
+    story_data_path = os.path.join(PATHS['story_data'], story_data_file_name + ".json")
 
+    if "story" not in completed_stages:
+        if skip_story_create == False:
+            story_data_path = create_story_data(story_type=story_type, 
+                            story_title=story_title, 
+                            story_author=story_author,
+                            story_protagonist=story_protagonist, 
+                            story_year=story_year, 
+                            story_summary_path=story_summary_path,
+                            build_story_summary=build_story_summary,
+                            story_cover_path=story_cover_path)
+            if not story_data_path:
+                print("❌ Story Create failed. Skipping.")
+                return False
+        else:
+            print("Skipping Story Create for ", story_title, " - ", story_protagonist)
+            print("Finding Story Data...")
+            if os.path.exists(story_data_path):
+                print("Story Data Found!")
+            else:
+                print("❌ Could not find Story Data. Skipping.")
+                return False
+        finished("story")
+
+    print(story_data_path)
+
+    if "product" in completed_stages:
+        product_data_path, _ = get_product_output_paths(story_data_path, product_type, product_details)
+    else:
+        product_data_path = create_product_data(story_data_path=story_data_path,
+                            product_type=product_type, 
+                            product_details=product_details)
+    if not product_data_path or not os.path.exists(product_data_path):
+        print("❌ No Product Data. Skipping.")
+        return False
+    if "product" not in completed_stages:
+        finished("product")
 
-    publish_product_on_printify(product_data_path=product_data_path)
+    if "support" not in completed_stages:
+        if not create_product_support_data(product_data_path=product_data_path):
+            print("❌ Product Support Data failed. Skipping.")
+            return False
+        finished("support")
 
+    if "printify" not in completed_stages:
+        if not publish_product_on_printify(product_data_path=product_data_path):
+            print("❌ Printify publish failed. Skipping.")
+            return False
+        finished("printify")
 
-    create_shopify_product(story_data_path, "print")
+    if "shopify_product" not in completed_stages:
+        if not create_shopify_product(story_data_path, "print"):
+            print("❌ Shopify product create failed. Skipping.")
+            return False
+        finished("shopify_product")
 
-    create_shopify_product_variant(story_data_path, product_type="print", product_slug="ALL", delete_placeholder_variants=True)
+    if "shopify_variants" not in completed_stages:
+        if create_shopify_product_variant(story_data_path, product_type="print", product_slug="ALL", delete_placeholder_variants=True) is None:
+            print("❌ Shopify variant create failed. Skipping.")
+            return False
+        finished("shopify_variants")
 
+    if "mockups" not in completed_stages:
+        add_shopify_product_variant_mockups(product_data_path)
+        finished("mockups")
 
-    add_shopify_product_variant_mockups(product_data_path)
+    return True
 
 
 
@@ -67,78 +114,82 @@ def load_credentials_from_yaml(file_path):
         config = yaml.safe_load(yaml_file)
     return config["google_sheets"]
 
-# Use the configured path from the PATHS dictionary
-creds_data = load_credentials_from_yaml(PATHS['config'])
+# Sheet runs serially; for a parallel, resumable run over the same rows use batch_render.py
+if __name__ == "__main__":
+    # Use the configured path from the PATHS dictionary
+    creds_data = load_credentials_from_yaml(PATHS['config'])
 
-# Define the correct scope
-# SCOPES = ["https://www.googleapis.com/auth/spreadsheets.readonly"]
-SCOPES = ["https://www.googleapis.com/auth/spreadsheets",
-        "https://www.googleapis.com/auth/drive"
-]
+    # Define the correct scope
+    # SCOPES = ["https://www.googleapis.com/auth/spreadsheets.readonly"]
+    SCOPES = ["https://www.googleapis.com/auth/spreadsheets",
+            "https://www.googleapis.com/auth/drive"
+    ]
 
-# Create credentials with the correct scope
-credentials = Credentials.from_service_account_info(creds_data, scopes=SCOPES)
+    # Create credentials with the correct scope
+    credentials = Credentials.from_service_account_info(creds_data, scopes=SCOPES)
 
-# Authorize and create a client
-client = gspread.authorize(credentials)
+    # Authorize and create a client
+    client = gspread.authorize(credentials)
 
 
-#link https://docs.google.com/spreadsheets/d/16tmqmaXRN_a_TV4iWdkHkJb4XPgc7dKKZZzd7dVtQs4/edit?usp=sharing
-sheet_id = "16tmqmaXRN_a_TV4iWdkHkJb4XPgc7dKKZZzd7dVtQs4"
-spreadsheet = client.open_by_key(sheet_id)
-worksheet = spreadsheet.worksheet("Create Full")
+    #link https://docs.google.com/spreadsheets/d/16tmqmaXRN_a_TV4iWdkHkJb4XPgc7dKKZZzd7dVtQs4/edit?usp=sharing
+    sheet_id = "16tmqmaXRN_a_TV4iWdkHkJb4XPgc7dKKZZzd7dVtQs4"
+    spreadsheet = client.open_by_key(sheet_id)
+    worksheet = spreadsheet.worksheet("Create Full")
 
 
-# Get all rows from the sheet
-rows = worksheet.get_all_records()
-print("starting...")
-for row in rows:
+    # Get all rows from the sheet
+    rows = worksheet.get_all_records()
+    print("starting...")
+    # every product/variant metafield in the run goes out in 25-per-call metafieldsSet batches
+    with metafield_batch():
+        for row in rows:
     
-    #get input data
-    story_type = row.get("story_type")
-    story_title = row.get("story_title")
-    story_author = row.get("story_author")
-    story_protagonist = row.get("story_protagonist")
-    story_year = row.get("story_year")
-    story_summary_path = row.get("story_summary_path")
-    cover_path = row.get("cover_path")
-    product_type = row.get("product_type")
-    product_details = row.get("product_details")
-    skip_story_create = row.get("skip_story_create")
-    build_story_summary = row.get("build_story_summary")
-
-    if product_details == "":
-        print("Setting product details to default.")
-        product_details = {} #using default product details 
+            #get input data
+            story_type = row.get("story_type")
+            story_title = row.get("story_title")
+            story_author = row.get("story_author")
+            story_protagonist = row.get("story_protagonist")
+            story_year = row.get("story_year")
+            story_summary_path = row.get("story_summary_path")
+            cover_path = row.get("cover_path")
+            product_type = row.get("product_type")
+            product_details = row.get("product_details")
+            skip_story_create = row.get("skip_story_create")
+            build_story_summary = row.get("build_story_summary")
+
+            if product_details == "":
+                print("Setting product details to default.")
+                product_details = {} #using default product details 
     
-    if skip_story_create == "TRUE":
-        skip_story_create = True
-    else: #default
-        skip_story_create = False
+            if skip_story_create == "TRUE":
+                skip_story_create = True
+            else: #default
+                skip_story_create = False
     
-    if build_story_summary == "TRUE":
-        build_story_summary = True
-    else: #default
-        build_story_summary = False
+            if build_story_summary == "TRUE":
+                build_story_summary = True
+            else: #default
+                build_story_summary = False
 
     
-    if story_type == "" or story_title == "" or story_author == "" or story_protagonist == "" or story_year == "" or story_summary_path == "" or product_type == "":
-        print("Skipping row. Missing required fields")
-        continue
-
-    full_create(
-        story_type=story_type, 
-        story_title=story_title, 
-        story_author=story_author,
-        story_protagonist=story_protagonist, 
-        story_year=story_year, 
-        story_summary_path=story_summary_path,
-        cover_path=cover_path,
-        product_type=product_type,
-        product_details=product_details,
-        skip_story_create=skip_story_create,
-        build_story_summary=build_story_summary
-    )
+            if story_type == "" or story_title == "" or story_author == "" or story_protagonist == "" or story_year == "" or story_summary_path == "" or product_type == "":
+                print("Skipping row. Missing required fields")
+                continue
+
+            full_create(
+                story_type=story_type, 
+                story_title=story_title, 
+                story_author=story_author,
+                story_protagonist=story_protagonist, 
+                story_year=story_year, 
+                story_summary_path=story_summary_path,
+                story_cover_path=cover_path,
+                product_type=product_type,
+                product_details=product_details,
+                skip_story_create=skip_story_create,
+                build_story_summary=build_story_summary
+            )
 
 
 
@@ -30,55 +30,57 @@ def load_credentials_from_yaml(file_path):
         config = yaml.safe_load(yaml_file)
     return config["google_sheets"]
 
-# Use the configured path from the PATHS dictionary
-creds_data = load_credentials_from_yaml(PATHS['config'])
+# Sheet runs serially; for a parallel, resumable run over the same rows use batch_render.py
+if __name__ == "__main__":
+    # Use the configured path from the PATHS dictionary
+    creds_data = load_credentials_from_yaml(PATHS['config'])
 
-# Define the correct scope
-# SCOPES = ["https://www.googleapis.com/auth/spreadsheets.readonly"]
-SCOPES = ["https://www.googleapis.com/auth/spreadsheets",
-        "https://www.googleapis.com/auth/drive"
-]
+    # Define the correct scope
+    # SCOPES = ["https://www.googleapis.com/auth/spreadsheets.readonly"]
+    SCOPES = ["https://www.googleapis.com/auth/spreadsheets",
+            "https://www.googleapis.com/auth/drive"
+    ]
 
-# Create credentials with the correct scope
-credentials = Credentials.from_service_account_info(creds_data, scopes=SCOPES)
+    # Create credentials with the correct scope
+    credentials = Credentials.from_service_account_info(creds_data, scopes=SCOPES)
 
-# Authorize and create a client
-client = gspread.authorize(credentials)
+    # Authorize and create a client
+    client = gspread.authorize(credentials)
 
 
-#link https://docs.google.com/spreadsheets/d/16tmqmaXRN_a_TV4iWdkHkJb4XPgc7dKKZZzd7dVtQs4/edit?usp=sharing
-sheet_id = "16tmqmaXRN_a_TV4iWdkHkJb4XPgc7dKKZZzd7dVtQs4"
-spreadsheet = client.open_by_key(sheet_id)
-worksheet = spreadsheet.worksheet("Create Product")
+    #link https://docs.google.com/spreadsheets/d/16tmqmaXRN_a_TV4iWdkHkJb4XPgc7dKKZZzd7dVtQs4/edit?usp=sharing
+    sheet_id = "16tmqmaXRN_a_TV4iWdkHkJb4XPgc7dKKZZzd7dVtQs4"
+    spreadsheet = client.open_by_key(sheet_id)
+    worksheet = spreadsheet.worksheet("Create Product")
 
-print(worksheet)
+    print(worksheet)
 
-# Get all rows from the sheet
-rows = worksheet.get_all_records()
-print(rows)
-for row in rows:
+    # Get all rows from the sheet
+    rows = worksheet.get_all_records()
+    print(rows)
+    for row in rows:
     
-    #get input data
-    story_data_path = row.get("story_data_path")
-    product_type = row.get("product_type")
-    product_details = row.get("product_details")
+        #get input data
+        story_data_path = row.get("story_data_path")
+        product_type = row.get("product_type")
+        product_details = row.get("product_details")
 
-    print(story_data_path)
+        print(story_data_path)
 
 
-    if product_details == "":
-        print("Setting product details to default.")
-        product_details = {} #using default product details 
+        if product_details == "":
+            print("Setting product details to default.")
+            product_details = {} #using default product details 
     
-    if story_data_path == "" or product_type == "":
-        print("Skipping row. Missing required fields")
-        continue
-
-    build_product(
-        story_data_path=story_data_path,
-        product_type=product_type,
-        product_details=product_details
-    )
+        if story_data_path == "" or product_type == "":
+            print("Skipping row. Missing required fields")
+            continue
+
+        build_product(
+            story_data_path=story_data_path,
+            product_type=product_type,
+            product_details=product_details
+        )
 
 
 
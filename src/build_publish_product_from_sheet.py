@@ -6,6 +6,7 @@ from shopify_create_product          import create_shopify_product
 from shopify_create_product_variant  import create_shopify_product_variant
 from shopify_product_variant_mockups import add_shopify_product_variant_mockups
 from create_product_support_data     import create_product_support_data
+from shopify_metafield_batch         import metafield_batch
 
 
 import yaml
@@ -67,17 +68,19 @@ worksheet = spreadsheet.worksheet("Publish Product")
 
 # Get all rows from the sheet
 rows = worksheet.get_all_records()
-for row in rows:
+# every product/variant metafield in the run goes out in 25-per-call metafieldsSet batches
+with metafield_batch():
+    for row in rows:
     
-    #get input data
-    product_data_path = row.get("product_data_path")
+        #get input data
+        product_data_path = row.get("product_data_path")
 
-    if product_data_path == "":
-        print("Skipping row. Missing required fields")
-        continue
+        if product_data_path == "":
+            print("Skipping row. Missing required fields")
+            continue
 
-    publish_product(
-       product_data_path = product_data_path
-    )
+        publish_product(
+           product_data_path = product_data_path
+        )
 
 
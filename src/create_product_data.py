@@ -7,7 +7,7 @@ import time
 from datetime import datetime
 
 
-from product_shape import create_shape
+from product_shape import create_shape, get_product_path_name
 from product_color import map_hex_to_simple_color
 from story_shape_category import get_story_symbolic_and_archetype, shapes_equal_ignore_magnitude, _direction_tokens, shape_direction_diff
 from product_description import create_product_description
@@ -135,11 +135,7 @@ def create_product_data(story_data_path, product_type="", product_details=""):
     if product_type == "print":
 
         #open print_product_details --> we know product details for print items includes print_size, line_style, background_color_hex, font_color_hex, font
-        print_size = (product_details.get("print_size") or "11x14") #default is 11x14 print 
-        line_style = (product_details.get("line_style") or "storybeats") #default is storybeats
-        background_color_hex = (product_details.get("background_color_hex") or story_data.get("default_style", {}).get("background_color_hex"))
-        font_color_hex = (product_details.get("font_color_hex") or story_data.get("default_style", {}).get("font_color_hex"))
-        font = (product_details.get("font") or story_data.get("default_style", {}).get("font"))
+        print_size, line_style, background_color_hex, font_color_hex, font = get_print_product_settings(story_data, product_details)
         
 
         #annoucen which product you're creating 
@@ -390,6 +386,48 @@ def create_product_data(story_data_path, product_type="", product_details=""):
 
 
 
+def get_print_product_settings(story_data, product_details):
+    """Print settings from product_details, falling back to the story's default_style."""
+    print_size = (product_details.get("print_size") or "11x14") #default is 11x14 print 
+    line_style = (product_details.get("line_style") or "storybeats") #default is storybeats
+    background_color_hex = (product_details.get("background_color_hex") or story_data.get("default_style", {}).get("background_color_hex"))
+    font_color_hex = (product_details.get("font_color_hex") or story_data.get("default_style", {}).get("font_color_hex"))
+    font = (product_details.get("font") or story_data.get("default_style", {}).get("font"))
+    return print_size, line_style, background_color_hex, font_color_hex, font
+
+
+def get_product_output_paths(story_data_path, product_type="", product_details=""):
+    """
+    Where create_product_data will write the product data JSON and design PNG for
+    this story/product, without rendering anything.
+
+    Returns:
+        tuple: (product_data_path, product_design_path) or (None, None) if the
+               story data is missing or the product isn't one we can render
+    """
+    if not os.path.exists(story_data_path):
+        return None, None
+    with open(story_data_path, 'r') as f:
+        story_data = json.load(f)
+    if 'story_plot_data' in story_data:
+        story_data = story_data['story_plot_data']
+
+    if product_type != "print":
+        return None, None
+    print_size, _, background_color_hex, font_color_hex, font = get_print_product_settings(story_data, product_details or {})
+    if print_size != "11x14" or not (background_color_hex and font_color_hex and font):
+        return None, None
+
+    # must match create_print_11x14_product_data / create_shape
+    path_name = get_product_path_name(
+        story_data['title'], story_data['protagonist'], "print", 11, 14, font,
+        map_hex_to_simple_color(background_color_hex)['name'],
+        map_hex_to_simple_color(font_color_hex)['name'])
+    product_data_path = os.path.join(PATHS['product_data'], f"{path_name}.json")
+    product_design_path = os.path.join(PATHS['product_designs'], f"{path_name}-storybeats.png")
+    return product_data_path, product_design_path
+
+
 def create_print_11x14_product_data(story_data_path, title, protagonist, author, year, background_color_hex, font_color_hex,font, line_type, output_format, output_dir):       
 
     total_chars_line1 = len(title) + len(protagonist)
@@ -510,7 +548,8 @@ def create_print_11x14_product_data(story_data_path, title, protagonist, author,
                     llm_model = "claude-sonnet-4-5-nonthinking",#"meta-llama/llama-4-scout-17b-16e-instruct",#"gpt-4.1-2025-04-14", #"claude-3-5-sonnet-latest",#"gemini-2.5-pro-preview-03-25", #"claude-3-5-sonnet-latest", #for generating descriptors 
                     #llm_provider = "google", #"anthropic", #google", 
                     #llm_model = "gemini-2.5-pro-preview-05-06", #"claude-3-5-sonnet-latest" #"gemini-2.5-pro-preview-03-25"
-                    output_format=output_format #options png or svg
+                    output_format=output_format, #options png or svg
+                    glyph_metrics_path = PATHS['glyph_metrics'] #cached Pango glyph sizes shared across runs
                 ) 
     return product_data_path, product_design_path 
 
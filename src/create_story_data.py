@@ -9,7 +9,8 @@ from datetime import datetime
 
 # imports from my code
 from story_style import get_story_style, pango_font_exists #move to this sheet
-from story_components import get_story_components, grade_story_components, get_distilled_story_components, visualize_distillation, review_story_shape
+from story_components import get_story_components, agrade_story_components, get_distilled_story_components, visualize_distillation, areview_story_shape
+from llm import gather_llm_calls
 from story_summary import get_story_summary
 from story_shape_category import get_story_symbolic_and_archetype
 from story_metadata import get_story_metadata
@@ -238,39 +239,39 @@ def create_story_data(story_type, story_title, story_author,story_protagonist, s
     print("✅ Story Components Visualized")
 
 
-    #grade story components
-    story_components_grader_llm_model = "gemini-2.5-pro" #google good for grading 
-    story_component_grades = grade_story_components(
-        config_path = PATHS['config'], 
-        story_components=story_components, 
-        canonical_summary=story_summary, 
-        title=story_title, 
-        author=story_author, 
-        protagonist=story_protagonist, 
-        llm_provider = "google", #"google", #"openai",#, #"openai",, #"anthropic", #google", 
-        llm_model = story_components_grader_llm_model#"gemini-2.5-pro-preview-06-05", #o3-mini-2025-01-31", #"o4-mini-2025-04-16" #"gemini-2.5-pro-preview-05-06" #"o3-2025-04-16" #"gemini-2.5-pro-preview-05-06"#o3-2025-04-16"#"gemini-2.5-pro-preview-05-06" #"claude-3-5-sonnet-latest" #"gemini-2.5-pro-preview-03-25"
-    )
-    print("✅ Story Components Graded")
-    print("GRADE: ", story_component_grades['shape_accuracy']['final_grade'])
-
-
     # get category of shape
     story_symbolic_rep,  story_archetype = get_story_symbolic_and_archetype(story_components)
     print("✅ Story Shape Category")
     print("SHAPE: ", story_symbolic_rep)
 
-    # review shape category 
+    #grade story components and review shape category (independent, so both LLM calls go out together)
+    story_components_grader_llm_model = "gemini-2.5-pro" #google good for grading 
     story_shape_review_llm_model = "claude-sonnet-4-5" #google good for grading 
-    story_shape_review = review_story_shape(
-        config_path=PATHS['config'], 
-        story_title=story_title, 
-        author=story_author, 
-        protagonist=story_protagonist, 
-        story_summary=story_summary, 
-        shape=story_symbolic_rep, 
-        story_components=story_components,
-        llm_provider="anthropic", 
-        llm_model=story_shape_review_llm_model)
+    story_component_grades, story_shape_review = gather_llm_calls(
+        agrade_story_components(
+            config_path = PATHS['config'], 
+            story_components=story_components, 
+            canonical_summary=story_summary, 
+            title=story_title, 
+            author=story_author, 
+            protagonist=story_protagonist, 
+            llm_provider = "google", #"google", #"openai",#, #"openai",, #"anthropic", #google", 
+            llm_model = story_components_grader_llm_model#"gemini-2.5-pro-preview-06-05", #o3-mini-2025-01-31", #"o4-mini-2025-04-16" #"gemini-2.5-pro-preview-05-06" #"o3-2025-04-16" #"gemini-2.5-pro-preview-05-06"#o3-2025-04-16"#"gemini-2.5-pro-preview-05-06" #"claude-3-5-sonnet-latest" #"gemini-2.5-pro-preview-03-25"
+        ),
+        areview_story_shape(
+            config_path=PATHS['config'], 
+            story_title=story_title, 
+            author=story_author, 
+            protagonist=story_protagonist, 
+            story_summary=story_summary, 
+            shape=story_symbolic_rep, 
+            story_components=story_components,
+            llm_provider="anthropic", 
+            llm_model=story_shape_review_llm_model)
+    )
+    print("✅ Story Components Graded")
+    print("GRADE: ", story_component_grades['shape_accuracy']['final_grade'])
+
     print(story_shape_review)
     if story_shape_review.get("passes_review") == True:
         print("✅ Story Shape Reviewed Passed")
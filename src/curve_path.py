@@ -0,0 +1,136 @@
+"""
+Arc-Length Curve Lookup for The Shapes of Stories
+=================================================
+
+draw_text_on_curve and spacing_optimizer.test_text_fit_on_curve both found
+each glyph's spot on the arc by walking an index forward through the
+cumulative segment lengths in a Python while loop, one character at a
+time; draw_text_on_curve also rebuilt np.hypot(np.diff(...)) twice per
+call, and the binary-search spacing optimizer re-ran all of it (12 times
+per component) on the same arc.
+
+CurvePath is built once per component arc and precomputes:
+    - cumulative arc length at every vertex (and the total length, summed
+      the same way calculate_arc_length does)
+    - the tangent angle at every vertex (central difference, one-sided at
+      the ends, as get_tangent_angle did)
+
+and answers "where is distance d along the curve" for a whole phrase at
+once: one np.searchsorted over the cumulative lengths, then the same
+linear interpolation per glyph. Both lookup rules the old loops used are
+kept exactly (they differ in how they treat a distance sitting on a vertex
+and zero-length segments), so placements come out bit for bit the same:
+
+    curve = CurvePath(arc_x_values_scaled, arc_y_values_scaled)
+    segments = curve.segments_containing(distances)       # draw_text_on_curve
+    segments = curve.segments_reaching(center_distances)  # the fit test
+    x, y, angle = curve.points(distances, segments)
+
+A segment index of curve.end_index means the distance is off the curve.
+"""
+
+import math
+
+import numpy as np
+
+
+class CurvePath:
+    def __init__(self, x_values, y_values):
+        self.x = np.asarray(x_values, dtype=np.float64)
+        self.y = np.asarray(y_values, dtype=np.float64)
+        segment_lengths = np.hypot(np.diff(self.x), np.diff(self.y))
+        self.length = np.sum(segment_lengths)
+        self.cumulative = np.insert(np.cumsum(segment_lengths), 0, 0)
+        # spans between cumulative lengths: what the old loops divided by
+        self.spans = np.diff(self.cumulative)
+        self.end_index = len(self.cumulative) - 1
+        self.tangent_angles = self._tangent_angles()
+        self.previous_nonempty = self._previous_nonempty()
+
+    def _tangent_angles(self):
+        n = len(self.x)
+        if n < 2:
+            return np.zeros(n)
+        dx = np.empty(n); dy = np.empty(n)
+        dx[0], dy[0] = self.x[1] - self.x[0], self.y[1] - self.y[0]
+        dx[-1], dy[-1] = self.x[-1] - self.x[-2], self.y[-1] - self.y[-2]
+        dx[1:-1] = self.x[2:] - self.x[:-2]
+        dy[1:-1] = self.y[2:] - self.y[:-2]
+        # math.atan2, not np.arctan2: the two disagree in the last bit now and then
+        return np.array([math.atan2(b, a) for a, b in zip(dx.tolist(), dy.tolist())])
+
+    def _previous_nonempty(self):
+        # for each segment, the closest earlier segment with a non-zero span (-1 if none)
+        prev = np.full(len(self.spans) + 1, -1)
+        last = -1
+        for i, span in enumerate(self.spans.tolist()):
+            prev[i] = last
+            if span != 0:
+                last = i
+        prev[-1] = last
+        return prev
+
+    def __len__(self):
+        return len(self.x)
+
+    # ---------- segment lookups ----------
+    def segments_containing(self, distances, start_index=0):
+        """
+        For each distance, the first segment at/after start_index that isn't
+        zero-length and has start <= d <= end (draw_text_on_curve's rule).
+        end_index where there's none. Assumes distances >= the length at
+        start_index, as the forward walk did.
+        """
+        d = np.asarray(distances, dtype=np.float64)
+        segments = np.searchsorted(self.cumulative, d, side="left") - 1
+        # d sits exactly on a vertex at/before start_index: the walk starts
+        # there, so take the first non-empty segment that begins at d
+        on_vertex = segments < start_index
+        if np.any(on_vertex):
+            segments = np.where(on_vertex, np.searchsorted(self.cumulative, d, side="right") - 1, segments)
+        # the walk accepted a segment when (d - start) / span rounded to <= 1,
+        # which a d a hair past the segment's end can still do
+        while True:
+            prev = self.previous_nonempty[np.clip(segments, 0, self.end_index)]
+            ok = (prev >= start_index) & (segments >= 0)
+            if not np.any(ok):
+                break
+            safe_prev = np.where(ok, prev, 0)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                ratio = (d - self.cumulative[safe_prev]) / self.spans[safe_prev]
+            ok &= (ratio >= 0) & (ratio <= 1)
+            if not np.any(ok):
+                break
+            segments = np.where(ok, prev, segments)
+        off = (segments < start_index) | (segments >= self.end_index) | (d < self.cumulative[min(start_index, self.end_index)])
+        return np.where(off, self.end_index, segments)
+
+    def segment_containing(self, distance, start_index=0):
+        return int(self.segments_containing([distance], start_index)[0])
+
+    def segments_reaching(self, distances):
+        """For each distance, the first segment whose end is at/after it (the fit test's rule); end_index past the end."""
+        return np.searchsorted(self.cumulative[1:], np.asarray(distances, dtype=np.float64), side="left")
+
+    # ---------- positions ----------
+    def ratios(self, distances, segments, clip=False):
+        """How far into each segment each distance is (segments must be on the curve)."""
+        segments = np.asarray(segments)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = (np.asarray(distances, dtype=np.float64) - self.cumulative[segments]) / self.spans[segments]
+        return np.clip(ratio, 0, 1) if clip else ratio
+
+    def points(self, distances, segments, clip=False):
+        """(x, y, tangent angle) arrays for distances already matched to on-curve segments."""
+        segments = np.asarray(segments)
+        ratio = self.ratios(distances, segments, clip)
+        x0 = self.x[segments]; y0 = self.y[segments]
+        with np.errstate(invalid="ignore"):  # empty segments give nan, callers skip those
+            x = x0 + ratio * (self.x[segments + 1] - x0)
+            y = y0 + ratio * (self.y[segments + 1] - y0)
+        return x, y, self.tangent_angles[segments]
+
+
+def as_curve_path(x_values, y_values, curve=None):
+    """`curve` if the caller already built one for this arc, otherwise a new CurvePath."""
+    return curve if curve is not None else CurvePath(x_values, y_values)
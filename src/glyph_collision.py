@@ -0,0 +1,258 @@
+"""
+Glyph Collision Index for The Shapes of Stories
+===============================================
+
+draw_text_on_curve used to test every new glyph box against every box
+rendered so far (rendered_boxes + all_rendered_boxes), which is O(n^2) over
+a whole design. This module keeps the rendered boxes in a uniform grid keyed
+by canvas cell so a collision check only looks at the handful of boxes that
+share a cell with the candidate glyph.
+
+One index lives for a whole create_shape_single_pass run (it replaces the old
+all_rendered_boxes list) and supports:
+    - insert()            add a placed glyph box
+    - mark() / rollback() drop every box added after a mark (rejected phrase)
+    - intersects_any()    the collision test used by the layout loops
+    - nearest()           closest rendered box to a candidate
+
+The boxes themselves are glyph_obb.GlyphBox rectangles kept in a
+GlyphBoxStore (one NumPy array); intersects_any() runs the separating-axis
+test against all the boxes in the candidate's cells in one call. to_shapely()
+gives them back as Shapely polygons for debugging.
+
+When a glyph collides, draw_text_on_curve used to bump it 1px along the
+path and test again, hundreds of times on a crowded joint between
+components. next_free_slot() does that search in batches instead: it lays
+out the next N 1px steps on the CurvePath at once and tests them all against
+the boxes near the batch in one go. The steps are added up one at a time
+like the loop did, and every step gets exactly the test intersects_any()
+would give it, so it lands on the same slot the bump loop would have.
+"""
+
+import math
+from collections import defaultdict
+
+import numpy as np
+
+from glyph_obb import GlyphBoxStore, as_glyph_box, glyph_box
+
+# ~2x the glyph height of our usual 8-12pt arc text at 300 DPI
+DEFAULT_CELL_SIZE = 64
+
+# next_free_slot: 1px steps looked at per batch (grows while nothing clears)
+SLOT_BATCH = 32
+MAX_SLOT_BATCH = 256
+
+
+class GlyphCollisionIndex:
+    """
+    Uniform-grid spatial index over rendered glyph boxes (GlyphBox).
+
+    Boxes are stored in insertion order so rolling back a rejected phrase is
+    just a truncate. The index is iterable and sized like the list it
+    replaces, so code that only needs "all boxes so far" keeps working.
+    """
+
+    def __init__(self, cell_size=DEFAULT_CELL_SIZE):
+        if cell_size <= 0:
+            raise ValueError("cell_size must be positive")
+        self.cell_size = float(cell_size)
+        self._store = GlyphBoxStore()
+        self._box_cells = []
+        self._cells = defaultdict(list)  # (col, row) -> [box ids]
+
+    @classmethod
+    def from_boxes(cls, boxes, cell_size=DEFAULT_CELL_SIZE):
+        index = cls(cell_size=cell_size)
+        for box in boxes:
+            index.insert(box)
+        return index
+
+    def __len__(self):
+        return len(self._store)
+
+    def __iter__(self):
+        return iter(self.boxes_since(0))
+
+    def _cells_for_bounds(self, bounds):
+        min_x, min_y, max_x, max_y = bounds
+        c0 = math.floor(min_x / self.cell_size)
+        c1 = math.floor(max_x / self.cell_size)
+        r0 = math.floor(min_y / self.cell_size)
+        r1 = math.floor(max_y / self.cell_size)
+        return [(c, r) for c in range(c0, c1 + 1) for r in range(r0, r1 + 1)]
+
+    def insert(self, box):
+        """Add a rendered glyph box (a GlyphBox, or a rectangular Shapely polygon). Returns its id."""
+        box = as_glyph_box(box)
+        box_id = self._store.append(box)
+        cells = self._cells_for_bounds(box.bounds)
+        for cell in cells:
+            self._cells[cell].append(box_id)
+        self._box_cells.append(cells)
+        return box_id
+
+    def mark(self):
+        """Checkpoint to pass to rollback() if the phrase gets rejected."""
+        return len(self._store)
+
+    def boxes_since(self, mark):
+        """Boxes inserted after `mark`, oldest first."""
+        return [self._store.box(box_id) for box_id in range(mark, len(self._store))]
+
+    def rollback(self, mark):
+        """Remove every box inserted after `mark`."""
+        while len(self._box_cells) > mark:
+            for cell in self._box_cells.pop():
+                ids = self._cells[cell]
+                # ids are appended in insertion order so the newest is last
+                ids.pop()
+                if not ids:
+                    del self._cells[cell]
+        self._store.truncate(mark)
+
+    def _ids_near(self, bounds):
+        # ids in the cells `bounds` covers (a superset of the boxes whose bounds touch it)
+        ids = set()
+        for cell in self._cells_for_bounds(bounds):
+            ids.update(self._cells.get(cell, ()))
+        return np.fromiter(sorted(ids), dtype=np.intp, count=len(ids))
+
+    def query(self, box):
+        """Rendered boxes whose bounding box touches the bounding box of `box`."""
+        bounds = as_glyph_box(box).bounds
+        ids = self._ids_near(bounds)
+        return [self._store.box(box_id) for box_id in ids[self._store.touching(ids, bounds)].tolist()]
+
+    def intersects_any(self, box):
+        """True if `box` intersects any rendered box (touching counts)."""
+        box = as_glyph_box(box)
+        ids = self._ids_near(box.bounds)
+        if not len(ids):
+            return False
+        return self._store.any_overlapping(ids, box)
+
+    def first_clear(self, x, y, angle, half_w, half_h):
+        """
+        Index of the first candidate (arrays x, y, angle; one size) that
+        intersects_any() would let through, or None.
+        """
+        if not len(self._store):
+            return 0 if len(x) else None
+        cos = np.abs(np.cos(angle))
+        sin = np.abs(np.sin(angle))
+        # a little slack so rounding in the vectorized cos/sin can't drop a neighbour
+        ex = half_w * cos + half_h * sin + 1
+        ey = half_w * sin + half_h * cos + 1
+        ids = self._ids_near((float((x - ex).min()), float((y - ey).min()), float((x + ex).max()), float((y + ey).max())))
+        if not len(ids):
+            return 0 if len(x) else None
+        blocked = self._store.overlapping(ids, x, y, half_w, half_h, angle).any(axis=1)
+        clear = np.flatnonzero(~blocked)
+        return int(clear[0]) if len(clear) else None
+
+    def to_shapely(self):
+        """Every rendered box as a Shapely polygon, oldest first (for debugging / plotting)."""
+        return self._store.to_shapely()
+
+    def nearest(self, box, max_distance=None):
+        """
+        Closest rendered box to `box`.
+
+        Searches outward ring by ring from the candidate's cells and stops once
+        a ring can no longer beat the best distance found.
+
+        Returns:
+            tuple: (nearest_box, distance) or (None, None) if nothing is within
+                   max_distance (or the index is empty)
+        """
+        if not len(self._store):
+            return None, None
+
+        box = as_glyph_box(box)
+        min_x, min_y, max_x, max_y = box.bounds
+        c0 = math.floor(min_x / self.cell_size)
+        c1 = math.floor(max_x / self.cell_size)
+        r0 = math.floor(min_y / self.cell_size)
+        r1 = math.floor(max_y / self.cell_size)
+
+        if self._cells:
+            cols = [c for c, _ in self._cells]
+            rows = [r for _, r in self._cells]
+            max_ring = max(c0 - min(cols), max(cols) - c1, r0 - min(rows), max(rows) - r1, 0)
+        else:
+            max_ring = 0
+        if max_distance is not None:
+            max_ring = min(max_ring, int(math.ceil(max_distance / self.cell_size)) + 1)
+
+        best_box, best_distance = None, None
+        seen = set()
+        for ring in range(max_ring + 1):
+            # anything in this ring is at least (ring - 1) cells away
+            if best_distance is not None and (ring - 1) * self.cell_size > best_distance:
+                break
+            for col in range(c0 - ring, c1 + ring + 1):
+                for row in range(r0 - ring, r1 + ring + 1):
+                    on_ring = col in (c0 - ring, c1 + ring) or row in (r0 - ring, r1 + ring)
+                    if not on_ring:
+                        continue
+                    for box_id in self._cells.get((col, row), ()):
+                        if box_id in seen:
+                            continue
+                        seen.add(box_id)
+                        other = self._store.box(box_id)
+                        distance = box.distance(other)
+                        if best_distance is None or distance < best_distance:
+                            best_box, best_distance = other, distance
+
+        if best_distance is None or (max_distance is not None and best_distance > max_distance):
+            return None, None
+        return best_box, best_distance
+
+
+def as_collision_index(boxes, cell_size=DEFAULT_CELL_SIZE):
+    """Return `boxes` if it's already an index, otherwise build one from a list of boxes."""
+    if isinstance(boxes, GlyphCollisionIndex):
+        return boxes
+    return GlyphCollisionIndex.from_boxes(boxes or [], cell_size=cell_size)
+
+
+def next_free_slot(index, curve, distance, segment, char_width, char_height, step=1):
+    """
+    Where the 1px bump loop ends up after a glyph collides at `distance`
+    (on `segment` of the CurvePath `curve`): the first of distance + step,
+    + step, ... whose glyph box clears every box in `index`.
+
+    Returns:
+        tuple: (distance, segment, x, y, angle, box) for the free slot, or
+               (distance, curve.end_index, None, None, None, None) once the
+               steps run off the end of the curve
+    """
+    batch = SLOT_BATCH
+    while True:
+        # cumsum adds the steps one after another, same floats as `distance += step`
+        distances = np.cumsum(np.concatenate(([distance], np.full(batch, float(step)))))[1:]
+        segments = curve.segments_containing(distances, segment)
+
+        # the loop never walks back a segment; where a lookup from `segment`
+        # would, stop the batch there so the next one starts from its neighbour
+        backwards = np.flatnonzero(segments[1:] < segments[:-1])
+        count = int(backwards[0]) + 1 if len(backwards) else batch
+        off_curve = np.flatnonzero(segments[:count] >= curve.end_index)
+        ran_out = len(off_curve) > 0
+        if ran_out:
+            count = int(off_curve[0])
+        distances, segments = distances[:count], segments[:count]
+
+        if count:
+            x, y, angle = curve.points(distances, segments)
+            k = index.first_clear(x, y, angle, char_width / 2, char_height / 2)
+            if k is not None:
+                x, y, angle = float(x[k]), float(y[k]), float(angle[k])
+                return (float(distances[k]), int(segments[k]), x, y, angle,
+                        glyph_box(x, y, angle, char_width, char_height))
+            distance, segment = float(distances[-1]), int(segments[-1])
+
+        if ran_out:
+            return distance, curve.end_index, None, None, None, None
+        batch = min(batch * 2, MAX_SLOT_BATCH)
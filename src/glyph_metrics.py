@@ -0,0 +1,217 @@
+"""
+Glyph Metrics Cache for The Shapes of Stories
+=============================================
+
+Every character placed by draw_text_on_curve, _layout_single_phrase_on_curve
+and spacing_optimizer.test_text_fit_on_curve used to build a fresh
+Pango.Layout just to call get_pixel_size(). Across the recursive_loops of
+create_shape that's the same few dozen glyphs measured hundreds of thousands
+of times.
+
+GlyphMetricsCache holds the pixel advance/height of each glyph for one
+(font description, size, DPI, cairo font options, font file) and is shared
+by all of those call sites via get_glyph_metrics(). The printable ASCII +
+Latin-1 set can be precomputed up front, and the whole registry can be
+saved to / loaded from a JSON file so later runs never touch Pango for
+measurement.
+
+Glyph sizes depend on more than the font description:
+    - hint metrics / hint style / antialias: a PNG surface hints metrics
+      and an SVG surface doesn't, so the same font measures differently.
+      create_pango_context() pins the surface's font options on the Pango
+      context so they're part of the key
+    - the font file itself: the key carries the path, size and mtime of the
+      file fontconfig picks, so updating a font invalidates saved metrics
+"""
+
+import json
+import os
+import subprocess
+
+from gi.repository import Pango, PangoCairo
+
+PRINTABLE_ASCII = "".join(chr(c) for c in range(0x20, 0x7F))
+LATIN_1 = "".join(chr(c) for c in range(0xA0, 0x100))
+DEFAULT_CHARSET = PRINTABLE_ASCII + LATIN_1
+
+# same sample get_average_char_width has always used when none is given
+DEFAULT_AVERAGE_SAMPLE_TEXT = "Nervous. First Day. Office. Challenges. Potential."
+
+# 2: keys carry font options and the font file stamp
+GLYPH_METRICS_FILE_VERSION = 2
+
+_REGISTRY = {}
+_FONT_FILE_STAMPS = {}
+
+
+def create_pango_context(cr):
+    """
+    PangoCairo context for `cr` with the surface's font options set on it
+    explicitly: Pango would apply the same ones anyway, but this way
+    get_glyph_metrics() can see them.
+    """
+    pangocairo_context = PangoCairo.create_context(cr)
+    PangoCairo.context_set_font_options(pangocairo_context, cr.get_target().get_font_options())
+    return pangocairo_context
+
+
+def font_options_stamp(pangocairo_context):
+    """Hint metrics, hint style and antialias set on the context ("surface" if none were set)."""
+    options = PangoCairo.context_get_font_options(pangocairo_context)
+    if options is None:
+        return "surface"
+    return f"hm{int(options.get_hint_metrics())}-hs{int(options.get_hint_style())}-aa{int(options.get_antialias())}"
+
+
+def font_file_stamp(font_desc):
+    """Path, size and mtime of the font file fontconfig picks for this family/weight/style ("" if unknown)."""
+    pattern = font_desc.get_family() or ""
+    if font_desc.get_weight() >= Pango.Weight.BOLD:
+        pattern += ":bold"
+    if font_desc.get_style() != Pango.Style.NORMAL:
+        pattern += ":italic"
+    stamp = _FONT_FILE_STAMPS.get(pattern)
+    if stamp is None:
+        try:
+            path = subprocess.run(["fc-match", "-f", "%{file}", pattern],
+                                  capture_output=True, text=True, check=True).stdout.strip()
+            info = os.stat(path)
+            stamp = f"{path}:{info.st_size}:{int(info.st_mtime)}"
+        except (OSError, subprocess.CalledProcessError):
+            stamp = ""
+        _FONT_FILE_STAMPS[pattern] = stamp
+    return stamp
+
+
+def font_metrics_key(font_desc, dpi, font_options="surface", font_file=""):
+    """Registry key: font description string, Pango size, context resolution, font options and font file."""
+    return f"{font_desc.to_string()}|{font_desc.get_size()}|{float(dpi)}|{font_options}|{font_file}"
+
+
+class GlyphMetricsCache:
+    """
+    Pixel sizes for one font file at one size/DPI/set of font options.
+
+    glyph_size() covers single characters (what the curve layout loops need);
+    text_size() memoizes whole strings, since a run's width includes kerning
+    and isn't just the sum of its glyphs. Misses are measured with the most
+    recently bound Pango context.
+    """
+
+    def __init__(self, key, font_desc=None, pangocairo_context=None):
+        self.key = key
+        self.font_desc = font_desc
+        self.pangocairo_context = pangocairo_context
+        self.glyphs = {}
+        self.texts = {}
+        self.precomputed = False
+
+    def bind(self, pangocairo_context, font_desc):
+        self.pangocairo_context = pangocairo_context
+        self.font_desc = font_desc
+        return self
+
+    def _measure(self, text):
+        if self.pangocairo_context is None or self.font_desc is None:
+            raise ValueError(f"No Pango context bound to measure {text!r} for font '{self.key}'")
+        layout = Pango.Layout.new(self.pangocairo_context)
+        layout.set_font_description(self.font_desc)
+        layout.set_text(text, -1)
+        return tuple(layout.get_pixel_size())
+
+    def glyph_size(self, char):
+        size = self.glyphs.get(char)
+        if size is None:
+            size = self._measure(char)
+            self.glyphs[char] = size
+        return size
+
+    def text_size(self, text):
+        if len(text) == 1:
+            return self.glyph_size(text)
+        size = self.texts.get(text)
+        if size is None:
+            size = self._measure(text)
+            self.texts[text] = size
+        return size
+
+    def space_width(self):
+        """Width of a plain space; at least 1px so it's safe to divide by."""
+        width = self.glyph_size(" ")[0]
+        return width if width > 0 else 1
+
+    def average_char_width(self, sample_text=None):
+        if sample_text is None or sample_text == "":
+            sample_text = DEFAULT_AVERAGE_SAMPLE_TEXT
+        total_width = self.text_size(sample_text)[0]
+        num_chars = len(sample_text.replace(" ", ""))
+        return total_width / num_chars
+
+    def precompute(self, charset=DEFAULT_CHARSET):
+        for char in charset:
+            self.glyph_size(char)
+        self.precomputed = True
+        return self
+
+    def to_dict(self):
+        return {"glyphs": {char: list(size) for char, size in self.glyphs.items()}}
+
+    def update_from_dict(self, data):
+        for char, size in data.get("glyphs", {}).items():
+            self.glyphs[char] = tuple(size)
+        return self
+
+
+def get_glyph_metrics(pangocairo_context, font_desc, precompute=True):
+    """
+    Shared cache for this font at the context's resolution and font
+    options, bound to the given context for any glyphs not measured yet.
+    """
+    dpi = PangoCairo.context_get_resolution(pangocairo_context)
+    key = font_metrics_key(font_desc, dpi, font_options_stamp(pangocairo_context), font_file_stamp(font_desc))
+    cache = _REGISTRY.get(key)
+    if cache is None:
+        cache = GlyphMetricsCache(key)
+        _REGISTRY[key] = cache
+    cache.bind(pangocairo_context, font_desc)
+    if precompute and not cache.precomputed:
+        cache.precompute()
+    return cache
+
+
+def clear_glyph_metrics():
+    _REGISTRY.clear()
+
+
+def save_glyph_metrics(path):
+    data = {
+        "version": GLYPH_METRICS_FILE_VERSION,
+        "fonts": {key: cache.to_dict() for key, cache in _REGISTRY.items()},
+    }
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def load_glyph_metrics(path):
+    """
+    Merge glyph metrics saved by save_glyph_metrics() into the registry.
+    Fonts loaded this way count as precomputed. Returns the number of fonts loaded.
+    """
+    if not path or not os.path.exists(path):
+        return 0
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("version") != GLYPH_METRICS_FILE_VERSION:
+        print(f"Ignoring glyph metrics file {path}: unsupported version {data.get('version')}")
+        return 0
+    for key, font_data in data.get("fonts", {}).items():
+        cache = _REGISTRY.get(key)
+        if cache is None:
+            cache = GlyphMetricsCache(key)
+            _REGISTRY[key] = cache
+        cache.update_from_dict(font_data)
+        if all(char in cache.glyphs for char in DEFAULT_CHARSET):
+            cache.precomputed = True
+    return len(data.get("fonts", {}))
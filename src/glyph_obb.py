@@ -0,0 +1,258 @@
+"""
+Oriented Glyph Boxes for The Shapes of Stories
+==============================================
+
+Every glyph placement attempt in draw_text_on_curve used to build a Shapely
+Polygon, rotate it and translate it (three geometry objects per try) just to
+ask for its .bounds and whether it intersects() the boxes already drawn.
+
+A glyph box is always a rectangle turned to the curve's tangent, so it's
+kept here as plain numbers instead:
+    - GlyphBox: centre, half-extents and angle (plus the angle's cos/sin
+      and the axis-aligned bounds), built with a handful of float ops
+    - GlyphBoxStore: the rendered boxes as rows of one growable NumPy array
+      (rolling back a phrase is a truncate)
+    - axis_slack(): the separating-axis test for two rectangles written
+      out in closed form, so one call checks a candidate (or a whole batch
+      of candidates) against every nearby stored box
+
+Touching counts as overlapping, like Shapely's intersects(). Whether two
+exactly abutting boxes "touch" comes down to rounding, and Shapely rounds
+its corners differently, so Shapely remains as the fallback for ties: the
+rare pair within TOUCH_TOLERANCE of touching is handed to it, and the
+answers come out the same as before. (A plain epsilon rule would call every
+exact abut a touch, which Shapely doesn't, and layouts would shift.) Boxes
+made from Shapely rectangles keep their polygon for this, since rebuilding
+it can move a corner by an ulp. Everything else is plain float / NumPy math,
+and Shapely is only imported once a tie, distance() or to_shapely() needs it.
+
+Shapely is still there when you want to look at the boxes:
+
+    box = glyph_box(x, y, angle, char_width, char_height)
+    box.to_shapely()   # the same Polygon draw_text_on_curve used to build
+"""
+
+import math
+
+import numpy as np
+
+# GlyphBoxStore row layout
+X, Y, HALF_W, HALF_H, ANGLE, COS, SIN, MIN_X, MIN_Y, MAX_X, MAX_Y = range(11)
+N_COLUMNS = 11
+INITIAL_CAPACITY = 256
+# below this many boxes in reach, a plain loop beats NumPy's per-call overhead
+VECTOR_MIN_BOXES = 8
+# boxes whose slack is within this (px) of zero are exactly touching up to
+# rounding; Shapely settles those so layouts don't change (consecutive equal
+# glyphs on a straight run abut exactly, and Shapely calls most of them touching)
+TOUCH_TOLERANCE = 1e-9
+
+
+def axis_slack(ax, ay, a_half_w, a_half_h, a_cos, a_sin, bx, by, b_half_w, b_half_h, b_cos, b_sin):
+    """
+    Separating-axis test between rectangles a and b (centre, half-extents,
+    cos/sin of the angle), as four slacks: on each axis, how far the two
+    projections overlap (negative = a gap, i.e. that axis separates them).
+    Works on floats or broadcastable arrays; every element goes through the
+    same float ops either way, so a batch gives exactly the one-at-a-time
+    answers.
+    """
+    tx = bx - ax
+    ty = by - ay
+    # b's axes seen from a's frame
+    c = abs(b_cos * a_cos + b_sin * a_sin)
+    s = abs(b_sin * a_cos - b_cos * a_sin)
+    return (a_half_w + b_half_w * c + b_half_h * s - abs(tx * a_cos + ty * a_sin),
+            a_half_h + b_half_w * s + b_half_h * c - abs(ty * a_cos - tx * a_sin),
+            b_half_w + a_half_w * c + a_half_h * s - abs(tx * b_cos + ty * b_sin),
+            b_half_h + a_half_w * s + a_half_h * c - abs(ty * b_cos - tx * b_sin))
+
+
+def _touching(a, b):
+    # a tie (the Shapely fallback): let Shapely decide on the polygons the layout used
+    # to build (or was given: a rebuilt polygon's corners can differ in the last bits and flip it)
+    return a.to_shapely().intersects(b.to_shapely())
+
+
+def extents(half_w, half_h, cos, sin):
+    """Half width/height of the axis-aligned bounds of a turned rectangle."""
+    return abs(half_w * cos) + abs(half_h * sin), abs(half_w * sin) + abs(half_h * cos)
+
+
+class GlyphBox:
+    """A glyph's collision rectangle: centred at (x, y), turned by `angle` radians."""
+
+    __slots__ = ("x", "y", "half_w", "half_h", "angle", "cos", "sin", "bounds", "polygon")
+
+    def __init__(self, x, y, half_w, half_h, angle, polygon=None):
+        self.x = x
+        self.y = y
+        self.half_w = half_w
+        self.half_h = half_h
+        self.angle = angle
+        # math.cos, not np.cos: batches take their cos/sin from here too (see GlyphBoxStore.overlapping)
+        self.cos = math.cos(angle)
+        self.sin = math.sin(angle)
+        ex, ey = extents(half_w, half_h, self.cos, self.sin)
+        self.bounds = (x - ex, y - ey, x + ex, y + ey)
+        # the Shapely polygon this box was made from, if any (see from_shapely)
+        self.polygon = polygon
+
+    @classmethod
+    def from_shapely(cls, polygon):
+        """
+        GlyphBox for a rectangular Shapely polygon (corner order as to_shapely()
+        writes them). The polygon is kept, and to_shapely() hands it back.
+        """
+        coords = list(polygon.exterior.coords)
+        if len(coords) != 5:
+            raise ValueError("GlyphBox.from_shapely needs a rectangle")
+        (ax, ay), (bx, by), (cx, cy), (dx, dy) = coords[:4]
+        width = math.hypot(bx - ax, by - ay)
+        height = math.hypot(cx - bx, cy - by)
+        if abs((bx - ax) * (cx - bx) + (by - ay) * (cy - by)) > 1e-6 * max(width * height, 1.0):
+            raise ValueError("GlyphBox.from_shapely needs a rectangle")
+        return cls((ax + cx) / 2, (ay + cy) / 2, width / 2, height / 2, math.atan2(by - ay, bx - ax), polygon)
+
+    def intersects(self, other):
+        slack = min(axis_slack(self.x, self.y, self.half_w, self.half_h, self.cos, self.sin,
+                               other.x, other.y, other.half_w, other.half_h, other.cos, other.sin))
+        if slack > TOUCH_TOLERANCE:
+            return True
+        return slack >= -TOUCH_TOLERANCE and _touching(self, other)
+
+    def to_shapely(self):
+        """The Polygon draw_text_on_curve used to build for this glyph (or the one it was made from)."""
+        if self.polygon is not None:
+            return self.polygon
+        # only ties, distance() and debugging get here
+        from shapely.affinity import rotate as shapely_rotate, translate as shapely_translate
+        from shapely.geometry import Polygon
+
+        box = Polygon([
+            (-self.half_w, -self.half_h),
+            (self.half_w, -self.half_h),
+            (self.half_w, self.half_h),
+            (-self.half_w, self.half_h)
+        ])
+        rotated_box = shapely_rotate(box, self.angle * (180 / math.pi), origin=(0, 0), use_radians=False)
+        return shapely_translate(rotated_box, xoff=self.x, yoff=self.y)
+
+    def distance(self, other):
+        return self.to_shapely().distance(other.to_shapely())
+
+    def __eq__(self, other):
+        return isinstance(other, GlyphBox) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def key(self):
+        return (self.x, self.y, self.half_w, self.half_h, self.angle)
+
+    def __repr__(self):
+        return f"GlyphBox(x={self.x:.2f}, y={self.y:.2f}, half_w={self.half_w:.2f}, half_h={self.half_h:.2f}, angle={self.angle:.4f})"
+
+
+def glyph_box(x, y, angle, char_width, char_height):
+    """The collision box of a glyph centred at (x, y) and turned to `angle` (radians)."""
+    return GlyphBox(x, y, char_width / 2, char_height / 2, angle)
+
+
+def as_glyph_box(box):
+    """`box` as a GlyphBox (Shapely rectangles are converted)."""
+    return box if isinstance(box, GlyphBox) else GlyphBox.from_shapely(box)
+
+
+class GlyphBoxStore:
+    """Rendered glyph boxes as rows of one NumPy array, in insertion order."""
+
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        self._rows = np.empty((max(int(capacity), 1), N_COLUMNS))
+        self._count = 0
+        self._polygons = []  # per row: the Shapely polygon it was inserted as, or None
+
+    def __len__(self):
+        return self._count
+
+    def append(self, box):
+        """Store a GlyphBox; returns its row id."""
+        if self._count == len(self._rows):
+            grown = np.empty((len(self._rows) * 2, N_COLUMNS))
+            grown[:self._count] = self._rows[:self._count]
+            self._rows = grown
+        self._rows[self._count] = (box.x, box.y, box.half_w, box.half_h, box.angle, box.cos, box.sin) + box.bounds
+        self._polygons.append(box.polygon)
+        self._count += 1
+        return self._count - 1
+
+    def truncate(self, count):
+        """Drop every row from `count` on."""
+        self._count = min(self._count, count)
+        del self._polygons[self._count:]
+
+    def box(self, box_id):
+        x, y, half_w, half_h, angle = self._rows[box_id, :ANGLE + 1].tolist()
+        return GlyphBox(x, y, half_w, half_h, angle, self._polygons[box_id])
+
+    def bounds(self, box_id):
+        return tuple(self._rows[box_id, MIN_X:].tolist())
+
+    def touching(self, ids, bounds):
+        """Mask over `ids`: stored bounds touch `bounds` (edges included)."""
+        min_x, min_y, max_x, max_y = bounds
+        rows = self._rows[ids]
+        return ((rows[:, MIN_X] <= max_x) & (min_x <= rows[:, MAX_X]) &
+                (rows[:, MIN_Y] <= max_y) & (min_y <= rows[:, MAX_Y]))
+
+    def overlapping(self, ids, x, y, half_w, half_h, angle):
+        """
+        Which stored boxes in `ids` each candidate overlaps: bounds touching
+        and no separating axis. Candidates are GlyphBox fields as floats (one
+        candidate -> mask over ids) or arrays of length K (-> K x len(ids)).
+        """
+        if np.ndim(x):
+            x, y, angle = (np.asarray(v, dtype=np.float64)[:, None] for v in (x, y, angle))
+            cos = np.array([math.cos(a) for a in angle[:, 0].tolist()])[:, None]
+            sin = np.array([math.sin(a) for a in angle[:, 0].tolist()])[:, None]
+        else:
+            cos, sin = math.cos(angle), math.sin(angle)
+        ex, ey = extents(half_w, half_h, cos, sin)
+        rows = self._rows[ids]
+        hit = ((rows[:, MIN_X] <= x + ex) & (x - ex <= rows[:, MAX_X]) &
+               (rows[:, MIN_Y] <= y + ey) & (y - ey <= rows[:, MAX_Y]))
+        # the SAT only for pairs whose bounds touch
+        pairs = np.nonzero(hit)
+        if not len(pairs[0]):
+            return hit
+        if hit.ndim == 2:
+            c, o = pairs
+            x, y, angle, cos, sin = (v[c, 0] for v in (x, y, angle, cos, sin))
+        else:
+            o = pairs[0]
+            x, y, angle, cos, sin = (np.full(len(o), v) for v in (x, y, angle, cos, sin))
+        rows = rows[o]
+        slack = np.minimum.reduce(axis_slack(x, y, half_w, half_h, cos, sin,
+                                             rows[:, X], rows[:, Y], rows[:, HALF_W], rows[:, HALF_H], rows[:, COS], rows[:, SIN]))
+        result = slack > TOUCH_TOLERANCE
+        for k in np.flatnonzero(np.abs(slack) <= TOUCH_TOLERANCE).tolist():
+            result[k] = _touching(GlyphBox(float(x[k]), float(y[k]), half_w, half_h, float(angle[k])), self.box(int(ids[o[k]])))
+        hit[pairs] = result
+        return hit
+
+    def any_overlapping(self, ids, box):
+        """overlapping() for one GlyphBox, stopping at the first hit."""
+        near = ids[self.touching(ids, box.bounds)]
+        if len(near) >= VECTOR_MIN_BOXES:
+            return bool(self.overlapping(near, box.x, box.y, box.half_w, box.half_h, box.angle).any())
+        # same float ops as the vectorized call, one pair at a time
+        for box_id, (bx, by, b_half_w, b_half_h, _, b_cos, b_sin) in zip(near.tolist(), self._rows[near, :SIN + 1].tolist()):
+            slack = min(axis_slack(box.x, box.y, box.half_w, box.half_h, box.cos, box.sin,
+                                   bx, by, b_half_w, b_half_h, b_cos, b_sin))
+            if slack > TOUCH_TOLERANCE or (slack >= -TOUCH_TOLERANCE and _touching(box, self.box(box_id))):
+                return True
+        return False
+
+    def to_shapely(self, start=0):
+        """Shapely polygons for rows `start` onwards."""
+        return [self.box(box_id).to_shapely() for box_id in range(start, self._count)]
@@ -0,0 +1,533 @@
+"""
+Goodreads Scraper for The Shapes of Stories
+===========================================
+
+story_cover, story_goodreads_book_cover_and_metadata and the tail of
+story_metadata each carried their own copy of the same BeautifulSoup parsers
+and each fetched the Goodreads search and book pages again, so building one
+story scraped Goodreads twice. Every copy also re-parsed the page's
+__NEXT_DATA__ JSON from scratch four times (awards, genres, work details,
+identifiers), each with its own recursive walk over the whole payload.
+
+This module is the one copy:
+    - pages are fetched through http_cache.Fetcher, so the raw search and
+      book HTML is cached on disk (HTML_TTL_S) and Goodreads gets the
+      per-host politeness limits instead of back-to-back requests
+    - each book page is parsed once (lxml, or html.parser if lxml isn't
+      installed) and __NEXT_DATA__ is walked once, collecting awards,
+      genres, settings, characters and identifiers in the same pass
+    - the extracted record is cached too (~/.shapes_cache/goodreads/), so a
+      second lookup of the same title is one small JSON read
+    - lookup_titles() looks several titles up at once
+
+    record = lookup_title("The Old Man and the Sea")
+    cover = fetch_cover(record, size="l")   # (bytes, url used) or None
+
+A record has page_url, goodreads_book_id / goodreads_work_id, canonical_url,
+isbn13 / isbn10 / asin (also grouped under "edition"), "work_details"
+(awards, setting, characters), "genres" (names) and cover_image_url.
+Bump PARSER_VERSION when the extraction changes so old records are redone.
+"""
+
+import hashlib
+import importlib.util
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import requests
+from bs4 import BeautifulSoup
+
+from http_cache import CachedHTTPError, Fetcher
+
+GOODREADS_URL = "https://www.goodreads.com"
+HDRS = {"User-Agent": "Mozilla/5.0", "Accept-Language": "en-US,en;q=0.9"}
+# lxml when it's installed (much faster); html.parser ships with Python
+HTML_PARSER = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+
+RECORD_CACHE_DIR = os.path.join(os.path.expanduser("~/.shapes_cache"), "goodreads")
+PARSER_VERSION = 1
+HTML_TTL_S = 30 * 24 * 3600  # raw pages and extracted records
+LOOKUP_WORKERS = 4  # http_cache still holds Goodreads to 2 requests in flight, 1s apart
+
+SIZE_RE = re.compile(r"(/books/\d+)([sml])(/[^/?#]+\.(?:jpe?g|png|webp))", re.I)
+ISBN13_RE = re.compile(r"\b97[89][\d\-]{10,16}\b")
+ISBN10_RE = re.compile(r"\b\d{9}[\dXx]\b")
+ASIN_RE = re.compile(r"\bB0[A-Z0-9]{8}\b", re.I)  # Kindle-style ASIN; some pages reuse ISBN10
+AWARD_KEY_RE = re.compile(r"award", re.I)
+
+_FETCHER = None
+_FETCHER_LOCK = threading.Lock()
+
+
+def _default_fetcher() -> Fetcher:
+    global _FETCHER
+    with _FETCHER_LOCK:
+        if _FETCHER is None:
+            _FETCHER = Fetcher(headers=HDRS)
+        return _FETCHER
+
+
+# -------------------- small helpers --------------------
+
+def _dedupe_preserve_case(seq: List[str]) -> List[str]:
+    seen, out = set(), []
+    for s in seq:
+        k = s.strip().lower()
+        if k and k not in seen:
+            seen.add(k); out.append(s.strip())
+    return out
+
+
+def _uniq_by_name(dicts):
+    seen = set(); out = []
+    for d in dicts:
+        nm = (d.get("name") or "").strip()
+        if not nm:
+            continue
+        k = nm.lower()
+        if k in seen:
+            continue
+        seen.add(k); out.append(d)
+    return out
+
+
+def _uniq(seq):
+    seen = set(); out = []
+    for x in seq:
+        if not x: continue
+        key = json.dumps(x, sort_keys=True) if isinstance(x, dict) else str(x)
+        if key in seen: continue
+        seen.add(key); out.append(x)
+    return out
+
+
+def _norm_isbn13(v) -> Optional[str]:
+    raw = re.sub(r"\D", "", str(v))
+    return raw if len(raw) == 13 else None
+
+
+def _norm_isbn10(v) -> Optional[str]:
+    raw = re.sub(r"[^0-9Xx]", "", str(v)).upper()
+    return raw if re.fullmatch(r"\d{9}[0-9X]", raw) else None
+
+
+def _norm_asin(v) -> Optional[str]:
+    raw = re.sub(r"[^A-Za-z0-9]", "", str(v)).upper()
+    m = re.search(r"[A-Z0-9]{10}", raw)
+    return m.group(0) if m else None
+
+
+def _following_dd(dt):
+    """Goodreads uses <dt>ISBN</dt><dd>...</dd> pairs inside .DescListItem."""
+    if not dt: return None
+    dd = dt.find_next_sibling("dd")
+    if dd: return dd
+    # some pages wrap dt+dd in a div; grab the dd inside that wrapper
+    if dt.parent and dt.parent.name != "dl":
+        dd = dt.parent.find("dd")
+    return dd
+
+
+def _get_dd_by_label(soup: BeautifulSoup, label: str):
+    dt = soup.find(lambda t: t.name == "dt" and t.get_text(strip=True).lower() == label.lower())
+    return _following_dd(dt)
+
+
+def _parse_links_or_csv(dd) -> list:
+    vals = [a.get_text(strip=True) for a in dd.select("a") if a.get_text(strip=True)]
+    if not vals:
+        raw = dd.get_text(" ", strip=True)
+        vals = [v.strip() for v in re.split(r"\s*,\s*|\s+and\s+", raw) if v.strip()]
+    return _uniq(vals)
+
+
+# -------------------- __NEXT_DATA__ (one pass) --------------------
+
+def parse_next_data(soup: BeautifulSoup) -> Dict[str, Any]:
+    """
+    Everything we use from the Next.js boot payload, in one walk:
+    awards (names), genres ({name, slug, url}), setting, characters and
+    isbn13 / isbn10 / asin (first one found, in document order).
+    """
+    out = {"awards": [], "genres": [], "setting": [], "characters": [], "ids": {}}
+    tag = soup.find("script", id="__NEXT_DATA__", attrs={"type": "application/json"})
+    if not tag or not tag.string:
+        return out
+    try:
+        data = json.loads(tag.string)
+    except Exception:
+        return out
+
+    awards, genres, settings, characters, ids = [], [], [], [], {}
+
+    def named(it, *keys):
+        for k in keys:
+            if it.get(k):
+                return it[k]
+        return None
+
+    def visit(node, in_awards):
+        if isinstance(node, dict):
+            if "isbn13" not in ids:
+                for key in ("isbn", "isbn13", "isbn_13"):
+                    if key in node and "isbn13" not in ids:
+                        v = _norm_isbn13(node[key])
+                        if v: ids["isbn13"] = v
+            if "isbn10" not in ids:
+                for key in ("isbn10", "isbn_10"):
+                    if key in node and "isbn10" not in ids:
+                        v = _norm_isbn10(node[key])
+                        if v: ids["isbn10"] = v
+            if "asin" not in ids:
+                for key in ("asin", "ebookAsin", "ebook_asin", "kindleAsin", "kindle_asin"):
+                    if key in node and "asin" not in ids:
+                        v = _norm_asin(node[key])
+                        if v: ids["asin"] = v
+
+            for key in ("genres", "topGenres"):
+                if isinstance(node.get(key), list):
+                    for it in node[key]:
+                        if isinstance(it, dict):
+                            genres.append({"name": named(it, "name", "genreName"), "slug": it.get("slug"),
+                                           "url": named(it, "url", "webUrl")})
+                        elif isinstance(it, str):
+                            genres.append({"name": it})
+            for key in ("settings", "places", "settingPlaces"):
+                if isinstance(node.get(key), list):
+                    for it in node[key]:
+                        nm = named(it, "name", "placeName") if isinstance(it, dict) else it
+                        if isinstance(nm, str) and nm.strip(): settings.append(nm.strip())
+            if isinstance(node.get("characters"), list):
+                for it in node["characters"]:
+                    nm = named(it, "name", "characterName") if isinstance(it, dict) else it
+                    if isinstance(nm, str) and nm.strip(): characters.append(nm.strip())
+
+            for k, v in node.items():
+                # award lists count once, at the outermost award key
+                is_award_list = not in_awards and isinstance(v, list) and AWARD_KEY_RE.search(k)
+                if is_award_list:
+                    for it in v:
+                        nm = named(it, "name", "awardName", "title") if isinstance(it, dict) else it
+                        if isinstance(nm, str) and nm.strip(): awards.append(nm.strip())
+                visit(v, in_awards or bool(is_award_list))
+        elif isinstance(node, list):
+            for v in node:
+                visit(v, in_awards)
+
+    visit(data, False)
+
+    clean_genres = []
+    for g in genres:
+        name = g.get("name")
+        if isinstance(name, str) and name.strip():
+            clean_genres.append({"name": name.strip(), **{k: g[k] for k in ("slug", "url") if g.get(k)}})
+    out.update(awards=_dedupe_preserve_case(awards), genres=_uniq_by_name(clean_genres),
+               setting=_uniq(settings), characters=_uniq(characters), ids=ids)
+    return out
+
+
+# -------------------- DOM --------------------
+
+def _awards_dom(soup: BeautifulSoup) -> List[str]:
+    names = []
+    for a in soup.select('span[data-testid="award"] a'):
+        txt = " ".join(a.stripped_strings)              # merge multi-line text
+        txt = txt.replace("“", "").replace("”", "").replace('"', "").strip()
+        txt = re.sub(r"\s*\(\d{4}\)\s*", "", txt)       # drop any (YYYY)
+        if txt:
+            names.append(txt)
+    return _dedupe_preserve_case(names)
+
+
+def _genres_dom(soup: BeautifulSoup) -> List[str]:
+    """The 'Top genres for this book' chips."""
+    return _dedupe_preserve_case([a.get_text(strip=True) for a in soup.select('[data-testid="genresList"] a[href*="/genres/"]')
+                                  if a.get_text(strip=True)])
+
+
+def _work_details(soup: BeautifulSoup, nxt: Dict[str, Any]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    awards = _awards_dom(soup) or nxt["awards"]
+    if awards:
+        out["awards"] = awards
+    # Settings/Characters: DOM first, Next.js to fill gaps
+    dd_setting = _get_dd_by_label(soup, "Setting")
+    dd_chars = _get_dd_by_label(soup, "Characters")
+    setting = (_parse_links_or_csv(dd_setting) if dd_setting else []) or nxt["setting"]
+    characters = (_parse_links_or_csv(dd_chars) if dd_chars else []) or nxt["characters"]
+    if setting:    out["setting"] = setting
+    if characters: out["characters"] = characters
+    return out
+
+
+def _ids_from_url(url: str) -> Dict[str, str]:
+    out: Dict[str, str] = {}
+    m = re.search(r"/book/show/(\d+)", url)
+    if m:
+        out["goodreads_book_id"] = m.group(1)
+    mw = re.search(r"/work(?:/(?:show|editions))?/(\d+)", url)
+    if mw:
+        out["goodreads_work_id"] = mw.group(1)
+    return out
+
+
+def _ids_from_dom(soup: BeautifulSoup) -> Dict[str, str]:
+    out: Dict[str, str] = {}
+    # canonical or og:url often carry the clean /book/show/<id> URL
+    canon = soup.find("link", rel="canonical")
+    if canon and canon.get("href"):
+        out.update(_ids_from_url(canon["href"]))
+        out.setdefault("canonical_url", canon["href"])
+    og_url = soup.find("meta", attrs={"property": "og:url"})
+    if og_url and og_url.get("content"):
+        out.update(_ids_from_url(og_url["content"]))
+        out.setdefault("canonical_url", og_url["content"])
+    # look for any link to a work page to grab work_id
+    work_a = soup.select_one("a[href*='/work/']")
+    if work_a and work_a.get("href"):
+        out.update(_ids_from_url(urllib.parse.urljoin(GOODREADS_URL, work_a["href"])))
+    return out
+
+
+def _find_isbn(node):
+    if isinstance(node, dict):
+        if "isbn" in node: return node["isbn"]
+        for v in node.values():
+            r = _find_isbn(v)
+            if r: return r
+    elif isinstance(node, list):
+        for it in node:
+            r = _find_isbn(it)
+            if r: return r
+    return None
+
+
+def _isbn_asin(soup: BeautifulSoup, nxt: Dict[str, Any]) -> Dict[str, str]:
+    out: Dict[str, str] = {}
+
+    # 1) DOM (works if server-rendered)
+    dd_isbn = _get_dd_by_label(soup, "isbn")
+    if dd_isbn:
+        text = dd_isbn.get_text(" ", strip=True)
+        m13 = ISBN13_RE.search(text)
+        if m13: out["isbn13"] = re.sub(r"\D", "", m13.group(0))
+        m10 = ISBN10_RE.search(text)
+        if m10: out["isbn10"] = m10.group(0).upper()
+
+    asin_span = soup.select_one("[data-testid='asin']")
+    if asin_span:
+        raw = asin_span.get_text(strip=True).upper()
+        if re.fullmatch(r"[A-Z0-9]{10}", raw):
+            out["asin"] = raw
+    else:
+        dd_asin = _get_dd_by_label(soup, "asin")
+        if dd_asin:
+            t = dd_asin.get_text(" ", strip=True)
+            m = ASIN_RE.search(t) or ISBN10_RE.search(t)
+            if m: out["asin"] = m.group(0).upper()
+
+    # 2) Next.js boot JSON (works when DOM is empty)
+    if not {"isbn13", "isbn10", "asin"} & out.keys():
+        out.update({k: v for k, v in nxt["ids"].items() if k not in out})
+
+    # 3) JSON-LD fallback
+    if "isbn13" not in out or "isbn10" not in out:
+        for tag in soup.select('script[type="application/ld+json"]'):
+            if not tag.string: continue
+            try:
+                payload = json.loads(tag.string)
+            except Exception:
+                continue
+            val = _find_isbn(payload)
+            if not val: continue
+            for v in (val if isinstance(val, list) else [val]):
+                raw = re.sub(r"[^0-9Xx]", "", str(v))
+                if len(raw) == 13 and "isbn13" not in out: out["isbn13"] = raw
+                elif len(raw) == 10 and "isbn10" not in out: out["isbn10"] = raw.upper()
+            if "isbn13" in out and "isbn10" in out: break
+
+    return out
+
+
+def _cover_image_url(soup: BeautifulSoup) -> Optional[str]:
+    og = soup.find("meta", attrs={"property": "og:image"})
+    img_url = og.get("content") if og else None
+    if not img_url:
+        img = soup.select_one("#coverImage")
+        if img and img.get("src"): img_url = img["src"]
+    if not img_url or "nophoto/book" in img_url:
+        return None
+    return urllib.parse.urljoin(GOODREADS_URL, img_url)
+
+
+# -------------------- pages --------------------
+
+def parse_search_page(html: str) -> Optional[str]:
+    """URL of the first book in a search results page."""
+    soup = BeautifulSoup(html, HTML_PARSER)
+    row = soup.select_one("table.tableList tr")
+    href_el = row.select_one("a.bookTitle") if row else None
+    if not href_el or not href_el.get("href"):
+        return None
+    return urllib.parse.urljoin(GOODREADS_URL, href_el["href"])
+
+
+def parse_book_page(html: str, page_url: str) -> Dict[str, Any]:
+    """The record for one book page (one HTML parse, one __NEXT_DATA__ walk)."""
+    soup = BeautifulSoup(html, HTML_PARSER)
+    nxt = parse_next_data(soup)
+
+    record: Dict[str, Any] = {"page_url": page_url}
+    record.update(_ids_from_url(page_url))
+    record.update(_ids_from_dom(soup))
+
+    ids = _isbn_asin(soup, nxt)
+    if ids:
+        record.update(ids)            # isbn13 / isbn10 / asin at top-level
+        record["edition"] = dict(ids)  # and grouped
+
+    work_details = _work_details(soup, nxt)
+    if work_details:
+        record["work_details"] = work_details
+
+    genres = _genres_dom(soup) or [g["name"] for g in nxt["genres"]]
+    if genres:
+        record["genres"] = genres
+
+    record["cover_image_url"] = _cover_image_url(soup)
+    return record
+
+
+# -------------------- record cache --------------------
+
+def _record_path(title: str) -> str:
+    key = hashlib.sha1(f"{PARSER_VERSION}\n{title.strip()}".encode("utf-8")).hexdigest()
+    return os.path.join(RECORD_CACHE_DIR, key + ".json")
+
+
+def _load_record(title: str) -> Optional[Dict[str, Any]]:
+    path = _record_path(title)
+    try:
+        if time.time() - os.path.getmtime(path) > HTML_TTL_S:
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_record(title: str, record: Dict[str, Any]) -> None:
+    os.makedirs(RECORD_CACHE_DIR, exist_ok=True)
+    with tempfile.NamedTemporaryFile("w", delete=False, dir=RECORD_CACHE_DIR, suffix=".tmp", encoding="utf-8") as tmp:
+        json.dump(record, tmp, ensure_ascii=False)
+        tmp_path = tmp.name
+    os.replace(tmp_path, _record_path(title))
+
+
+# -------------------- lookups --------------------
+
+def lookup_title(title: str, fetcher: Optional[Fetcher] = None, refresh: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    The Goodreads record for the first search hit on `title`, or None if
+    there's no hit (or Goodreads answered with an error). Records are only
+    cached for live fetchers: recording fetches the pages so they land in
+    the fixture file, and replaying fixtures still runs the parser.
+    """
+    fetcher = fetcher or _default_fetcher()
+    use_records = fetcher.mode == "live"
+    if use_records and not refresh:
+        record = _load_record(title)
+        if record is not None:
+            return record
+
+    try:
+        search_html = fetcher.get_text(f"{GOODREADS_URL}/search", {"q": title.strip()}, ttl_s=HTML_TTL_S, headers=HDRS)
+        book_url = parse_search_page(search_html)
+        if not book_url:
+            return None
+        book_html = fetcher.get_text(book_url, ttl_s=HTML_TTL_S, headers=HDRS)
+    except CachedHTTPError as e:
+        print(f"⚠️ Goodreads lookup for '{title}' failed: {e}")
+        return None
+
+    record = parse_book_page(book_html, book_url)
+    if use_records:
+        _save_record(title, record)
+    return record
+
+
+def lookup_titles(titles: Iterable[str], fetcher: Optional[Fetcher] = None,
+                  max_workers: int = LOOKUP_WORKERS) -> Dict[str, Optional[Dict[str, Any]]]:
+    """{title: record or None}, looked up side by side. A title that raises comes back None."""
+    titles = list(dict.fromkeys(titles))
+
+    def one(title):
+        try:
+            return lookup_title(title, fetcher)
+        except Exception as e:
+            print(f"❌ Goodreads lookup for '{title}' raised: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        return dict(zip(titles, pool.map(one, titles)))
+
+
+# -------------------- covers --------------------
+
+def _size_variant(url: str, size: str) -> str:
+    m = SIZE_RE.search(url)
+    if not m or size.lower() not in {"s", "m", "l"}: return url
+    prefix = url[: m.start(1)]
+    books_part, _, tail = m.groups()
+    return f"{prefix}{books_part}{size.lower()}{tail}"
+
+
+def _fetch_img(url: str) -> Optional[bytes]:
+    r = requests.get(url, headers=HDRS, timeout=20)
+    return r.content if r.ok and r.headers.get("content-type", "").startswith("image/") else None
+
+
+def fetch_cover(record: Optional[Dict[str, Any]], size: str = "l") -> Optional[Tuple[bytes, str]]:
+    """(image bytes, url used) for a record's cover, trying the requested size first."""
+    img_url = (record or {}).get("cover_image_url")
+    if not img_url:
+        return None
+    try_url = _size_variant(img_url, size)
+    cover_bytes = _fetch_img(try_url)
+    if cover_bytes:
+        return cover_bytes, try_url
+    cover_bytes = _fetch_img(img_url)
+    return (cover_bytes, img_url) if cover_bytes else None
+
+
+def cover_by_title(title: str, size: str = "l", with_details: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Cover image + ids for the first hit on `title`, the shape story_cover has
+    always returned (cover_bytes, cover_url_used, page_url, ids, "edition").
+    with_details adds "work_details" and "genres". None if there's no cover.
+    """
+    record = lookup_title(title)
+    cover = fetch_cover(record, size)
+    if not cover:
+        return None
+    cover_bytes, cover_url_used = cover
+
+    data: Dict[str, Any] = {"cover_url_used": cover_url_used, "cover_bytes": cover_bytes, "page_url": record["page_url"]}
+    for key in ("goodreads_book_id", "goodreads_work_id", "canonical_url", "isbn13", "isbn10", "asin"):
+        if record.get(key):
+            data[key] = record[key]
+    if record.get("edition"):
+        data["edition"] = dict(record["edition"])
+    if with_details:
+        if record.get("work_details"):
+            data["work_details"] = dict(record["work_details"])
+        if record.get("genres"):
+            data["genres"] = list(record["genres"])
+    return data
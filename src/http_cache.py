@@ -0,0 +1,295 @@
+"""
+HTTP Cache for The Shapes of Stories
+====================================
+
+story_metadata kept every API response in its own ~/.shapes_cache/<sha1>.json
+forever, never remembered a failure (a 404 was asked for again on every
+run), only cached some of the calls (OpenLibrary and Google Books searches
+always went out), and slept a flat 0.6s after every cache miss no matter
+which host it had just hit.
+
+Fetcher is the shared replacement:
+    - one SQLite store (~/.shapes_cache/http_cache.sqlite3) indexed by request
+      key, with an expiry per entry: successful responses live DEFAULT_TTL_S,
+      "not found"-type 4xx answers are cached too, for NEGATIVE_TTL_S, and
+      raise CachedHTTPError just like the original failure did
+    - per-host politeness instead of the global sleep: each host gets at most
+      `max_concurrent` requests in flight and `min_interval_s` between
+      request starts (HOST_POLICIES), so different hosts can be fetched at the
+      same time while each one is still asked gently
+    - old one-file-per-SHA1 entries are picked up on a miss (same key), so the
+      existing cache isn't thrown away
+    - fixtures: mode="record" saves every response it serves to a JSON file;
+      mode="replay" serves only from that file (no network, no SQLite), so the
+      code behind the fetch can be run and timed offline. `replay_latency_s`
+      adds a fake round trip per request (still subject to the host policies)
+
+    fetcher = Fetcher(headers={"User-Agent": "..."})
+    data = fetcher.get_json("https://openlibrary.org/search.json", {"title": "Dune"})
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+CACHE_ROOT = os.path.expanduser("~/.shapes_cache")
+CACHE_DB_PATH = os.path.join(CACHE_ROOT, "http_cache.sqlite3")
+LEGACY_CACHE_DIR = CACHE_ROOT  # story_metadata's old <sha1>.json files
+
+HTTP_TIMEOUT = 20  # seconds
+DEFAULT_TTL_S = 30 * 24 * 3600
+NEGATIVE_TTL_S = 24 * 3600
+# answers worth remembering; 429 / 5xx are not, and neither is 403: that is how
+# Goodreads and Wikipedia block bots / throttle, so it usually clears within minutes
+NEGATIVE_STATUSES = {400, 404, 410}
+
+# per host: max requests in flight, min seconds between request starts
+DEFAULT_HOST_POLICY = {"max_concurrent": 2, "min_interval_s": 0.5}
+HOST_POLICIES = {
+    "openlibrary.org": {"max_concurrent": 2, "min_interval_s": 0.5},
+    "www.googleapis.com": {"max_concurrent": 4, "min_interval_s": 0.1},
+    "en.wikipedia.org": {"max_concurrent": 2, "min_interval_s": 0.2},
+    "www.wikidata.org": {"max_concurrent": 2, "min_interval_s": 0.2},
+    "www.goodreads.com": {"max_concurrent": 2, "min_interval_s": 1.0},
+}
+
+
+class CachedHTTPError(requests.HTTPError):
+    """A failed response (live or remembered from the cache)."""
+
+    def __init__(self, url, status):
+        super().__init__(f"HTTP {status} for {url}")
+        self.url = url
+        self.status = status
+
+
+class FixtureMiss(requests.ConnectionError):
+    """Replay mode and the request isn't in the fixture file."""
+
+
+def cache_key(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+    # same key story_metadata's one-file-per-SHA1 cache used
+    params = params or {}
+    payload = url + "?" + "&".join(f"{k}={params[k]}" for k in sorted(params))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+# -------------------- store --------------------
+
+class HttpCache:
+    """SQLite response store with per-entry expiry. Safe to share between threads."""
+
+    def __init__(self, path: str = CACHE_DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS responses (
+                                key TEXT PRIMARY KEY,
+                                url TEXT NOT NULL,
+                                status INTEGER NOT NULL,
+                                body TEXT,
+                                fetched_at REAL NOT NULL,
+                                expires_at REAL NOT NULL)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_expires_at ON responses (expires_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str):
+        """(status, body) if there's an unexpired entry, else None."""
+        row = self._conn().execute("SELECT status, body, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None or row[2] < time.time():
+            return None
+        return row[0], row[1]
+
+    def put(self, key: str, url: str, status: int, body: Optional[str], ttl_s: float) -> None:
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO responses (key, url, status, body, fetched_at, expires_at) "
+                         "VALUES (?, ?, ?, ?, ?, ?)", (key, url, status, body, now, now + ttl_s))
+
+    def purge_expired(self) -> int:
+        with self._conn() as conn:
+            return conn.execute("DELETE FROM responses WHERE expires_at < ?", (time.time(),)).rowcount
+
+
+# -------------------- politeness --------------------
+
+class HostLimiter:
+    def __init__(self, policies: Dict[str, Dict[str, float]] = None, default: Dict[str, float] = None):
+        self.policies = HOST_POLICIES if policies is None else policies
+        self.default = default or DEFAULT_HOST_POLICY
+        self._lock = threading.Lock()
+        self._hosts = {}  # host -> [semaphore, lock, earliest next start, min interval]
+
+    def _host(self, host):
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                policy = self.policies.get(host, self.default)
+                state = [threading.Semaphore(int(policy["max_concurrent"])), threading.Lock(), 0.0,
+                         float(policy["min_interval_s"])]
+                self._hosts[host] = state
+            return state
+
+    @contextmanager
+    def slot(self, url: str):
+        """Hold one of the host's request slots, starting no sooner than min_interval_s after the last start."""
+        state = self._host(urlsplit(url).netloc)
+        semaphore, lock, interval = state[0], state[1], state[3]
+        with semaphore:
+            with lock:
+                now = time.monotonic()
+                wait = state[2] - now
+                state[2] = max(state[2], now) + interval
+            if wait > 0:
+                time.sleep(wait)
+            yield
+
+
+# -------------------- fetcher --------------------
+
+class Fetcher:
+    def __init__(self, headers: Optional[Dict[str, str]] = None, session_factory: Optional[Callable[[], requests.Session]] = None,
+                 cache: Optional[HttpCache] = None, mode: str = "live", fixtures_path: Optional[str] = None,
+                 policies: Optional[Dict[str, Dict[str, float]]] = None, ttl_s: float = DEFAULT_TTL_S,
+                 negative_ttl_s: float = NEGATIVE_TTL_S, timeout: float = HTTP_TIMEOUT, replay_latency_s: float = 0.0):
+        """
+        mode: "live" (cache + network), "record" (live, and keep every response
+        for save_fixtures()) or "replay" (fixtures_path only, no network).
+        """
+        if mode not in ("live", "record", "replay"):
+            raise ValueError(f"Unknown fetch mode: {mode}")
+        if mode != "live" and not fixtures_path:
+            raise ValueError(f"mode={mode} needs a fixtures_path")
+        self.mode = mode
+        self.headers = headers or {}
+        self.session_factory = session_factory or requests.Session
+        self.cache = None if mode == "replay" else (cache or HttpCache())
+        self.fixtures_path = fixtures_path
+        self.limiter = HostLimiter(policies)
+        self.ttl_s = ttl_s
+        self.negative_ttl_s = negative_ttl_s
+        self.timeout = timeout
+        self.replay_latency_s = replay_latency_s
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.fixtures = {}
+        if mode == "replay":
+            with open(fixtures_path, "r", encoding="utf-8") as f:
+                self.fixtures = json.load(f)
+        self.stats = {"hits": 0, "negative_hits": 0, "misses": 0, "legacy_hits": 0, "replayed": 0}
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self.session_factory()
+            session.headers.update(self.headers)
+            self._local.session = session
+        return session
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _record(self, key, url, status, body):
+        if self.mode == "record":
+            with self._lock:
+                self.fixtures[key] = {"url": url, "status": status, "body": body}
+
+    def _legacy(self, key):
+        # story_metadata's old cache: <CACHE_ROOT>/<key>.json, JSON bodies only
+        path = os.path.join(LEGACY_CACHE_DIR, key + ".json")
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def fetch(self, url: str, params: Optional[Dict[str, Any]] = None, ttl_s: Optional[float] = None,
+              headers: Optional[Dict[str, str]] = None, legacy_json: bool = False) -> str:
+        """Response text for a GET; failed responses raise CachedHTTPError (and stay cached if they're 'not found'-type)."""
+        params = params or {}
+        key = cache_key(url, params)
+
+        if self.mode == "replay":
+            entry = self.fixtures.get(key)
+            if entry is None:
+                raise FixtureMiss(f"not in fixtures: {url} {params}")
+            if self.replay_latency_s:
+                with self.limiter.slot(url):
+                    time.sleep(self.replay_latency_s)
+            self._count("replayed")
+            if entry["status"] >= 400:
+                raise CachedHTTPError(url, entry["status"])
+            return entry["body"]
+
+        hit = self.cache.get(key)
+        if hit is not None:
+            status, body = hit
+            self._record(key, url, status, body)
+            if status >= 400:
+                self._count("negative_hits")
+                raise CachedHTTPError(url, status)
+            self._count("hits")
+            return body
+        if legacy_json:
+            body = self._legacy(key)
+            if body is not None:
+                self._count("legacy_hits")
+                self.cache.put(key, url, 200, body, self.ttl_s if ttl_s is None else ttl_s)
+                self._record(key, url, 200, body)
+                return body
+
+        self._count("misses")
+        with self.limiter.slot(url):
+            r = self._session().get(url, params=params, headers=headers, timeout=self.timeout)
+        if r.status_code >= 400:
+            if r.status_code in NEGATIVE_STATUSES:
+                self.cache.put(key, url, r.status_code, None, self.negative_ttl_s)
+                self._record(key, url, r.status_code, None)
+            raise CachedHTTPError(url, r.status_code)
+        body = r.text
+        self.cache.put(key, url, r.status_code, body, self.ttl_s if ttl_s is None else ttl_s)
+        self._record(key, url, r.status_code, body)
+        return body
+
+    def get_json(self, url: str, params: Optional[Dict[str, Any]] = None, ttl_s: Optional[float] = None) -> Any:
+        return json.loads(self.fetch(url, params, ttl_s=ttl_s, legacy_json=True))
+
+    def get_text(self, url: str, params: Optional[Dict[str, Any]] = None, ttl_s: Optional[float] = None,
+                 headers: Optional[Dict[str, str]] = None) -> str:
+        return self.fetch(url, params, ttl_s=ttl_s, headers=headers)
+
+    def save_fixtures(self) -> None:
+        """Write what was served so far (record mode), merged with what the file already has."""
+        if self.mode != "record":
+            return
+        existing = {}
+        if os.path.exists(self.fixtures_path):
+            with open(self.fixtures_path, "r", encoding="utf-8") as f:
+                existing = json.load(f)
+        with self._lock:
+            existing.update(self.fixtures)
+        os.makedirs(os.path.dirname(self.fixtures_path) or ".", exist_ok=True)
+        with open(self.fixtures_path, "w", encoding="utf-8") as f:
+            json.dump(existing, f, ensure_ascii=False, indent=1, sort_keys=True)
+        logging.info("Saved %d fixtures to %s", len(existing), self.fixtures_path)
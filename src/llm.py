@@ -1,6 +1,11 @@
 import os
 import json
 import yaml
+import asyncio
+import hashlib
+import random
+import threading
+import time
 import tiktoken
 # from langchain_community.llms import OpenAI
 # from langchain_community.chat_models import ChatOpenAI
@@ -9,6 +14,7 @@ from langchain_google_genai import ChatGoogleGenerativeAI, HarmCategory, HarmBlo
 import re
 from langchain_groq import ChatGroq
 from langchain_classic.chains import LLMChain
+from llm_cache import get_llm_response_cache, llm_cache_key
 
 
 #Models:
@@ -96,11 +102,378 @@ def get_llm(provider: str, model: str, config: dict, max_tokens: int = 1024):
                        groq_api_key=groq_api_key,
                        max_tokens=max_tokens) # ChatGroq uses max_tokens
         
+    elif provider == "fake":
+        # local stand-in for tests / offline benchmarks, see _get_fake_llm below
+        llm = _get_fake_llm(model, config or {}, max_tokens)
     else:
         raise ValueError(f"Unsupported provider: {provider}")
     return llm
 
 
+# -------------------- Async client layer --------------------
+# Every pipeline step used to make one blocking runnable.invoke at a time.
+# AsyncLLMClient wraps the same get_llm() model with:
+#   - a per-provider concurrency limit (asyncio.Semaphore)
+#   - a per-provider token bucket (requests per minute)
+#   - retry with jittered exponential backoff on rate limit / overload / network errors
+#   - request coalescing: identical in-flight prompts share one call
+# and lets callers fire independent prompts together with abatch()/batch()
+# (one client) or gather_llm_calls() (coroutines on several clients).
+# Every call (sync or async, from any thread) runs on one background event
+# loop, so the limits and in-flight requests hold for the whole process, and
+# get_llm_client() hands out one shared client per provider/model/settings.
+#
+#   client = get_llm_client("anthropic", "claude-sonnet-4-5-nonthinking", config, max_tokens=500)
+#   texts = client.batch([(prompt, inputs_1), (prompt, inputs_2)])
+
+# Defaults per provider; override with config["llm_limits"][provider] = {...}
+PROVIDER_LIMITS = {
+    "anthropic": {"max_concurrency": 4, "requests_per_minute": 50},
+    "openai":    {"max_concurrency": 4, "requests_per_minute": 60},
+    "google":    {"max_concurrency": 4, "requests_per_minute": 60},
+    "groq":      {"max_concurrency": 2, "requests_per_minute": 30},
+    "fake":      {"max_concurrency": 16, "requests_per_minute": None},
+}
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+RETRYABLE_ERROR_NAMES = ("RateLimit", "Overloaded", "Timeout", "Connection", "ServiceUnavailable", "InternalServer", "ResourceExhausted")
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, bursting up to `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens=1):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+
+class _ProviderLimiter:
+    """Concurrency + rate limit and in-flight requests for one provider (lives on the LLM loop)."""
+
+    def __init__(self, max_concurrency, requests_per_minute):
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.bucket = None
+        if requests_per_minute:
+            rate = requests_per_minute / 60.0
+            self.bucket = TokenBucket(rate, capacity=max(1, max_concurrency))
+        self.in_flight = {}
+
+
+# provider -> _ProviderLimiter; only touched from the LLM loop (see _llm_loop)
+_LIMITERS = {}
+
+_LLM_LOOP = None
+_LLM_LOOP_LOCK = threading.Lock()
+
+
+def _llm_loop():
+    """
+    The one event loop every LLM call runs on, started on a daemon thread on
+    first use. asyncio primitives belong to the loop they're used on, so
+    running everything here is what lets the limiters span calls.
+    """
+    global _LLM_LOOP
+    with _LLM_LOOP_LOCK:
+        if _LLM_LOOP is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="llm-loop", daemon=True).start()
+            _LLM_LOOP = loop
+    return _LLM_LOOP
+
+
+def _provider_limits(provider, config):
+    limits = dict(PROVIDER_LIMITS.get(provider, {"max_concurrency": 2, "requests_per_minute": 30}))
+    limits.update((config or {}).get("llm_limits", {}).get(provider, {}))
+    return limits
+
+
+def _get_limiter(provider, config):
+    limiter = _LIMITERS.get(provider)
+    if limiter is None:
+        limits = _provider_limits(provider, config)
+        limiter = _ProviderLimiter(limits["max_concurrency"], limits["requests_per_minute"])
+        _LIMITERS[provider] = limiter
+    return limiter
+
+
+def is_retryable_llm_error(error):
+    status_code = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status_code in RETRYABLE_STATUS_CODES:
+        return True
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError, TimeoutError)):
+        return True
+    name = type(error).__name__
+    return any(part in name for part in RETRYABLE_ERROR_NAMES)
+
+
+def _prompt_text(model_input):
+    """
+    The fully rendered prompt as one string (used for coalescing and cache
+    keys). Message contents are JSON dumped so image blocks count too.
+    """
+    if isinstance(model_input, str):
+        return model_input
+    if hasattr(model_input, "to_messages"):
+        model_input = model_input.to_messages()
+    if isinstance(model_input, (list, tuple)):
+        parts = []
+        for message in model_input:
+            content = getattr(message, "content", message)
+            parts.append(f"{getattr(message, 'type', '')}:{json.dumps(content, sort_keys=True, default=str)}")
+        return "\n".join(parts)
+    raise TypeError(f"Unsupported prompt type: {type(model_input)}")
+
+
+def _render_prompt(prompt, inputs):
+    """
+    Returns (model_input, text). prompt can be a langchain prompt template
+    (rendered with inputs), a plain string, or a list of messages.
+    """
+    if hasattr(prompt, "format_prompt"):
+        prompt_value = prompt.format_prompt(**(inputs or {}))
+        return prompt_value, _prompt_text(prompt_value)
+    if isinstance(prompt, (list, tuple)):
+        return list(prompt), _prompt_text(prompt)
+    return prompt, _prompt_text(prompt)
+
+
+def _output_text(output):
+    if hasattr(output, "content"):
+        output = output.content
+    if isinstance(output, list):  # content blocks
+        output = "".join(block.get("text", "") if isinstance(block, dict) else str(block) for block in output)
+    return output
+
+
+def _run_sync(coro):
+    """Run coro on the LLM loop and block until it's done (works from any thread, notebooks included)."""
+    return asyncio.run_coroutine_threadsafe(coro, _llm_loop()).result()
+
+
+def gather_llm_calls(*coros, return_exceptions=False):
+    """
+    Run independent coroutines that make LLM calls (e.g. ainvoke on clients for
+    different providers) together on the LLM loop and block until all are done.
+    Results come back in argument order.
+    """
+    async def _gather():
+        return await asyncio.gather(*coros, return_exceptions=return_exceptions)
+    return _run_sync(_gather())
+
+
+async def _on_llm_loop(coro):
+    """Await coro on the LLM loop from whatever loop the caller is on."""
+    loop = _llm_loop()
+    if asyncio.get_running_loop() is loop:
+        return await coro
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+
+class AsyncLLMClient:
+    """
+    Concurrency-limited, retrying, coalescing front end for one get_llm() model.
+
+    ainvoke()/invoke() return the raw response text; callers still do their
+    own .strip() / extract_json().
+    """
+
+    def __init__(self, provider, model, config, max_tokens=1024, max_retries=4, base_delay=1.0, max_delay=30.0, llm=None, response_cache=None):
+        self.provider = provider.lower()
+        self.model = model
+        self.config = config or {}
+        self.max_tokens = max_tokens
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.llm = llm if llm is not None else get_llm(provider, model, self.config, max_tokens=max_tokens)
+        self.response_cache = response_cache  # llm_cache.LLMResponseCache, checked before the provider limits
+        self.stats = {"calls": 0, "coalesced": 0, "retries": 0, "failures": 0}
+
+    def _coalesce_key(self, text):
+        return hashlib.sha1(f"{self.model}|{self.max_tokens}|{text}".encode("utf-8")).hexdigest()
+
+    async def _call_with_retry(self, model_input, limiter):
+        attempt = 0
+        while True:
+            async with limiter.semaphore:
+                if limiter.bucket is not None:
+                    await limiter.bucket.acquire()
+                try:
+                    self.stats["calls"] += 1
+                    return _output_text(await self.llm.ainvoke(model_input))
+                except Exception as e:
+                    if attempt >= self.max_retries or not is_retryable_llm_error(e):
+                        self.stats["failures"] += 1
+                        raise
+                    error = e
+            # back off outside the semaphore so other requests can use the slot
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+            attempt += 1
+            self.stats["retries"] += 1
+            print(f"LLM {self.provider}/{self.model}: {type(error).__name__}, retry {attempt}/{self.max_retries} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def ainvoke(self, prompt, inputs=None, cache_variant=None):
+        return await _on_llm_loop(self._ainvoke(prompt, inputs, cache_variant))
+
+    async def _ainvoke(self, prompt, inputs, cache_variant):
+        model_input, text = _render_prompt(prompt, inputs)
+        cache_key = None
+        if self.response_cache is not None:
+            cache_key = llm_cache_key(self.provider, self.model, text, self.max_tokens, cache_variant)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        limiter = _get_limiter(self.provider, self.config)
+        key = self._coalesce_key(f"{cache_variant}|{text}")
+        pending = limiter.in_flight.get(key)
+        if pending is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        limiter.in_flight[key] = future
+        try:
+            result = await self._call_with_retry(model_input, limiter)
+            if cache_key is not None:
+                self.response_cache.put(cache_key, result, {"provider": self.provider, "model": self.model})
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved; waiters still get it re-raised
+            raise
+        finally:
+            limiter.in_flight.pop(key, None)
+
+    async def abatch(self, requests, return_exceptions=False):
+        """
+        Run independent prompts concurrently (still within the provider limits).
+        requests: list of (prompt, inputs) tuples or bare prompts.
+        Results come back in request order.
+        """
+        calls = [self.ainvoke(*request) if isinstance(request, tuple) else self.ainvoke(request) for request in requests]
+        return await asyncio.gather(*calls, return_exceptions=return_exceptions)
+
+    def invoke(self, prompt, inputs=None, cache_variant=None):
+        return _run_sync(self.ainvoke(prompt, inputs, cache_variant=cache_variant))
+
+    def batch(self, requests, return_exceptions=False):
+        return _run_sync(self.abatch(requests, return_exceptions=return_exceptions))
+
+
+_CLIENTS = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def _client_key(provider, model, config, max_tokens, kwargs):
+    config_text = json.dumps(config or {}, sort_keys=True, default=repr)
+    options = tuple(sorted((name, value if isinstance(value, (int, float, str, bool, type(None))) else id(value))
+                           for name, value in kwargs.items()))
+    return (provider.lower(), model, max_tokens, hashlib.sha1(config_text.encode("utf-8")).hexdigest(), options)
+
+
+def get_llm_client(provider: str, model: str, config: dict, max_tokens: int = 1024, **kwargs):
+    """
+    Shared AsyncLLMClient for this provider/model/max_tokens, config and
+    options: call sites can ask for one per call and still get coalescing
+    and stats across calls.
+    """
+    key = _client_key(provider, model, config, max_tokens, kwargs)
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(key)
+        if client is None:
+            client = AsyncLLMClient(provider, model, config, max_tokens=max_tokens, **kwargs)
+            _CLIENTS[key] = client
+    return client
+
+
+# -------------------- Fake provider (offline) --------------------
+# get_llm("fake", ...) returns a runnable that answers locally, so the
+# pipeline and the async layer can run without network access. Behaviour
+# is driven by the config:
+#   fake_responder:     callable(prompt_text, max_tokens) -> str
+#   fake_latency:       seconds to wait per call (default 0)
+#   fake_failure_rate:  probability a call raises a (retryable) rate limit error
+#   fake_seed:          seed for the failure draws
+
+class FakeRateLimitError(Exception):
+    status_code = 429
+
+
+_FAKE_LENGTH_PATTERN = re.compile(r"exactly (\d+) characters", re.IGNORECASE)
+_FAKE_WORDS = ["Home", "Journey", "Storm", "Friends", "Loss", "Hope", "Return", "Dream", "Trial", "Love"]
+
+
+def default_fake_responder(prompt_text, max_tokens):
+    """Descriptor prompts get phrases of exactly the requested length; anything else gets empty JSON."""
+    match = _FAKE_LENGTH_PATTERN.search(prompt_text)
+    if not match:
+        return "{}"
+    target = max(2, int(match.group(1)))
+    phrases = []
+    while len(". ".join(phrases)) + 1 < target:
+        word = _FAKE_WORDS[len(phrases) % len(_FAKE_WORDS)]
+        if phrases and len(". ".join(phrases + [word])) + 1 > target:
+            break
+        phrases.append(word)
+    text = ". ".join(phrases)
+    missing = target - len(text) - 1
+    text = text + "o" * missing if missing > 0 else text[:len(text) + missing]
+    return text + "."
+
+
+def _get_fake_llm(model, config, max_tokens):
+    from langchain_core.messages import AIMessage
+    from langchain_core.runnables import RunnableLambda
+
+    responder = config.get("fake_responder", default_fake_responder)
+    latency = float(config.get("fake_latency", 0))
+    failure_rate = float(config.get("fake_failure_rate", 0))
+    rng = random.Random(config.get("fake_seed"))
+
+    def _respond(model_input):
+        if failure_rate and rng.random() < failure_rate:
+            raise FakeRateLimitError("fake provider: rate limited")
+        if hasattr(model_input, "to_string"):
+            text = model_input.to_string()
+        elif isinstance(model_input, str):
+            text = model_input
+        else:
+            text = "\n".join(str(_output_text(message)) for message in model_input)
+        return AIMessage(content=responder(text, max_tokens), response_metadata={"model": model, "provider": "fake"})
+
+    def _invoke(model_input):
+        if latency:
+            time.sleep(latency)
+        return _respond(model_input)
+
+    async def _ainvoke(model_input):
+        if latency:
+            await asyncio.sleep(latency)
+        return _respond(model_input)
+
+    return RunnableLambda(_invoke, afunc=_ainvoke, name=f"fake:{model}")
+
+
 # def extract_json(text: str) -> str:
 #     """
 #     Remove markdown code fences (e.g. ```json ... ```) from the text.
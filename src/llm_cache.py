@@ -0,0 +1,207 @@
+"""
+LLM Response Cache for The Shapes of Stories
+============================================
+
+analyze_story, distill_story_components, grade_story_components,
+generate_descriptors and create_description pay full latency and tokens
+every time a pipeline is re-run with the same inputs (create_shape restarts,
+retried sheet rows). This caches responses on disk the same way
+story_metadata._cached_get_json caches HTTP: one JSON file per sha1 key
+under ~/.shapes_cache.
+
+The key is (provider, model, fully rendered prompt, max_tokens) plus an
+optional variant for call sites that deliberately re-ask the same prompt
+(e.g. the descriptor retry loop). Modes:
+    - readwrite  read hits, store misses (default)
+    - replay     read only; a miss raises LLMCacheMiss, so a re-render is
+                 either fully deterministic or fails loudly
+
+Replay only works if a re-render asks the same prompts. The descriptor
+retry loop changes the requested length between attempts, and that length
+is part of the prompt (and so of the key). Those nudges come from
+product_shape.target_nudge_rng, seeded from the story title, component index
+and attempt, so a re-render asks for the same lengths in the same order.
+    - refresh    never read, always store (re-prime stale entries)
+    - off        bypass the cache entirely
+
+Configure with an "llm_cache" block in config.yaml
+(mode / ttl_days / max_entries / max_mb / dir) or override the mode with the
+SHAPES_LLM_CACHE_MODE environment variable.
+"""
+
+import hashlib
+import json
+import os
+import time
+
+LLM_CACHE_DIR = os.path.join(os.path.expanduser("~/.shapes_cache"), "llm")
+CACHE_MODES = ("readwrite", "replay", "refresh", "off")
+DEFAULT_TTL_DAYS = 30
+DEFAULT_MAX_ENTRIES = 5000
+EVICT_EVERY_N_WRITES = 50
+
+_CACHES = {}
+
+
+class LLMCacheMiss(KeyError):
+    """Replay mode was asked for a response it has never seen."""
+
+
+def llm_cache_key(provider, model, prompt_text, max_tokens, variant=None):
+    payload = json.dumps({
+        "provider": (provider or "").lower(),
+        "model": model,
+        "prompt": prompt_text,
+        "max_tokens": max_tokens,
+        "variant": variant,
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    One JSON file per response, named by key. Entries older than the TTL are
+    dropped on read, and the cache is trimmed back to max_entries / max_bytes
+    (least recently used first, by file mtime) every few writes.
+    """
+
+    def __init__(self, cache_dir=LLM_CACHE_DIR, mode="readwrite", ttl_seconds=DEFAULT_TTL_DAYS * 86400,
+                 max_entries=DEFAULT_MAX_ENTRIES, max_bytes=None):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown LLM cache mode '{mode}', expected one of {CACHE_MODES}")
+        self.cache_dir = cache_dir
+        self.mode = mode
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "expired": 0, "evicted": 0}
+        self._writes_since_evict = 0
+        if mode != "off":
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".json")
+
+    def get(self, key):
+        """Cached response text, or None. Raises LLMCacheMiss on a replay-mode miss."""
+        if self.mode in ("off", "refresh"):
+            return None
+        path = self._path(key)
+        entry = None
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                entry = None
+        # replay ignores the TTL: an old answer is still the answer that was rendered
+        if entry is not None and self.mode != "replay" and self.ttl_seconds:
+            if time.time() - entry.get("created_at", 0) > self.ttl_seconds:
+                self.stats["expired"] += 1
+                self._remove(path)
+                entry = None
+        if entry is None:
+            self.stats["misses"] += 1
+            if self.mode == "replay":
+                raise LLMCacheMiss(key)
+            return None
+        self.stats["hits"] += 1
+        try:
+            os.utime(path)  # mark as recently used for eviction
+        except OSError:
+            pass
+        return entry["response"]
+
+    def put(self, key, response, meta=None):
+        if self.mode in ("off", "replay"):
+            return
+        entry = {"response": response, "created_at": time.time(), "meta": meta or {}}
+        path = self._path(key)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self.stats["writes"] += 1
+        self._writes_since_evict += 1
+        if self._writes_since_evict >= EVICT_EVERY_N_WRITES:
+            self.evict()
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def evict(self):
+        """Drop expired entries, then the least recently used until within max_entries / max_bytes."""
+        self._writes_since_evict = 0
+        if not os.path.isdir(self.cache_dir):
+            return
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+
+        if self.ttl_seconds:
+            # mtime is bumped on every hit, so this only catches entries nobody has used in a TTL
+            fresh = []
+            for mtime, size, path in entries:
+                if now - mtime > self.ttl_seconds:
+                    self._remove(path)
+                    self.stats["evicted"] += 1
+                else:
+                    fresh.append((mtime, size, path))
+            entries = fresh
+
+        entries.sort()
+        total_bytes = sum(size for _, size, _ in entries)
+        while entries and ((self.max_entries and len(entries) > self.max_entries)
+                           or (self.max_bytes and total_bytes > self.max_bytes)):
+            _, size, path = entries.pop(0)
+            self._remove(path)
+            total_bytes -= size
+            self.stats["evicted"] += 1
+
+    def summary(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        hit_rate = (self.stats["hits"] / lookups * 100) if lookups else 0.0
+        return f"LLM cache ({self.mode}): {self.stats['hits']} hits / {self.stats['misses']} misses ({hit_rate:.0f}%), {self.stats['writes']} writes"
+
+
+def get_llm_response_cache(config=None):
+    """Shared cache for the settings in config['llm_cache'] (and SHAPES_LLM_CACHE_MODE)."""
+    settings = dict((config or {}).get("llm_cache") or {})
+    mode = os.environ.get("SHAPES_LLM_CACHE_MODE") or settings.get("mode", "readwrite")
+    cache_dir = os.path.expanduser(settings.get("dir", LLM_CACHE_DIR))
+    ttl_days = settings.get("ttl_days", DEFAULT_TTL_DAYS)
+    max_entries = settings.get("max_entries", DEFAULT_MAX_ENTRIES)
+    max_mb = settings.get("max_mb")
+
+    registry_key = (cache_dir, mode, ttl_days, max_entries, max_mb)
+    cache = _CACHES.get(registry_key)
+    if cache is None:
+        cache = LLMResponseCache(
+            cache_dir=cache_dir,
+            mode=mode,
+            ttl_seconds=ttl_days * 86400 if ttl_days else None,
+            max_entries=max_entries,
+            max_bytes=int(max_mb * 1024 * 1024) if max_mb else None,
+        )
+        _CACHES[registry_key] = cache
+    return cache
+
+
+def llm_cache_stats():
+    """Combined hit/miss counters across every cache used in this process."""
+    totals = {"hits": 0, "misses": 0, "writes": 0, "expired": 0, "evicted": 0}
+    for cache in _CACHES.values():
+        for name, value in cache.stats.items():
+            totals[name] += value
+    return totals
@@ -9,7 +9,8 @@ from datetime import datetime
 
 # imports from my code
 from story_style import get_story_style, pango_font_exists #move to this sheet
-from story_components import get_story_components, grade_story_components, get_distilled_story_components, visualize_distillation, review_story_shape
+from story_components import get_story_components, agrade_story_components, get_distilled_story_components, visualize_distillation, areview_story_shape
+from llm import gather_llm_calls
 from story_summary import get_story_summary
 from story_shape_category import get_story_symbolic_and_archetype
 from story_metadata import get_story_metadata
@@ -49,39 +50,39 @@ def manually_adjust_story_data(story_data_file_path):
     print(f"Story: {story_title} - {story_protagonist}")
     print("Re-running analysis after manual adjustments...")
     
-    # 1. Re-grade story components
-    story_components_grader_llm_model = "gemini-2.5-pro"
-    story_component_grades = grade_story_components(
-        config_path=PATHS['config'],
-        story_components=story_components,
-        canonical_summary=story_summary,
-        title=story_title,
-        author=story_author,
-        protagonist=story_protagonist,
-        llm_provider="google",
-        llm_model=story_components_grader_llm_model
-    )
-    print("✅ Story Components Re-Graded")
-    print("GRADE: ", story_component_grades['shape_accuracy']['final_grade'])
-    
-    # 2. Re-calculate shape and archetype
+    # 1. Re-calculate shape and archetype
     story_symbolic_rep, story_archetype = get_story_symbolic_and_archetype(story_components)
     print("✅ Story Shape Re-Categorized")
     print("SHAPE: ", story_symbolic_rep)
     
-    # 3. Re-review shape
+    # 2./3. Re-grade story components and re-review shape (independent, so both LLM calls go out together)
+    story_components_grader_llm_model = "gemini-2.5-pro"
     story_shape_review_llm_model = "claude-sonnet-4-5"
-    story_shape_review = review_story_shape(
-        config_path=PATHS['config'],
-        story_title=story_title,
-        author=story_author,
-        protagonist=story_protagonist,
-        story_summary=story_summary,
-        shape=story_symbolic_rep,
-        story_components=story_components,
-        llm_provider="anthropic",
-        llm_model=story_shape_review_llm_model
+    story_component_grades, story_shape_review = gather_llm_calls(
+        agrade_story_components(
+            config_path=PATHS['config'],
+            story_components=story_components,
+            canonical_summary=story_summary,
+            title=story_title,
+            author=story_author,
+            protagonist=story_protagonist,
+            llm_provider="google",
+            llm_model=story_components_grader_llm_model
+        ),
+        areview_story_shape(
+            config_path=PATHS['config'],
+            story_title=story_title,
+            author=story_author,
+            protagonist=story_protagonist,
+            story_summary=story_summary,
+            shape=story_symbolic_rep,
+            story_components=story_components,
+            llm_provider="anthropic",
+            llm_model=story_shape_review_llm_model
+        )
     )
+    print("✅ Story Components Re-Graded")
+    print("GRADE: ", story_component_grades['shape_accuracy']['final_grade'])
     print(story_shape_review)
     if story_shape_review.get("passes_review") == True:
         print("✅ Story Shape Review Passed")
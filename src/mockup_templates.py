@@ -0,0 +1,342 @@
+"""
+Mockup Template Registry for The Shapes of Stories
+==================================================
+
+create_mockups used to re-open and re-convert the @BIG template, the gold
+clip PNG and the cover image for every product, and place_artworks re-solved
+the same perspective coefficients and re-drew the same slot masks every
+time, even though none of that changes between products on one template.
+
+This module decodes each image once and keeps:
+    - decoded RGBA pixels as raw buffers on disk
+      (~/.shapes_cache/mockup_templates), memory-mapped on load. Every process
+      in a pool maps the same file, so a template is decoded once per machine
+      (until the PNG changes) and its pages are shared instead of each worker
+      holding its own copy.
+    - per-slot derived assets keyed by (template, slot quad, art size):
+      region box, perspective coefficients, feathered polygon mask, lip mask
+      and sharpen mask (see slot_assets)
+    - finished clip overlays (trimmed / resized / rotated / sharpened, plus
+      their shadows) keyed by the ClipSpec and supersample factor
+
+Only images shared by every product belong in the raw buffer cache. Older
+versions of the same file are dropped when it is re-decoded, and once the
+buffers add up to more than MAX_RAW_CACHE_BYTES the least recently mapped
+ones are removed (a worker that still has one mapped keeps its pages until
+it lets go; on Windows the removal just waits for a later prune).
+Per-product images (designs, story covers) are loaded with a loader whose
+cache gets discarded (batch_mockups uses a temporary cache_dir and
+discard()).
+
+Images handed out by load_rgba() are read-only views of the mapped buffer;
+.copy() one before drawing on it.
+"""
+
+import contextlib
+import hashlib
+import json
+import mmap
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, workers may decode the same image twice
+    fcntl = None
+
+from PIL import Image, ImageDraw, ImageFilter
+
+TEMPLATE_CACHE_DIR = os.path.join(os.path.expanduser("~/.shapes_cache"), "mockup_templates")
+MAX_RAW_CACHE_BYTES = 4 * 1024 ** 3  # an @BIG template is ~150 MB decoded
+MAX_IMAGES = 32  # per process; designs come and go during a batch, templates stay hot
+MAX_SLOT_ASSETS = 64
+MAX_CLIP_OVERLAYS = 64
+
+_IMAGES = {}         # abs path -> (stamp, read-only mmapped Image)
+_SLOT_ASSETS = {}    # (template stamp, quad, art size, ...) -> dict
+_CLIP_OVERLAYS = {}  # (clip path stamp, clip spec, supersample, unsharp) -> (overlay, shadow)
+_LOCK = threading.Lock()
+_STATS = {"decoded": 0, "mapped": 0, "hits": 0, "slot_assets_built": 0, "slot_asset_hits": 0,
+          "clips_built": 0, "clip_hits": 0}
+
+
+def _file_stamp(path):
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+
+def _raw_key(stamp):
+    return hashlib.sha1(json.dumps(stamp).encode("utf-8")).hexdigest()
+
+
+def _raw_paths(key, cache_dir):
+    return os.path.join(cache_dir, key + ".rgba"), os.path.join(cache_dir, key + ".json")
+
+
+def _drop_stale_raw(source, cache_dir):
+    # an edited template gets a new key; remove the buffers decoded from its old versions
+    for name in os.listdir(cache_dir):
+        if not name.endswith(".json"):
+            continue
+        meta_path = os.path.join(cache_dir, name)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                if json.load(f).get("source") != source:
+                    continue
+            os.remove(meta_path)
+            os.remove(meta_path[:-len(".json")] + ".rgba")
+        except (OSError, ValueError):
+            continue
+        with contextlib.suppress(OSError):
+            os.remove(meta_path[:-len(".json")] + ".lock")
+
+
+def _write_raw(img, key, source, cache_dir):
+    os.makedirs(cache_dir, exist_ok=True)
+    _drop_stale_raw(source, cache_dir)
+    raw_path, meta_path = _raw_paths(key, cache_dir)
+    # several pool workers can miss at once; each writes its own tmp file and the last replace wins
+    suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(raw_path + suffix, "wb") as f:
+        f.write(img.tobytes("raw", "RGBA"))
+    os.replace(raw_path + suffix, raw_path)
+    with open(meta_path + suffix, "w", encoding="utf-8") as f:
+        json.dump({"size": list(img.size), "mode": "RGBA", "source": source}, f)
+    os.replace(meta_path + suffix, meta_path)
+    _prune_raw(cache_dir, keep=key)
+
+
+def _prune_raw(cache_dir, keep=None):
+    # least recently mapped first (_map_raw touches a buffer each time a process maps it)
+    try:
+        names = [name for name in os.listdir(cache_dir) if name.endswith(".rgba")]
+    except OSError:
+        return
+    entries = []
+    for name in names:
+        try:
+            st = os.stat(os.path.join(cache_dir, name))
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, name[:-len(".rgba")]))
+    total = sum(size for _, size, _ in entries)
+    if total <= MAX_RAW_CACHE_BYTES:
+        return
+    entries.sort()
+    for _, size, key in entries:
+        if total <= MAX_RAW_CACHE_BYTES:
+            break
+        if key == keep:
+            continue
+        raw_path, meta_path = _raw_paths(key, cache_dir)
+        try:
+            os.remove(meta_path)
+            os.remove(raw_path)
+        except OSError:
+            continue
+        with contextlib.suppress(OSError):
+            os.remove(os.path.join(cache_dir, key + ".lock"))
+        total -= size
+
+
+@contextlib.contextmanager
+def _decode_lock(key, cache_dir):
+    # one process decodes a given image; the others wait and then map its buffer
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(os.path.join(cache_dir, key + ".lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _map_raw(key, cache_dir):
+    raw_path, meta_path = _raw_paths(key, cache_dir)
+    if not (os.path.exists(raw_path) and os.path.exists(meta_path)):
+        return None
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            width, height = json.load(f)["size"]
+        with open(raw_path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError, KeyError):
+        return None
+    if len(buffer) != width * height * 4:
+        buffer.close()
+        return None  # half-written by a killed run; decode again
+    with contextlib.suppress(OSError):
+        os.utime(raw_path)  # recently used, for _prune_raw
+    return Image.frombuffer("RGBA", (width, height), buffer, "raw", "RGBA", 0, 1)
+
+
+def load_rgba(path, cache_dir=TEMPLATE_CACHE_DIR):
+    """
+    Image.open(path).convert("RGBA"), decoded once and shared.
+
+    Returns a read-only Image backed by a memory-mapped raw buffer (falls back
+    to a plain in-memory decode if the cache directory isn't writable).
+    """
+    stamp = _file_stamp(path)
+    cached = _IMAGES.get(stamp[0])
+    if cached is not None and cached[0] == stamp:
+        _STATS["hits"] += 1
+        return cached[1]
+
+    key = _raw_key(stamp)
+    img = _map_raw(key, cache_dir)
+    if img is None:
+        try:
+            with _decode_lock(key, cache_dir):
+                img = _map_raw(key, cache_dir)  # someone else may have just written it
+                if img is None:
+                    img = _decode(path)
+                    _write_raw(img, key, stamp[0], cache_dir)
+                    img = _map_raw(key, cache_dir) or img
+                else:
+                    _STATS["mapped"] += 1
+        except OSError as e:
+            print(f"⚠️ Could not cache decoded template {path}: {e}")
+            if img is None:
+                img = _decode(path)
+    else:
+        _STATS["mapped"] += 1
+
+    _remember(_IMAGES, stamp[0], (stamp, img), MAX_IMAGES)
+    return img
+
+
+def _decode(path):
+    with Image.open(path) as src:
+        decoded = src.convert("RGBA")
+    _STATS["decoded"] += 1
+    return decoded
+
+
+def discard(path, cache_dir=TEMPLATE_CACHE_DIR):
+    """Drop an image from this process and delete its raw buffer (e.g. a design a batch is done with)."""
+    abs_path = os.path.abspath(path)
+    with _LOCK:
+        _IMAGES.pop(abs_path, None)
+    if os.path.isdir(cache_dir):
+        _drop_stale_raw(abs_path, cache_dir)
+
+
+def preload(paths, cache_dir=TEMPLATE_CACHE_DIR):
+    """Decode (or map) every path up front, e.g. before starting a process pool."""
+    loaded = []
+    for path in paths:
+        if path and os.path.exists(path):
+            load_rgba(path, cache_dir)
+            loaded.append(path)
+        else:
+            print(f"⚠️ Template not found, skipping preload: {path}")
+    return loaded
+
+
+def template_stamp(path):
+    """Identity of a template file as used in derived-asset keys."""
+    return _file_stamp(path)
+
+
+def _remember(cache, key, value, limit):
+    with _LOCK:
+        cache.pop(key, None)
+        if len(cache) >= limit:
+            cache.pop(next(iter(cache)))
+        cache[key] = value
+    return value
+
+
+def slot_assets(template_key, template_size, quad, art_size, slot_pad, poly_feather, lip_w, lip_f,
+                sharpen_pad=None):
+    """
+    Everything place_artworks needs for one slot that doesn't depend on the
+    artwork's pixels, built once per (template, quad, art size, edge settings):
+
+      roi / roi_quad       slot region box and the quad relative to it
+      coeffs               PERSPECTIVE coefficients from an art_size image to roi_quad
+      mask                 feathered polygon mask over the region
+      lip_mask             inner-lip line mask over the region
+      sharpen_roi / sharpen_mask  region and hard polygon mask for the selective sharpen
+    """
+    from product_mockups import find_coeffs, quad_roi, shift_quad
+
+    quad = tuple((float(x), float(y)) for x, y in quad)
+    key = (template_key, tuple(template_size), quad, tuple(art_size), slot_pad, poly_feather, lip_w, lip_f, sharpen_pad)
+    assets = _SLOT_ASSETS.get(key)
+    if assets is not None:
+        _STATS["slot_asset_hits"] += 1
+        return assets
+
+    W, H = template_size
+    x0, y0, x1, y1 = quad_roi(quad, slot_pad, W, H)
+    roi_size = (x1 - x0, y1 - y0)
+    roi_quad = shift_quad(quad, x0, y0)
+    art_w, art_h = art_size
+    coeffs = find_coeffs([(0, 0), (art_w, 0), (art_w, art_h), (0, art_h)], roi_quad)
+
+    mask = _polygon_mask(roi_size, roi_quad, poly_feather)
+    lip_mask = _lip_mask(roi_size, roi_quad, lip_w, lip_f)
+
+    assets = {"roi": (x0, y0, x1, y1), "roi_size": roi_size, "roi_quad": roi_quad, "coeffs": coeffs,
+              "mask": mask, "lip_mask": lip_mask}
+    if sharpen_pad is not None:
+        sx0, sy0, sx1, sy1 = quad_roi(quad, sharpen_pad, W, H)
+        sharpen_mask = Image.new("L", (sx1 - sx0, sy1 - sy0), 0)
+        ImageDraw.Draw(sharpen_mask, "L").polygon(shift_quad(quad, sx0, sy0), fill=255)
+        assets["sharpen_roi"] = (sx0, sy0, sx1, sy1)
+        assets["sharpen_mask"] = sharpen_mask
+
+    _STATS["slot_assets_built"] += 1
+    return _remember(_SLOT_ASSETS, key, assets, MAX_SLOT_ASSETS)
+
+
+def _polygon_mask(size, poly, feather):
+    from product_mockups import polygon_mask
+    return polygon_mask(size, poly, feather=feather)
+
+
+def _lip_mask(size, quad, width_px, feather):
+    # the mask overlay_inner_lip draws
+    from product_mockups import _sanitize_poly
+    W, H = size
+    quad_int = _sanitize_poly(quad, W, H)
+    mask = Image.new("L", (W, H), 0)
+    ImageDraw.Draw(mask, "L").line(quad_int + [quad_int[0]], fill=255, width=width_px)
+    if feather > 0:
+        mask = mask.filter(ImageFilter.GaussianBlur(feather))
+    return mask
+
+
+def clip_overlay(spec, supersample, post_unsharp, build, load_image=None):
+    """
+    (overlay, shadow) for a ClipSpec at this supersample factor. `build` does
+    the actual work from the decoded clip image and is only called on a miss.
+    load_image(path) decodes the clip (default: load_rgba, the shared
+    template cache; pass another loader for per-product clips like covers).
+    """
+    from dataclasses import astuple
+
+    key = (_file_stamp(spec.path), astuple(spec), supersample, tuple(post_unsharp))
+    cached = _CLIP_OVERLAYS.get(key)
+    if cached is not None:
+        _STATS["clip_hits"] += 1
+        return cached
+    _STATS["clips_built"] += 1
+    return _remember(_CLIP_OVERLAYS, key, build((load_image or load_rgba)(spec.path)), MAX_CLIP_OVERLAYS)
+
+
+def registry_stats():
+    return dict(_STATS, images=len(_IMAGES), slot_assets=len(_SLOT_ASSETS), clip_overlays=len(_CLIP_OVERLAYS))
+
+
+def clear_registry():
+    """Forget everything held in this process (the raw buffers on disk stay)."""
+    with _LOCK:
+        _IMAGES.clear()
+        _SLOT_ASSETS.clear()
+        _CLIP_OVERLAYS.clear()
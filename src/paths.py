@@ -22,6 +22,7 @@ PATHS['product_mockups'] = os.path.join(BASE_DIR, 'product_mockups')
 PATHS['story_covers'] = os.path.join(BASE_DIR, 'story_covers')
 PATHS['story_distillations'] = os.path.join(BASE_DIR, 'story_distillations')
 PATHS['config'] = os.path.join(BASE_DIR, 'config.yaml')
+PATHS['glyph_metrics'] = os.path.join(BASE_DIR, 'glyph_metrics.json')
 
 
 # --- Automatically create output directories if they don't exist ---
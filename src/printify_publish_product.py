@@ -12,6 +12,7 @@ from datetime import datetime
 import time
 import os
 import base64
+from upload_prep import Base64JSONBody, prepare_for_upload
 
 ## FROM printify_print_details.py ##
 # ✅ Blueprint: Matte Vertical Posters -> 282
@@ -48,7 +49,8 @@ def ensure_dimensions(image_path, w=3300, h=4200):
 
 
 def upload_image(api_token, image_path):
-    """Uploads an image to Printify using Base64 encoding and returns its ID."""
+    """Uploads an image to Printify using Base64 encoding and returns its ID.
+    The JSON body is streamed from disk (see upload_prep.Base64JSONBody)."""
     #print("Uploading image using Base64 method...")
     url = "https://api.printify.com/v1/uploads/images.json"
     
@@ -60,15 +62,14 @@ def upload_image(api_token, image_path):
     try:
         file_name = os.path.basename(image_path)
 
-        with open(image_path, "rb") as image_file:
-            encoded_string = base64.b64encode(image_file.read()).decode('utf-8')
-        
-        payload = {
-            "file_name": file_name,
-            "contents": encoded_string
-        }
-        
-        response = requests.post(url, headers=headers, json=payload)
+        # designs are already exact print size; this only fixes mode / color profile if needed
+        upload_path = prepare_for_upload(image_path, max_edge=None, max_pixels=None)
+
+        payload = Base64JSONBody(upload_path, file_name=file_name)
+        try:
+            response = requests.post(url, headers=headers, data=payload)
+        finally:
+            payload.close()
 
         # --- THIS IS THE CORRECTED PART ---
         if 200 <= response.status_code < 300: # Checks for any success code (200, 201, etc.)
@@ -227,12 +228,12 @@ def publish_product_on_printify(product_data_path, config_path="/Users/johnmiked
         height_dimensions = printify_print_details[product_type + "-" + product_size]["height_dimensions"]
     else:
         print("❌ ERROR: Only print 11x14 supported today")
-        return
+        return False
 
     #before creating printify product -- make sure design matches product dimenions 
     image_dimensions_quality = ensure_dimensions(product_design_path, w=width_dimensions, h=height_dimensions)
     if image_dimensions_quality == "image_dimensions_bad":
-        return 
+        return False
     
     #upload design to printify
     product_image_id = upload_image(PRINTIFY_API_KEY, product_design_path)
@@ -314,7 +315,7 @@ def publish_product_on_printify(product_data_path, config_path="/Users/johnmiked
     time.sleep(1)
     print("✅ Story Data Updated w/ Product Variant SKU")
 
-    return 
+    return True
 
 
    
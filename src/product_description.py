@@ -1,5 +1,6 @@
 # create_description.py
-from llm import load_config, get_llm, extract_json  # keep your existing helpers
+from llm import load_config, get_llm, get_llm_client, extract_json  # keep your existing helpers
+from llm_cache import get_llm_response_cache
 # from langchain.chains import LLMChain               # parity with your imports
 # from langchain.prompts import PromptTemplate        # parity with your imports
 from langchain_core.prompts import PromptTemplate, ChatPromptTemplate
@@ -163,9 +164,9 @@ def create_description(
 
     Preserves your LLM structure:
       - config = load_config(...)
-      - llm = get_llm(provider, model, config, max_tokens=...)
+      - llm_client = get_llm_client(provider, model, config, max_tokens=...)
       - message = HumanMessage([...])
-      - response = llm.invoke([message])
+      - response = llm_client.invoke([message])
 
     Structure enforced:
       1) The Shape of "[TITLE]" — [PROTAGONIST]'s Journey
@@ -183,7 +184,7 @@ def create_description(
     """
     # 1) Load config + model (unchanged)
     config = load_config(config_path)
-    llm = get_llm(llm_provider, llm_model, config, max_tokens=8192)
+    llm_client = get_llm_client(llm_provider, llm_model, config, max_tokens=8192, response_cache=get_llm_response_cache(config))
 
     # 2) Optional image
     image_mime_type, base64_image = _encode_image_to_data_url(image_path)
@@ -276,7 +277,7 @@ STORY DATA (JSON):
     message = HumanMessage(content=human_content)
 
     # 6) Invoke the model exactly like you already do
-    response = llm.invoke([message])
+    response = llm_client.invoke([message])
     product_description = response.content if hasattr(response, "content") else str(response)
 
     #clean production description
@@ -14,6 +14,8 @@ from PIL.Image import Resampling  # Pillow 10+
 
 from PIL import Image, ImageDraw, ImageFilter, ImageOps
 
+from mockup_templates import clip_overlay, load_rgba, slot_assets, template_stamp
+
 
 
 ### CLIPS FUNCTIONS #####
@@ -107,15 +109,48 @@ def clip_positions_from_poster_quad(poster_quad, inset_pct=0.06, raise_px=18):
     y_top   = yT - int(round(raise_px))
     return (x_left, y_top), (x_right, y_top)
 
-def overlay_clips_exact(
-    base_path: str,
+def _prepare_clip_overlay(clip_rgba, spec, ss, post_unsharp):
+    """Trimmed / resized / outlined / rotated / sharpened clip and its shadow (or None)."""
+    overlay = clip_rgba
+    if spec.trim_transparent_edges:
+        overlay = _trim_transparent_edges(overlay)
+
+    # scale to requested size (honor aspect) — scale the target by supersample
+    tw, th = spec.size_px
+    if tw is not None: tw = int(round(tw * ss))
+    if th is not None: th = int(round(th * ss))
+    overlay = _resize_keep_aspect(overlay, (tw, th))
+
+    # --- NEW: ADD OUTLINE LOGIC HERE ---
+    if spec.outline_width > 0:
+        # Scale outline width by supersample factor so it stays visible
+        w_px = int(spec.outline_width * ss)
+
+        # ImageOps.expand adds the border.
+        # We convert to RGBA to ensure compatibility.
+        overlay = ImageOps.expand(overlay, border=w_px, fill=spec.outline_color)
+        # -----------------------------------
+
+    # rotate, then sharpen RGB a touch to recover edge contrast
+    if abs(spec.rotation_deg) > 1e-6:
+        overlay = overlay.rotate(spec.rotation_deg, expand=True, resample=Resampling.BICUBIC)
+    overlay = _unsharp_rgb(overlay, post_unsharp)
+
+    shadow = None
+    if spec.add_shadow:
+        shadow = _make_shadow(overlay, spec.shadow_offset, spec.shadow_blur, spec.shadow_opacity)
+    return overlay, shadow
+
+def apply_clips(
+    base: Image.Image,
     clips: List[ClipSpec],
-    output_path: str,
     supersample: int = 1,                 # 2 gives extra crisp edges; 1 = off
     post_unsharp: tuple = (0.5, 180, 0),  # after rotate/resize (per clip)
     final_unsharp: tuple = (0.4, 120, 1), # gentle pass after downsample
-):
-    base = Image.open(base_path).convert("RGBA")
+    load_clip=None,                       # path -> RGBA image; default is the shared template cache
+) -> Image.Image:
+    """overlay_clips_exact on an image already in memory; returns the new image."""
+    base = base.convert("RGBA") if base.mode != "RGBA" else base.copy()
     W0, H0 = base.size
     ss = max(1, int(supersample))
 
@@ -124,32 +159,13 @@ def overlay_clips_exact(
         base = base.resize((W0 * ss, H0 * ss), Resampling.LANCZOS)
 
     for spec in clips:
-        overlay = Image.open(spec.path).convert("RGBA")
-        if spec.trim_transparent_edges:
-            overlay = _trim_transparent_edges(overlay)
-
-        # scale to requested size (honor aspect) — scale the target by supersample
-        tw, th = spec.size_px
-        if tw is not None: tw = int(round(tw * ss))
-        if th is not None: th = int(round(th * ss))
-        overlay = _resize_keep_aspect(overlay, (tw, th))
-
-        # --- NEW: ADD OUTLINE LOGIC HERE ---
-        if spec.outline_width > 0:
-            # Scale outline width by supersample factor so it stays visible
-            w_px = int(spec.outline_width * ss)
-            
-            # ImageOps.expand adds the border. 
-            # We convert to RGBA to ensure compatibility.
-            overlay = ImageOps.expand(overlay, border=w_px, fill=spec.outline_color)
-            # -----------------------------------
-
-
-        
-        # rotate, then sharpen RGB a touch to recover edge contrast
-        if abs(spec.rotation_deg) > 1e-6:
-            overlay = overlay.rotate(spec.rotation_deg, expand=True, resample=Resampling.BICUBIC)
-        overlay = _unsharp_rgb(overlay, post_unsharp)
+        # the prepared overlay (and its shadow) only depends on the spec, so it's
+        # built once per process and reused for every product (mockup_templates)
+        overlay, shadow = clip_overlay(
+            spec, ss, post_unsharp,
+            lambda clip_rgba, spec=spec: _prepare_clip_overlay(clip_rgba, spec, ss, post_unsharp),
+            load_image=load_clip,
+        )
 
         # anchor math (positions scaled by supersample)
         cx, cy = spec.pos
@@ -159,8 +175,8 @@ def overlay_clips_exact(
         y = int(cy - ay)
 
         # shadow (optional)
-        if spec.add_shadow:
-            sh, shift = _make_shadow(overlay, spec.shadow_offset, spec.shadow_blur, spec.shadow_opacity)
+        if shadow is not None:
+            sh, shift = shadow
             base.alpha_composite(sh, (x + shift[0], y + shift[1]))
 
         base.alpha_composite(overlay, (x, y))
@@ -170,6 +186,18 @@ def overlay_clips_exact(
         base = base.resize((W0, H0), Resampling.LANCZOS)
         base = _unsharp_rgb(base, final_unsharp)
 
+    return base
+
+def overlay_clips_exact(
+    base_path: str,
+    clips: List[ClipSpec],
+    output_path: str,
+    supersample: int = 1,                 # 2 gives extra crisp edges; 1 = off
+    post_unsharp: tuple = (0.5, 180, 0),  # after rotate/resize (per clip)
+    final_unsharp: tuple = (0.4, 120, 1), # gentle pass after downsample
+):
+    base = Image.open(base_path).convert("RGBA")
+    base = apply_clips(base, clips, supersample, post_unsharp, final_unsharp)
     base.save(output_path, "PNG", optimize=True)
     return output_path
 
@@ -283,10 +311,35 @@ def fit_to_aspect_canvas(img, target_aspect):
 
 # ---------------------- compositing helpers ----------------------
 
+def quad_roi(quad, pad, W, H):
+    """
+    Bounding box (x0, y0, x1, y1) of the quad grown by `pad` px and clamped to
+    the W x H image. pad has to cover how far blurs/line widths reach past the
+    quad, so work done inside the box matches work done on the full frame.
+    """
+    import math
+    xs = [float(x) for x, _ in quad]
+    ys = [float(y) for _, y in quad]
+    x0 = max(0, int(math.floor(min(xs))) - pad)
+    y0 = max(0, int(math.floor(min(ys))) - pad)
+    x1 = min(W, int(math.ceil(max(xs))) + pad + 1)
+    y1 = min(H, int(math.ceil(max(ys))) + pad + 1)
+    return x0, y0, x1, y1
+
+def shift_quad(quad, dx, dy):
+    return [(x - dx, y - dy) for (x, y) in quad]
+
+def blur_reach(radius):
+    """Pixels a GaussianBlur / UnsharpMask of this radius can pull from (generous)."""
+    import math
+    return int(math.ceil(4 * float(radius))) + 4
+
 def warp_art_into_quad(base_size, art_rgba, quad):
     """
     Warp the art to the quad area on a canvas sized like base.
     Then you can mask it with a polygon and alpha_composite onto the base.
+    (base_size can be just a region of the base; pass the quad in that
+    region's coordinates.)
     """
     W,H = base_size
     src_quad = [(0,0),(art_rgba.width,0),(art_rgba.width,art_rgba.height),(0,art_rgba.height)]
@@ -485,6 +538,15 @@ def choose_flanker_paths(
 
 # --------------------- MAIN FUNCTIONS -----------------------
 # MAIN FUNCTIONS 
+def save_mockup(img, output_path):
+    """PNG, or JPEG for a .jpg / .jpeg path."""
+    out_ext = os.path.splitext(output_path)[1].lower()
+    if out_ext in (".jpg", ".jpeg"):
+        img.convert("RGB").save(output_path, "JPEG", quality=95, optimize=True)
+    else:
+        img.save(output_path, "PNG", optimize=True)
+    return output_path
+
 def place_artworks(
     mockup_path,
     output_path,
@@ -504,21 +566,41 @@ def place_artworks(
       - optional "art_idx": index into artwork_paths
     artwork_paths: list of file paths (can be length 1 to reuse same art for all)
     """
+    arts = [Image.open(p).convert("RGBA") for p in artwork_paths]
+    comp = compose_artworks(mockup_path, slots, arts, default_mode=default_mode, lip_width_px=lip_width_px,
+                            lip_feather=lip_feather, supersample=supersample, sharpen=sharpen, unsharp=unsharp)
+    return save_mockup(comp, output_path)
+
+def compose_artworks(
+    mockup_path,
+    slots,
+    arts,
+    default_mode="fill",       # "fill" | "fit" | "stretch"
+    lip_width_px=5,            # overlay line width (at final size)
+    lip_feather=0.8,           # overlay softness (at final size)
+    supersample=2,             # 1 = off; 2–3 strongly recommended for text-heavy art
+    sharpen=True,              # unsharp-mask only where art is placed
+    unsharp=(1.0, 150, 2),     # (radius, percent, threshold)
+):
+    """
+    place_artworks without the file I/O: arts are already-decoded RGBA images
+    (one per slot, or fewer to reuse the last) and the composited mockup is
+    returned instead of saved.
+    """
     from PIL import Image, ImageDraw, ImageFilter  # ensure available inside function
-    import os
 
-    base = Image.open(mockup_path).convert("RGBA")
-    W0, H0 = base.size
+    # decoded once per machine and memory-mapped (mockup_templates); copy before drawing on it
+    template = load_rgba(mockup_path)
+    template_key = template_stamp(mockup_path)
+    W0, H0 = template.size
     ss = max(1, int(round(supersample)))  # supersample factor
 
-    # Preload all arts once
-    arts = [Image.open(p).convert("RGBA") for p in artwork_paths]
     if not arts:
         raise ValueError("No artwork_paths provided.")
 
     # Upscale base & slots for supersampling
     if ss > 1:
-        base = base.resize((W0 * ss, H0 * ss), Image.LANCZOS)
+        base = template.resize((W0 * ss, H0 * ss), Image.LANCZOS)
 
         scaled_slots = []
         for slot in slots:
@@ -543,15 +625,20 @@ def place_artworks(
                 s["quad"] = [(x, y), (x+w, y), (x+w, y+h), (x, y+h)]
                 s.pop("rect", None)
             work_slots.append(s)
+        base = template.copy()
 
-    comp = base.copy()
-    union_mask = Image.new("L", base.size, 0)  # track art areas (for selective sharpening)
+    comp = base  # composited in place, one slot-sized region at a time
 
     # Scale edge softening with supersample so it looks the same after downscale
     poly_feather = 0.7 * ss if ss > 1 else 0.7
     lip_w = max(1, int(round(lip_width_px * ss)))
     lip_f = float(lip_feather) * ss if ss > 1 else float(lip_feather)
 
+    # 1/20/2026 everything below only touches each quad's bounding box (plus enough
+    # padding for the feathering / lip line) instead of full-frame canvases and masks
+    slot_pad = max(blur_reach(poly_feather), lip_w + blur_reach(lip_f))
+    sharpen_pad = blur_reach(unsharp[0]) if sharpen else None
+
     for i, slot in enumerate(work_slots):
         quad = slot["quad"]
 
@@ -571,39 +658,48 @@ def place_artworks(
         else:
             raise ValueError(f"Slot {i}: unknown mode '{mode}'")
 
-        # Warp to quad on a base-sized canvas
-        warped = warp_art_into_quad(base.size, art_prepped, quad)
+        # region, perspective coeffs and masks are the same for every product on this
+        # template, so they come from the registry (built on first use)
+        assets = slot_assets(template_key, base.size, quad, art_prepped.size,
+                             slot_pad, poly_feather, lip_w, lip_f, sharpen_pad)
+        slot["assets"] = assets
+        x0, y0, x1, y1 = assets["roi"]
+        roi_size = assets["roi_size"]
+
+        # Warp to quad on a canvas the size of the slot's region
+        warped = art_prepped.transform(roi_size, Image.PERSPECTIVE, assets["coeffs"], resample=Image.BICUBIC)
 
         # Mask to the quad and composite
-        mask = polygon_mask(base.size, quad, feather=poly_feather)
-        comp = Image.alpha_composite(
-            comp,
-            Image.composite(warped, Image.new("RGBA", base.size, (0, 0, 0, 0)), mask),
+        comp.alpha_composite(
+            Image.composite(warped, Image.new("RGBA", roi_size, (0, 0, 0, 0)), assets["mask"]),
+            dest=(x0, y0),
         )
 
-        # Track art region for later selective sharpening
-        ImageDraw.Draw(union_mask, "L").polygon(quad, fill=255)
-
-        # Inner-lip overlay to hide micro seams
-        comp = overlay_inner_lip(comp, quad, width_px=lip_w, feather=lip_f)
+        # Inner-lip overlay to hide micro seams (same as overlay_inner_lip, cached mask)
+        region = comp.crop((x0, y0, x1, y1))
+        lip = region.copy()
+        lip.putalpha(assets["lip_mask"])
+        comp.paste(Image.alpha_composite(region, lip), (x0, y0))
 
     # Selective sharpen of the art regions (helps text edges)
     if sharpen:
         radius, percent, thresh = unsharp
-        sharpened = comp.filter(ImageFilter.UnsharpMask(radius=radius, percent=percent, threshold=thresh))
-        comp = Image.composite(sharpened, comp, union_mask)
+        # sharpen every region from the unsharpened composite first, so overlapping
+        # regions don't sharpen each other's output
+        sharpened_regions = []
+        for slot in work_slots:
+            x0, y0, x1, y1 = slot["assets"]["sharpen_roi"]
+            sharpened = comp.crop((x0, y0, x1, y1)).filter(
+                ImageFilter.UnsharpMask(radius=radius, percent=percent, threshold=thresh))
+            sharpened_regions.append((sharpened, (x0, y0), slot["assets"]["sharpen_mask"]))
+        for sharpened, offset, art_mask in sharpened_regions:
+            comp.paste(sharpened, offset, art_mask)
 
     # Downscale back to original size (high-quality)
     if ss > 1:
         comp = comp.resize((W0, H0), Image.LANCZOS)
 
-    # Save
-    out_ext = os.path.splitext(output_path)[1].lower()
-    if out_ext in (".jpg", ".jpeg"):
-        comp.convert("RGB").save(output_path, "JPEG", quality=95, optimize=True)
-    else:
-        comp.save(output_path, "PNG", optimize=True)
-    return output_path
+    return comp
 
 MOCKUPS = {
     "11x14_poster":{
@@ -638,167 +734,184 @@ MOCKUPS = {
     # }
 }
 
+GOLD_CLIP_PATH = "/Users/johnmikedidonato/Projects/TheShapesOfStories/mockup_templates/gold-clip@BIG.png"
+
+def mockup_clips(mockup_type, story_cover_path=None):
+    """Clips / objects overlaid after the art is placed (None for mockups without any)."""
+    if mockup_type not in ("11x14_poster", "11x14_poster_with_cover"):
+        return None
+
+    objects_to_add = [
+        ClipSpec(
+            path=GOLD_CLIP_PATH,
+            pos=(230, 30),  
+            size_px=(65, None),
+            rotation_deg=-0.2,
+            anchor="top_center",
+            shadow_offset=(1, 2),
+            shadow_blur=2,
+            shadow_opacity=105
+        ),
+        ClipSpec(
+            path=GOLD_CLIP_PATH,
+            pos=(1560, 30),
+            size_px=(65, None),
+            rotation_deg=0.2,
+            anchor="top_center",
+            shadow_offset=(1, 2),
+            shadow_blur=2,
+            shadow_opacity=105
+        ),
+    ]
+
+    #add story cover 
+    if mockup_type == "11x14_poster_with_cover" and story_cover_path and os.path.exists(story_cover_path):
+        objects_to_add.append(
+            ClipSpec(
+                path=story_cover_path,
+                # [ADJUST POS]: (X, Y) pixel coordinates on the base image.
+                # Since your base is likely ~1700px wide, placing it at 
+                # bottom-right (e.g., 1400, 2000) creates an overlap.
+                pos=(1735, 2225), 
+                
+                # [ADJUST SIZE]: Width 500px, Height Auto (None). 
+                # This preserves the aspect ratio of your specific book.
+                size_px=(420, None), 
+                
+                rotation_deg=0,     # Slight tilt looks natural
+                anchor="bottom_right",       # Coordinates define the center of the book
+
+                # --- NEW OUTLINE SETTINGS ---
+                outline_width=3,  # 3px represents the thickness of the pages
+                outline_color=(245, 245, 240), # Off-white/Cream page color
+                
+                # Shadow makes it pop off the poster
+                add_shadow=True,
+                shadow_offset=(15, 15), 
+                shadow_blur=20,
+                shadow_opacity=140,
+                trim_transparent_edges=True
+            )
+        )
+    return objects_to_add
+
+def mockup_artwork_paths(product_data, product_design_path, mockup_type):
+    """Design paths for each slot of this mockup, in slot order."""
+    if mockup_type == "3x_11x14_wall":
+        
+        #get paths for left and right
+        # deterministically pick two other designs from set pool that have (a) complementary color 
+        left_path, right_path = choose_flanker_paths(
+            product_slug=product_data.get("product_slug"),
+            background_hex=product_data.get("background_color_hex"),
+            title=product_data.get("title"),
+            author=product_data.get("author"),
+            mockup_pool=mockup_pool_11x14
+        )
+
+        # slots order is: LEFT, CENTER, RIGHT
+        return [left_path, product_design_path, right_path]
+    # for non-3x mockups, just use the center art
+    return [product_design_path]
+
+def mockup_output_path(output_dir, product_slug, mockup_type, output_format="png"):
+    return f"{output_dir}/{product_slug}-{MOCKUPS[mockup_type].get('name')}.{output_format}"
+
+def render_mockup(product_data, product_design_path, mockup_type, output_path, load_image=None):
+    """
+    Render one mockup for one product straight to output_path: art placed
+    into the template, clips / cover overlaid, saved once.
+
+    load_image(path) -> RGBA image is used for the designs and the story
+    cover (defaults to decoding the file); batch_mockups passes the template
+    registry's loader on a batch-only cache so each is decoded once for the
+    whole batch and dropped after. Clips shared by every product always go
+    through the template cache.
+
+    Returns:
+        dict: seconds spent per step (load / compose / clips / save)
+    """
+    import time
+
+    if load_image is None:
+        load_image = lambda path: Image.open(path).convert("RGBA")
+    mockup_details = MOCKUPS[mockup_type]
+    timings = {}
+
+    start = time.perf_counter()
+    arts = [load_image(path) for path in mockup_artwork_paths(product_data, product_design_path, mockup_type)]
+    timings["load"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    comp = compose_artworks(
+        mockup_details.get("mockup_template_path"),
+        mockup_details.get("slots"),
+        arts,
+        supersample=1,
+        sharpen=True,
+        unsharp=(0.7, 200, 0),
+        lip_width_px=5,
+        lip_feather=0.8,
+    )
+    timings["compose"] = time.perf_counter() - start
+
+    #need to create poster only mockups after initial artworks place
+    clips = mockup_clips(mockup_type, (product_data.get("cover_data") or {}).get("cover_path_file"))
+    if clips:
+        start = time.perf_counter()
+        # the gold clips are shared template images; the cover is per product, so it goes through load_image
+        shared_clip_paths = {clip.path for clip in mockup_clips(mockup_type) or []}
+        # Apply all clips (Gold Clips + Book) in one pass
+        comp = apply_clips(
+            comp,
+            clips,
+            supersample=3,                   # key for tiny overlays
+            post_unsharp=(0.6, 240, 0),      # per-clip after rotate
+            final_unsharp=(0.35, 110, 1),    # gentle overall after downscale
+            load_clip=lambda path: load_rgba(path) if path in shared_clip_paths else load_image(path),
+        )
+        timings["clips"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    save_mockup(comp, output_path)
+    timings["save"] = time.perf_counter() - start
+    return timings
+
+def save_product_mockup_paths(product_data_path, mockup_paths):
+    """Write mockup_paths back into the product JSON."""
+    with open(product_data_path, 'r') as f:
+        product_data = json.load(f)
+    product_data["mockup_paths"] = mockup_paths
+
+    # Atomic write to avoid partial/corrupt files
+    dir_name = os.path.dirname(product_data_path) or "."
+    with tempfile.NamedTemporaryFile("w", delete=False, dir=dir_name, encoding="utf-8") as tmp:
+        json.dump(product_data, tmp, ensure_ascii=False, indent=2)
+        tmp_path = tmp.name
+    os.replace(tmp_path, product_data_path)
+
 def create_mockups(product_data_path, product_design_path, mockup_list, output_dir="/Users/johnmikedidonato/Library/CloudStorage/GoogleDrive-johnmike@theshapesofstories.com/My Drive/data/product_mockups"):
     
     with open(product_data_path, 'r') as f:  #open product json data that was just created
         product_data = json.load(f)
     product_slug = product_data.get("product_slug")
-    design_background_color = product_data.get("background_color_hex")
-    design_title = product_data.get("title")
-    design_author = product_data.get("author")
-    story_cover_path = product_data.get("cover_data")["cover_path_file"]
 
     mockups_paths_added = []
     for mockup_type in mockup_list:
 
-        mockup_details = MOCKUPS.get(mockup_type, "")
-        if mockup_details == "":
+        if mockup_type not in MOCKUPS:
             print("❌ Mockup: ", mockup_type, " does not exist. Skipping.")
             continue 
 
-        mockup_output_path = f"{output_dir}/{product_slug}-{mockup_details.get('name')}.png"
-
-        if mockup_type == "3x_11x14_wall":
-            
-            #get paths for left and right
-            # deterministically pick two other designs from set pool that have (a) complementary color 
-            left_path, right_path = choose_flanker_paths(
-                product_slug=product_slug,
-                background_hex=design_background_color,
-                title=design_title,
-                author=design_author,
-                mockup_pool=mockup_pool_11x14
-            )
-
-            # slots order is: LEFT, CENTER, RIGHT
-            center_path = product_design_path  # keep the original arg value
-            product_design_path_list = [left_path, center_path, right_path]
-        else:
-            # for non-3x mockups, just use the center art
-            product_design_path_list = [product_design_path]
-
-
-        place_artworks(
-            mockup_path=mockup_details.get("mockup_template_path"),
-            output_path=mockup_output_path,
-            slots=mockup_details.get("slots"),
-            artwork_paths=product_design_path_list,
-            supersample=1,
-            sharpen=True,
-            unsharp=(0.7, 200, 0),
-            lip_width_px=5,
-            lip_feather=0.8,
-        )
-
-        #need to create poster only mockup after initial artworks place
-        if mockup_type == "11x14_poster":
-            out = overlay_clips_exact(
-                base_path=mockup_output_path,
-                clips=[
-                    ClipSpec(
-                        path="/Users/johnmikedidonato/Projects/TheShapesOfStories/mockup_templates/gold-clip@BIG.png",
-                        pos=(230, 30),  
-                        size_px=(65, None),
-                        rotation_deg=-0.2,
-                        anchor="top_center",
-                        shadow_offset=(1, 2),
-                        shadow_blur=2,
-                        shadow_opacity=105
-                    ),
-                    ClipSpec(
-                        path="/Users/johnmikedidonato/Projects/TheShapesOfStories/mockup_templates/gold-clip@BIG.png",
-                        pos=(1560, 30),
-                        size_px=(65, None),
-                        rotation_deg=0.2,
-                        anchor="top_center",
-                        shadow_offset=(1, 2),
-                        shadow_blur=2,
-                        shadow_opacity=105
-                    ),
-                ],
-                output_path=mockup_output_path,
-                supersample=3,                   # key for tiny overlays
-                post_unsharp=(0.6, 240, 0),      # per-clip after rotate
-                final_unsharp=(0.35, 110, 1),    # gentle overall after downscale
-            )
-        elif mockup_type == "11x14_poster_with_cover":
-            objects_to_add=[
-                ClipSpec(
-                    path="/Users/johnmikedidonato/Projects/TheShapesOfStories/mockup_templates/gold-clip@BIG.png",
-                    pos=(230, 30),  
-                    size_px=(65, None),
-                    rotation_deg=-0.2,
-                    anchor="top_center",
-                    shadow_offset=(1, 2),
-                    shadow_blur=2,
-                    shadow_opacity=105
-                ),
-                ClipSpec(
-                    path="/Users/johnmikedidonato/Projects/TheShapesOfStories/mockup_templates/gold-clip@BIG.png",
-                    pos=(1560, 30),
-                    size_px=(65, None),
-                    rotation_deg=0.2,
-                    anchor="top_center",
-                    shadow_offset=(1, 2),
-                    shadow_blur=2,
-                    shadow_opacity=105
-                ),
-            ]
-
-            #add story cover 
-            if story_cover_path and os.path.exists(story_cover_path):
-                objects_to_add.append(
-                    ClipSpec(
-                        path=story_cover_path,
-                        # [ADJUST POS]: (X, Y) pixel coordinates on the base image.
-                        # Since your base is likely ~1700px wide, placing it at 
-                        # bottom-right (e.g., 1400, 2000) creates an overlap.
-                        pos=(1735, 2225), 
-                        
-                        # [ADJUST SIZE]: Width 500px, Height Auto (None). 
-                        # This preserves the aspect ratio of your specific book.
-                        size_px=(420, None), 
-                        
-                        rotation_deg=0,     # Slight tilt looks natural
-                        anchor="bottom_right",       # Coordinates define the center of the book
-
-                        # --- NEW OUTLINE SETTINGS ---
-                        outline_width=3,  # 3px represents the thickness of the pages
-                        outline_color=(245, 245, 240), # Off-white/Cream page color
-                        
-                        # Shadow makes it pop off the poster
-                        add_shadow=True,
-                        shadow_offset=(15, 15), 
-                        shadow_blur=20,
-                        shadow_opacity=140,
-                        trim_transparent_edges=True
-                    )
-                )
-        
-            # Apply all clips (Gold Clips + Book) in one pass
-            overlay_clips_exact(
-                base_path=mockup_output_path,
-                clips=objects_to_add,
-                output_path=mockup_output_path,
-                supersample=3,                   
-                post_unsharp=(0.6, 240, 0),      
-                final_unsharp=(0.35, 110, 1),    
-            )
-
+        mockup_path = mockup_output_path(output_dir, product_slug, mockup_type)
+        render_mockup(product_data, product_design_path, mockup_type, mockup_path)
 
         #added mockup path added 
-        mockups_paths_added.append(mockup_output_path)
+        mockups_paths_added.append(mockup_path)
 
     
     #save mockup_paths_added back to product_data and save
-    product_data["mockup_paths"] = mockups_paths_added
-
-    # Atomic write to avoid partial/corrupt files
-    dir_name = os.path.dirname(product_data_path) or "."
-    with tempfile.NamedTemporaryFile("w", delete=False, dir=dir_name, encoding="utf-8") as tmp:
-        json.dump(product_data, tmp, ensure_ascii=False, indent=2)
-        tmp_path = tmp.name
-    os.replace(tmp_path, product_data_path)
+    save_product_mockup_paths(product_data_path, mockups_paths_added)
 
 
 
@@ -6,7 +6,8 @@ import math
 from shapely.geometry import Polygon
 from shapely.affinity import rotate as shapely_rotate
 import shapely.affinity
-from llm import load_config, get_llm, extract_json
+from llm import load_config, get_llm, get_llm_client, extract_json
+from llm_cache import get_llm_response_cache
 # from langchain.chains import LLMChain
 # from langchain.prompts import PromptTemplate
 from langchain_core.prompts import PromptTemplate, ChatPromptTemplate
@@ -17,11 +18,24 @@ from scipy.interpolate import CubicSpline
 import json
 import os
 import random 
+import hashlib
 import os
 import json
 import matplotlib.font_manager as fm
 from product_color import map_hex_to_simple_color
 
+from glyph_collision import GlyphCollisionIndex, as_collision_index, next_free_slot
+from glyph_obb import glyph_box
+from glyph_metrics import create_pango_context, get_glyph_metrics, load_glyph_metrics, save_glyph_metrics
+from curve_path import CurvePath, as_curve_path
+from render_profiler import active_profiler, as_profiler, profiled, profiling
+from text_fit_predictor import (
+    StoryCanvasMap,
+    predict_component_end,
+    text_advance_length,
+    MAX_PREDICTIONS_PER_COMPONENT
+)
+
 #added 11/29/2025
 from spacing_optimizer import (
     handle_spacing_adjustment_optimized,
@@ -42,9 +56,12 @@ CURRENT_DPI = 300
 MAX_SPACING_ADJUSTMENT_ATTEMPTS = 20 #200
 
 
-def maybe_save(surface, path, output_format, save: bool):
+@profiled("save")
+def maybe_save(surface, path, output_format, save: bool, before_save=None):
     if not save:
         return
+    if before_save is not None:
+        before_save() #e.g. draw glyphs that incremental mode has queued up
     if output_format == "svg":
         surface.flush()
     else:
@@ -110,7 +127,12 @@ def create_shape(
                 recursive_loops = 500,
                 llm_provider = "anthropic",
                 llm_model = "claude-3-5-sonnet-latest",
-                output_format="png"):
+                output_format="png",
+                glyph_metrics_path=None, #optional json file of cached Pango glyph sizes, reused across runs
+                incremental_mode=False, #reuse the glyph layouts of components that already fit (surface, title, borders and wrap bands are still redrawn every pass); off until bench_render_suite.py --incremental matches the baseline hashes
+                speculative_descriptors=0, #>1: fire that many descriptor candidates at once and keep the best fit (0 = one at a time)
+                predictive_fit=False, #solve for the arc end point that fits the text instead of nudging it one step per pass; changes the output, so off until bench_render_suite.py --predictive-fit matches the baseline
+                profile=None): #JSONL path or RenderProfiler: time every pass and trace how the components converge (see render_profiler.py)
     
 
     fonts_to_check = {
@@ -161,9 +183,7 @@ def create_shape(
     else:
         line_style_name = "classic"
     
-    path_name = story_data['title'].lower().replace(' ', '-') + "-" + story_data['protagonist'].lower().replace(' ', '-') + "-" + product.lower().replace(' ', '-') + "-" + str(width_in_inches) + "x" + str(height_in_inches) + "-" + font_style.lower().replace(' ', '-') + "-" + background_color_name.lower().replace(' ', '-') + "-" + font_color_name.lower().replace(' ', '-')
-    path_name = path_name.replace("’", "'")   # Normalize the path to replace curly apostrophes with straight ones
-    path_name = path_name.replace(",", "")    # Normalize the path to replace commas
+    path_name = get_product_path_name(story_data['title'], story_data['protagonist'], product, width_in_inches, height_in_inches, font_style, background_color_name, font_color_name)
     product_data_path_name = path_name
 
     #check_path = f'/Users/johnmikedidonato/Projects/TheShapesOfStories/data/story_data/{path_title}_{path_protagonist}_{path_size}.json'
@@ -198,90 +218,126 @@ def create_shape(
     #print("story_shape_path: ", story_shape_path)
 
    
+    #glyph sizes measured in earlier runs so the loops below don't have to ask Pango
+    if glyph_metrics_path:
+        load_glyph_metrics(glyph_metrics_path)
+
+    #per-component glyph placements carried between loops (see create_shape_single_pass)
+    render_cache = {} if incremental_mode else None
+
+    #off unless asked for (or a caller already has one active, e.g. a benchmark)
+    profiler = as_profiler(profile)
+
     status = "processing"
     story_data['status'] = status
     count = 1
     print("starting...")
-    # while status == "processing":
-    for i in range(recursive_loops):
-        # print(story_data['story_components'][1]['modified_end_time'])
-        print("loop #", i)
-        if story_data is None:
-            print("STORY DATA NONE")
-
-        story_data = transform_story_data(story_data, x_delta, step_k, max_num_steps)
-
-        story_data, status = create_shape_single_pass(
-                    config_path=config_path,
-                    story_data=story_data, 
-                    font_style=font_style,
-                    font_size=font_size,
-                    font_color = font_color,
-                    line_type=line_type,
-                    line_thickness = line_thickness,
-                    line_color = line_color,
-                    background_type=background_type, 
-                    background_value=background_value, 
-                    has_title = has_title,
-                    title_text=title_text,
-                    title_font_style=title_font_style,
-                    title_font_size=title_font_size,
-                    title_font_color = title_font_color,
-                    title_font_bold = title_font_bold, 
-                    title_font_underline = title_font_underline,
-                    title_padding = title_padding,
-                    gap_above_title = gap_above_title,
-                    protagonist_text = protagonist_text,
-                    protagonist_font_style = protagonist_font_style,
-                    protagonist_font_size= protagonist_font_size, 
-                    protagonist_font_color= protagonist_font_color,
-                    protagonist_font_bold = protagonist_font_bold,
-                    protagonist_font_underline = protagonist_font_underline,
-                    author_text=author_text, # Optional, defaults to story_data['author']
-                    author_font_style=author_font_style, # Defaults to title font style if empty
-                    author_font_size=author_font_size, # Suggest smaller than title
-                    author_font_color=author_font_color, # Use hex, defaults to title color
-                    author_font_bold=author_font_bold,
-                    author_font_underline=author_font_underline,
-                    author_padding=author_padding, 
-                    top_text = top_text, #only applies when wrapped > 0; if "" will default to author, year
-                    top_text_font_style = top_text_font_style,
-                    top_text_font_size = top_text_font_size,
-                    top_text_font_color = top_text_font_color,
-                    bottom_text = bottom_text, #only applies when wrapped > 0; if "" will default to "Shapes of Stories"
-                    bottom_text_font_style = bottom_text_font_style,
-                    bottom_text_font_size = bottom_text_font_size,
-                    bottom_text_font_color = bottom_text_font_color,
-                    top_and_bottom_text_band = top_and_bottom_text_band,
-                    border = border,
-                    border_thickness=border_thickness,
-                    border_color=border_color,
-                    width_in_inches=width_in_inches,
-                    height_in_inches=height_in_inches,
-                    wrap_in_inches=wrap_in_inches,
-                    wrap_background_color = wrap_background_color,
-                    fixed_margin_in_inches=fixed_margin_in_inches,
-                    story_shape_path=story_shape_path,
-                    recursive_mode=recursive_mode,
-                    llm_provider = llm_provider,
-                    llm_model = llm_model,
-                    output_format = output_format)
+    try:
+        # while status == "processing":
+        for i in range(recursive_loops):
+            # print(story_data['story_components'][1]['modified_end_time'])
+            print("loop #", i)
+            if story_data is None:
+                print("STORY DATA NONE")
+
+            profiler.start_pass(i)
+            with profiling(profiler):
+                transformed_story_data = transform_story_data(story_data, x_delta, step_k, max_num_steps)
+                if transformed_story_data is None:
+                    #bad component data, or x values no story component covers (transform_story_data prints which)
+                    status = "error"
+                else:
+                    story_data = transformed_story_data
+                    story_data, status = create_shape_single_pass(
+                                config_path=config_path,
+                                story_data=story_data, 
+                                font_style=font_style,
+                                font_size=font_size,
+                                font_color = font_color,
+                                line_type=line_type,
+                                line_thickness = line_thickness,
+                                line_color = line_color,
+                                background_type=background_type, 
+                                background_value=background_value, 
+                                has_title = has_title,
+                                title_text=title_text,
+                                title_font_style=title_font_style,
+                                title_font_size=title_font_size,
+                                title_font_color = title_font_color,
+                                title_font_bold = title_font_bold, 
+                                title_font_underline = title_font_underline,
+                                title_padding = title_padding,
+                                gap_above_title = gap_above_title,
+                                protagonist_text = protagonist_text,
+                                protagonist_font_style = protagonist_font_style,
+                                protagonist_font_size= protagonist_font_size, 
+                                protagonist_font_color= protagonist_font_color,
+                                protagonist_font_bold = protagonist_font_bold,
+                                protagonist_font_underline = protagonist_font_underline,
+                                author_text=author_text, # Optional, defaults to story_data['author']
+                                author_font_style=author_font_style, # Defaults to title font style if empty
+                                author_font_size=author_font_size, # Suggest smaller than title
+                                author_font_color=author_font_color, # Use hex, defaults to title color
+                                author_font_bold=author_font_bold,
+                                author_font_underline=author_font_underline,
+                                author_padding=author_padding, 
+                                top_text = top_text, #only applies when wrapped > 0; if "" will default to author, year
+                                top_text_font_style = top_text_font_style,
+                                top_text_font_size = top_text_font_size,
+                                top_text_font_color = top_text_font_color,
+                                bottom_text = bottom_text, #only applies when wrapped > 0; if "" will default to "Shapes of Stories"
+                                bottom_text_font_style = bottom_text_font_style,
+                                bottom_text_font_size = bottom_text_font_size,
+                                bottom_text_font_color = bottom_text_font_color,
+                                top_and_bottom_text_band = top_and_bottom_text_band,
+                                border = border,
+                                border_thickness=border_thickness,
+                                border_color=border_color,
+                                width_in_inches=width_in_inches,
+                                height_in_inches=height_in_inches,
+                                wrap_in_inches=wrap_in_inches,
+                                wrap_background_color = wrap_background_color,
+                                fixed_margin_in_inches=fixed_margin_in_inches,
+                                story_shape_path=story_shape_path,
+                                recursive_mode=recursive_mode,
+                                llm_provider = llm_provider,
+                                llm_model = llm_model,
+                                output_format = output_format,
+                                render_cache = render_cache,
+                                speculative_descriptors = speculative_descriptors,
+                                predictive_fit = predictive_fit,
+                                x_delta = x_delta,
+                                step_k = step_k,
+                                max_num_steps = max_num_steps)
+            profiler.end_pass(status)
         
-        #print(count, " .) ", status)
-        if(count % 50 == 0):
-            print(count)
+            #print(count, " .) ", status)
+            if(count % 50 == 0):
+                print(count)
 
-        count = count + 1
-        if status == "completed" or status == "error":
-            story_data['status'] = status
-            break
-        #print(story_data['story_components'][1]['modified_end_time'])
+            count = count + 1
+            if status == "completed" or status == "error":
+                story_data['status'] = status
+                break
+            #print(story_data['story_components'][1]['modified_end_time'])
+    except BaseException:
+        profiler.end_pass("error")  #the pass that raised, if one was open
+        raise
+    finally:
+        if isinstance(profile, str):
+            profiler.close()  #write the summary line and close the trace even when a pass raised
 
+    if glyph_metrics_path:
+        save_glyph_metrics(glyph_metrics_path)
+
+    if isinstance(profile, str):
+        print("⏱️ render profile (" + profile + ")")
+        print(profiler.summary_table())
 
 
     #clean up story_data for saving 10/5/2025 -- testing out commenting out 
-    del story_data['x_values']
-    del story_data['y_values']
+    story_data.pop('x_values', None) #missing if the first transform failed
+    story_data.pop('y_values', None)
     for component in story_data['story_components']:
 
         if 'arc_x_values' in component:
@@ -290,6 +346,10 @@ def create_shape(
         if 'arc_y_values' in component:
             del component['arc_y_values']
 
+        #predictive fit bookkeeping (only meaningful while the passes run)
+        component.pop('predictive_fit_text', None)
+        component.pop('predictive_fit_attempts', None)
+
 
     #set new path
     story_data['font_size'] = font_size
@@ -337,6 +397,18 @@ def create_shape(
     return new_story_data_path, story_shape_path
 
 
+def get_product_path_name(title, protagonist, product, width_in_inches, height_in_inches, font_style, background_color_name, font_color_name):
+    """
+    Slug create_shape uses for the product data file (<slug>.json) and, with the
+    line style appended, the design file. Also used by batch_render to tell
+    whether a product has already been rendered.
+    """
+    path_name = title.lower().replace(' ', '-') + "-" + protagonist.lower().replace(' ', '-') + "-" + product.lower().replace(' ', '-') + "-" + str(width_in_inches) + "x" + str(height_in_inches) + "-" + font_style.lower().replace(' ', '-') + "-" + background_color_name.lower().replace(' ', '-') + "-" + font_color_name.lower().replace(' ', '-')
+    path_name = path_name.replace("’", "'")   # Normalize the path to replace curly apostrophes with straight ones
+    path_name = path_name.replace(",", "")    # Normalize the path to replace commas
+    return path_name
+
+
 def create_shape_single_pass(
                 config_path,
                 story_data, 
@@ -392,7 +464,13 @@ def create_shape_single_pass(
                 llm_provider = "anthropic",
                 llm_model = "claude-3-5-sonnet-latest",
                 output_format = "png",
-                save_intermediate=False):
+                save_intermediate=False,
+                render_cache=None,
+                speculative_descriptors=0,
+                predictive_fit=False,
+                x_delta=0.015,
+                step_k=15,
+                max_num_steps=3):
     
     """
     Creates the shape with story data and optionally sets the background 
@@ -410,6 +488,21 @@ def create_shape_single_pass(
     - title_font_style, title_font_size, title_font_color: style for the title
     - width_in_inches, height_in_inches: final image size in inches
     - recursive_mode: whether to keep adjusting arcs if they're too short/long
+    - render_cache: dict kept by create_shape across passes (incremental mode). Components
+      that already fit keep their glyph placements/collision boxes here and are reused as
+      long as their arc, text and spacing (and everything upstream) are unchanged; the first
+      changed component and every one after it are laid out again. Glyphs are only drawn
+      onto the surface once the pass gets to the end (or saves). Only glyph layout is
+      reused: the surface, background, title, borders and wrap bands are redrawn every pass.
+    - speculative_descriptors: if > 1, generate that many descriptor candidates concurrently
+      at a spread of lengths and keep the one whose rendered width best matches the arc
+    - predictive_fit: when an arc is too short/long for its text, jump straight to the end
+      point whose arc length matches the text's glyph advances (text_fit_predictor) instead
+      of moving it one step per pass; the old nudges still run if the prediction misses.
+      Off by default: it lands on different end points, so the output changes. Each
+      prediction is recorded in the profiler trace as a "predicted_fit" event.
+      x_delta, step_k and max_num_steps must match what create_shape passes to
+      transform_story_data so the predicted arc has the same shape as the rendered one.
     """
 
     ### START OF DEBUG ###
@@ -498,7 +591,16 @@ def create_shape_single_pass(
     cr = cairo.Context(surface)
 
     from gi.repository import Pango, PangoCairo
-    pangocairo_context = PangoCairo.create_context(cr)
+    pangocairo_context = create_pango_context(cr)  # surface font options go into the glyph metrics key
+
+    # incremental mode queues glyph placements here and draws them once per pass
+    pending_glyphs = []
+
+    def draw_pending_glyphs():
+        for color, char_positions in pending_glyphs:
+            cr.set_source_rgb(*color)
+            draw_char_positions(cr, font_desc, char_positions)
+        pending_glyphs.clear()
 
     # Calculate dimensions
     design_offset_x = wrap_in_inches * CURRENT_DPI
@@ -680,6 +782,14 @@ def create_shape_single_pass(
     # Create a mapping from original to scaled coordinates
     coordinate_mapping = dict(zip(zip(x_values, y_values), zip(x_values_scaled, y_values_scaled)))
 
+    # same mapping as a function of (end_time, end_fortune_score), for the text fit predictor
+    story_canvas_map = StoryCanvasMap(
+        old_min_x, old_max_x, old_min_y, old_max_y,
+        x_min, y_min, scale_x, scale_y,
+        path_margin_x, path_margin_y_top + path_drawable_h,
+        new_min_x, new_max_x, new_min_y, new_max_y
+    )
+
     # Now ready to draw arcs/text
     title = story_data.get('title', '')
     author = story_data.get('author', '')
@@ -715,12 +825,19 @@ def create_shape_single_pass(
         # font_size_for_300dpi = font_size * (300 / 96)
         # font_desc = Pango.FontDescription(f"{font_style} {font_size_for_300dpi}")
         arc_sample_text = ""
-        all_rendered_boxes = []
+        # spatial index over every glyph box placed in this pass (was a plain list)
+        all_rendered_boxes = GlyphCollisionIndex()
+
+        # incremental mode: reuse a component's cached layout only while everything before it was reused too
+        pass_layout_key = (font_desc.to_string(), margin_x, margin_y, design_width, design_height)
+        upstream_layouts_reused = render_cache is not None
         status = "completed"
 
         last_story_component_index = last_index = len(story_data['story_components']) - 1 
 
+        profiler = active_profiler()
         for index, component in enumerate(story_data['story_components'][1:], start=1):
+            profiler.set_component(index)
             arc_x_values = component.get('arc_x_values', [])
             arc_y_values = component.get('arc_y_values', [])
             description = component.get('description', '')
@@ -735,6 +852,8 @@ def create_shape_single_pass(
                 component['spacing_factor'] = 1
 
             if not arc_x_values or not arc_y_values:
+                if render_cache is not None and render_cache.pop(index, None) is not None:
+                    upstream_layouts_reused = False
                 continue
 
             # Scale arc coordinates
@@ -830,8 +949,9 @@ def create_shape_single_pass(
             # Now set real color for text
             cr.set_source_rgb(*font_color)
 
-            # Calculate arc length
-            arc_length = calculate_arc_length(arc_x_values_scaled, arc_y_values_scaled)
+            # Calculate arc length (the curve lookup is shared by the fit test, layout and spacing optimizer)
+            arc_curve = CurvePath(arc_x_values_scaled, arc_y_values_scaled)
+            arc_length = arc_curve.length
             #ADDING 5/18/2025
             #average_rotation_angle = calculate_average_rotation_angle(arc_x_values_scaled, arc_y_values_scaled)
 
@@ -855,6 +975,8 @@ def create_shape_single_pass(
                     target_chars = component['target_arc_text_chars']
 
                 if target_chars < 5:
+                    if render_cache is not None and render_cache.pop(index, None) is not None:
+                        upstream_layouts_reused = False
                     continue
 
                 if index == 1 or index == last_story_component_index:
@@ -890,24 +1012,44 @@ def create_shape_single_pass(
 
                 #generate descriptors 
                 while descriptors_valid == False and reasonable_descriptiors_attempts <= 5:
-                    descriptors_text = generate_descriptors(
-                        title=story_data['title'],
-                        author=story_data['author'],
-                        protagonist=story_data['protagonist'],
-                        component_description=description,
-                        story_data=story_data,
-                        desired_length=llm_target_chars,
-                        llm_provider=llm_provider,
-                        llm_model=llm_model,
-                        config_path=config_path
-                    )
+                    if speculative_descriptors > 1:
+                        descriptors_text, descriptors_valid, descriptor_message = generate_speculative_descriptors(
+                            title=story_data['title'],
+                            author=story_data['author'],
+                            protagonist=story_data['protagonist'],
+                            component_description=description,
+                            story_data=story_data,
+                            desired_length=llm_target_chars,
+                            lower_bound=lower_bound,
+                            upper_bound=upper_bound,
+                            num_candidates=speculative_descriptors,
+                            arc_length=arc_length,
+                            glyph_metrics=get_glyph_metrics(pangocairo_context, font_desc),
+                            llm_provider=llm_provider,
+                            llm_model=llm_model,
+                            config_path=config_path,
+                            attempt=component.get('arc_text_attempts', 0) + 1
+                        )
+                    else:
+                        descriptors_text = generate_descriptors(
+                            title=story_data['title'],
+                            author=story_data['author'],
+                            protagonist=story_data['protagonist'],
+                            component_description=description,
+                            story_data=story_data,
+                            desired_length=llm_target_chars,
+                            llm_provider=llm_provider,
+                            llm_model=llm_model,
+                            config_path=config_path,
+                            attempt=component.get('arc_text_attempts', 0) + 1
+                        )
 
-                    descriptors_valid, descriptor_message = validate_descriptors(
-                        descriptors_text=descriptors_text,
-                        protagonist=story_data['protagonist'],
-                        lower_bound=lower_bound,
-                        upper_bound=upper_bound
-                    )
+                        descriptors_valid, descriptor_message = validate_descriptors(
+                            descriptors_text=descriptors_text,
+                            protagonist=story_data['protagonist'],
+                            lower_bound=lower_bound,
+                            upper_bound=upper_bound
+                        )
 
                     #update descriptors text immediately if valid 
                     if descriptors_valid == True:
@@ -952,23 +1094,24 @@ def create_shape_single_pass(
                     
                     else:
                         print("#", reasonable_descriptiors_attempts,".) Descriptors NOT Valid: ", descriptors_text, "Target Chars: ", llm_target_chars, " Error: ",  descriptor_message)
+                        nudge = target_nudge_rng(story_data, index, "descriptors", component['arc_text_attempts'])
 
                         if (actual_chars - target_chars) > 50:
-                            llm_target_chars = llm_target_chars - random.randint(20, 30) #if descriptors not even close > 10 chars away
+                            llm_target_chars = llm_target_chars - nudge.randint(20, 30) #if descriptors not even close > 10 chars away
                         elif (actual_chars - target_chars) > 20 and (actual_chars - target_chars) <= 50:
-                            llm_target_chars = llm_target_chars - random.randint(13, 17) #if descriptors not even close > 10 chars away
+                            llm_target_chars = llm_target_chars - nudge.randint(13, 17) #if descriptors not even close > 10 chars away
                         elif (actual_chars - target_chars) > 10 and (actual_chars - target_chars) <= 20:
-                            llm_target_chars = llm_target_chars - random.randint(4, 9) #if descriptors not even close > 10 chars away
+                            llm_target_chars = llm_target_chars - nudge.randint(4, 9) #if descriptors not even close > 10 chars away
                         elif (actual_chars - target_chars) > 5 and (actual_chars - target_chars) <= 10:
-                            llm_target_chars = llm_target_chars - random.randint(3, 5) #if descriptors not even close > 10 chars away
+                            llm_target_chars = llm_target_chars - nudge.randint(3, 5) #if descriptors not even close > 10 chars away
                         elif (actual_chars - target_chars) > 0 and (actual_chars - target_chars) <= 5:
-                            llm_target_chars = llm_target_chars - random.randint(1, 2) #if descriptors not even close > 10 chars away
+                            llm_target_chars = llm_target_chars - nudge.randint(1, 2) #if descriptors not even close > 10 chars away
                         elif (actual_chars - target_chars) < 0 and (actual_chars - target_chars) >= -5:
-                            llm_target_chars = llm_target_chars + random.randint(1, 2)
+                            llm_target_chars = llm_target_chars + nudge.randint(1, 2)
                         elif (actual_chars - target_chars) < -5 and (actual_chars - target_chars) >= -10:
-                            llm_target_chars = llm_target_chars + random.randint(3, 4)
+                            llm_target_chars = llm_target_chars + nudge.randint(3, 4)
                         elif (actual_chars - target_chars) < -10:
-                            llm_target_chars = llm_target_chars + random.randint(4, 5)
+                            llm_target_chars = llm_target_chars + nudge.randint(4, 5)
                     
                     reasonable_descriptiors_attempts = reasonable_descriptiors_attempts + 1
 
@@ -1020,21 +1163,53 @@ def create_shape_single_pass(
             
             
             # Draw text on curve
-            curve_length_status = draw_text_on_curve(
-                cr=cr,
-                x_values_scaled=arc_x_values_scaled,
-                y_values_scaled=arc_y_values_scaled,
-                text=descriptors_text,
-                pangocairo_context=pangocairo_context,
-                font_desc=font_desc,
-                all_rendered_boxes=all_rendered_boxes,
-                margin_x=margin_x, 
-                margin_y=margin_y, 
-                design_width=design_width, 
-                design_height=design_height,
-                spaces_width_multiplier=component['spaces_width_multiplier'],
-                adjust_spacing=component['adjust_spacing']
-            )
+            cached_layout = None
+            if render_cache is not None:
+                layout_key = component_layout_key(pass_layout_key, arc_x_values_scaled, arc_y_values_scaled,
+                                                  descriptors_text, component['spaces_width_multiplier'], component['adjust_spacing'])
+                cached_layout = render_cache.get(index)
+                if not (upstream_layouts_reused and cached_layout is not None and cached_layout['key'] == layout_key):
+                    cached_layout = None
+                    upstream_layouts_reused = False
+
+            if cached_layout is not None:
+                # frozen component: same arc, text, spacing and upstream boxes as last pass
+                for box in cached_layout['boxes']:
+                    all_rendered_boxes.insert(box)
+                pending_glyphs.append((font_color, cached_layout['char_positions']))
+                curve_length_status = cached_layout['status']
+            else:
+                placement = {} if render_cache is not None else None
+                curve_length_status = draw_text_on_curve(
+                    cr=cr,
+                    x_values_scaled=arc_x_values_scaled,
+                    y_values_scaled=arc_y_values_scaled,
+                    text=descriptors_text,
+                    pangocairo_context=pangocairo_context,
+                    font_desc=font_desc,
+                    all_rendered_boxes=all_rendered_boxes,
+                    margin_x=margin_x, 
+                    margin_y=margin_y, 
+                    design_width=design_width, 
+                    design_height=design_height,
+                    spaces_width_multiplier=component['spaces_width_multiplier'],
+                    adjust_spacing=component['adjust_spacing'],
+                    render=render_cache is None,
+                    placement=placement,
+                    curve=arc_curve
+                )
+                if render_cache is not None:
+                    pending_glyphs.append((font_color, placement['char_positions']))
+                    if curve_length_status == "curve_correct_length":
+                        render_cache[index] = {
+                            'key': layout_key,
+                            'status': curve_length_status,
+                            'char_positions': placement['char_positions'],
+                            'boxes': placement['boxes'],
+                        }
+                    else:
+                        render_cache.pop(index, None)
+            profiler.component_status(index, curve_length_status)
 
             # Around line 1030 in create_shape_single_pass
             if component['spaces_width_multiplier']:  # Check if dict is not empty
@@ -1044,6 +1219,47 @@ def create_shape_single_pass(
                 # No spaces in the text, so no spacing multipliers to check
                 min_space_multipler = 1.0
                 max_space_multipler = 1.0
+
+            #ADDED: predictive fit -- solve for the end point whose arc is as long as the text
+            #instead of moving it one step per pass; capped so a miss falls back to the nudges below
+            def predict_fitting_end(curve_length_status):
+                if not predictive_fit or not recursive_mode or component['adjust_spacing'] == True:
+                    return None
+                if component.get('predictive_fit_text') != descriptors_text:
+                    component['predictive_fit_text'] = descriptors_text
+                    component['predictive_fit_attempts'] = 0
+                if component['predictive_fit_attempts'] >= MAX_PREDICTIONS_PER_COMPONENT:
+                    return None
+                # moving a story's extreme point rescales every arc, which the prediction can't account for
+                if not (old_min_x < original_arc_end_time_values[-1] < old_max_x
+                        and old_min_y < original_arc_end_fortune_score_values[-1] < old_max_y):
+                    return None
+                component['predictive_fit_attempts'] += 1
+
+                text_length = text_advance_length(
+                    descriptors_text,
+                    get_glyph_metrics(pangocairo_context, font_desc),
+                    component['spaces_width_multiplier'],
+                    component['adjust_spacing']
+                )
+                prediction = predict_component_end(
+                    curve_length_status,
+                    text_length,
+                    get_average_char_width(pangocairo_context, font_desc, descriptors_text),
+                    original_arc_end_time_values,
+                    original_arc_end_fortune_score_values,
+                    component.get('arc'),
+                    story_canvas_map,
+                    get_component_arc_function_vectorized,
+                    x_delta, step_k, max_num_steps
+                )
+                if prediction is None:
+                    return None
+                predicted_end_time, predicted_end_score, predicted_length = prediction
+                active_profiler().event("predicted_fit", arc_px=float(arc_length), predicted_px=float(predicted_length),
+                                         text_px=float(text_length))
+                return predicted_end_time, predicted_end_score
+
             #print(curve_length_status)
             # Check if curve too short/long, do your recursion logic...
             if curve_length_status == "curve_too_short":
@@ -1102,11 +1318,12 @@ def create_shape_single_pass(
                             old_max_x=old_max_x,
                             old_min_y=old_min_y,
                             old_max_y=old_max_y,
-                            recursive_mode=recursive_mode
+                            recursive_mode=recursive_mode,
+                            curve=arc_curve
                         )
                         if success:
                             component['status'] = "spacing_optimized_short_segment"
-                            maybe_save(surface, story_shape_path, output_format, save_intermediate)
+                            maybe_save(surface, story_shape_path, output_format, save_intermediate, before_save=draw_pending_glyphs)
                             return story_data, "processing"
                     
                     # If spacing didn't work, regenerate with fewer chars
@@ -1116,6 +1333,12 @@ def create_shape_single_pass(
                     return story_data, "processing"  # Retry, don't fail!
 
 
+                predicted_end = predict_fitting_end(curve_length_status)
+                if predicted_end is not None:
+                    component['modified_end_time'], component['modified_end_fortune_score'] = predicted_end
+                    maybe_save(surface, story_shape_path, output_format, save_intermediate, before_save=draw_pending_glyphs)
+                    return story_data, "processing"
+
                 #print("X: ", x_og)
                 cs = CubicSpline(x_og, y_og, extrapolate=True)
                 new_x = x_og[-1] + (x_og[1] - x_og[0])
@@ -1132,7 +1355,7 @@ def create_shape_single_pass(
                     component['modified_end_time'] = new_x
                     component['modified_end_fortune_score'] = new_y
                     
-                    maybe_save(surface, story_shape_path, output_format, save_intermediate)
+                    maybe_save(surface, story_shape_path, output_format, save_intermediate, before_save=draw_pending_glyphs)
 
                     if story_data is None:
                         print("STORY DATA NONE -- 12")
@@ -1148,7 +1371,7 @@ def create_shape_single_pass(
                     component['modified_end_time'] = new_x
                     component['modified_end_fortune_score'] = new_y
 
-                    maybe_save(surface, story_shape_path, output_format, save_intermediate)
+                    maybe_save(surface, story_shape_path, output_format, save_intermediate, before_save=draw_pending_glyphs)
 
                     if story_data is None:
                         print("STORY DATA NONE -- 13")
@@ -1163,7 +1386,7 @@ def create_shape_single_pass(
                     component['modified_end_time'] = new_x
                     component['modified_end_fortune_score'] = new_y
 
-                    maybe_save(surface, story_shape_path, output_format, save_intermediate)
+                    maybe_save(surface, story_shape_path, output_format, save_intermediate, before_save=draw_pending_glyphs)
 
                     if story_data is None:
                         print("STORY DATA NONE -- 1")
@@ -1223,12 +1446,13 @@ def create_shape_single_pass(
                         old_max_x=old_max_x,
                         old_min_y=old_min_y,
                         old_max_y=old_max_y,
-                        recursive_mode=recursive_mode
+                        recursive_mode=recursive_mode,
+                        curve=arc_curve
                     )
                     
                     if success:
                         component['status'] = "spacing_optimized"
-                        maybe_save(surface, story_shape_path, output_format, save_intermediate)
+                        maybe_save(surface, story_shape_path, output_format, save_intermediate, before_save=draw_pending_glyphs)
                         if story_data is None:
                             print("STORY DATA NONE -- 2")
                         return story_data, "processing"
@@ -1239,14 +1463,14 @@ def create_shape_single_pass(
                         component['arc_text_valid_message'] = "spacing failed - need more characters"
                         # INCREASE target since curve is too short (need longer text to fill it)
                         old_target = component.get('target_arc_text_chars', 50)
-                        component['target_arc_text_chars'] = max(5, old_target - random.randint(2, 4))
+                        component['target_arc_text_chars'] = max(5, old_target - target_nudge_rng(story_data, index, "spacing_short", component.get('arc_text_attempts', 0)).randint(2, 4))
                         print(f"   → Increasing target chars: {old_target} → {component['target_arc_text_chars']}")
-                        maybe_save(surface, story_shape_path, output_format, save_intermediate)
+                        maybe_save(surface, story_shape_path, output_format, save_intermediate, before_save=draw_pending_glyphs)
                         return story_data, "processing"
 
                 else: #this means: "curve too short but can't change due to constraints"
                     #so we actually want less chars than we initially thought
-                    maybe_save(surface, story_shape_path, output_format, save_intermediate)
+                    maybe_save(surface, story_shape_path, output_format, save_intermediate, before_save=draw_pending_glyphs)
 
 
                     if component['arc_manual_override'] == True:
@@ -1277,6 +1501,12 @@ def create_shape_single_pass(
                 #an alternative apprach is instead of defining num of point you could define x_delta size and infer num of points
                 original_arc_end_time_index_length = len(original_arc_end_time_values) - 3
                 original_arc_end_fortune_score_index_length = len(original_arc_end_fortune_score_values) - 3
+
+                predicted_end = predict_fitting_end(curve_length_status)
+                if predicted_end is not None:
+                    component['modified_end_time'], component['modified_end_fortune_score'] = predicted_end
+                    maybe_save(surface, story_shape_path, output_format, save_intermediate, before_save=draw_pending_glyphs)
+                    return story_data, "processing"
                 
                 #print(original_arc_end_time_values[original_arc_end_time_index_length], " : ", original_arc_end_fortune_score_values[original_arc_end_fortune_score_index_length])
 
@@ -1294,7 +1524,7 @@ def create_shape_single_pass(
                     component['modified_end_time'] = original_arc_end_time_values[original_arc_end_time_index_length]
                     component['modified_end_fortune_score'] = original_arc_end_fortune_score_values[original_arc_end_fortune_score_index_length]
                     
-                    maybe_save(surface, story_shape_path, output_format, save_intermediate)
+                    maybe_save(surface, story_shape_path, output_format, save_intermediate, before_save=draw_pending_glyphs)
 
                     if story_data is None:
                         print("STORY DATA NONE -- 4")
@@ -1313,7 +1543,7 @@ def create_shape_single_pass(
                     component['modified_end_time'] = original_arc_end_time_values[-1]
                     component['modified_end_fortune_score'] = original_arc_end_fortune_score_values[original_arc_end_fortune_score_index_length]
                     
-                    maybe_save(surface, story_shape_path, output_format, save_intermediate)
+                    maybe_save(surface, story_shape_path, output_format, save_intermediate, before_save=draw_pending_glyphs)
 
                     if story_data is None:
                         print("STORY DATA NONE -- 5")
@@ -1391,12 +1621,13 @@ def create_shape_single_pass(
                         old_max_x=old_max_x,
                         old_min_y=old_min_y,
                         old_max_y=old_max_y,
-                        recursive_mode=recursive_mode
+                        recursive_mode=recursive_mode,
+                        curve=arc_curve
                     )
                     
                     if success:
                         component['status'] = "spacing_optimized"
-                        maybe_save(surface, story_shape_path, output_format, save_intermediate)
+                        maybe_save(surface, story_shape_path, output_format, save_intermediate, before_save=draw_pending_glyphs)
                         if story_data is None:
                             print("STORY DATA NONE -- 6")
                         return story_data, "processing"
@@ -1407,15 +1638,15 @@ def create_shape_single_pass(
                         component['arc_text_valid_message'] = "spacing failed - need fewer characters"
                         # DECREASE target since curve is too long (need shorter text)
                         old_target = component.get('target_arc_text_chars', 50)
-                        component['target_arc_text_chars'] = old_target + random.randint(2, 4)
+                        component['target_arc_text_chars'] = old_target + target_nudge_rng(story_data, index, "spacing_long", component.get('arc_text_attempts', 0)).randint(2, 4)
                         print(f"   → Decreasing target chars: {old_target} → {component['target_arc_text_chars']}")
-                        maybe_save(surface, story_shape_path, output_format, save_intermediate)
+                        maybe_save(surface, story_shape_path, output_format, save_intermediate, before_save=draw_pending_glyphs)
                         return story_data, "processing"
 
                 else: # this means: curve too long but can't change due to constraints
                     # so we want more chars than we initially thought so let's up the number of chars
                     # so we need recalc descriptors and ask for longer 
-                    maybe_save(surface, story_shape_path, output_format, save_intermediate)
+                    maybe_save(surface, story_shape_path, output_format, save_intermediate, before_save=draw_pending_glyphs)
 
                     if component['arc_manual_override'] == True:
                         status = 'Manual Override'
@@ -1436,13 +1667,16 @@ def create_shape_single_pass(
                         return story_data, "processing"
 
             elif curve_length_status == "curve_correct_length":
-                maybe_save(surface, story_shape_path, output_format, save_intermediate)
+                maybe_save(surface, story_shape_path, output_format, save_intermediate, before_save=draw_pending_glyphs)
 
                 status = 'All phrases fit exactly on the curve.'
 
             component['status'] = status
 
 
+        profiler.set_component(None)
+        draw_pending_glyphs()
+
         # --- MODIFICATION: End main text group ---
         end_svg_group(cr, output_format)
         # -----------------------------------------
@@ -1651,10 +1885,11 @@ def create_shape_single_pass(
 
     
     # 7) Save final image
-    if output_format == "svg":
-        surface.finish()
-    else:
-        surface.write_to_png(story_shape_path)
+    with active_profiler().section("save"):
+        if output_format == "svg":
+            surface.finish()
+        else:
+            surface.write_to_png(story_shape_path)
 
     # 8) QUICK AUDIT (skip for SVG)
     if output_format == "png":
@@ -1683,18 +1918,8 @@ def calculate_arc_length(arc_x_values, arc_y_values):
     return total_length
 
 def get_average_char_width(pangocairo_context, font_desc, sample_text=None):
-    layout = Pango.Layout.new(pangocairo_context)
-    layout.set_font_description(font_desc)
-
-    if sample_text is None or sample_text == "":
-        sample_text = (
-            "Nervous. First Day. Office. Challenges. Potential."
-        )
-    layout.set_text(sample_text, -1)
-    total_width = layout.get_pixel_size()[0]
-    num_chars = len(sample_text.replace(" ", ""))
-    average_char_width = total_width / num_chars
-    return average_char_width
+    # measured once per (font, text) via the shared glyph metrics cache
+    return get_glyph_metrics(pangocairo_context, font_desc).average_char_width(sample_text)
 
 
 def estimate_characters_fit(arc_length, average_char_width, average_rotation_angle=0, spacing=1.0):
@@ -1713,8 +1938,23 @@ def calculate_average_rotation_angle(x_values, y_values):
     return average_angle
 
 
-def generate_descriptors(title, author, protagonist, component_description, story_data, desired_length, llm_provider, llm_model, config_path):
+@profiled("llm")
+def generate_descriptors(title, author, protagonist, component_description, story_data, desired_length, llm_provider, llm_model, config_path, attempt=1):
+    prompt, inputs = build_descriptor_prompt(title, author, protagonist, component_description, story_data)
+    config = load_config(config_path=config_path)
+
+    # goes through the async client so create_shape loops get provider limits + retries.
+    # attempt is part of the cache key: a retry for the same prompt wants a fresh answer,
+    # but a re-render with the same inputs replays the same sequence of answers
+    llm_client = get_llm_client(llm_provider, llm_model, config, max_tokens=500, response_cache=get_llm_response_cache(config))
+    output_text = llm_client.invoke(prompt, dict(inputs, desired_length=desired_length), cache_variant=attempt)
     
+    output_text = output_text.strip()
+    return output_text
+
+
+def build_descriptor_prompt(title, author, protagonist, component_description, story_data):
+    """Descriptor prompt and its inputs (everything except desired_length)."""
     existing_arc_texts = "\n".join(
         component.get('arc_text', '') 
         for component in story_data['story_components'] 
@@ -1846,31 +2086,94 @@ Respond with ONLY the descriptor text, exactly {desired_length} characters. No e
         input_variables=["desired_length", "author", "title", "protagonist", "component_description", "existing_arc_texts"],  # Define the expected inputs
         template=prompt_template
     )
-    config = load_config(config_path=config_path)
-    llm = get_llm(llm_provider, llm_model, config, max_tokens=500)
-
-     # Instead of building an LLMChain, use the pipe operator:
-    runnable = prompt | llm
-
-    # Then invoke with the required inputs:
-    output = runnable.invoke({
-        "desired_length": desired_length,
+    return prompt, {
         "author": author,
         "title": title,
         "protagonist": protagonist,
         "component_description":component_description,
         "existing_arc_texts":existing_arc_texts,
-    })
+    }
 
-    #print(output)
-    # If the output is an object with a 'content' attribute, extract it.
-    if hasattr(output, "content"):
-        output_text = output.content
-    else:
-        output_text = output
-    
-    output_text = output_text.strip()
-    return output_text
+
+def descriptor_target_spread(target_chars, num_candidates):
+    """
+    Target lengths for speculative descriptor generation: the target itself, then
+    alternating shorter / longer by ~8% of the target (at least 2 chars).
+    """
+    step = max(2, int(round(target_chars * 0.08)))
+    targets = [target_chars]
+    offset = 1
+    while len(targets) < num_candidates:
+        for sign in (-1, 1):
+            candidate = target_chars + sign * offset * step
+            if candidate >= 5 and candidate not in targets and len(targets) < num_candidates:
+                targets.append(candidate)
+        offset += 1
+        if offset > num_candidates + 5:
+            break
+    return targets
+
+
+def target_nudge_rng(story_data, component_index, purpose, attempt):
+    """
+    Random source for the retry nudges to a component's target length, seeded
+    from the story, component, purpose and attempt: a re-render asks the LLM
+    for the same lengths, so the LLM cache's replay mode has every response.
+    """
+    seed = f"{story_data['title']}|{story_data['protagonist']}|{component_index}|{purpose}|{attempt}"
+    return random.Random(int(hashlib.sha1(seed.encode("utf-8")).hexdigest(), 16))
+
+
+@profiled("llm")
+def generate_speculative_descriptors(title, author, protagonist, component_description, story_data, desired_length,
+                                     lower_bound, upper_bound, num_candidates, arc_length, glyph_metrics,
+                                     llm_provider, llm_model, config_path, attempt=1):
+    """
+    Fire num_candidates descriptor requests at once (spread around desired_length),
+    validate each against the caller's lower_bound / upper_bound, and keep the valid
+    one whose laid-out length (the glyph advances draw_text_on_curve steps by) is
+    closest to the arc length. One wall-clock LLM round trip instead of up to 5
+    sequential ones.
+
+    Returns the same shape as validate_descriptors, plus the text:
+        (descriptors_text, is_valid, fixed_text_or_error_message)
+    If nothing validates, returns the candidate closest to desired_length so the
+    caller's retry nudging still has something to work with.
+    """
+    prompt, inputs = build_descriptor_prompt(title, author, protagonist, component_description, story_data)
+    config = load_config(config_path=config_path)
+    llm_client = get_llm_client(llm_provider, llm_model, config, max_tokens=500, response_cache=get_llm_response_cache(config))
+
+    targets = descriptor_target_spread(desired_length, num_candidates)
+    outputs = llm_client.batch(
+        [(prompt, dict(inputs, desired_length=target), attempt) for target in targets],
+        return_exceptions=True,
+    )
+
+    best = None        # (width error, text, fixed_text)
+    closest = None     # (length error, text, message) among the invalid ones
+    for target, output in zip(targets, outputs):
+        if isinstance(output, Exception):
+            print(f"Descriptor candidate ({target} chars) failed: {output}")
+            continue
+        text = output.strip()
+        is_valid, message = validate_descriptors(text, protagonist, lower_bound, upper_bound)
+        if is_valid:
+            width_error = abs(text_advance_length(message, glyph_metrics) - arc_length)
+            if best is None or width_error < best[0]:
+                best = (width_error, text, message)
+        else:
+            length_error = abs(len(text) - desired_length)
+            if closest is None or length_error < closest[0]:
+                closest = (length_error, text, message)
+
+    print(f"Speculative descriptors: {len(targets)} candidates at {targets}, "
+          f"{'best width error ' + str(round(best[0])) + 'px' if best else 'none valid'}")
+    if best is not None:
+        return best[1], True, best[2]
+    if closest is not None:
+        return closest[1], False, closest[2]
+    return "", False, "Empty descriptor text"
 
 import numpy as np
 import math
@@ -1902,18 +2205,13 @@ def get_standard_space_width(pangocairo_context, font_desc):
     Gets the pixel width of a standard space character for the given font,
     without any dynamic char_spacing_factor or space_width_multiplier applied.
     """
-    layout = Pango.Layout.new(pangocairo_context)
-    layout.set_font_description(font_desc)
-    layout.set_text(" ", -1)  # A single space character
-    width, _ = layout.get_pixel_size()
-    # It's possible for a font to have a zero-width space, handle defensively.
-    return width if width > 0 else 1 # Return at least 1px to avoid division by zero later
+    # Zero-width spaces come back as 1px to avoid division by zero later
+    return get_glyph_metrics(pangocairo_context, font_desc).space_width()
 
 
 
 #### THE OLD STORY FUNCTION CODE ###
 
-import pandas as pd
 import numpy as np
 import json
 import itertools
@@ -1965,458 +2263,253 @@ def scale_y_values(y_values, new_min, new_max):
 
 
 def get_component_arc_function(x1, x2, y1, y2, arc, step_k=15, max_num_steps=3):
+    """
+    One x at a time view of get_component_arc_function_vectorized: the returned
+    function gives the arc's y at x, or None outside [x1, x2].
+    """
+    arc_function = get_component_arc_function_vectorized(x1, x2, y1, y2, arc, step_k, max_num_steps)
 
-    def exponential_step_function(x):
-        # 1) If out of range, return None
-        if not (x1 <= x <= x2):
-            return None
-        
-        # 2) Decide how many steps you want
-        # num_steps = int(math.ceil(x2 - x1))
-        # if num_steps < 1:
-        #     num_steps = 1
-        # elif num_steps > 3:
-        #     num_steps = 3
-
-
-        # distance = math.hypot(x2 - x1, y2 - y1)  # sqrt(dx^2 + dy^2)
-        # # Then map distance to [1..3] steps, for example:
-        # if distance < 1:
-        #     num_steps = 1
-        # elif distance < 3:
-        #     num_steps = 2
-        # else:
-        #     num_steps = 3
+    def component_arc_function(x):
+        y = arc_function(np.array([x], dtype=float))[0]
+        return None if np.isnan(y) else float(y)
+    return component_arc_function
 
-        dx = abs(x2 - x1)
-        dy = abs(y2 - y1)
 
-        if dx == 0:
-            # Avoid dividing by zero
-            slope = float('inf')
-        else:
-            slope = dy / dx
+def get_component_arc_function_vectorized(x1, x2, y1, y2, arc, step_k=15, max_num_steps=3):
+    """
+    The y values of one story component's arc: the returned function takes a
+    whole array of x values and returns a float array of y values, with NaN
+    outside [x1, x2].
 
-        # Example rule:
-        # - if slope is small (< ~ 0.5), only 1 step
-        # - if slope is moderate, use 2 steps
-        # - if slope is steep, use 3 steps
+    Anything that only depends on (x1, x2, y1, y2) -- step counts, np.linspace
+    edges, curve coefficients -- is worked out once here instead of on every call.
+    """
+
+    def _domain(x):
+        x = np.asarray(x, dtype=float)
+        return x, np.full(x.shape, np.nan), (x1 <= x) & (x <= x2)
 
+    def _num_steps_from_slope():
+        dx = abs(x2 - x1)
+        dy = abs(y2 - y1)
+        slope = float('inf') if dx == 0 else dy / dx
         if slope < 0.5:
-            num_steps = 1
+            return 1
         elif slope < 3.0:
-            num_steps = 2
-        else:
-            num_steps = max_num_steps
-        
-        
-        # 3) We create the sub-intervals
-        x_edges = np.linspace(x1, x2, num_steps + 1)  # e.g. [x1, x1+1, x1+2, ..., x2]
-        # total change in y is (y2 - y1)
+            return 2
+        return max_num_steps
+
+    def exponential_step_function(x):
+        x, y, inside = _domain(x)
+        num_steps = exp_num_steps
         dy = (y2 - y1) / num_steps
-        
-        # 4) Find which step i such that x_edges[i] <= x <= x_edges[i+1]
-        # e.g. loop or use a quick search:
+        unassigned = inside.copy()
         for i in range(num_steps):
-            start = x_edges[i]
-            end   = x_edges[i+1]
-            
-            if start <= x <= end:
-                # y_base is the bottom of step i
-                y_base = y1 + i * dy
-                
-                # now define an exponential from y_base up to y_base + dy
-                # choose a k (steepness)
-                k = step_k  # or 10, or something user-chosen
-                # map x into [0..1] for exponential
-                alpha = (x - start) / (end - start)  # 0 to 1
-                # standard increase formula:
-                local_y = y_base + dy * (1 - math.exp(-k * alpha))
-                return local_y
-        
-        # If x somehow equals x2 exactly, let's ensure we return y2
-        return y2
-
+            start, end = exp_x_edges[i], exp_x_edges[i + 1]
+            in_step = unassigned & (start <= x) & (x <= end)
+            alpha = (x[in_step] - start) / (end - start)
+            y[in_step] = (y1 + i * dy) + dy * (1 - np.exp(-step_k * alpha))
+            unassigned &= ~in_step
+        y[unassigned] = y2
+        return y
 
     def s_curve_step_function(x):
-        """
-        Returns an S-curve-based step interpolation for the interval [x1, x2],
-        subdivided into multiple 'step' segments. Each sub-interval uses a
-        smoothstep function for a gentle transition, rather than a sharp jump.
-
-        Args:
-            x (float): The x-value at which we want the interpolated y.
-            x1, x2 (float): The start and end x-values of the overall segment.
-            y1, y2 (float): The start and end y-values at x1 and x2.
-            max_num_steps (int): Maximum number of steps to use for steep slopes.
-            step_k (float): Optional steepness factor for controlling how sharply
-                            the step transitions occur.
-
-        Returns:
-            float or None:
-                - The interpolated y-value if x is within [x1, x2].
-                - None if x is outside that range.
-
-        Behavior:
-            1. Computes slope = (|y2 - y1| / |x2 - x1|).
-            2. Decides how many sub-steps to create:
-            - If slope < 0.5, use 1 step.
-            - If slope < 3.0, use min(2, max_num_steps).
-            - Else, use max_num_steps.
-            3. Splits [x1, x2] into 'num_steps' sub-intervals (x_edges).
-            4. For each sub-interval, uses a smoothstep-like function to
-            ease from the sub-interval's base (y_base) to y_base + (dy).
-            5. Returns y2 if x == x2 exactly (to handle any rounding issues).
-
-        Example:
-            Suppose (x1, y1) = (0, 0), (x2, y2) = (10, 5), and slope is moderate.
-            We might get 2 steps:
-                - Step 1 covers x in [0..5], step 2 covers x in [5..10].
-                - Within each step, we do a smooth S-curve from y_base to y_base + dy.
-        """
-
-        # 1) If x is out of [x1, x2], return None.
-        if not (min(x1, x2) <= x <= max(x1, x2)):
-            return None
-
-        # 2) Handle the edge case where x1 == x2.
+        x = np.asarray(x, dtype=float)
+        y = np.full(x.shape, np.nan)
+        inside = (min(x1, x2) <= x) & (x <= max(x1, x2))
         dx = x2 - x1
-        if abs(dx) < 1e-12:  # effectively vertical line
-            # If x1 == x2 and x is that same value, just return y1 (or y2).
-            return y1
+        if abs(dx) < 1e-12:
+            y[inside] = y1
+            return y
 
-        # 3) Calculate slope and decide number of steps.
         dy_abs = abs(y2 - y1)
-        slope = float('inf') if abs(dx) < 1e-12 else (dy_abs / abs(dx))
-
+        slope = dy_abs / abs(dx)
         if slope < 0.5:
             num_steps = 1
         elif slope < 3.0:
-            #num_steps = min(2, max_num_steps)
             num_steps = 2
         else:
             num_steps = max_num_steps
 
-        # 4) Subdivide the interval [x1, x2].
         x_edges = np.linspace(x1, x2, num_steps + 1)
-        total_dy = (y2 - y1)
-        dy_per_step = total_dy / num_steps
-
-        # 5) Identify which sub-interval x falls into.
+        dy_per_step = (y2 - y1) / num_steps
+        n = max(1.0, step_k / 10.0)
+        unassigned = inside.copy()
         for i in range(num_steps):
             start, end = x_edges[i], x_edges[i + 1]
-
-            # Ensure start <= end for the loop logic, even if x2 < x1.
             if start > end:
                 start, end = end, start
-
-            if start <= x <= end:
-                # Base y for this step
-                y_base = y1 + i * dy_per_step
-
-                # alpha in [0..1] within this sub-interval
-                alpha = (x - x_edges[i]) / (x_edges[i + 1] - x_edges[i])
-
-                # Option A: Standard smoothstep
-                # local_y = y_base + dy_per_step * (alpha**2 * (3 - 2*alpha))
-
-                # Option B: Use step_k to adjust steepness if desired.
-                # The code below is a simple variation: alpha^(n) * ( (n+1) - n*alpha ).
-                # Adjust n = step_k / 10.0 or pick your own formula.
-                n = max(1.0, step_k / 10.0)  # avoid n=0
-                smooth_factor = (alpha**n) * ((n + 1) - n * alpha)
-
-                local_y = y_base + dy_per_step * smooth_factor
-                return local_y
-
-        # 6) If we got here, x might be exactly x2 (float rounding).
-        return y2
-
+            in_step = unassigned & (start <= x) & (x <= end)
+            alpha = (x[in_step] - x_edges[i]) / (x_edges[i + 1] - x_edges[i])
+            smooth_factor = (alpha**n) * ((n + 1) - n * alpha)
+            y[in_step] = (y1 + i * dy_per_step) + dy_per_step * smooth_factor
+            unassigned &= ~in_step
+        y[unassigned] = y2
+        return y
 
     def smooth_step_function(x):
-        if x1 <= x <= x2:
-            #num_steps = int((x2) - (x1))
-            num_steps = int(math.ceil(x2 - x1))
-            #print(x2, " ", x1)
-            if num_steps < 1:
-                num_steps = 2  # Ensure at least one step
-            elif num_steps > 3:
-                num_steps = 3
-            #num_steps = 2
-
-            # Calculate the positions of the steps
-            step_edges = np.linspace(x1, x2, num_steps + 1)
-            step_height = (y2 - y1) / num_steps
-
-            # Define smoothing width as a fraction of step width
-            step_width = (x2 - x1) / num_steps
-            smoothing_fraction = 0.5 # Adjust this value between 0 and 0.5
-            smoothing_width = smoothing_fraction * step_width
-
-            # Determine which step we're in
-            for i in range(num_steps):
-                start = step_edges[i]
-                end = step_edges[i + 1]
-                y_base = y1 + i * step_height
-
-                # If we're within the smoothing region at the end of the step
-                if end - smoothing_width <= x <= end:
-                    t = (x - (end - smoothing_width)) / smoothing_width
-                    # Smoothstep interpolation
-                    transition = t**2 * (3 - 2 * t)
-                    return y_base + step_height * transition
-                # If we're within the flat part of the step
-                elif start <= x < end - smoothing_width:
-                    return y_base
-            return y2  # In case x == x2
-        else:
-            return None
+        x, y, inside = _domain(x)
+        num_steps = int(math.ceil(x2 - x1))
+        if num_steps < 1:
+            num_steps = 2
+        elif num_steps > 3:
+            num_steps = 3
+        step_edges = np.linspace(x1, x2, num_steps + 1)
+        step_height = (y2 - y1) / num_steps
+        smoothing_width = 0.5 * ((x2 - x1) / num_steps)
 
-    def smooth_exponential_decrease_function(x):
-        # Only define behavior in the interval [x1, x2]
-        if x1 <= x <= x2:
-            # We want the function to rapidly drop from y1 at x1 and approach y2 as x approaches x2.
-            # Let's choose k so that at x2 we're close to y2, say within 1%:
-            # exp(-k*(x2-x1)) = 0.01 -> -k*(x2-x1)=ln(0.01) -> k = -ln(0.01)/(x2-x1)
-            # ln(0.01) ~ -4.60517, so k ≈ 4.6/(x2-x1).
-            # You can adjust this factor (4.6) if you want a different "steepness".
-            if x2 > x1:  
-                k = 15 / (x2 - x1)
-            else:
-                # Avoid division by zero if times are equal
-                k = 1.0
+        unassigned = inside.copy()
+        for i in range(num_steps):
+            start, end = step_edges[i], step_edges[i + 1]
+            y_base = y1 + i * step_height
+            in_transition = unassigned & (end - smoothing_width <= x) & (x <= end)
+            t = (x[in_transition] - (end - smoothing_width)) / smoothing_width
+            y[in_transition] = y_base + step_height * (t**2 * (3 - 2 * t))
+            unassigned &= ~in_transition
+            in_flat = unassigned & (start <= x) & (x < end - smoothing_width)
+            y[in_flat] = y_base
+            unassigned &= ~in_flat
+        y[unassigned] = y2
+        return y
 
-            return y2 + (y1 - y2)*math.exp(-k*(x - x1))
-        else:
-            return None
+    def smooth_exponential_decrease_function(x):
+        x, y, inside = _domain(x)
+        k = 15 / (x2 - x1) if x2 > x1 else 1.0
+        y[inside] = y2 + (y1 - y2) * np.exp(-k * (x[inside] - x1))
+        return y
 
     def smooth_exponential_increase_function(x):
-        # Similar logic but reversed to create a curve that starts low and rises up.
-        if x1 <= x <= x2:
-            if x2 > x1:
-                #k = 4.6 / (x2 - x1)
-                k = 15 / (x2 - x1)
-            else:
-                k = 1.0
-
-            # For an "increase", you can simply flip the logic:
-            # Start at y1 and approach y2 from below using a mirrored exponential shape:
-            # y(x) = y1 + (y2 - y1)*(1 - exp(-k*(x - x1)))
-            return y1 + (y2 - y1)*(1 - math.exp(-k*(x - x1)))
-        else:
-            return None
-    
-    def straight_decrease_function(x):
-        if x1 <= x <= x2:
-            # Parameters to adjust
-            horizontal_fraction = 0.01  # Adjust as needed
-
-            # Calculate key points
-            total_interval = x2 - x1
-            horizontal_end = x1 + horizontal_fraction * total_interval
-
-            if x1 <= x < horizontal_end:
-                # Initial horizontal segment at y1
-                return y1
-            elif horizontal_end <= x <= x2:
-                # Immediate jump to y2
-                return y2
-            else:
-                return None
-        else:
-            return None
- 
-    def straight_increase_function(x):
-        if x1 <= x <= x2:
-            horizontal_fraction = 0.01  # Adjust as needed
-            total_interval = x2 - x1
-            horizontal_end = x1 + horizontal_fraction * total_interval
-
-            if x1 <= x < horizontal_end:
-                return y1
-            elif horizontal_end <= x <= x2:
-                return y2
-            else:
-                return None
-        else:
-            return None
+        x, y, inside = _domain(x)
+        k = 15 / (x2 - x1) if x2 > x1 else 1.0
+        y[inside] = y1 + (y2 - y1) * (1 - np.exp(-k * (x[inside] - x1)))
+        return y
+
+    def straight_function(x):
+        # straight_increase_function and straight_decrease_function are the same shape
+        x, y, inside = _domain(x)
+        horizontal_end = x1 + 0.01 * (x2 - x1)
+        y[inside] = np.where(x[inside] < horizontal_end, y1, y2)
+        return y
 
     def step_function(x):
-        if x1 <= x <= x2:
-
-            #num_steps = (x2 - x1)
-            #num_steps = 2 #setting static number of steps
-            #step_height = (y2 - y1) / num_steps
-            #print("x1: ", x1, " x2: ", x2, " y1: ", y1, " y2: ", y2)
-            #print("num_steps: ", num_steps, "  step_height: ", step_height)
-            #steps_completed = int((x - x1) / ((x2 - x1) / num_steps)) # Calculate the number of steps from x1 to x
-            
-            num_steps = int(x2 - x1)
-            if(num_steps < 1):
-                num_steps = 1  # Static number of steps
-            
-            segment_width = (x2 - x1) / (num_steps + 1)
-            steps_completed = int((x - x1) / segment_width)
-            step_height = (y2 - y1) / num_steps
-       
-            return y1 + (steps_completed * step_height)
-        else:
-            return None
-            
+        x, y, inside = _domain(x)
+        num_steps = int(x2 - x1)
+        if num_steps < 1:
+            num_steps = 1
+        segment_width = (x2 - x1) / (num_steps + 1)
+        steps_completed = np.floor((x[inside] - x1) / segment_width)
+        y[inside] = y1 + steps_completed * ((y2 - y1) / num_steps)
+        return y
+
     def linear_function(x):
-        if x1 <= x <= x2:
-            return y1 + ((y2 - y1) / (x2 - x1)) * (x - x1)
-        else:
-            return None
-    
+        x, y, inside = _domain(x)
+        y[inside] = y1 + ((y2 - y1) / (x2 - x1)) * (x[inside] - x1)
+        return y
+
     def concave_up_decreasing_function(x):
-        if x1 <= x <= x2:
-            a = (y1 - y2) / ((x1 - x2) * (x1 + x2 - 2*x2))
-            b = y2 - a * (x2 - x2)**2
-            return a * (x - x2)**2 + b
-        else:
-            return None
-        
+        x, y, inside = _domain(x)
+        a = (y1 - y2) / ((x1 - x2) * (x1 + x2 - 2*x2))
+        b = y2 - a * (x2 - x2)**2
+        y[inside] = a * (x[inside] - x2)**2 + b
+        return y
+
     def concave_down_decreasing_function(x):
-        if x1 <= x <= x2:
-            a = (y2 - y1) / ((x2 - x1) * (x2 + x1 - 2*x1))
-            b = y1 - a * (x1 - x1)**2
-            return a * (x - x1)**2 + b
-        else:
-            return None
-        
+        x, y, inside = _domain(x)
+        a = (y2 - y1) / ((x2 - x1) * (x2 + x1 - 2*x1))
+        b = y1 - a * (x1 - x1)**2
+        y[inside] = a * (x[inside] - x1)**2 + b
+        return y
+
     def concave_up_increasing_function(x):
-        if x1 <= x <= x2:
-            a = (y2 - y1) / ((x2 - x1) * (x2 + x1 - 2*x1))
-            b = y1 - a * (x1 - x1)**2
-            return a * (x - x1)**2 + b
-        else:
-            return None
+        x, y, inside = _domain(x)
+        a = (y2 - y1) / ((x2 - x1) * (x2 + x1 - 2*x1))
+        b = y1 - a * (x1 - x1)**2
+        y[inside] = a * (x[inside] - x1)**2 + b
+        return y
 
     def concave_down_increasing_function(x):
-        if x1 <= x <= x2:
-            a = (y1 - y2) / ((x1 - x2) * (x1 + x2 - 2*x2))
-            b = y2 - a * (x2 - x2)**2
-            return a * (x - x2)**2 + b
-        else:
-            return None
+        x, y, inside = _domain(x)
+        a = (y1 - y2) / ((x1 - x2) * (x1 + x2 - 2*x2))
+        b = y2 - a * (x2 - x2)**2
+        y[inside] = a * (x[inside] - x2)**2 + b
+        return y
 
     def test(x):
-        
+        x, y, inside = _domain(x)
         xm = (x1 + x2) / 2
         ym = (y1 + y2) / 2
-        
-        if x1 <= x <= xm:
-            # Concave down decreasing function up to the midpoint
-            a = (ym - y1) / ((xm - x1)**2)
-            return a * (x - xm)**2 + ym
-        elif xm < x <= x2:
-            # Concave up decreasing function from the midpoint to x2
-            a = (ym - y2) / ((xm - x2)**2)
-            return a * (x - xm)**2 + ym
-        else:
-            return None
-            
+        first_half = inside & (x <= xm)
+        second_half = inside & (x > xm)
+        y[first_half] = ((ym - y1) / ((xm - x1)**2)) * (x[first_half] - xm)**2 + ym
+        y[second_half] = ((ym - y2) / ((xm - x2)**2)) * (x[second_half] - xm)**2 + ym
+        return y
+
     def curvy_down_up(x):
-        
+        x, y, inside = _domain(x)
         xm = (x1 + x2) / 2
         ym = (y1 + y2) / 2
         a_down = (ym - y1) / ((xm - x1)**2)
         b_down = y1 - a_down * (x1 - x1)**2
-        
-        # Ensure the vertex of concave up is at (x2, y2)
         a_up = (ym - y2) / ((xm - x2)**2)
         b_up = y2 - a_up * (x2 - x2)**2
-        
-        if x1 <= x <= xm:
-            return a_down * (x - x1)**2 + b_down
-        elif xm < x <= x2:
-            return a_up * (x - x2)**2 + b_up
-        else:
-            return None
-    
+        first_half = inside & (x <= xm)
+        second_half = inside & (x > xm)
+        y[first_half] = a_down * (x[first_half] - x1)**2 + b_down
+        y[second_half] = a_up * (x[second_half] - x2)**2 + b_up
+        return y
 
-
-   
     if x1 == x2:
-        # x1 == x2, return a function that is only defined at x == x1
         def point_function(x):
-            if x == x1:
-                return y1
-            else:
-                return None
+            x = np.asarray(x, dtype=float)
+            return np.where(x == x1, float(y1), np.nan)
         return point_function
-    else:
-        # Existing code for other arcs
-        if arc in['Step-by-Step Increase', 'Step-by-Step Decrease']:
-            return exponential_step_function
-            #return s_curve_step_function
-        elif arc in ['Straight Increase']:
-            return smooth_exponential_increase_function
-        elif arc in ['Straight Decrease']:
-            return smooth_exponential_decrease_function
-        elif arc in ['Linear Increase','Linear Decrease','Gradual Increase', 'Gradual Decrease', 'Linear Flat']:
-            #return linear_function #3/8/2025
-            return curvy_down_up #replacing linear function with s-curve function because it avoid gaps in designs
-        elif arc in ['Concave Down, Increase', 'Rapid-to-Gradual Increase']:
-            return concave_down_increasing_function
-        elif arc in ['Concave Down, Decrease', 'Gradual-to-Rapid Decrease']:
-            return concave_down_decreasing_function
-        elif arc in ['Concave Up, Increase', 'Gradual-to-Rapid Increase']:
-            return concave_up_increasing_function
-        elif arc in ['Concave Up, Decrease', 'Rapid-to-Gradual Decrease']:
-            return concave_up_decreasing_function
-        elif arc in ['Hyperbola Increase','Hyperbola Decrease', 'S-Curve Increase', 'S-Curve Decrease']:
-            return curvy_down_up
-        elif arc  == 'test':
-            return test
-        else:
-            #print(arc)
-            raise ValueError(f"{arc} Interpolation method not supported")
-    
-
-  
-# Master function to evaluate the emotional score for any given plot point number
-def get_story_arc(x, functions_list):
-    for func in functions_list:
-        result = func(x)
-        if result is not None:
-            return result
-    return None  # Return None if x is outside the range of all functions
 
+    # shared by every call of exponential_step_function
+    exp_num_steps = _num_steps_from_slope()
+    exp_x_edges = np.linspace(x1, x2, exp_num_steps + 1)
+
+    # same dispatch as get_component_arc_function
+    if arc in ['Step-by-Step Increase', 'Step-by-Step Decrease']:
+        return exponential_step_function
+        #return s_curve_step_function
+    elif arc in ['Straight Increase']:
+        return smooth_exponential_increase_function
+    elif arc in ['Straight Decrease']:
+        return smooth_exponential_decrease_function
+    elif arc in ['Linear Increase','Linear Decrease','Gradual Increase', 'Gradual Decrease', 'Linear Flat']:
+        return curvy_down_up
+    elif arc in ['Concave Down, Increase', 'Rapid-to-Gradual Increase']:
+        return concave_down_increasing_function
+    elif arc in ['Concave Down, Decrease', 'Gradual-to-Rapid Decrease']:
+        return concave_down_decreasing_function
+    elif arc in ['Concave Up, Increase', 'Gradual-to-Rapid Increase']:
+        return concave_up_increasing_function
+    elif arc in ['Concave Up, Decrease', 'Rapid-to-Gradual Decrease']:
+        return concave_up_decreasing_function
+    elif arc in ['Hyperbola Increase','Hyperbola Decrease', 'S-Curve Increase', 'S-Curve Decrease']:
+        return curvy_down_up
+    elif arc == 'test':
+        return test
+    else:
+        raise ValueError(f"{arc} Interpolation method not supported")
 
-def transform_story_data(data, x_delta, step_k, max_num_steps ):
-    # # Convert JSON to DataFrame
-    # try:
-    #     df = pd.json_normalize(
-    #         data, 
-    #         record_path=['story_components'], 
-    #         meta=[
-    #             'title', 
-    #             'protagonist'
-    #         ],
-    #         record_prefix='story_component_'
-    #     )
-    # except Exception as e:
-    #     print("Error:", e)
-    #     print("NORMALIZE IS BREAKING!")
-    #     return None
 
-        # --- Start of transform_story_data ---
-    if not isinstance(data, dict):
-        print(f"transform_story_data FATAL: Input 'data' is not a dictionary. Type: {type(data)}")
-        return None 
-    
-    if 'story_components' not in data:
-        print(f"transform_story_data FATAL: 'story_components' key missing from input data. Keys: {list(data.keys())}")
-        return None
+def get_story_component_pairs(story_components):
+    """
+    Pair each story component with the one before it, the way the arc
+    functions need them (start point = previous component, arc = this one).
 
-    if not isinstance(data['story_components'], list):
-        print(f"transform_story_data FATAL: 'story_components' is not a list. Type: {type(data['story_components'])}")
-        return None
+    This used to go through a pandas DataFrame (built twice, sorted, then read
+    back with df.loc[i]). df.loc is label based, so the sort never changed the
+    pairing -- components are paired in their original order and the sort only
+    fed the min/max used to scale time onto 1 - 10. Plain lists give the same
+    result without paying for pandas on every create_shape loop.
 
-    components_for_df_creation = []
-    for comp_idx, component_data_item in enumerate(data['story_components']):
+    Returns:
+        tuple: (x_scale, array_of_dicts) or None if there are fewer than 2 usable components
+    """
+    story_component_records = []
+    for comp_idx, component_data_item in enumerate(story_components):
         if not isinstance(component_data_item, dict):
             print(f"transform_story_data WARNING: story_component at index {comp_idx} is not a dict. Skipping.")
             continue 
@@ -2424,7 +2517,6 @@ def transform_story_data(data, x_delta, step_k, max_num_steps ):
         mod_end_time = component_data_item.get('modified_end_time')
         mod_emo_score = component_data_item.get('modified_end_fortune_score')
         arc_type = component_data_item.get('arc') 
-        description = component_data_item.get('description', '#N/A') # Get description
 
         # All components (including the first placeholder) need time and score.
         if mod_end_time is None or mod_emo_score is None:
@@ -2432,103 +2524,70 @@ def transform_story_data(data, x_delta, step_k, max_num_steps ):
             continue
         
         # If arc_type is None (e.g. for the first component if 'arc' key is missing), default to "#N/A"
-        # This ensures the key 'story_component_arc' will exist for all rows going into the DataFrame.
         if arc_type is None:
             arc_type = "#N/A"
 
-        essential_comp_info = {
-            # Fields that will be directly used or selected later with these exact names
-            'title': data.get('title', 'Unknown Title'), 
-            'protagonist': data.get('protagonist', 'Unknown Protagonist'),
-            'story_component_arc': arc_type, # Use the direct name
-            'story_component_description': description, # Use the direct name
-
-            # Fields that will be renamed later (or you can name them directly now)
-            # Using 'modified_...' prefix initially, then renaming, is fine if you prefer that pattern.
-            'story_component_modified_end_time': mod_end_time,
-            'story_component_modified_end_fortune_score': mod_emo_score,
-        }
-        components_for_df_creation.append(essential_comp_info)
-
-    if not components_for_df_creation or len(components_for_df_creation) < 2 :
-        print(f"transform_story_data ERROR: Not enough valid components ({len(components_for_df_creation)}) to create DataFrame for arc calculation.")
-        return None
-
-    try:
-        df = pd.DataFrame(components_for_df_creation)
-    except Exception as e:
-        print(f"transform_story_data ERROR: Creating DataFrame from components_for_df_creation failed: {e}")
-        return None
-    if not components_for_df_creation or len(components_for_df_creation) < 2 : # Need at least 2 points to form an arc
-        print(f"transform_story_data ERROR: Not enough valid components ({len(components_for_df_creation)}) to create DataFrame for arc calculation.")
-        return None
+        story_component_records.append((mod_end_time, mod_emo_score, arc_type))
 
-    try:
-        df = pd.DataFrame(components_for_df_creation)
-    except Exception as e:
-        print(f"transform_story_data ERROR: Creating DataFrame from components_for_df_creation failed: {e}")
+    if len(story_component_records) < 2: # Need at least 2 points to form an arc
+        print(f"transform_story_data ERROR: Not enough valid components ({len(story_component_records)}) for arc calculation.")
         return None
 
-
-    # Print the column names for debugging
-    #print("DataFrame columns:", df.columns.tolist())
-
-    # Use 'story_component_modified_end_time' and 'story_component_modified_end_fortune_score' directly
-    df['story_component_end_time'] = df['story_component_modified_end_time']
-    df['story_component_end_fortune_score'] = df['story_component_modified_end_fortune_score']
-
-    # Rename other columns as needed
-    df = df.rename(columns={
-        'story_component_description': 'story_component_description',
-        'story_component_arc': 'story_component_arc'
-    })
-
-    # Select relevant columns
-    df = df[['title', 'protagonist', 'story_component_end_time', 'story_component_end_fortune_score', 'story_component_arc', 'story_component_description']]
-    df = df.sort_values(by='story_component_end_time', ascending=True)
-
     # Convert time values to x-values
-    story_time_values = df['story_component_end_time'].tolist()
-    x_original = np.array(story_time_values)
+    x_original = np.array([record[0] for record in story_component_records])
     x_scale = np.array(scale_plot_points(x_original, 1, 10))  # Scale x values so they are 1 - 10
 
-    # Store pairs of x_original values and their scaled counterparts
-    x_dict = dict(zip(x_original, x_scale))
-
     # Extract individual story components
     array_of_dicts = []
-    for i in range(len(df) - 1):  # -1 because we are considering pairs of adjacent rows
-        start_time = x_dict[df.loc[i, 'story_component_end_time']]
-        end_time = x_dict[df.loc[i + 1, 'story_component_end_time']]
-        start_emotional_score = df.loc[i, 'story_component_end_fortune_score']
-        end_fortune_score = df.loc[i + 1, 'story_component_end_fortune_score']
-        arc = df.loc[i + 1, 'story_component_arc']  # Using the arc of the second point
+    for i in range(len(story_component_records) - 1):  # -1 because we are considering pairs of adjacent rows
+        start_time, start_emotional_score, _ = story_component_records[i]
+        _, end_fortune_score, arc = story_component_records[i + 1]  # Using the arc of the second point
 
         dict_item = {
-            'story_component_times': [start_time, end_time],
+            'story_component_times': [x_scale[i], x_scale[i + 1]],
             'story_component_end_fortune_scores': [start_emotional_score, end_fortune_score],
             'arc': arc
         }
         array_of_dicts.append(dict_item)
 
-    # Create a list to store the component story arcs
-    story_arc_functions_list = []
-    for item in array_of_dicts:
-        story_component_times = item['story_component_times']
-        story_component_end_fortune_scores = item['story_component_end_fortune_scores']
-        story_component_arc = item['arc']
+    return x_scale, array_of_dicts
 
-        # Create the function based on the specified interpolation
-        component_arc_function = get_component_arc_function(
-            story_component_times[0],
-            story_component_times[1],
-            story_component_end_fortune_scores[0],
-            story_component_end_fortune_scores[1],
-            story_component_arc,
-            step_k,
-            max_num_steps
-        )
-        story_arc_functions_list.append(component_arc_function)
+
+@profiled("transform")
+def transform_story_data(data, x_delta, step_k, max_num_steps ):
+    # # Convert JSON to DataFrame
+    # try:
+    #     df = pd.json_normalize(
+    #         data, 
+    #         record_path=['story_components'], 
+    #         meta=[
+    #             'title', 
+    #             'protagonist'
+    #         ],
+    #         record_prefix='story_component_'
+    #     )
+    # except Exception as e:
+    #     print("Error:", e)
+    #     print("NORMALIZE IS BREAKING!")
+    #     return None
+
+        # --- Start of transform_story_data ---
+    if not isinstance(data, dict):
+        print(f"transform_story_data FATAL: Input 'data' is not a dictionary. Type: {type(data)}")
+        return None 
+    
+    if 'story_components' not in data:
+        print(f"transform_story_data FATAL: 'story_components' key missing from input data. Keys: {list(data.keys())}")
+        return None
+
+    if not isinstance(data['story_components'], list):
+        print(f"transform_story_data FATAL: 'story_components' is not a list. Type: {type(data['story_components'])}")
+        return None
+
+    pairs = get_story_component_pairs(data['story_components'])
+    if pairs is None:
+        return None
+    x_scale, array_of_dicts = pairs
 
     num_points = int((max(x_scale) - min(x_scale)) / x_delta)
     #print(num_points)
@@ -2541,37 +2600,59 @@ def transform_story_data(data, x_delta, step_k, max_num_steps ):
     x_values = np.unique(np.concatenate([x_values, np.array(list(x1_x2_values))]))
     x_values.sort()
 
-    y_values = np.array([get_story_arc(x, story_arc_functions_list) for x in x_values])  # Calculate corresponding y-values
-    y_values = scale_y_values(y_values, -10, 10)
-
-    # Process arcs for each story component
-    story_component_index = 1
+    # Each component only covers x in [x1, x2], which is a contiguous slice of the
+    # sorted x_values, so evaluate its vectorized arc function once on just that
+    # slice. Where two components share a point (their boundary) the earlier
+    # component wins, same as get_story_arc's first-match rule.
+    y_values = np.full(x_values.shape, np.nan)
+    y_assigned = np.zeros(x_values.shape, dtype=bool)
+    component_slices = []
     for item in array_of_dicts:
         story_component_times = item['story_component_times']
         story_component_end_fortune_scores = item['story_component_end_fortune_scores']
         story_component_arc = item['arc']
 
-        component_arc_function = get_component_arc_function(
+        component_arc_function = get_component_arc_function_vectorized(
             story_component_times[0],
             story_component_times[1],
             story_component_end_fortune_scores[0],
             story_component_end_fortune_scores[1],
-            story_component_arc, 
+            story_component_arc,
             step_k,
             max_num_steps
         )
-        result = np.array([get_story_arc(x, [component_arc_function]) for x in x_values])
 
-        non_none_positions = np.where(result != None)[0]
+        if story_component_times[0] <= story_component_times[1]:
+            start = np.searchsorted(x_values, story_component_times[0], side='left')
+            end = np.searchsorted(x_values, story_component_times[1], side='right')
+        else:
+            start = end = 0  # out of order times cover no x values
+        component_slices.append((start, end))
+
+        if end > start:
+            component_y = component_arc_function(x_values[start:end])
+            unassigned = ~y_assigned[start:end]
+            y_values[start:end][unassigned] = component_y[unassigned]
+            y_assigned[start:end] = True
+
+    if not y_assigned.all():
+        print(f"transform_story_data ERROR: {int((~y_assigned).sum())} x values are not covered by any story component.")
+        return None
+
+    y_values = scale_y_values(y_values, -10, 10)
+
+    # Process arcs for each story component
+    story_component_index = 1
+    for start, end in component_slices:
 
-        # **Add check for empty non_none_positions**
-        if non_none_positions.size == 0:
+        # **Add check for empty component slice**
+        if end <= start:
             print(f"No valid positions for component at index {story_component_index}, function returns None for all x")
             story_component_index += 1
             continue  # Skip this component or handle accordingly
 
-        arc_x_values = x_values[non_none_positions]
-        arc_y_values = y_values[non_none_positions]
+        arc_x_values = x_values[start:end]
+        arc_y_values = y_values[start:end]
 
         
         #1/12/2024 -- testing to see if I can help produce smoother arcs
@@ -2618,6 +2699,7 @@ def transform_story_data(data, x_delta, step_k, max_num_steps ):
     return data
 
 
+@profiled("draw")
 def place_text_centered(cr, text, font_size_px,
                        x_center, y_center,
                        rotation_degrees=0,
@@ -2786,6 +2868,7 @@ def end_svg_group(cr, output_format):
 from PIL import Image
 import numpy as np
 
+@profiled("save")
 def verify_safe_margin(
         path: str,
         bg_rgb: tuple,
@@ -2835,14 +2918,39 @@ def get_standard_space_width(pangocairo_context, font_desc):
     """
     Gets the pixel width of a standard space character for the given font.
     """
-    layout = Pango.Layout.new(pangocairo_context)
-    layout.set_font_description(font_desc)
-    layout.set_text(" ", -1)  # A single space character
-    width, _ = layout.get_pixel_size()
-    # It's possible for a font to have a zero-width space, handle defensively.
-    return width if width > 0 else 1 # Return at least 1px to avoid division by zero later
+    # Zero-width spaces come back as 1px to avoid division by zero later
+    return get_glyph_metrics(pangocairo_context, font_desc).space_width()
+
 
+@profiled("draw")
+def draw_char_positions(cr, font_desc, char_positions):
+    """Draw glyphs laid out by draw_text_on_curve: (x, y, angle, char, char_width, char_height) tuples."""
+    for x, y, angle, char, char_width, char_height in char_positions:
+        cr.save()
+        cr.translate(x, y)
+        cr.rotate(angle)
 
+        layout = PangoCairo.create_layout(cr)
+        layout.set_font_description(font_desc)
+        layout.set_text(char, -1)
+        cr.translate(-char_width / 2, -char_height / 2) 
+        PangoCairo.show_layout(cr, layout)
+        cr.restore()
+
+
+def component_layout_key(pass_layout_key, arc_x_values_scaled, arc_y_values_scaled, text, spaces_width_multiplier, adjust_spacing):
+    """Everything draw_text_on_curve's output depends on for one component (besides upstream boxes)."""
+    digest = hashlib.sha1()
+    digest.update(repr(pass_layout_key).encode("utf-8"))
+    digest.update(np.asarray(arc_x_values_scaled, dtype=np.float64).tobytes())
+    digest.update(np.asarray(arc_y_values_scaled, dtype=np.float64).tobytes())
+    digest.update(text.encode("utf-8"))
+    multipliers = sorted((str(k), float(v)) for k, v in (spaces_width_multiplier or {}).items())
+    digest.update(repr((multipliers, bool(adjust_spacing))).encode("utf-8"))
+    return digest.hexdigest()
+
+
+@profiled("layout")
 def draw_text_on_curve(
         cr, 
         x_values_scaled, 
@@ -2856,94 +2964,85 @@ def draw_text_on_curve(
         design_width, 
         design_height,
         spaces_width_multiplier,
-        adjust_spacing):
-    
-    total_curve_length = np.sum(np.hypot(np.diff(x_values_scaled), np.diff(y_values_scaled)))
-    cumulative_curve_lengths = np.insert(np.cumsum(np.hypot(np.diff(x_values_scaled), np.diff(y_values_scaled))), 0, 0)
+        adjust_spacing,
+        render=True,
+        placement=None,
+        curve=None):
+    """
+    Lays text out along the curve (one phrase at a time, rolling back a phrase
+    that doesn't fit) and draws it. With render=False nothing is drawn; pass a
+    dict as `placement` to get back the glyph positions and collision boxes
+    ('char_positions', 'boxes') so the caller can draw/reuse them later.
+    `curve` is the arc's CurvePath if the caller already built one.
+    """
+    curve = as_curve_path(x_values_scaled, y_values_scaled, curve)
+    total_curve_length = curve.length
 
     idx_on_curve = 0
     distance_along_curve = 0
 
-    def get_tangent_angle(x_vals, y_vals, idx):
-        if idx == 0:
-            dx = x_vals[1] - x_vals[0]
-            dy = y_vals[1] - y_vals[0]
-        elif idx == len(x_vals) - 1:
-            dx = x_vals[-1] - x_vals[-2]
-            dy = y_vals[-1] - y_vals[-2]
-        else:
-            dx = x_vals[idx + 1] - x_vals[idx - 1]
-            dy = y_vals[idx + 1] - y_vals[idx - 1]
-        angle = math.atan2(dy, dx)
-        return angle
-
     import re
     phrases = re.findall(r'.+?(?:\. |$)', text)
     phrases = [phrase for phrase in phrases if phrase.strip()]
 
     char_positions = []
-    rendered_boxes = []
     all_text_fits = True
 
+    # all_rendered_boxes is normally the pass-wide GlyphCollisionIndex; a plain list still works
+    collision_index = as_collision_index(all_rendered_boxes)
+    built_index = collision_index is not all_rendered_boxes
+    #profiling on: index calls (and next_free_slot's searches) are timed as "collision"; off: the index itself
+    collision_index = active_profiler().timed(
+        collision_index, "collision", ("insert", "rollback", "intersects_any", "first_clear"))
+    glyph_metrics = get_glyph_metrics(pangocairo_context, font_desc)
+    call_mark = collision_index.mark()
+
     space_count = 0
     for phrase in phrases:
         temp_char_positions = []
-        temp_rendered_boxes = []
+        phrase_mark = collision_index.mark()
         saved_idx_on_curve = idx_on_curve
         saved_distance_along_curve = distance_along_curve
         phrase_fits = True
 
+        # measure the phrase up front so it can be located on the curve in one go
+        char_sizes = []
         for char in phrase:
-            layout = Pango.Layout.new(pangocairo_context)
-            layout.set_font_description(font_desc)
-            layout.set_text(char, -1)
-            char_width, char_height = layout.get_pixel_size()
+            char_width, char_height = glyph_metrics.glyph_size(char)
 
             if adjust_spacing == True and char == ' ':
-                before_char_width = char_width
-                #print("char_width before multiplier: ", char_width)
                 try:
-                    char_width = get_standard_space_width(pangocairo_context, font_desc) * spaces_width_multiplier[space_count]
-                    #print("multiplier: ", spaces_width_multiplier[space_count])
+                    char_width = glyph_metrics.space_width() * spaces_width_multiplier[space_count]
                 except:
-                    char_width = get_standard_space_width(pangocairo_context, font_desc) * spaces_width_multiplier[str(space_count)]
-                    #print("multiplier: ", spaces_width_multiplier[str(space_count)])
-                
-                after_char_width = char_width
-                #print("char width after multiplier: ", char_width, " | diff: ", (after_char_width - before_char_width) )
-                
-
-
+                    char_width = glyph_metrics.space_width() * spaces_width_multiplier[str(space_count)]
                 space_count = space_count + 1
 
-            while idx_on_curve < len(cumulative_curve_lengths) - 1:
-                segment_start_distance = cumulative_curve_lengths[idx_on_curve]
-                segment_end_distance = cumulative_curve_lengths[idx_on_curve + 1]
-                segment_distance = segment_end_distance - segment_start_distance
-
-                if segment_distance == 0:
-                    idx_on_curve += 1
-                    continue
-
-                ratio = (distance_along_curve - segment_start_distance) / segment_distance
-
-                if ratio < 0 or ratio > 1:
-                    idx_on_curve += 1
-                    continue
-
-                x = x_values_scaled[idx_on_curve] + ratio * (x_values_scaled[idx_on_curve + 1] - x_values_scaled[idx_on_curve])
-                y = y_values_scaled[idx_on_curve] + ratio * (y_values_scaled[idx_on_curve + 1] - y_values_scaled[idx_on_curve])
-                angle = get_tangent_angle(x_values_scaled, y_values_scaled, idx_on_curve)
-
-                box = Polygon([
-                    (-char_width / 2, -char_height / 2),
-                    (char_width / 2, -char_height / 2),
-                    (char_width / 2, char_height / 2),
-                    (-char_width / 2, char_height / 2)
-                ])
-
-                rotated_box = shapely_rotate(box, angle * (180 / math.pi), origin=(0, 0), use_radians=False)
-                translated_box = shapely.affinity.translate(rotated_box, xoff=x, yoff=y)
+            char_sizes.append((char, char_width, char_height))
+
+        # where every glyph lands if nothing collides; a collision nudges the
+        # glyph 1px along the path and the rest of the phrase is re-located
+        planned = None
+        for char_idx, (char, char_width, char_height) in enumerate(char_sizes):
+            if planned is None:
+                planned_from = char_idx
+                planned_distances = np.cumsum([distance_along_curve] + [w for _, w, _ in char_sizes[char_idx:-1]])
+                planned_segments = curve.segments_containing(planned_distances, idx_on_curve)
+                planned = curve.points(planned_distances, np.minimum(planned_segments, curve.end_index - 1))
+
+            segment = int(planned_segments[char_idx - planned_from])
+            x, y, angle = (float(v[char_idx - planned_from]) for v in planned)
+            if segment < idx_on_curve:
+                # a zero-width glyph on a vertex: the walk never steps back
+                segment = curve.segment_containing(distance_along_curve, idx_on_curve)
+                planned = None
+
+            placed = False
+            while segment < curve.end_index:
+                if planned is None:
+                    x, y, angle = (float(v[0]) for v in curve.points([distance_along_curve], [segment]))
+                idx_on_curve = segment
+
+                translated_box = glyph_box(x, y, angle, char_width, char_height)
 
                 #CAUSED ALOT OF ISSUES !!!!!!!!!
                 # ── NEW: bounce the char if it crosses the 0.625‑in safety zone ──
@@ -2952,24 +3051,27 @@ def draw_text_on_curve(
                 #     translated_box.bounds[1] < margin_y or                 # top
                 #     translated_box.bounds[3] > design_height - margin_y
                 #     ):  # bottom
-                #     distance_along_curve += 1      # scoot 1 px along path
+                #     distance_along_curve += 1      # scoot 1 px along path
                 #     continue                       # try again at new spot
                 # ───────────────────────────────────────────────
 
-                # Check overlap
-                for other_box in rendered_boxes + all_rendered_boxes:
-                    if translated_box.intersects(other_box):
-                        distance_along_curve += 1
+                # Check overlap: jump straight to the first free 1px step instead of bumping one at a time
+                if collision_index.intersects_any(translated_box):
+                    distance_along_curve, segment, x, y, angle, translated_box = next_free_slot(
+                        collision_index, curve, distance_along_curve, idx_on_curve, char_width, char_height)
+                    planned = None
+                    if segment >= curve.end_index:
                         break
-                else:
-                    temp_char_positions.append((x, y, angle, char, char_width, char_height))
-                    temp_rendered_boxes.append(translated_box)
-                    rendered_boxes.append(translated_box)
-                    all_rendered_boxes.append(translated_box)
+                    idx_on_curve = segment
 
-                    distance_along_curve += char_width
-                    break
-            else:
+                temp_char_positions.append((x, y, angle, char, char_width, char_height))
+                collision_index.insert(translated_box)
+
+                distance_along_curve += char_width
+                placed = True
+                break
+
+            if not placed:
                 # No space left on the curve
                 phrase_fits = False
                 break
@@ -2980,23 +3082,20 @@ def draw_text_on_curve(
             # rollback
             idx_on_curve = saved_idx_on_curve
             distance_along_curve = saved_distance_along_curve
-            rendered_boxes = rendered_boxes[:len(rendered_boxes) - len(temp_rendered_boxes)]
-            all_rendered_boxes = all_rendered_boxes[:len(all_rendered_boxes) - len(temp_rendered_boxes)]
+            collision_index.rollback(phrase_mark)
             all_text_fits = False
             break
 
-    # Render characters
-    for x, y, angle, char, char_width, char_height in char_positions:
-        cr.save()
-        cr.translate(x, y)
-        cr.rotate(angle)
+    if placement is not None:
+        placement['char_positions'] = char_positions
+        placement['boxes'] = collision_index.boxes_since(call_mark)
 
-        layout = PangoCairo.create_layout(cr)
-        layout.set_font_description(font_desc)
-        layout.set_text(char, -1)
-        cr.translate(-char_width / 2, -char_height / 2) 
-        PangoCairo.show_layout(cr, layout)
-        cr.restore()
+    if built_index:
+        all_rendered_boxes[:] = list(collision_index)
+
+    # Render characters
+    if render:
+        draw_char_positions(cr, font_desc, char_positions)
 
     average_char_width = get_average_char_width(pangocairo_context, font_desc, text)
     remaining_curve_length = total_curve_length - distance_along_curve
@@ -3097,15 +3196,14 @@ def _layout_single_phrase_on_curve(
 
     distance_on_curve = initial_distance_on_curve
     idx_on_curve = initial_idx_on_curve
+    collision_index = as_collision_index(existing_rendered_boxes)
+    glyph_metrics = get_glyph_metrics(pangocairo_context, font_desc)
     
     char_render_info_list = []
     new_boxes_for_this_phrase = []
 
     for char_idx, char_glyph in enumerate(phrase_text):
-        layout = Pango.Layout.new(pangocairo_context)
-        layout.set_font_description(font_desc)
-        layout.set_text(char_glyph, -1)
-        char_width_measured, char_height = layout.get_pixel_size()
+        char_width_measured, char_height = glyph_metrics.glyph_size(char_glyph)
 
         char_width_effective = char_width_measured * base_char_spacing_factor
         if char_glyph == ' ':
@@ -3168,11 +3266,7 @@ def _layout_single_phrase_on_curve(
                 char_found_segment = True # Found a potential segment
 
                 # Bounding box for collision
-                half_w = char_width_measured / 2.0
-                half_h = char_height / 2.0
-                box = Polygon([(-half_w, -half_h), (half_w, -half_h), (half_w, half_h), (-half_w, half_h)])
-                rotated_box = shapely_rotate(box, math.degrees(angle), origin=(0, 0), use_radians=False)
-                translated_box = shapely.affinity.translate(rotated_box, xoff=x, yoff=y)
+                translated_box = glyph_box(x, y, angle, char_width_measured, char_height)
 
                 # Boundary check
                 b = translated_box.bounds
@@ -3183,11 +3277,12 @@ def _layout_single_phrase_on_curve(
                     break # Break from while temp_idx_on_curve, will try next nudge_attempt
 
                 # Collision check
-                collision = False
-                for other_box in existing_rendered_boxes + new_boxes_for_this_phrase: # Check against ALL so far
-                    if translated_box.intersects(other_box):
-                        collision = True
-                        break
+                collision = collision_index.intersects_any(translated_box)
+                if not collision:
+                    for other_box in new_boxes_for_this_phrase: # this phrase isn't in the index yet
+                        if translated_box.intersects(other_box):
+                            collision = True
+                            break
                 
                 if collision:
                     # Collision, this nudge attempt failed for this character
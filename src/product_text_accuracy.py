@@ -151,7 +151,7 @@ class MechanicalCheck:
 # --- LLM Integration (mirrors your grade_shape_accuracy pattern) --------------
 
 try:
-    from llm import load_config, get_llm, extract_json  # project-local helper
+    from llm import load_config, get_llm, get_llm_client, extract_json  # project-local helper
     # from langchain.prompts import PromptTemplate
     from langchain_core.prompts import PromptTemplate, ChatPromptTemplate
     from langchain_core.output_parsers import StrOutputParser
@@ -229,9 +229,8 @@ def _llm_text_grade(generated_analysis: dict, canonical_summary: str, llm_provid
     prompt = _build_llm_prompt()
     gen_str = json.dumps(generated_analysis, ensure_ascii=False)
     config = load_config(config_path=config_path)
-    llm = get_llm(llm_provider, llm_model, config, max_tokens=6000)
-    runnable = prompt | llm
-    output = runnable.invoke({
+    llm_client = get_llm_client(llm_provider, llm_model, config, max_tokens=6000)
+    output = llm_client.invoke(prompt, {
         "generated_analysis": gen_str,
         "canonical_summary": canonical_summary or "",
         "title": title,
@@ -0,0 +1,329 @@
+"""
+Render Profiler for The Shapes of Stories
+=========================================
+
+create_shape only ever told us what it was doing through print() calls
+("loop #", "curve_too_short | spacing"), so with hundreds of passes per
+design there was no way to see where the time went or how the components
+converged.
+
+RenderProfiler is the opt-in instrumentation for it:
+    - per pass: wall time, pass status and time per section
+    - per component: time per section and its curve_length_status, plus
+      every status change from one pass to the next (the convergence trace)
+    - per pass: events the renderer reports, e.g. each predicted fit
+    - sections: transform, llm, layout, collision, spacing, draw, save.
+      Times are self times: collision runs inside layout and glyph drawing
+      inside save, and each is taken out of its parent, so a pass's sections
+      plus "other" add up to its wall time
+    - a JSONL trace (one line per pass as it finishes, then a summary line)
+      and summary_table() for the console
+
+Turn it on for one render:
+
+    create_shape(..., profile="render_trace.jsonl")
+
+or for everything inside a block (e.g. a benchmark; the active profiler is
+per thread / asyncio task, so concurrent renders each keep their own):
+
+    with profiling(RenderProfiler("trace.jsonl")) as profiler:
+        create_shape(...)
+    print(profiler.summary_table())
+
+Off is the default and costs nothing worth measuring: the hooks talk to
+NULL_PROFILER, whose methods do nothing, @profiled functions check one
+attribute and call straight through, and timed() hands back the object it
+was given instead of a timing wrapper.
+"""
+
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import time
+
+SECTIONS = ("transform", "llm", "layout", "collision", "spacing", "draw", "save")
+
+
+class _NullSection:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SECTION = _NullSection()
+
+
+class NullProfiler:
+    """Profiling off: every hook is a no-op."""
+
+    enabled = False
+
+    def section(self, name):
+        return _NULL_SECTION
+
+    def add(self, name, seconds, calls=1):
+        pass
+
+    def timed(self, obj, name, methods):
+        return obj
+
+    def start_pass(self, number):
+        pass
+
+    def end_pass(self, status):
+        pass
+
+    def set_component(self, index):
+        pass
+
+    def component_status(self, index, status):
+        pass
+
+    def event(self, kind, **fields):
+        pass
+
+    def close(self):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class _Section:
+    __slots__ = ("profiler", "name", "start", "child")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.child = 0.0
+        self.start = time.perf_counter()
+        self.profiler._stack.append(self)
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        stack = self.profiler._stack
+        stack.pop()
+        self.profiler._record(self.name, elapsed - self.child)
+        if stack:
+            stack[-1].child += elapsed
+        return False
+
+
+class _TimedProxy:
+    """Forwards to `target`, timing the listed methods as one profiler section."""
+
+    def __init__(self, profiler, target, name, methods):
+        self._target = target
+        for method in methods:
+            setattr(self, method, self._timing(profiler, name, getattr(target, method)))
+
+    @staticmethod
+    def _timing(profiler, name, fn):
+        @functools.wraps(fn)
+        def call(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profiler.add(name, time.perf_counter() - start)
+        return call
+
+    def __getattr__(self, attr):
+        return getattr(self._target, attr)
+
+    def __iter__(self):
+        return iter(self._target)
+
+    def __len__(self):
+        return len(self._target)
+
+
+class RenderProfiler:
+    enabled = True
+
+    def __init__(self, trace_path=None, label=None):
+        """
+        trace_path: write the JSONL trace there (None = keep it in memory only).
+        label: copied into every trace line, e.g. the story or product name.
+        """
+        self.trace_path = trace_path
+        self.label = label
+        self._trace = None
+        if trace_path:
+            os.makedirs(os.path.dirname(trace_path) or ".", exist_ok=True)
+            self._trace = open(trace_path, "w", encoding="utf-8")
+        self._stack = []
+        self._pass = None
+        self._component = None
+        self._last_status = {}  # component -> curve_length_status in the pass before
+        self.passes = []
+        self.totals = {}  # section -> [seconds, calls] over the whole run
+        self.transitions = []
+        self.started = time.perf_counter()
+
+    # ---------- hooks ----------
+    def section(self, name):
+        return _Section(self, name)
+
+    def add(self, name, seconds, calls=1):
+        """Time measured by the caller (e.g. a hot loop), counted as a section nested in the open one."""
+        self._record(name, seconds, calls)
+        if self._stack:
+            self._stack[-1].child += seconds
+
+    def timed(self, obj, name, methods):
+        """`obj` with calls to `methods` timed as section `name`."""
+        return _TimedProxy(self, obj, name, methods)
+
+    def start_pass(self, number):
+        self._component = None
+        self._pass = {"pass": number, "started": time.perf_counter(), "sections": {}, "components": {},
+                      "transitions": [], "events": []}
+
+    def end_pass(self, status):
+        record = self._pass
+        if record is None:
+            return
+        self._pass = None
+        self._component = None
+        wall = time.perf_counter() - record.pop("started")
+        line = {"type": "pass", "label": self.label, "pass": record["pass"], "status": status, "wall_s": wall,
+                "sections": {name: {"s": s, "calls": calls} for name, (s, calls) in record["sections"].items()},
+                "other_s": wall - sum(s for s, _ in record["sections"].values()),
+                "components": record["components"], "transitions": record["transitions"],
+                "events": record["events"]}
+        self.passes.append(line)
+        self._write(line)
+
+    def set_component(self, index):
+        """Sections from here on belong to story component `index` (None = the pass as a whole)."""
+        self._component = index
+
+    def component_status(self, index, status):
+        if self._pass is None:
+            return
+        self._pass["components"].setdefault(str(index), {"sections": {}})["status"] = status
+        previous = self._last_status.get(index)
+        if previous != status:
+            transition = {"component": index, "from": previous, "to": status}
+            self._pass["transitions"].append(transition)
+            self.transitions.append(dict(transition, **{"pass": self._pass["pass"]}))
+        self._last_status[index] = status
+
+    def event(self, kind, **fields):
+        """Something worth keeping in the trace (e.g. a predicted fit), tagged with the current component."""
+        if self._pass is None:
+            return
+        self._pass["events"].append(dict(fields, kind=kind, component=self._component))
+
+    def _record(self, name, seconds, calls=1):
+        total = self.totals.setdefault(name, [0.0, 0])
+        total[0] += seconds
+        total[1] += calls
+        record = self._pass
+        if record is None:
+            return
+        section = record["sections"].setdefault(name, [0.0, 0])
+        section[0] += seconds
+        section[1] += calls
+        if self._component is not None:
+            sections = record["components"].setdefault(str(self._component), {"sections": {}})["sections"]
+            sections[name] = sections.get(name, 0.0) + seconds
+
+    def _write(self, line):
+        if self._trace is not None:
+            self._trace.write(json.dumps(line) + "\n")
+            self._trace.flush()
+
+    # ---------- results ----------
+    def summary(self):
+        wall = sum(p["wall_s"] for p in self.passes)
+        sections = {name: {"s": s, "calls": calls, "share": s / wall if wall else 0.0}
+                    for name, (s, calls) in sorted(self.totals.items(), key=lambda kv: -kv[1][0])}
+        components = {}
+        for p in self.passes:
+            for index, data in p["components"].items():
+                entry = components.setdefault(index, {"s": 0.0, "passes": 0, "status": None, "transitions": 0})
+                entry["s"] += sum(data["sections"].values())
+                entry["passes"] += 1
+                entry["status"] = data.get("status", entry["status"])
+        for t in self.transitions:
+            components.setdefault(str(t["component"]), {"s": 0.0, "passes": 0, "status": t["to"], "transitions": 0})["transitions"] += 1
+        return {"type": "summary", "label": self.label, "passes": len(self.passes),
+                "final_status": self.passes[-1]["status"] if self.passes else None,
+                "wall_s": wall, "sections": sections,
+                "other_s": wall - sum(s["s"] for s in sections.values()),
+                "components": components, "transitions": len(self.transitions)}
+
+    def summary_table(self):
+        summary = self.summary()
+        lines = [f"{summary['passes']} passes, {summary['wall_s']:.2f}s, final status: {summary['final_status']}, "
+                 f"{summary['transitions']} component status changes",
+                 f"{'section':<12}{'total s':>10}{'share':>8}{'calls':>9}{'ms/pass':>10}"]
+        passes = max(summary["passes"], 1)
+        rows = list(summary["sections"].items()) + [("other", {"s": summary["other_s"], "calls": 0,
+                                                              "share": summary["other_s"] / summary["wall_s"] if summary["wall_s"] else 0.0})]
+        for name, s in rows:
+            lines.append(f"{name:<12}{s['s']:>10.3f}{s['share'] * 100:>7.1f}%{s['calls']:>9}{s['s'] / passes * 1000:>10.2f}")
+        if summary["components"]:
+            lines.append(f"{'component':<12}{'total s':>10}{'passes':>8}{'changes':>9}  final status")
+            for index, c in sorted(summary["components"].items(), key=lambda kv: int(kv[0])):
+                lines.append(f"{index:<12}{c['s']:>10.3f}{c['passes']:>8}{c['transitions']:>9}  {c['status']}")
+        return "\n".join(lines)
+
+    def close(self):
+        """Write the summary line and close the trace."""
+        if self._trace is not None:
+            self._write(self.summary())
+            self._trace.close()
+            self._trace = None
+
+
+# -------------------- active profiler --------------------
+
+# per thread / asyncio task, so renders running side by side don't record into each other's profiler
+_ACTIVE = contextvars.ContextVar("active_render_profiler", default=NULL_PROFILER)
+
+
+def active_profiler():
+    return _ACTIVE.get()
+
+
+@contextlib.contextmanager
+def profiling(profiler):
+    """Route every hook inside the block (in this thread / task) to `profiler`."""
+    token = _ACTIVE.set(profiler)
+    try:
+        yield profiler
+    finally:
+        _ACTIVE.reset(token)
+
+
+def as_profiler(profile):
+    """create_shape's `profile` argument: None (whatever is active), a trace path, or a RenderProfiler."""
+    if profile is None:
+        return active_profiler()
+    if isinstance(profile, str):
+        return RenderProfiler(trace_path=profile)
+    return profile
+
+
+def profiled(name):
+    """Time every call of the decorated function as section `name` while profiling is on."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            profiler = _ACTIVE.get()
+            if not profiler.enabled:
+                return fn(*args, **kwargs)
+            with profiler.section(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
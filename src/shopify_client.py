@@ -0,0 +1,301 @@
+"""
+Shopify GraphQL Client for The Shapes of Stories
+================================================
+
+Every shopify_* module used to load config.yaml itself and send each query
+with its own requests.post: a new connection per call, and nothing looked at
+the query cost Shopify sends back, so a busy run just hit THROTTLED and
+died.
+
+ShopifyGraphQLClient is the one client they all share:
+    - keep-alive connection pool (one requests.Session per thread)
+    - client-side leaky bucket mirroring Shopify's: every response carries
+      extensions.cost.throttleStatus (maximumAvailable, currentlyAvailable,
+      restoreRate), and before each request the client waits until the
+      bucket has refilled enough for that query's last known cost
+    - THROTTLED responses are retried after the wait the cost payload says
+      is needed; 429 / 5xx / connection errors back off and retry too
+    - metrics(): requests, retries, throttles, time spent waiting, points
+      spent and latency percentiles, overall and per operation
+
+get_client() returns the shared client for the store in config.yaml and
+gql() runs a query on it. Point a client at shopify_stub (which simulates
+the cost bucket) to test offline, and use_client() to make the shopify_*
+modules use it:
+
+    with ShopifyStub(bucket_size=100, restore_rate=20) as stub:
+        client = ShopifyGraphQLClient(stub.shop_domain, "token", endpoint=stub.endpoint)
+        use_client(client)
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+
+import requests
+import yaml
+from requests.adapters import HTTPAdapter
+
+CONFIG_PATH = "/Users/johnmikedidonato/Projects/TheShapesOfStories/config.yaml"
+API_VERSION = "2025-10"
+
+POOL_SIZE = 10
+REQUEST_TIMEOUT_S = 60
+MAX_RETRIES = 6
+BACKOFF_BASE_S = 1.0
+BACKOFF_MAX_S = 30.0
+
+# until a response says otherwise (Shopify's standard plan bucket)
+DEFAULT_BUCKET_SIZE = 1000.0
+DEFAULT_RESTORE_RATE = 50.0
+DEFAULT_QUERY_COST = 10.0  # guess for a query we haven't seen a cost for yet
+
+_CONFIG = None
+_CLIENTS = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+# -------------------- credentials --------------------
+
+def normalize_myshopify_domain(raw: str) -> str:
+    s = (raw or "").strip()
+    s = s.replace("https://", "").replace("http://", "").split("/")[0]
+    if s.endswith(".myshopify.com"):
+        s = s[: -len(".myshopify.com")]
+    return f"{s}.myshopify.com"
+
+
+def load_credentials_from_yaml(item):
+    """config.yaml is read once per process."""
+    global _CONFIG
+    if _CONFIG is None:
+        with open(CONFIG_PATH, "r") as yaml_file:
+            _CONFIG = yaml.safe_load(yaml_file)
+    return _CONFIG[item]
+
+
+def shop_domain() -> str:
+    return normalize_myshopify_domain(load_credentials_from_yaml("shopify_url"))
+
+
+def access_token() -> str:
+    return load_credentials_from_yaml("shopify_key")
+
+
+# -------------------- client --------------------
+
+class ShopifyThrottled(RuntimeError):
+    pass
+
+
+class ShopifyGraphQLClient:
+    def __init__(self, shop_domain, access_token, api_version=API_VERSION, endpoint=None,
+                 pool_size=POOL_SIZE, timeout=REQUEST_TIMEOUT_S, max_retries=MAX_RETRIES):
+        self.shop_domain = shop_domain
+        self.api_version = api_version
+        self.endpoint = endpoint or f"https://{shop_domain}/admin/api/{api_version}/graphql.json"
+        self.headers = {
+            "X-Shopify-Access-Token": access_token,
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+        }
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._local = threading.local()
+
+        # leaky bucket, as of the last response (or our own bookkeeping since)
+        self._lock = threading.Lock()
+        self._bucket_size = DEFAULT_BUCKET_SIZE
+        self._restore_rate = DEFAULT_RESTORE_RATE
+        self._available = DEFAULT_BUCKET_SIZE
+        self._available_at = time.monotonic()
+        self._in_flight = 0.0   # points reserved by requests the server hasn't answered yet
+        self._query_costs = {}  # query hash -> last requestedQueryCost
+
+        self._metrics = {"requests": 0, "retries": 0, "throttled": 0, "http_errors": 0, "graphql_errors": 0,
+                         "wait_s": 0.0, "requested_cost": 0.0, "actual_cost": 0.0}
+        self._latencies = {}  # operation -> [seconds]
+
+    # ---------- HTTP ----------
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(self.headers)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self._local.session = session
+        return session
+
+    # ---------- bucket ----------
+    def _refilled(self, now):
+        return min(self._bucket_size, self._available + (now - self._available_at) * self._restore_rate)
+
+    def _reserve(self, cost):
+        """Block until `cost` points are available, then take them."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                available = self._refilled(now)
+                cost = min(cost, self._bucket_size)
+                if available >= cost:
+                    self._available = available - cost
+                    self._available_at = now
+                    self._in_flight += cost
+                    self._metrics["wait_s"] += waited
+                    return cost
+                wait = (cost - available) / self._restore_rate
+            time.sleep(wait)
+            waited += wait
+
+    def _settle(self, reserved, cost=None):
+        """A request came back: stop counting its reservation and sync to the server's bucket."""
+        status = (cost or {}).get("throttleStatus") or {}
+        with self._lock:
+            self._in_flight = max(0.0, self._in_flight - reserved)
+            if not status:
+                return
+            self._bucket_size = float(status.get("maximumAvailable") or self._bucket_size)
+            self._restore_rate = float(status.get("restoreRate") or self._restore_rate)
+            # the server's count covers everything it has answered; requests
+            # still in flight haven't been charged there yet
+            self._available = float(status.get("currentlyAvailable", self._available)) - self._in_flight
+            self._available_at = time.monotonic()
+
+    # ---------- metrics ----------
+    def _record(self, operation, seconds):
+        with self._lock:
+            self._latencies.setdefault(operation, []).append(seconds)
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._metrics[name] += amount
+
+    def metrics(self):
+        """Counters plus latency percentiles, overall and per operation (wait_s is summed over threads)."""
+        def summary(values):
+            values = sorted(values)
+            if not values:
+                return {"count": 0}
+            pick = lambda q: values[min(len(values) - 1, int(q * len(values)))]
+            return {"count": len(values), "mean_s": round(sum(values) / len(values), 4),
+                    "p50_s": round(pick(0.5), 4), "p95_s": round(pick(0.95), 4), "max_s": round(values[-1], 4)}
+
+        with self._lock:
+            out = dict(self._metrics)
+            out["wait_s"] = round(out["wait_s"], 3)
+            out["bucket"] = {"maximum": self._bucket_size, "restore_rate": self._restore_rate,
+                             "available": round(self._refilled(time.monotonic()), 1)}
+            all_latencies = [s for values in self._latencies.values() for s in values]
+            out["latency"] = summary(all_latencies)
+            out["operations"] = {op: summary(values) for op, values in sorted(self._latencies.items())}
+        return out
+
+    def reset_metrics(self):
+        with self._lock:
+            for key in self._metrics:
+                self._metrics[key] = 0.0 if isinstance(self._metrics[key], float) else 0
+            self._latencies.clear()
+
+    # ---------- queries ----------
+    @staticmethod
+    def operation_name(query):
+        # "mutation productCreateMedia(...)" -> productCreateMedia; anonymous ops -> their first field
+        match = re.search(r"\b(?:query|mutation)\s+(\w+)", query)
+        if match:
+            return match.group(1)
+        match = re.search(r"{\s*(\w+)", query)
+        return match.group(1) if match else "query"
+
+    def execute(self, query, variables=None):
+        """Run a query and return its `data`; GraphQL errors raise RuntimeError."""
+        operation = self.operation_name(query)
+        query_key = hashlib.sha1(query.encode("utf-8")).hexdigest()
+        payload = json.dumps({"query": query, "variables": variables or {}})
+
+        for attempt in range(self.max_retries + 1):
+            reserved = self._reserve(self._query_costs.get(query_key, DEFAULT_QUERY_COST))
+            start = time.perf_counter()
+            self._count("requests")
+            try:
+                r = self._session().post(self.endpoint, data=payload, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._settle(reserved)
+                self._record(operation, time.perf_counter() - start)
+                self._count("http_errors")
+                if attempt == self.max_retries:
+                    raise
+                self._backoff(attempt, f"{type(e).__name__}", operation)
+                continue
+            self._record(operation, time.perf_counter() - start)
+
+            if r.status_code == 429 or r.status_code >= 500:
+                self._settle(reserved)
+                self._count("http_errors")
+                if attempt == self.max_retries:
+                    r.raise_for_status()
+                self._backoff(attempt, f"HTTP {r.status_code}", operation, r.headers.get("Retry-After"))
+                continue
+            if not r.ok:
+                self._settle(reserved)
+                r.raise_for_status()
+
+            body = r.json()
+            cost = (body.get("extensions") or {}).get("cost") or {}
+            self._settle(reserved, cost)
+            if cost.get("requestedQueryCost") is not None:
+                self._query_costs[query_key] = float(cost["requestedQueryCost"])
+                self._count("requested_cost", float(cost["requestedQueryCost"]))
+            if cost.get("actualQueryCost") is not None:
+                self._count("actual_cost", float(cost["actualQueryCost"]))
+
+            errors = body.get("errors")
+            if errors and any(((e or {}).get("extensions") or {}).get("code") == "THROTTLED" for e in errors):
+                self._count("throttled")
+                if attempt == self.max_retries:
+                    raise ShopifyThrottled(f"{operation}: still THROTTLED after {self.max_retries} retries")
+                # _reserve waits for the refill before the retry goes out
+                self._count("retries")
+                continue
+            if errors:
+                self._count("graphql_errors")
+                raise RuntimeError(json.dumps(errors, indent=2))
+            return body["data"]
+
+    def _backoff(self, attempt, reason, operation, retry_after=None):
+        try:
+            delay = float(retry_after) if retry_after else None
+        except ValueError:
+            delay = None
+        if delay is None:
+            delay = min(BACKOFF_MAX_S, BACKOFF_BASE_S * (2 ** attempt))
+        print(f"⚠️ Shopify {operation}: {reason}, retrying in {delay:.1f}s")
+        self._count("retries")
+        time.sleep(delay)
+
+
+# -------------------- shared client --------------------
+
+def get_client(api_version=API_VERSION):
+    """The process-wide client for the store in config.yaml (one per API version)."""
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(api_version)
+        if client is None:
+            client = ShopifyGraphQLClient(shop_domain(), access_token(), api_version=api_version)
+            _CLIENTS[api_version] = client
+        return client
+
+
+def gql(query, variables=None, api_version=API_VERSION):
+    return get_client(api_version).execute(query, variables)
+
+
+def use_client(client, api_version=API_VERSION):
+    """Make `client` the shared one for api_version (e.g. one pointed at shopify_stub)."""
+    with _CLIENTS_LOCK:
+        _CLIENTS[api_version] = client
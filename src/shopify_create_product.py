@@ -1,31 +1,17 @@
 import os, json, requests, yaml, time
 
 # ---------- boilerplate (same style you’re using) ----------
-def normalize_myshopify_domain(raw: str) -> str:
-    s = (raw or "").strip()
-    s = s.replace("https://", "").replace("http://", "").split("/")[0]
-    if s.endswith(".myshopify.com"):
-        s = s[: -len(".myshopify.com")]
-    return f"{s}.myshopify.com"
-
-def load_credentials_from_yaml(item):
-    with open("/Users/johnmikedidonato/Projects/TheShapesOfStories/config.yaml", "r") as yaml_file:
-        config = yaml.safe_load(yaml_file)
-    return config[item]
-
-SHOP_DOMAIN = normalize_myshopify_domain(load_credentials_from_yaml('shopify_url'))
-TOKEN = load_credentials_from_yaml('shopify_key')
-API_VERSION = "2025-10"
-GQL_URL = f"https://{SHOP_DOMAIN}/admin/api/{API_VERSION}/graphql.json"
-HEADERS = {"X-Shopify-Access-Token": TOKEN, "Content-Type": "application/json"}
+import shopify_client
+from shopify_metafield_batch import set_metafields
+
+# credentials come from shopify_client (config.yaml is read once per process)
+SHOP_DOMAIN = shopify_client.shop_domain()
+TOKEN = shopify_client.access_token()
+API_VERSION = shopify_client.API_VERSION
 
 def gql(query: str, variables: dict = None):
-    r = requests.post(GQL_URL, headers=HEADERS, json={"query": query, "variables": variables or {}})
-    r.raise_for_status()
-    data = r.json()
-    if "errors" in data:
-        raise RuntimeError(json.dumps(data["errors"], indent=2))
-    return data["data"]
+    # shared pooled client: keep-alive, query-cost throttling, retries on THROTTLED
+    return shopify_client.gql(query, variables)
 
 # ---------- mutations ----------
 MUT_PRODUCT_CREATE = """
@@ -38,16 +24,6 @@ mutation($input: ProductInput!) {
 """
 
 
-MUT_METAFIELDS_SET = """
-mutation($metafields: [MetafieldsSetInput!]!) {
-  metafieldsSet(metafields: $metafields) {
-    metafields { id namespace key type value }  # removed ownerId
-    userErrors { field message }
-  }
-}
-"""
-
-
 # ---------- type map for YOUR product metafields ----------
 PRODUCT_TYPE_MAP = {
   # story.*
@@ -83,7 +59,11 @@ def _coerce_value(dotted_key: str, value):
     return str(value)
 
 def set_product_metafields(product_id: str, values: dict):
-    """values = {'ns.key': python_value, ...}"""
+    """
+    values = {'ns.key': python_value, ...}
+    Queued into the open metafield_batch() if there is one, otherwise written
+    now; unchanged values are skipped. Returns how many were new or changed.
+    """
     mf_inputs = []
     for dotted_key, val in values.items():
         if dotted_key not in PRODUCT_TYPE_MAP:
@@ -96,11 +76,8 @@ def set_product_metafields(product_id: str, values: dict):
             "type": PRODUCT_TYPE_MAP[dotted_key],
             "value": _coerce_value(dotted_key, val),
         })
-    # Chunk to 25 if you like; your set is under 25 so one call is fine.
-    res = gql(MUT_METAFIELDS_SET, {"metafields": mf_inputs})["metafieldsSet"]
-    if res["userErrors"]:
-        raise RuntimeError(res["userErrors"])
-    return res["metafields"]
+    # batched 25 per metafieldsSet, deduped against the metafield snapshot
+    return set_metafields(mf_inputs)
 
 
 MUT_PRODUCT_OPTIONS_CREATE = """
@@ -148,19 +125,19 @@ def create_product_and_set_metafields(product_input: dict, metafields: dict, opt
 
     # set metafields
     if metafields:
-        set_product_metafields(pid, metafields)
-        print(f"✅ Set {len(metafields)} product metafields")
+        changed = set_product_metafields(pid, metafields)
+        print(f"✅ Set {len(metafields)} product metafields ({changed} new/changed)")
 
     return pid
 
 
 
-def create_shopify_product(story_data_path, product_type):
-
-    #open story data
-    with open(story_data_path, 'r') as f:
-        story_data = json.load(f)
-    
+def build_product_spec(story_data, product_type):
+    """
+    What the Shopify product for this story should look like:
+    (product_input, product_metafields, product_options), or None if the
+    product / story type isn't supported.
+    """
     #SET SHOPIFY CORE PRODUCT FIELDS
     product_title = story_data['title'] + " — " + story_data['protagonist'] + "'s Journey"
     product_handle = story_data['story_slug'] + "-" + product_type
@@ -193,7 +170,7 @@ def create_shopify_product(story_data_path, product_type):
 
     else:
         print("❌ ERROR: Product Type: ", product_type, " NOT supported!")
-        return 
+        return None
     
     product_input = {
         "title": product_title,
@@ -234,20 +211,22 @@ def create_shopify_product(story_data_path, product_type):
         
     else:
         print("❌ ERROR: Story Type: ", story_data['story_type'], " NOT supported!")
-        return 
+        return None
     
     #combine basic and story specific metafields
     product_metafields = basic_product_metafields | story_specific_product_metafields
 
-    shopify_product_id = create_product_and_set_metafields(product_input, product_metafields, product_options)
-    
-    story_data['shopify_product_id'] = shopify_product_id #save shopify product id back to story_data
+    return product_input, product_metafields, product_options
+
 
-    with open(story_data_path, "w", encoding="utf-8") as f:     # save it back to the same file
-        json.dump(story_data, f, ensure_ascii=False, indent=2)
-        f.write("\n")  # optional newline at EOF
-    time.sleep(1)
-    print("✅ Story Data Updated w/ Shopify Product ID")
+def create_shopify_product(story_data_path, product_type):
+    """
+    Create the story's Shopify product, or bring an existing one up to date.
+    Goes through shopify_sync, so only what changed since the last run is
+    written (nothing at all for an unchanged story).
+    """
+    from shopify_sync import sync_shopify_product  # shopify_sync imports this module
+    return sync_shopify_product(story_data_path, product_type)
 
 #TESTING CODE
 # story_data_path = "/Users/johnmikedidonato/Library/CloudStorage/GoogleDrive-johnmike@theshapesofstories.com/My Drive/story_data/the-stranger-meursault.json"
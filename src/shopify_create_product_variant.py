@@ -10,32 +10,17 @@ import time
 
 # ---------- credentials / HTTP ----------
 
-def normalize_myshopify_domain(raw: str) -> str:
-    s = (raw or "").strip()
-    s = s.replace("https://", "").replace("http://", "").split("/")[0]
-    if s.endswith(".myshopify.com"):
-        s = s[: -len(".myshopify.com")]
-    return f"{s}.myshopify.com"
+import shopify_client
+from shopify_metafield_batch import metafield_batch, set_metafields
 
-def load_credentials_from_yaml(item: str):
-    with open("/Users/johnmikedidonato/Projects/TheShapesOfStories/config.yaml", "r") as f:
-        config = yaml.safe_load(f)
-    return config[item]
-
-SHOP_DOMAIN = normalize_myshopify_domain(load_credentials_from_yaml("shopify_url"))
-TOKEN       = load_credentials_from_yaml("shopify_key")
-API_VERSION = "2025-10"
-
-GQL_URL = f"https://{SHOP_DOMAIN}/admin/api/{API_VERSION}/graphql.json"
-HEADERS = {"X-Shopify-Access-Token": TOKEN, "Content-Type": "application/json"}
+# credentials come from shopify_client (config.yaml is read once per process)
+SHOP_DOMAIN = shopify_client.shop_domain()
+TOKEN = shopify_client.access_token()
+API_VERSION = shopify_client.API_VERSION
 
 def gql(query: str, variables: Dict[str, Any] = None) -> Dict[str, Any]:
-    r = requests.post(GQL_URL, headers=HEADERS, json={"query": query, "variables": variables or {}})
-    r.raise_for_status()
-    data = r.json()
-    if "errors" in data:
-        raise RuntimeError(json.dumps(data["errors"], indent=2))
-    return data["data"]
+    # shared pooled client: keep-alive, query-cost throttling, retries on THROTTLED
+    return shopify_client.gql(query, variables)
 
 # ---------- metafield typing (VARIANTS) ----------
 
@@ -118,15 +103,6 @@ mutation($productId: ID!, $variants: [ProductVariantsBulkInput!]!) {
 }
 """
 
-MUT_METAFIELDS_SET = """
-mutation($metafields: [MetafieldsSetInput!]!) {
-  metafieldsSet(metafields: $metafields) {
-    metafields { id namespace key type value }
-    userErrors { field message }
-  }
-}
-"""
-
 Q_PRODUCT_OPTIONS = """
 query($id: ID!) {
   product(id: $id) {
@@ -262,17 +238,8 @@ import requests
 # Make sure these are set in your env or config:
 
 def admin_gql(query: str, variables: dict | None = None) -> dict:
-    url = f"https://{SHOP_DOMAIN}/admin/api/2024-07/graphql.json"
-    headers = {
-        "Content-Type": "application/json",
-        "X-Shopify-Access-Token": TOKEN,   # NOTE: Admin token (NOT Storefront)
-    }
-    r = requests.post(url, json={"query": query, "variables": variables or {}}, headers=headers, timeout=60)
-    r.raise_for_status()
-    data = r.json()
-    if "errors" in data:
-        raise RuntimeError(json.dumps(data["errors"], indent=2))
-    return data["data"]
+    # NOTE: Admin token (NOT Storefront); this one still runs on the 2024-07 API
+    return shopify_client.gql(query, variables, api_version="2024-07")
 # --- /Admin GraphQL executor (ADD) ---
 def ensure_pod_inventory_settings(product_gid: str, variant_gid: str):
     """
@@ -370,9 +337,8 @@ def set_variant_metafields(variant_id: str, values: Dict[str, Any]) -> None:
             "type": VARIANT_TYPE_MAP[dotted_key],
             "value": _coerce_value(dotted_key, val),
         })
-    res = gql(MUT_METAFIELDS_SET, {"metafields": mf_inputs})["metafieldsSet"]
-    if res["userErrors"]:
-        raise RuntimeError(res["userErrors"])
+    # queued into the open metafield_batch() (or written now), unchanged values skipped
+    set_metafields(mf_inputs)
 
 # ---------- orchestration ----------
 
@@ -400,41 +366,39 @@ def upsert_variants_with_metafields(
     # Map by SKU primarily; fallback by title
     by_sku = {v.get("sku") or "": v for v in created if v.get("sku")}
     if metafields_for_variant:
-        for key, fields in metafields_for_variant.items():
-            node = by_sku.get(key) or next((v for v in created if v["title"] == key), None)
-            if not node:
-                logs.append(f"⚠️ Could not find variant for key '{key}' to set metafields")
-                continue
-            set_variant_metafields(node["id"], fields)
-            logs.append(f"Set {len(fields)} metafields on variant '{key}'")
+        # all variants' metafields go out together, 25 per metafieldsSet
+        with metafield_batch():
+            for key, fields in metafields_for_variant.items():
+                node = by_sku.get(key) or next((v for v in created if v["title"] == key), None)
+                if not node:
+                    logs.append(f"⚠️ Could not find variant for key '{key}' to set metafields")
+                    continue
+                set_variant_metafields(node["id"], fields)
+                logs.append(f"Set {len(fields)} metafields on variant '{key}'")
 
     return created, logs
 
 
 # ---------- main entry (your flow) ----------
 
-def create_shopify_product_variant(story_data_path: str, product_type: str, product_slug: str = "ALL", delete_placeholder_variants: bool = True):
-    # 1) Load story data
-    with open(story_data_path, "r", encoding="utf-8") as f:
-        story_data = json.load(f)
-
-    shopify_product_id = story_data.get("shopify_product_id")
-    if not shopify_product_id:
-        print("❌ ERROR: Missing 'shopify_product_id' in story data.")
-        return
-
-    # 2) Get product variants block for this product type
+def build_variant_specs(story_data: Dict[str, Any], product_type: str, product_slug: str = "ALL"):
+    """
+    The variants the story's product should have, from the variant JSON files:
+    (option_names, variants_payload for productVariantsBulkCreate,
+    metafields_by_sku), or None if something isn't supported.
+    """
+    # Get product variants block for this product type
     products_map = story_data.get("products", {})
     product_variants = products_map.get(product_type)
     if product_variants is None:
         print(f"❌ ERROR: No product variants for product type: {product_type}")
-        return
+        return None
 
     if product_slug != "ALL":
         print("❌ ERROR: SPECIFIC SLUG NOT SUPPORTED AT THIS TIME")
-        return
+        return None
 
-    # 3) Build variants + metafields (ACCUMULATE lists, don’t overwrite)
+    # Build variants + metafields (ACCUMULATE lists, don’t overwrite)
     option_names = ["Size", "Color", "Style"]
     variants_payload: List[Dict[str, Any]] = []
     metafields_by_sku: Dict[str, Dict[str, Any]] = {}
@@ -454,7 +418,7 @@ def create_shopify_product_variant(story_data_path: str, product_type: str, prod
             width_in, height_in, orientation = 8, 10, "Portrait"
         else:
             print(f"❌ ERROR: size '{size_label}' not currently supported")
-            return
+            return None
 
         dpi = 300
         border_in = (vjson["border_thickness"] / dpi) / 2  # if your JSON is total border, adjust as needed
@@ -469,7 +433,7 @@ def create_shopify_product_variant(story_data_path: str, product_type: str, prod
             style_label = "Classic"
         else:
             print(f"❌ ERROR: line_style '{line_style}' not currently supported")
-            return
+            return None
 
         bg_hex   = vjson["background_color_hex"]
         bg_name  = vjson["background_color_name"]
@@ -533,69 +497,19 @@ def create_shopify_product_variant(story_data_path: str, product_type: str, prod
             "printify.variant_id":   str(printify_variant_id)   if printify_variant_id   is not None else "",
         }
 
+    return option_names, variants_payload, metafields_by_sku
 
-    # 4) Create variants + set metafields
-    created, logs = upsert_variants_with_metafields(
-        product_id=shopify_product_id,
-        option_names=option_names,
-        variants=variants_payload,
-        metafields_for_variant=metafields_by_sku,
-    )
-
-    print("----- VARIANTS CREATED -----")
-    for v in created:
-        opts = " / ".join([f"{o['name']}={o['value']}" for o in v["selectedOptions"]])
-        print(f"- {v['title']} | SKU={v.get('sku','')} | {opts} | id={v['id']}")
-
-        #save variant id back into both product json and story json  and save 
-        #find the right place to add by matching sku
-        for slug, entry in product_variants.items(): #product variants part of story data 
-            if entry["sku"] == v["sku"]:
-                entry["shopify_variant_id"] = v["id"] #add shopify product variant 
-                variant_file_path = entry["file_path"]
-
-                with open(variant_file_path, "r", encoding="utf-8") as f:
-                    product_variant_data = json.load(f)
-                
-                product_variant_data['shopify_variant_id'] = v['id']
-                product_variant_data['shopify_product_id'] = shopify_product_id
-
-
-                with open(variant_file_path, "w", encoding="utf-8") as f:     # save it back to the same file
-                    json.dump(product_variant_data, f, ensure_ascii=False, indent=2)
-                    f.write("\n")  # optional newline at EOF
-                time.sleep(1)
-                print("✅ Product Variant Data updated w/ Shopify Variant ID and Shopify Product ID")
-
-                story_data['products'][product_type] = product_variants
-                with open(story_data_path, "w", encoding="utf-8") as f:     # save it back to the same file
-                    json.dump(story_data, f, ensure_ascii=False, indent=2)
-                    f.write("\n")  # optional newline at EOF
-                time.sleep(1)
-                print("✅ Story Data updated w/ Shopify Variant ID")
-                
-
-    print("----- LOGS -----")
-    for line in logs:
-        print(line)
-
-    # Build intended keys/SKUs for later comparison
-    intended_keys, intended_skus = build_intended_sets(variants_payload)
-
-
-    if delete_placeholder_variants:
-        placeholder_ids = find_placeholder_variants(shopify_product_id, intended_keys, intended_skus)
-        if not placeholder_ids:
-            print("🧹 No placeholder or stray variants found.")
-        else:
-            existing_after = list_product_variants(shopify_product_id)
-            if len(existing_after) - len(placeholder_ids) < 1:
-                print("⚠️ Refusing to delete: would leave product with zero variants.")
-            else:
-                deleted = delete_variants(shopify_product_id, placeholder_ids)
-                print(f"✅ Deleted placeholder/stray variants: {len(deleted)}")
-    
 
+def create_shopify_product_variant(story_data_path: str, product_type: str, product_slug: str = "ALL", delete_placeholder_variants: bool = True):
+    """
+    Create / update / delete the product's variants so they match the story's
+    variant files. Goes through shopify_sync: only variants (and variant
+    metafields) that changed since the last run are written, and the
+    placeholder variant left by product creation is removed once.
+    """
+    from shopify_sync import sync_shopify_variants  # shopify_sync imports this module
+    return sync_shopify_variants(story_data_path, product_type, product_slug=product_slug,
+                                 delete_placeholder_variants=delete_placeholder_variants)
 
 
 # ---------- testing ----------
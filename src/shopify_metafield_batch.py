@@ -0,0 +1,277 @@
+"""
+Metafield Write Batching for The Shapes of Stories
+==================================================
+
+set_product_metafields, set_variant_metafields (once per variant from
+upsert_variants_with_metafields) and ShopifyMockups.set_variant_mockup_metafield
+each sent their own metafieldsSet, so one print product with a dozen
+variants was a dozen-plus sequential round trips, and re-running a build
+re-wrote every value even when nothing had changed.
+
+MetafieldBatch collects metafield writes and sends them in full
+metafieldsSet calls (25 metafields per call, Shopify's limit):
+    - writes are keyed by (owner, namespace, key); a later write to the same
+      field replaces the queued one
+    - values already on Shopify, according to a local snapshot
+      (~/.shapes_cache/shopify_metafields/<shop>.json, a hash per field), are
+      dropped, so a re-run only writes what changed
+    - the snapshot is updated after every successful call: under a file lock
+      the file is re-read and only the fields this batch wrote (or forgot) are
+      merged in, so workers publishing side by side don't overwrite each
+      other's entries
+
+Wrap a build run in metafield_batch() and every set_*_metafields call inside
+it queues into the same batch, across products and variants. Anything that
+reads metafields back from Shopify calls flush_active() first, and whatever
+is still queued goes out when the block exits:
+
+    with metafield_batch():
+        for row in rows:
+            publish_product(...)
+
+Outside a metafield_batch() block the set_* helpers flush right away (still
+one call per 25 fields, still deduped).
+
+The snapshot only knows about writes made through here, so it goes stale
+when a value is edited in the Shopify admin. Callers that keep their own
+record of what they wrote pass dedupe=False and only queue what changed:
+shopify_sync diffs against the per-story state hashes (and the mockup upload
+against its recorded media), so there is one dedupe layer on that path and
+the snapshot is just kept up to date. For the other callers, run with
+dedupe=False (or delete the snapshot) to push everything again.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, concurrent workers may drop each other's entries
+    fcntl = None
+
+CHUNK_SIZE = 25  # metafieldsSet accepts at most 25 metafields per call
+SNAPSHOT_DIR = os.path.join(os.path.expanduser("~/.shapes_cache"), "shopify_metafields")
+
+MUT_METAFIELDS_SET = """
+mutation metafieldsSet($metafields: [MetafieldsSetInput!]!) {
+  metafieldsSet(metafields: $metafields) {
+    metafields { id namespace key type value }
+    userErrors { field message code }
+  }
+}
+"""
+
+_ACTIVE = []  # stack of open metafield_batch() blocks
+_ACTIVE_LOCK = threading.Lock()
+
+
+def _value_hash(type_, value):
+    return hashlib.sha1(f"{type_}\n{value}".encode("utf-8")).hexdigest()
+
+
+def default_snapshot_path():
+    import shopify_client
+    return os.path.join(SNAPSHOT_DIR, shopify_client.shop_domain() + ".json")
+
+
+class MetafieldBatch:
+    def __init__(self, execute=None, snapshot_path=None, chunk_size=CHUNK_SIZE, dedupe=True):
+        """
+        execute: fn(query, variables) -> data; defaults to shopify_client.gql
+        snapshot_path: JSON file of what has been written (None = default per
+        shop; False = no snapshot)
+        """
+        if execute is None:
+            import shopify_client
+            execute = shopify_client.gql
+        self.execute = execute
+        self.chunk_size = min(chunk_size, CHUNK_SIZE)
+        self.dedupe = dedupe
+        self.snapshot_path = default_snapshot_path() if snapshot_path is None else snapshot_path
+        self.snapshot = self._load_snapshot() if self.snapshot_path else {}
+        self._written = {}      # owner -> {field: hash} written since the last save
+        self._forgotten = set()  # owners dropped since the last save
+        self.pending = {}  # (owner, namespace, key) -> MetafieldsSetInput
+        self.stats = {"queued": 0, "unchanged": 0, "written": 0, "calls": 0}
+        self._lock = threading.Lock()
+
+    # ---------- snapshot ----------
+    def _load_snapshot(self):
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Ignoring unreadable metafield snapshot {self.snapshot_path}: {e}")
+            return {}
+
+    @contextlib.contextmanager
+    def _snapshot_lock(self):
+        # one writer at a time per snapshot, across processes
+        if fcntl is None:
+            yield
+            return
+        with open(self.snapshot_path + ".lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _save_snapshot(self):
+        if not self.snapshot_path:
+            return
+        directory = os.path.dirname(self.snapshot_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        with self._snapshot_lock():
+            with self._lock:
+                written, self._written = self._written, {}
+                forgotten, self._forgotten = self._forgotten, set()
+            # merge into what is on disk now: other workers may have saved since we loaded it
+            snapshot = self._load_snapshot()
+            for owner_id in forgotten:
+                snapshot.pop(owner_id, None)
+            for owner_id, fields in written.items():
+                snapshot.setdefault(owner_id, {}).update(fields)
+            with tempfile.NamedTemporaryFile("w", delete=False, dir=directory, suffix=".tmp", encoding="utf-8") as tmp:
+                json.dump(snapshot, tmp, indent=1, sort_keys=True)
+                tmp_path = tmp.name
+            os.replace(tmp_path, self.snapshot_path)
+        with self._lock:
+            # keep anything written while we were saving; it goes out with the next save
+            for owner_id in self._forgotten:
+                snapshot.pop(owner_id, None)
+            for owner_id, fields in self._written.items():
+                snapshot.setdefault(owner_id, {}).update(fields)
+            self.snapshot = snapshot
+
+    def is_current(self, owner_id, namespace, key, type_, value):
+        """True if the snapshot says Shopify already has this value."""
+        return self.snapshot.get(owner_id, {}).get(f"{namespace}.{key}") == _value_hash(type_, value)
+
+    # ---------- queueing ----------
+    def add(self, owner_id, namespace, key, type_, value, dedupe=None):
+        """
+        Queue one write (value already in metafieldsSet's string form). Returns
+        False if it was unchanged. dedupe overrides the batch's setting for
+        this write (False: the caller already knows it changed).
+        """
+        if dedupe is None:
+            dedupe = self.dedupe
+        with self._lock:
+            field = (owner_id, namespace, key)
+            if dedupe and self.is_current(owner_id, namespace, key, type_, value):
+                self.pending.pop(field, None)  # an older queued value would undo this one
+                self.stats["unchanged"] += 1
+                return False
+            self.pending[field] = {"ownerId": owner_id, "namespace": namespace, "key": key,
+                                   "type": type_, "value": value}
+            self.stats["queued"] += 1
+            full = len(self.pending) >= self.chunk_size
+        if full:
+            self.flush(full_chunks_only=True)
+        return True
+
+    def add_inputs(self, mf_inputs, dedupe=None):
+        """Queue a list of MetafieldsSetInput dicts."""
+        return sum(self.add(m["ownerId"], m["namespace"], m["key"], m["type"], m["value"], dedupe=dedupe)
+                   for m in mf_inputs)
+
+    # ---------- sending ----------
+    def flush(self, full_chunks_only=False):
+        """Send queued writes, chunk_size per metafieldsSet. Raises RuntimeError on userErrors."""
+        errors = []
+        written = []
+        while True:
+            with self._lock:
+                if not self.pending or (full_chunks_only and len(self.pending) < self.chunk_size):
+                    break
+                fields = list(self.pending)[:self.chunk_size]
+                chunk = [self.pending.pop(field) for field in fields]
+
+            res = self.execute(MUT_METAFIELDS_SET, {"metafields": chunk})["metafieldsSet"]
+            with self._lock:
+                self.stats["calls"] += 1
+                if res.get("userErrors"):
+                    # metafieldsSet is all or nothing: nothing in this chunk was written
+                    errors.extend(res["userErrors"])
+                    continue
+                for m in chunk:
+                    field, value_hash = f"{m['namespace']}.{m['key']}", _value_hash(m["type"], m["value"])
+                    self.snapshot.setdefault(m["ownerId"], {})[field] = value_hash
+                    self._written.setdefault(m["ownerId"], {})[field] = value_hash
+                self.stats["written"] += len(chunk)
+                written.extend(res.get("metafields") or [])
+            self._save_snapshot()
+
+        if errors:
+            raise RuntimeError(f"metafieldsSet errors: {errors}")
+        return written
+
+    def forget(self, owner_id):
+        """Drop an owner from the snapshot (e.g. a deleted variant)."""
+        with self._lock:
+            self.snapshot.pop(owner_id, None)
+            self._written.pop(owner_id, None)
+            self._forgotten.add(owner_id)
+        self._save_snapshot()  # another worker may have saved it even if we never saw it
+
+
+# -------------------- active batch --------------------
+
+@contextlib.contextmanager
+def metafield_batch(**kwargs):
+    """
+    Queue every set_*_metafields write made inside the block into one
+    MetafieldBatch, flushed when the block exits. Nested inside another
+    metafield_batch() (with no arguments) it just joins the outer one.
+    """
+    outer = active_batch()
+    if outer is not None and not kwargs:
+        yield outer
+        return
+    batch = MetafieldBatch(**kwargs)
+    with _ACTIVE_LOCK:
+        _ACTIVE.append(batch)
+    try:
+        yield batch
+    finally:
+        with _ACTIVE_LOCK:
+            _ACTIVE.remove(batch)
+        batch.flush()
+        print(f"✅ Metafields: {batch.stats['written']} written in {batch.stats['calls']} calls, "
+              f"{batch.stats['unchanged']} unchanged")
+
+
+def active_batch():
+    with _ACTIVE_LOCK:
+        return _ACTIVE[-1] if _ACTIVE else None
+
+
+def flush_active():
+    """Send everything queued in the open batch, e.g. before reading metafields back."""
+    batch = active_batch()
+    if batch is not None:
+        batch.flush()
+
+
+def set_metafields(mf_inputs, execute=None, snapshot_path=None, dedupe=True):
+    """
+    Write MetafieldsSetInput dicts: queued in the open metafield_batch() if it
+    sends through the same execute, otherwise sent now (in 25s). With dedupe,
+    inputs the snapshot says are current are skipped; pass dedupe=False when
+    the caller has already worked out what changed (shopify_sync).
+    Returns the number of inputs that weren't already current.
+    """
+    batch = active_batch()
+    if batch is not None and (execute is None or execute == batch.execute):
+        return batch.add_inputs(mf_inputs, dedupe=None if dedupe else False)
+    batch = MetafieldBatch(execute=execute, snapshot_path=snapshot_path, dedupe=dedupe)
+    changed = batch.add_inputs(mf_inputs)
+    batch.flush()
+    return changed
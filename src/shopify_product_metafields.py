@@ -2,35 +2,16 @@ import os, requests, json, yaml
 
 ### THIS IS FOR CREATING AND/OR UPDATING SHOPIFY PRODUCT METAFIELDS ###
 
-def normalize_myshopify_domain(raw: str) -> str:
-    s = (raw or "").strip()
-    s = s.replace("https://", "").replace("http://", "").split("/")[0]
-    if s.endswith(".myshopify.com"):
-        s = s[: -len(".myshopify.com")]
-    return f"{s}.myshopify.com"
-
-def load_credentials_from_yaml(item):
-    with open("/Users/johnmikedidonato/Projects/TheShapesOfStories/config.yaml", "r") as yaml_file:
-        config = yaml.safe_load(yaml_file)
-    return config[item]
-
-
-# -------------------------
-# Config
-# -------------------------
-SHOP_DOMAIN = normalize_myshopify_domain(load_credentials_from_yaml('shopify_url'))
-TOKEN = load_credentials_from_yaml('shopify_key')
-API_VERSION = "2025-10"
-GQL_URL = f"https://{SHOP_DOMAIN}/admin/api/{API_VERSION}/graphql.json"
-HEADERS = {"X-Shopify-Access-Token": TOKEN, "Content-Type": "application/json"}
+import shopify_client
+
+# credentials come from shopify_client (config.yaml is read once per process)
+SHOP_DOMAIN = shopify_client.shop_domain()
+TOKEN = shopify_client.access_token()
+API_VERSION = shopify_client.API_VERSION
 
 def gql(query: str, variables: dict = None):
-    r = requests.post(GQL_URL, headers=HEADERS, json={"query": query, "variables": variables or {}})
-    r.raise_for_status()
-    data = r.json()
-    if "errors" in data:
-        raise RuntimeError(json.dumps(data["errors"], indent=2))
-    return data["data"]
+    # shared pooled client: keep-alive, query-cost throttling, retries on THROTTLED
+    return shopify_client.gql(query, variables)
 
 # Look up an existing definition by namespace/key
 QUERY_DEF = """
@@ -5,50 +5,28 @@ import os
 import json
 import requests, yaml, time
 import datetime
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 
 from PIL import Image, ImageOps
 import os
+import shutil
+from upload_prep import file_digest, prepare_for_upload
+from shopify_metafield_batch import SNAPSHOT_DIR as METAFIELD_SNAPSHOT_DIR, flush_active, set_metafields
+from shopify_sync import MUT_FILE_DELETE, load_state, plan_mockups, product_entry, save_state
+
 MAX_PIXELS = 20_000_000  # Shopify hard limit
 def downscale_to_20mp_inplace(path: str, max_pixels: int = MAX_PIXELS) -> None:
     """
     If `path` points to an image >20MP, resizes it in-place (same filename)
     keeping aspect ratio. Uses high-quality resampling. Preserves format.
     """
-    with Image.open(path) as im:
-        # Honor EXIF orientation for JPEGs
-        im = ImageOps.exif_transpose(im)
-        w, h = im.size
-        pixels = w * h
-        if pixels <= max_pixels:
-            return  # already fine
-
-        scale = (max_pixels / pixels) ** 0.5
-        new_w = max(1, int(w * scale))
-        new_h = max(1, int(h * scale))
-        im = im.resize((new_w, new_h), Image.LANCZOS)
-
-        fmt = (im.format or os.path.splitext(path)[1].lstrip(".")).upper()
-        save_kwargs = {}
-        if fmt in ("JPG", "JPEG"):
-            # Sensible defaults for JPEG
-            save_kwargs.update(dict(quality=92, optimize=True, progressive=True))
-            fmt = "JPEG"
-        elif fmt == "PNG":
-            # Keep transparency; try to optimize
-            save_kwargs.update(dict(optimize=True))
-        # Overwrite same file
-        im.save(path, format=fmt, **save_kwargs)
-        print(f"ℹ️ Downscaled in-place {os.path.basename(path)}: {w}x{h} → {new_w}x{new_h}")
-
-
-from PIL import Image, ImageCms
-
-import os, io, tempfile
-from PIL import Image, ImageCms
-
-import os, io, tempfile
-from PIL import Image, ImageCms
+    prepared = prepare_for_upload(path, max_edge=None, max_pixels=max_pixels)
+    if prepared != path:
+        _replace_with(path, prepared)
+
 
 def normalize_for_shopify(src_path: str, max_edge: int = 5000, flatten_bg=None) -> str:
     """
@@ -56,91 +34,73 @@ def normalize_for_shopify(src_path: str, max_edge: int = 5000, flatten_bg=None)
       - 8-bit sRGB
       - RGB (or RGBA if keeping alpha); optional alpha flatten to a bg color
       - Long edge <= max_edge (default 5000px) using LANCZOS
-      - Saves as PNG (optimized, non-interlaced) OVERWRITING src_path atomically
+      - Overwrites src_path atomically, and only if something had to change
     Returns src_path.
-    """
-    im = Image.open(src_path)
 
-    # Ensure 8-bit channel & compatible mode
-    if im.mode not in ("RGB", "RGBA"):
-        im = im.convert("RGBA")
+    Uploads don't need this anymore: upload_product_images(prepare=prepare_for_upload)
+    uploads a prepared copy and leaves the mockup alone.
+    """
+    prepared = prepare_for_upload(src_path, max_edge=max_edge, max_pixels=None, flatten_bg=flatten_bg)
+    if prepared != src_path:
+        _replace_with(src_path, prepared)
+    return src_path
 
-    # Convert to sRGB if an ICC profile exists
-    try:
-        icc = im.info.get("icc_profile")
-        if icc:
-            src_prof = ImageCms.ImageCmsProfile(io.BytesIO(icc))
-            dst_prof = ImageCms.createProfile("sRGB")
-            im = ImageCms.profileToProfile(im, src_prof, dst_prof, outputMode=im.mode)
-    except Exception:
-        # If profile conversion fails, continue with current image
-        pass
-
-    # Optionally flatten alpha onto a background
-    if im.mode == "RGBA" and flatten_bg is not None:
-        bg = Image.new("RGB", im.size, flatten_bg)
-        bg.paste(im, mask=im.split()[-1])
-        im = bg  # now RGB (no alpha)
-
-    # Clamp dimensions if needed
-    w, h = im.size
-    long_edge = max(w, h)
-    if long_edge > max_edge:
-        scale = max_edge / float(long_edge)
-        im = im.resize((int(round(w*scale)), int(round(h*scale))), Image.LANCZOS)
 
+def _replace_with(dst_path: str, src_path: str) -> None:
     # Atomic overwrite to avoid partial writes
-    dir_, base = os.path.split(src_path)
-    with tempfile.NamedTemporaryFile(delete=False, dir=dir_, suffix=".png") as tmp:
+    dir_ = os.path.dirname(dst_path) or "."
+    with tempfile.NamedTemporaryFile(delete=False, dir=dir_, suffix=".tmp") as tmp:
         tmp_path = tmp.name
     try:
-        im.save(tmp_path, format="PNG", optimize=True)
-        os.replace(tmp_path, src_path)  # atomic on POSIX
+        shutil.copyfile(src_path, tmp_path)
+        os.replace(tmp_path, dst_path)  # atomic on POSIX
     finally:
         if os.path.exists(tmp_path):
             try: os.remove(tmp_path)
             except OSError: pass
 
-    return src_path
-
 
 
 def clip_alt(text: str, max_len: int = 512) -> str:
     return (text[: max_len - 1] + "…") if len(text) > max_len else text
 
 
-def normalize_myshopify_domain(raw: str) -> str:
-    s = (raw or "").strip()
-    s = s.replace("https://", "").replace("http://", "").split("/")[0]
-    if s.endswith(".myshopify.com"):
-        s = s[: -len(".myshopify.com")]
-    return f"{s}.myshopify.com"
-
-def load_credentials_from_yaml(item: str):
-    with open("/Users/johnmikedidonato/Projects/TheShapesOfStories/config.yaml", "r") as f:
-        config = yaml.safe_load(f)
-    return config[item]
+import shopify_client
+from shopify_client import ShopifyGraphQLClient
 
-SHOP_DOMAIN = normalize_myshopify_domain(load_credentials_from_yaml("shopify_url"))
-TOKEN       = load_credentials_from_yaml("shopify_key")
-API_VERSION = "2025-10"
+# credentials come from shopify_client (config.yaml is read once per process)
+SHOP_DOMAIN = shopify_client.shop_domain()
+TOKEN       = shopify_client.access_token()
+API_VERSION = shopify_client.API_VERSION
 
-GQL_URL = f"https://{SHOP_DOMAIN}/admin/api/{API_VERSION}/graphql.json"
-HEADERS = {"X-Shopify-Access-Token": TOKEN, "Content-Type": "application/json"}
+# pipelined uploads (upload_product_images)
+UPLOAD_WORKERS = 4        # staged uploads (prepare + stage + POST) in flight at once
+MEDIA_BATCH_SIZE = 10     # media per productCreateMedia call
+ATTACH_BATCH_SIZE = 25    # variant/media pairs per productVariantAppendMedia call
+NODES_PER_QUERY = 250     # Shopify's cap on nodes(ids:)
 
 
 class ShopifyMockups:
-    def __init__(self, shop_domain: str, access_token: str):
+    def __init__(self, shop_domain: str, access_token: str, endpoint: Optional[str] = None):
         self.shop_domain = shop_domain
         self.access_token = access_token
-        # Use the live domain you calculated above; ignore format() on GQL_URL
-        self.endpoint = f"https://{self.shop_domain}/admin/api/{API_VERSION}/graphql.json"
-        self.session = requests.Session()
-        self.session.headers.update({
-            "X-Shopify-Access-Token": access_token,
-            "Content-Type": "application/json",
-            "Accept": "application/json",
-        })
+        # (endpoint is only passed to point at shopify_stub)
+        self._shared_client = endpoint is None and shop_domain == SHOP_DOMAIN and access_token == TOKEN
+        if self._shared_client:
+            self.client = shopify_client.get_client(API_VERSION)  # share the pool / throttle with the other shopify_* modules
+        else:
+            self.client = ShopifyGraphQLClient(shop_domain, access_token, api_version=API_VERSION, endpoint=endpoint)
+        self.endpoint = self.client.endpoint
+        # upload workers each get their own session for the staged upload POSTs
+        self._local = threading.local()
+
+    def _thread_upload_session(self) -> requests.Session:
+        # no Shopify headers: this one talks to the staged upload bucket
+        session = getattr(self._local, "upload_session", None)
+        if session is None:
+            session = requests.Session()
+            self._local.upload_session = session
+        return session
     
     def wait_until_media_ready(self, media_id: str, timeout_sec: float = 20.0, poll_every: float = 0.5) -> None:
         """
@@ -257,13 +217,8 @@ class ShopifyMockups:
 
 
     def _gql(self, query: str, variables: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        payload = {"query": query, "variables": variables or {}}
-        r = self.session.post(self.endpoint, data=json.dumps(payload))
-        r.raise_for_status()
-        data = r.json()
-        if "errors" in data:
-            raise RuntimeError(f"GraphQL errors: {data['errors']}")
-        return data["data"]
+        # thread-safe: ShopifyGraphQLClient keeps a session per thread
+        return self.client.execute(query, variables)
     
     import time
 
@@ -342,10 +297,8 @@ class ShopifyMockups:
 
         raise RuntimeError("Timed out waiting for media preview.image to be generated.")
 
-    def upload_product_image(self, product_id: str, image_path: str, alt_text: Optional[str] = None) -> Tuple[str, str]:
-        if not os.path.exists(image_path):
-            raise FileNotFoundError(f"Image not found: {image_path}")
-
+    def _stage_and_upload(self, image_path: str) -> str:
+        """stagedUploadsCreate + POST of the file to the staged target. Returns the resourceUrl."""
         filename  = os.path.basename(image_path)
         mime      = "image/png" if image_path.lower().endswith(".png") else "image/jpeg"
         file_size = str(os.path.getsize(image_path))  # UnsignedInt64 must be STRING
@@ -381,9 +334,16 @@ class ShopifyMockups:
         # 2) POST file to S3
         with open(image_path, "rb") as f:
             files = {"file": (filename, f, mime)}
-            resp = requests.post(post_url, data=fields, files=files)
+            resp = self._thread_upload_session().post(post_url, data=fields, files=files)
         if not (200 <= resp.status_code < 400):
             raise RuntimeError(f"S3 upload failed: {resp.status_code} {resp.text[:300]}")
+        return resource_url
+
+    def upload_product_image(self, product_id: str, image_path: str, alt_text: Optional[str] = None) -> Tuple[str, str]:
+        if not os.path.exists(image_path):
+            raise FileNotFoundError(f"Image not found: {image_path}")
+
+        resource_url = self._stage_and_upload(image_path)
 
         # 3) Create media on product (IMAGE) — mediaContentType inside the media item
         media_mutation = """
@@ -481,6 +441,212 @@ class ShopifyMockups:
         return img_id, img_url, media_id
 
 
+    # ---------- pipelined uploads ----------
+    def _create_media_batch(self, product_id: str, batch: List[Dict[str, Any]]) -> None:
+        """One productCreateMedia for a batch of upload_product_images entries; fills in media_id / error."""
+        media_mutation = """
+        mutation productCreateMedia($productId: ID!, $media: [CreateMediaInput!]!) {
+        productCreateMedia(productId: $productId, media: $media) {
+            media {
+            id
+            mediaContentType
+            preview { image { id url altText } }
+            }
+            mediaUserErrors { field message }
+        }
+        }
+        """
+        media_vars = {
+            "productId": product_id,
+            "media": [{
+                "originalSource": entry["source"],
+                "mediaContentType": "IMAGE",
+                **({"alt": entry["alt"]} if entry.get("alt") else {}),
+            } for entry in batch]
+        }
+        try:
+            pcm = self._gql(media_mutation, media_vars)["productCreateMedia"]
+        except Exception as e:
+            for entry in batch:
+                entry["error"] = f"productCreateMedia failed: {e}"
+            return
+        if pcm.get("mediaUserErrors"):
+            for entry in batch:
+                entry["error"] = f"productCreateMedia errors: {pcm['mediaUserErrors']}"
+            return
+
+        # media comes back in input order; [None] slots are still being created
+        media_items = pcm.get("media") or []
+        for i, entry in enumerate(batch):
+            node = media_items[i] if i < len(media_items) else None
+            if node and node.get("id"):
+                entry["media_id"] = node["id"]
+                preview_img = (node.get("preview") or {}).get("image") or {}
+                if preview_img.get("id") and preview_img.get("url"):
+                    entry["image_id"], entry["image_url"] = preview_img["id"], preview_img["url"]
+            elif entry.get("alt"):
+                entry["media_id"] = self._find_recent_media_by_alt(product_id, entry["alt"])
+                if not entry["media_id"]:
+                    entry["error"] = "No media node returned and could not locate media by alt on product."
+            else:
+                entry["error"] = "No media node returned from productCreateMedia and no alt provided to locate it."
+
+    def wait_for_media_previews(self, media_ids: List[str], *, timeout_s: int = 90, poll_interval_s: float = 1.0) -> Dict[str, Any]:
+        """
+        Like _wait_for_media_preview, for many media at once: one nodes(ids:)
+        query per poll covers everything still processing.
+        Returns {media_id: (product_image_id, image_url)} for the ready ones and
+        {media_id: "error message"} for the ones that failed or timed out.
+        """
+        q = """
+        query ($ids: [ID!]!) {
+        nodes(ids: $ids) {
+            ... on MediaImage {
+            id
+            status        # EXPECTED: PROCESSING | READY | FAILED
+            preview {
+                image { id url altText }
+            }
+            }
+        }
+        }
+        """
+        results: Dict[str, Any] = {}
+        pending = list(dict.fromkeys(media_ids))
+        deadline = time.time() + timeout_s
+        while pending and time.time() < deadline:
+            for start in range(0, len(pending), NODES_PER_QUERY):
+                ids = pending[start:start + NODES_PER_QUERY]
+                data = self._gql(q, {"ids": ids})
+                for media_id, node in zip(ids, data.get("nodes") or []):
+                    if not node:
+                        continue
+                    preview = (node.get("preview") or {}).get("image")
+                    if node.get("status") == "FAILED":
+                        results[media_id] = "Media processing failed for image."
+                    elif preview and preview.get("id") and preview.get("url"):
+                        results[media_id] = (preview["id"], preview["url"])
+            pending = [m for m in pending if m not in results]
+            if pending:
+                time.sleep(poll_interval_s)
+
+        for media_id in pending:
+            results[media_id] = "Timed out waiting for media preview.image to be generated."
+        return results
+
+    def upload_product_images(self, product_id: str, items: List[Dict[str, Any]], *, prepare=None,
+                              max_workers: int = UPLOAD_WORKERS, media_batch_size: int = MEDIA_BATCH_SIZE,
+                              timeout_s: int = 90, poll_interval_s: float = 1.0,
+                              raise_on_error: bool = True) -> List[Dict[str, Any]]:
+        """
+        upload_product_image / upload_product_image_from_url for many images, pipelined:
+
+          1. up to `max_workers` images at a time go through prepare(path) (e.g.
+             upload_prep.prepare_for_upload, which returns the path to upload),
+             stagedUploadsCreate and the POST to the staged target
+          2. as soon as the next `media_batch_size` images (in input order) are
+             uploaded they're created with one productCreateMedia, while the
+             rest are still uploading; input order is kept so the product
+             gallery comes out in the order given
+          3. one nodes(ids:) poll waits for every new media's preview
+
+        items: dicts with image_path OR image_url, and alt (optional)
+        Returns one dict per item, in order, with media_id / image_id /
+        image_url (and error if it failed). With raise_on_error, any failure
+        raises RuntimeError after the others have finished.
+        """
+        entries = []
+        for item in items:
+            entry = {"image_path": item.get("image_path"), "image_url_in": item.get("image_url"), "alt": item.get("alt"),
+                     "source": None, "media_id": None, "image_id": None, "image_url": None, "error": None}
+            if entry["image_url_in"]:
+                entry["source"] = entry["image_url_in"]
+            elif not entry["image_path"]:
+                raise ValueError("Provide either image_path or image_url for each item.")
+            elif not os.path.exists(entry["image_path"]):
+                entry["error"] = f"Image not found: {entry['image_path']}"
+            entries.append(entry)
+
+        def stage(entry):
+            upload_path = entry["image_path"]
+            if prepare is not None:
+                upload_path = prepare(upload_path) or upload_path
+            return self._stage_and_upload(upload_path)
+
+        next_to_create = 0
+        batch: List[Dict[str, Any]] = []
+
+        def queue_ready(final=False):
+            # hand entries to productCreateMedia strictly in input order
+            nonlocal next_to_create, batch
+            while next_to_create < len(entries):
+                entry = entries[next_to_create]
+                if entry["source"] is None and entry["error"] is None:
+                    break  # still uploading
+                if entry["error"] is None:
+                    batch.append(entry)
+                next_to_create += 1
+                if len(batch) >= media_batch_size:
+                    self._create_media_batch(product_id, batch)
+                    batch = []
+            if final and batch:
+                self._create_media_batch(product_id, batch)
+                batch = []
+
+        to_stage = [e for e in entries if e["source"] is None and e["error"] is None]
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            futures = {pool.submit(stage, entry): entry for entry in to_stage}
+            queue_ready()
+            for future in as_completed(futures):
+                entry = futures[future]
+                try:
+                    entry["source"] = future.result()
+                except Exception as e:
+                    entry["error"] = f"{type(e).__name__}: {e}"
+                queue_ready()
+        queue_ready(final=True)
+
+        waiting = [e["media_id"] for e in entries if e["media_id"] and not e["image_url"]]
+        previews = self.wait_for_media_previews(waiting, timeout_s=timeout_s, poll_interval_s=poll_interval_s) if waiting else {}
+        for entry in entries:
+            preview = previews.get(entry["media_id"])
+            if isinstance(preview, tuple):
+                entry["image_id"], entry["image_url"] = preview
+            elif isinstance(preview, str):
+                entry["error"] = preview
+
+        failed = [e for e in entries if e["error"]]
+        for entry in failed:
+            print(f"❌ Upload failed for {entry['image_path'] or entry['image_url_in']}: {entry['error']}")
+        if failed and raise_on_error:
+            raise RuntimeError(f"{len(failed)} of {len(entries)} media uploads failed: {failed[0]['error']}")
+
+        return [{"image_path": e["image_path"], "source_url": e["image_url_in"], "alt": e["alt"],
+                 "media_id": e["media_id"], "image_id": e["image_id"], "image_url": e["image_url"], "error": e["error"]}
+                for e in entries]
+
+    def attach_media_to_variants(self, product_id: str, pairs: List[Tuple[str, str]],
+                                 batch_size: int = ATTACH_BATCH_SIZE) -> None:
+        """attach_media_to_variant for many (variant_id, media_id) pairs, `batch_size` per mutation."""
+        mutation = """
+        mutation ($productId: ID!, $variantMedia: [ProductVariantAppendMediaInput!]!) {
+        productVariantAppendMedia(productId: $productId, variantMedia: $variantMedia) {
+            userErrors { field message code }
+        }
+        }
+        """
+        for start in range(0, len(pairs), batch_size):
+            chunk = pairs[start:start + batch_size]
+            variables = {
+                "productId": product_id,
+                # one entry per media, same as ensure_media_on_variant
+                "variantMedia": [{"variantId": v_id, "mediaIds": [m_id]} for v_id, m_id in chunk],
+            }
+            data = self._gql(mutation, variables)
+            errs = (data["productVariantAppendMedia"] or {}).get("userErrors") or []
+            if errs:
+                raise RuntimeError(f"productVariantAppendMedia errors: {errs}")
+
     def attach_media_to_variant(self, product_id: str, variant_id: str, media_id: str) -> None:
         mutation = """
         mutation ($productId: ID!, $variantMedia: [ProductVariantAppendMediaInput!]!) {
@@ -498,42 +664,35 @@ class ShopifyMockups:
         if errs:
             raise RuntimeError(f"productVariantAppendMedia errors: {errs}")
 
-    def set_variant_mockup_metafield(self, variant_id: str, namespace: str, key: str, value: str, type_: str = "single_line_text_field") -> None:
-        mutation = """
-        mutation metafieldsSet($metafields: [MetafieldsSetInput!]!) {
-          metafieldsSet(metafields: $metafields) {
-            metafields {
-              id
-              namespace
-              key
-              value
-              type
-              owner {
-                __typename
-                ... on ProductVariant { id }
-              }
-            }
-            userErrors {
-              field
-              message
-            }
-          }
-        }
+    def delete_media(self, media_ids: List[str]) -> List[str]:
+        """Delete product media (MediaImage ids) that nothing uses any more."""
+        if not media_ids:
+            return []
+        res = self._gql(MUT_FILE_DELETE, {"fileIds": media_ids})["fileDelete"]
+        if res.get("userErrors"):
+            raise RuntimeError(f"fileDelete errors: {res['userErrors']}")
+        return res.get("deletedFileIds") or []
+
+    def write_metafields(self, mf_inputs: List[Dict[str, Any]], dedupe: bool = True) -> int:
         """
-        variables = {
-            "metafields": [{
-                "ownerId": variant_id,
-                "namespace": namespace,
-                "key": key,
-                "type": type_,
-                "value": value,
-            }]
-        }
-        data = self._gql(mutation, variables)
-        res = data["metafieldsSet"]
-        user_errors = res.get("userErrors") or []
-        if user_errors:
-            raise RuntimeError(f"metafieldsSet errors: {user_errors}")
+        metafieldsSet for a list of MetafieldsSetInput dicts, via
+        shopify_metafield_batch: joins the open metafield_batch() for this
+        store, 25 per call, values the snapshot says are current are skipped
+        (unless dedupe=False).
+        """
+        if self._shared_client:
+            return set_metafields(mf_inputs, dedupe=dedupe)
+        snapshot_path = os.path.join(METAFIELD_SNAPSHOT_DIR, self.shop_domain + ".json")
+        return set_metafields(mf_inputs, execute=self._gql, snapshot_path=snapshot_path, dedupe=dedupe)
+
+    def set_variant_mockup_metafield(self, variant_id: str, namespace: str, key: str, value: str, type_: str = "single_line_text_field") -> None:
+        self.write_metafields([{
+            "ownerId": variant_id,
+            "namespace": namespace,
+            "key": key,
+            "type": type_,
+            "value": value,
+        }])
 
     def bulk_attach_variant_mockups(self, product_id: str, mapping: List[Dict[str, Any]], alt_prefix: Optional[str] = None) -> List[Dict[str, Any]]:
         """
@@ -544,34 +703,38 @@ class ShopifyMockups:
             - metafield (optional dict): {"namespace": "...", "key": "...", "type": "url" or "single_line_text_field"}
         Returns: list of logs per item.
         """
-        logs = []
+        items = []
         for item in mapping:
             v_id = item["variant_id"]
             alt = item.get("alt")
             if (not alt) and alt_prefix:
                 alt = f"{alt_prefix} — {v_id.split('/')[-1]}"
-
-            if "image_path" in item:
-                img_id, img_src, media_id = self.upload_product_image(product_id, item["image_path"], alt_text=alt)
-            elif "image_url" in item:
-                img_id, img_src, media_id = self.upload_product_image_from_url(product_id, item["image_url"], alt_text=alt)
-            else:
+            if "image_path" not in item and "image_url" not in item:
                 raise ValueError("Provide either image_path or image_url for each mapping item.")
+            items.append({"image_path": item.get("image_path"), "image_url": item.get("image_url"), "alt": alt})
 
-            self.attach_media_to_variant(product_id, v_id, media_id)
+        # all uploads go through the pipeline, then one batched attach for every variant
+        uploaded = self.upload_product_images(product_id, items)
+        self.attach_media_to_variants(product_id, [(item["variant_id"], up["media_id"]) for item, up in zip(mapping, uploaded)])
 
+        logs = []
+        mf_inputs = []
+        for item, up in zip(mapping, uploaded):
+            v_id = item["variant_id"]
             meta = item.get("metafield")
             if meta:
-                mtype = meta.get("type", "url")
-                self.set_variant_mockup_metafield(
-                    variant_id=v_id,
-                    namespace=meta["namespace"],
-                    key=meta["key"],
-                    value=img_src,
-                    type_=mtype,
-                )
-
-            logs.append({"variant_id": v_id, "image_id": img_id, "image_src": img_src, "alt": alt})
+                mf_inputs.append({
+                    "ownerId": v_id,
+                    "namespace": meta["namespace"],
+                    "key": meta["key"],
+                    "type": meta.get("type", "url"),
+                    "value": up["image_url"],
+                })
+
+            logs.append({"variant_id": v_id, "image_id": up["image_id"], "image_src": up["image_url"], "alt": up["alt"]})
+        # every variant's metafield in as few metafieldsSet calls as possible
+        if mf_inputs:
+            self.write_metafields(mf_inputs)
         return logs
 
     @staticmethod
@@ -606,6 +769,7 @@ def fetch_product_and_one_variant_metafields(sdk, product_gid: str, variant_gid:
       }
     }
     """
+    flush_active()  # queued metafield writes have to land before we read them back
     data = sdk._gql(q, {"productId": product_gid, "variantId": variant_gid})
     return {
         "product": {
@@ -655,8 +819,10 @@ def get_meta(meta_list, namespace, key, default=None, parse=True):
 
 def add_shopify_product_variant_mockups(product_data_path: str) -> Dict[str, Any]:
     """
-    Upload all mockups at the PRODUCT level.
-    Attach ONLY the first successfully uploaded image as the VARIANT's native primary.
+    Upload all mockups at the PRODUCT level (mockups whose content is already
+    on Shopify, per the shopify_sync state, are reused, and replaced ones are
+    deleted; unchanged mockups make no calls at all).
+    Attach ONLY the first image as the VARIANT's native primary.
     Write:
       - variant metafield mockup.primary (url)
       - variant metafield mockup.gallery (list.url)  # JSON array string
@@ -676,100 +842,135 @@ def add_shopify_product_variant_mockups(product_data_path: str) -> Dict[str, Any
     if not mockups_paths:
         raise ValueError("mockups_paths is empty; nothing to upload.")
 
-    # --- SDK
-    sdk = ShopifyMockups(shop_domain=SHOP_DOMAIN, access_token=TOKEN)
-
-    # --- fetch metafields (for alt-text)
-    all_meta_fields   = fetch_product_and_one_variant_metafields(sdk, shopify_product_id, shopify_variant_id)
-    product_metafields = all_meta_fields["product"]["metafields"] or []
-    variant_metafields = all_meta_fields["variant"]["metafields"] or []
-
-    def nz(v, default=""):
-        return v if (v is not None and v != "null") else default
-
-    story_title       = nz(get_meta(product_metafields, "story", "title"))
-    story_protagonist = nz(get_meta(product_metafields, "story", "protagonist"))
-    story_author      = nz(get_meta(product_metafields, "literature", "author"))
-    story_shape       = nz(get_meta(product_metafields, "shape", "symbolic_representation"))
-    story_archetype   = nz(get_meta(product_metafields, "shape", "archetype"))
-
-    product_size  = nz(get_meta(variant_metafields, "print", "size_label"))
-    product_style = nz(get_meta(variant_metafields, "print", "style_label"))
-    product_color = nz(get_meta(variant_metafields, "print", "color_label"))
-
-    left  = " — ".join([p for p in [story_title, story_protagonist, story_author] if p])
-    mid   = " — ".join([p for p in [story_shape, story_archetype] if p])
-    right = " — ".join([p for p in [product_size, product_style, product_color] if p])
-    base_alt = " | ".join([s for s in [left, mid, right] if s])
-
-    uploaded_urls: List[str] = []
-    uploaded_media_ids: List[str] = []
+    # --- what's already on Shopify (shopify_sync state next to the story JSON)
+    story_data_path = product_data.get("story_data_path")
+    product_type = product_data.get("product_type") or "print"
+    state = load_state(story_data_path) if story_data_path else None
+    recorded = (product_entry(state, product_type)["mockups"].get(product_sku) or {}) if state else {}
 
+    files = []
     for path in mockups_paths:
         if not os.path.exists(path):
             print(f"⚠️  Skipping missing mockup file: {path}")
             continue
+        files.append({"name": os.path.basename(path), "digest": file_digest(path), "path": path})
+    if not files:
+        raise FileNotFoundError("None of the mockup files could be uploaded (all missing or invalid).")
 
-        # infer a view label by filename suffix
-        view = ""
-        if path.endswith("-poster.png"):
-            view = "Poster"
-        elif path.endswith("-table.png"):
-            view = "Table — Frame"
-        elif path.endswith("-wall.png"):
-            view = "Wall — Frame"
-        elif path.endswith("-3x_wall.png"):
-            view = "Gallery Wall — Frame"
-
-        pieces = [base_alt]
-        if view:
-            pieces.append(view)
-        if product_sku:
-            pieces.append(f"SKU: {product_sku}")
-        alt_text = " | ".join([p for p in pieces if p])
-        alt_text = clip_alt(alt_text)  # ensure this helper exists; trims ~512 chars
-
-        #downscale_to_20mp_inplace(path)
-        normalize_for_shopify(path)                   # keeps alpha
-
-
-        # Upload to PRODUCT
-        img_id, img_url, media_id = sdk.upload_product_image(shopify_product_id, path, alt_text=alt_text)
-
-        # Optional but stabilizing: wait until media is READY (no-op if you haven't implemented)
-        try:
-            sdk.wait_until_media_ready(media_id, timeout_sec=20, poll_every=0.5)
-        except AttributeError:
-            pass  # if helper isn't implemented, just proceed
-
-        uploaded_urls.append(img_url)
-        uploaded_media_ids.append(media_id)
+    plan = plan_mockups(recorded, files, shopify_variant_id)
+    if plan["unchanged"]:
+        print(f"ℹ️ Mockups unchanged since the last sync ({len(files)}); nothing to upload.")
+        return {
+            "variant_id": shopify_variant_id,
+            "primary_media_id": recorded["media"][0]["media_id"],
+            "primary_url": recorded["media"][0]["url"],
+            "gallery_urls": [m["url"] for m in recorded["media"]],
+            "count_uploaded": 0,
+        }
 
-    if not uploaded_urls:
-        raise FileNotFoundError("None of the mockup files could be uploaded (all missing or invalid).")
+    # --- SDK
+    sdk = ShopifyMockups(shop_domain=SHOP_DOMAIN, access_token=TOKEN)
 
-    # Choose primary from the FIRST SUCCESSFUL upload (not necessarily index 0 of input list)
+    items = []
+    if plan["upload"]:
+        # --- fetch metafields (for alt-text)
+        all_meta_fields   = fetch_product_and_one_variant_metafields(sdk, shopify_product_id, shopify_variant_id)
+        product_metafields = all_meta_fields["product"]["metafields"] or []
+        variant_metafields = all_meta_fields["variant"]["metafields"] or []
+
+        def nz(v, default=""):
+            return v if (v is not None and v != "null") else default
+
+        story_title       = nz(get_meta(product_metafields, "story", "title"))
+        story_protagonist = nz(get_meta(product_metafields, "story", "protagonist"))
+        story_author      = nz(get_meta(product_metafields, "literature", "author"))
+        story_shape       = nz(get_meta(product_metafields, "shape", "symbolic_representation"))
+        story_archetype   = nz(get_meta(product_metafields, "shape", "archetype"))
+
+        product_size  = nz(get_meta(variant_metafields, "print", "size_label"))
+        product_style = nz(get_meta(variant_metafields, "print", "style_label"))
+        product_color = nz(get_meta(variant_metafields, "print", "color_label"))
+
+        left  = " — ".join([p for p in [story_title, story_protagonist, story_author] if p])
+        mid   = " — ".join([p for p in [story_shape, story_archetype] if p])
+        right = " — ".join([p for p in [product_size, product_style, product_color] if p])
+        base_alt = " | ".join([s for s in [left, mid, right] if s])
+
+        for f in plan["upload"]:
+            path = f["path"]
+            # infer a view label by filename suffix
+            view = ""
+            if path.endswith("-poster.png"):
+                view = "Poster"
+            elif path.endswith("-table.png"):
+                view = "Table — Frame"
+            elif path.endswith("-wall.png"):
+                view = "Wall — Frame"
+            elif path.endswith("-3x_wall.png"):
+                view = "Gallery Wall — Frame"
+
+            pieces = [base_alt]
+            if view:
+                pieces.append(view)
+            if product_sku:
+                pieces.append(f"SKU: {product_sku}")
+            alt_text = " | ".join([p for p in pieces if p])
+            alt_text = clip_alt(alt_text)  # ensure this helper exists; trims ~512 chars
+            items.append({"image_path": path, "alt": alt_text})
+
+    # Upload to PRODUCT: prep + staged upload run a few at a time, media is
+    # created in batches (in mockup order) and all of it is polled together.
+    # prepare_for_upload uploads an sRGB, <=5000px / 20MP copy (keeps alpha) and
+    # skips mockups that already are one. Mockups already on Shopify with the
+    # same content are reused instead of uploaded again.
+    uploaded = sdk.upload_product_images(shopify_product_id, items, prepare=prepare_for_upload) if items else []
+    new_media = {f["digest"]: {"name": f["name"], "digest": f["digest"], "media_id": u["media_id"], "url": u["image_url"]}
+                 for f, u in zip(plan["upload"], uploaded)}
+    media = [new_media.get(f["digest"]) or dict(plan["reuse"][f["digest"]], name=f["name"]) for f in files]
+
+    uploaded_urls: List[str] = [m["url"] for m in media]
+    uploaded_media_ids: List[str] = [m["media_id"] for m in media]
+
+    # Primary is the first mockup in gallery order
     primary_media_id = uploaded_media_ids[0]
     primary_url      = uploaded_urls[0]
 
     # HYBRID: attach ONLY the primary to the VARIANT, then reorder so it's first (idempotent)
-    sdk.ensure_media_on_variant(shopify_product_id, shopify_variant_id, [primary_media_id])
-    sdk.reorder_variant_media(shopify_product_id, shopify_variant_id, [primary_media_id])
+    if recorded.get("primary_media_id") != primary_media_id or recorded.get("variant_id") != shopify_variant_id:
+        sdk.ensure_media_on_variant(shopify_product_id, shopify_variant_id, [primary_media_id])
+        sdk.reorder_variant_media(shopify_product_id, shopify_variant_id, [primary_media_id])
+
+    # Write metafields. With a sync state, plan_mockups has already decided something changed
+    # (an unchanged gallery returned above); without one, the metafield snapshot dedupes
+    sdk.write_metafields([
+        {"ownerId": shopify_variant_id, "namespace": "mockup", "key": "primary", "type": "url", "value": primary_url},
+        {"ownerId": shopify_variant_id, "namespace": "mockup", "key": "gallery", "type": "list.url",
+         "value": json.dumps(uploaded_urls)},
+    ], dedupe=state is None)
+    flush_active()  # the sync state only records what Shopify has accepted
+
+    # Mockups replaced by new content
+    if plan["stale"]:
+        try:
+            sdk.delete_media(plan["stale"])
+            print(f"🧹 Deleted {len(plan['stale'])} replaced mockups")
+        except RuntimeError as e:
+            print(f"⚠️ Could not delete replaced mockups: {e}")
 
-    # Write metafields
-    sdk.set_variant_mockup_metafield(shopify_variant_id, "mockup", "primary", primary_url, type_="url")
-    sdk.set_variant_mockup_metafield(
-        shopify_variant_id, "mockup", "gallery", json.dumps(uploaded_urls), type_="list.url"
-    )
+    if state is not None:
+        product_entry(state, product_type)["mockups"][product_sku] = {
+            "variant_id": shopify_variant_id, "primary_media_id": primary_media_id, "media": media}
+        save_state(story_data_path, state)
 
     result = {
         "variant_id": shopify_variant_id,
         "primary_media_id": primary_media_id,
         "primary_url": primary_url,
         "gallery_urls": uploaded_urls,
-        "count_uploaded": len(uploaded_urls),
+        "count_uploaded": len(uploaded),
     }
-    print(f"✅ Uploaded {len(uploaded_urls)} mockups; attached 1 primary to variant; metafields written.")
+    print(f"✅ Uploaded {len(uploaded)} mockups ({len(files) - len(uploaded)} already on Shopify); "
+          f"attached 1 primary to variant; metafields written.")
     
     product_data['shopify_published_product'] = True
     product_data['shopify_create_timestamp'] = str(datetime.datetime.now())
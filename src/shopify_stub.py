@@ -0,0 +1,462 @@
+"""
+Local Shopify Stub for The Shapes of Stories
+============================================
+
+A tiny in-process stand-in for the bits of the Shopify Admin API the mockup
+upload uses, so ShopifyMockups can be exercised (and timed) offline:
+
+    - POST /admin/api/<version>/graphql.json
+        stagedUploadsCreate, productCreateMedia, nodes(ids:) media status,
+        productVariant media, productVariantAppendMedia,
+        productVariantReorderMedia, metafieldsSet, fileDelete, product media and
+        product / variant metafields
+        productCreate, productUpdate, productOptionsCreate,
+        productVariantsBulkCreate / Update / Delete, product options and
+        variants, variant inventory item, inventoryItemUpdate
+    - POST /staged-uploads/<n>   (the "S3" bucket the staged targets point at)
+
+Operations are recognised by name in the query text, not parsed as GraphQL.
+Every request sleeps `gql_latency_s` / `upload_latency_s` to look like a
+network round trip, and new media stays PROCESSING for `processing_s` before
+it turns READY with a preview image. metafieldsSet rejects more than 25
+inputs, as Shopify does. `stats` counts calls per operation.
+
+Query cost works like Shopify's leaky bucket: each query costs `query_cost`
+points and each mutation `mutation_cost`, the bucket holds `bucket_size`
+points and refills at `restore_rate` per second, every response carries
+extensions.cost with the throttleStatus, and a query the bucket can't pay
+for gets a THROTTLED error instead of running. `stats["THROTTLED"]` counts
+those.
+
+Usage:
+    with ShopifyStub(processing_s=1.0) as stub:
+        sdk = ShopifyMockups(stub.shop_domain, "token", endpoint=stub.endpoint)
+        ...
+        print(stub.stats)
+
+    python shopify_stub.py --port 8765    # serve until Ctrl-C
+"""
+
+import argparse
+import itertools
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+API_VERSION = "2025-10"
+
+
+class ShopifyStub:
+    def __init__(self, port=0, gql_latency_s=0.05, upload_latency_s=0.3, processing_s=1.0,
+                 bucket_size=1000, restore_rate=50, query_cost=2, mutation_cost=10):
+        self.gql_latency_s = gql_latency_s
+        self.upload_latency_s = upload_latency_s
+        self.processing_s = processing_s
+        self.bucket_size = float(bucket_size)
+        self.restore_rate = float(restore_rate)
+        self.query_cost = query_cost
+        self.mutation_cost = mutation_cost
+        self._available = float(bucket_size)
+        self._available_at = time.monotonic()
+        self.stats = {}
+        self.media = {}           # media gid -> {"product_id", "alt", "source", "created", "failed"}
+        self.product_media = {}   # product gid -> [media gid]
+        self.variant_media = {}   # variant gid -> [media gid]
+        self.metafields = {}      # (owner gid, namespace, key) -> {"type", "value"}
+        self.products = {}        # product gid -> {"input", "options", "variants": [variant gid]}
+        self.variants = {}        # variant gid -> {"product_id", "title", "sku", "price", "selectedOptions", ...}
+        self.staged = {}          # staged key -> uploaded bytes
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                stub._handle(self)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.shop_domain = f"127.0.0.1:{self.port}"
+        self.base_url = f"http://{self.shop_domain}"
+        self.endpoint = f"{self.base_url}/admin/api/{API_VERSION}/graphql.json"
+        self._thread = None
+
+    # ---------- lifecycle ----------
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats.clear()
+
+    def _count(self, op):
+        with self._lock:
+            self.stats[op] = self.stats.get(op, 0) + 1
+
+    def _gid(self, kind):
+        return f"gid://shopify/{kind}/{next(self._ids)}"
+
+    # ---------- HTTP ----------
+    def _handle(self, request):
+        length = int(request.headers.get("Content-Length") or 0)
+        if request.path.startswith("/staged-uploads/"):
+            self._count("stagedUploadPost")
+            time.sleep(self.upload_latency_s)
+            body = request.rfile.read(length)
+            key = request.path.rsplit("/", 1)[-1]
+            # multipart isn't parsed; a staged POST just has to carry a "file" part
+            if b'name="file"' not in body:
+                return self._reply(request, 400, {"error": "missing file"})
+            self.staged[key] = len(body)
+            return self._reply(request, 201, {})
+
+        if not request.path.endswith("/graphql.json"):
+            return self._reply(request, 404, {"error": "not found"})
+        payload = json.loads(request.rfile.read(length) or b"{}")
+        time.sleep(self.gql_latency_s)
+        query = payload.get("query") or ""
+        cost = self.mutation_cost if re.match(r"\s*mutation\b", query) else self.query_cost
+        charged = self._charge(cost)
+        extensions = {"cost": {"requestedQueryCost": cost, "actualQueryCost": cost if charged else None,
+                               "throttleStatus": self._throttle_status()}}
+        if not charged:
+            self._count("THROTTLED")
+            return self._reply(request, 200, {"errors": [{"message": "Throttled", "extensions": {"code": "THROTTLED"}}],
+                                              "extensions": extensions})
+        try:
+            data = self._graphql(query, payload.get("variables") or {})
+        except Exception as e:
+            return self._reply(request, 200, {"errors": [{"message": f"{type(e).__name__}: {e}"}],
+                                              "extensions": extensions})
+        return self._reply(request, 200, {"data": data, "extensions": extensions})
+
+    def _charge(self, cost):
+        with self._lock:
+            now = time.monotonic()
+            self._available = min(self.bucket_size, self._available + (now - self._available_at) * self.restore_rate)
+            self._available_at = now
+            if self._available < cost:
+                return False
+            self._available -= cost
+            return True
+
+    def _throttle_status(self):
+        with self._lock:
+            return {"maximumAvailable": self.bucket_size, "currentlyAvailable": int(self._available),
+                    "restoreRate": self.restore_rate}
+
+    def _reply(self, request, status, body):
+        raw = json.dumps(body).encode("utf-8")
+        request.send_response(status)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("Content-Length", str(len(raw)))
+        request.end_headers()
+        request.wfile.write(raw)
+
+    # ---------- GraphQL ----------
+    def _graphql(self, query, variables):
+        for op in ("stagedUploadsCreate", "productCreateMedia", "productVariantAppendMedia",
+                   "productVariantReorderMedia", "metafieldsSet", "fileDelete", "productUpdate",
+                   "productOptionsCreate", "productVariantsBulkCreate", "productVariantsBulkUpdate",
+                   "productVariantsBulkDelete", "inventoryItemUpdate"):
+            if op in query:
+                self._count(op)
+                return getattr(self, "_" + op)(variables)
+        if re.search(r"\bproductCreate\s*\(", query):
+            self._count("productCreate")
+            return self._productCreate(variables)
+        if "productVariant(id" in query and "inventoryItem" in query:
+            self._count("variantInventoryItem")
+            return {"productVariant": {"inventoryItem": dict(self.variants[variables["id"]]["inventoryItem"])}}
+        if re.search(r"\bnodes\s*\(\s*ids", query):
+            self._count("nodes")
+            return self._nodes(variables)
+        if "productVariant(id" in query and "product(id" in query:
+            self._count("productAndVariantMetafields")
+            return self._product_and_variant_metafields(variables)
+        if "productVariant(id" in query:
+            self._count("productVariantMedia")
+            return self._product_variant_media(variables)
+        if "product(id" in query and ("variants(" in query or "options" in query):
+            self._count("product")
+            return self._product(variables)
+        if "product(id" in query:
+            self._count("productMedia")
+            return self._product_media(variables)
+        if re.search(r"\bshop\s*{", query):
+            self._count("shop")
+            return {"shop": {"name": "Stub Shop", "myshopifyDomain": self.shop_domain}}
+        raise ValueError("stub doesn't know this query")
+
+    def _stagedUploadsCreate(self, variables):
+        targets = []
+        for item in variables["input"]:
+            key = str(next(self._ids))
+            targets.append({
+                "url": f"{self.base_url}/staged-uploads/{key}",
+                "resourceUrl": f"{self.base_url}/staged-uploads/{key}/{item['filename']}",
+                "parameters": [{"name": "key", "value": key}, {"name": "Content-Type", "value": item["mimeType"]}],
+            })
+        return {"stagedUploadsCreate": {"stagedTargets": targets, "userErrors": []}}
+
+    def _productCreateMedia(self, variables):
+        # all or nothing, like the real mutation: any bad item fails the whole call
+        product_id = variables["productId"]
+        errors = []
+        for i, item in enumerate(variables["media"]):
+            source = item["originalSource"]
+            key = source.split("/staged-uploads/", 1)[-1].split("/", 1)[0] if "/staged-uploads/" in source else None
+            if key is not None and key not in self.staged:
+                errors.append({"field": ["media", str(i), "originalSource"], "message": "Source file was not uploaded"})
+        if errors:
+            return {"productCreateMedia": {"media": [], "mediaUserErrors": errors}}
+
+        media = []
+        for item in variables["media"]:
+            media_id = self._gid("MediaImage")
+            with self._lock:
+                self.media[media_id] = {"product_id": product_id, "alt": item.get("alt") or "",
+                                        "source": item["originalSource"], "created": time.time(), "failed": False}
+                self.product_media.setdefault(product_id, []).append(media_id)
+            media.append({"id": media_id, "mediaContentType": "IMAGE", "preview": {"image": None}})
+        return {"productCreateMedia": {"media": media, "mediaUserErrors": []}}
+
+    def _media_node(self, media_id):
+        m = self.media.get(media_id)
+        if m is None:
+            return None
+        if m["failed"]:
+            status = "FAILED"
+        elif time.time() - m["created"] >= self.processing_s:
+            status = "READY"
+        else:
+            status = "PROCESSING"
+        image = None
+        if status == "READY":
+            image = {"id": media_id.replace("MediaImage", "ProductImage"),
+                     "url": f"{self.base_url}/cdn/{media_id.rsplit('/', 1)[-1]}.png", "altText": m["alt"]}
+        return {"__typename": "MediaImage", "id": media_id, "alt": m["alt"], "mediaContentType": "IMAGE",
+                "status": status, "preview": {"image": image}}
+
+    def _nodes(self, variables):
+        return {"nodes": [self._media_node(i) for i in variables["ids"]]}
+
+    def _product_media(self, variables):
+        nodes = [self._media_node(i) for i in self.product_media.get(variables["id"], [])]
+        return {"product": {"media": {"nodes": nodes}}}
+
+    def _product_variant_media(self, variables):
+        ids = self.variant_media.get(variables["id"], [])
+        return {"productVariant": {"id": variables["id"], "media": {"nodes": [{"id": i} for i in ids]}}}
+
+    def _productVariantAppendMedia(self, variables):
+        errors = []
+        with self._lock:
+            for entry in variables["variantMedia"]:
+                attached = self.variant_media.setdefault(entry["variantId"], [])
+                for media_id in entry["mediaIds"]:
+                    if media_id not in self.media:
+                        errors.append({"field": ["variantMedia"], "message": f"Media {media_id} does not exist",
+                                       "code": "MEDIA_DOES_NOT_EXIST"})
+                    elif media_id in attached:
+                        errors.append({"field": ["variantMedia"], "message": "Variant already has media",
+                                       "code": "PRODUCT_VARIANT_ALREADY_HAS_MEDIA"})
+                    else:
+                        attached.append(media_id)
+        return {"productVariantAppendMedia": {"userErrors": errors}}
+
+    def _productVariantReorderMedia(self, variables):
+        with self._lock:
+            current = self.variant_media.setdefault(variables["variantId"], [])
+            for move in variables["moves"]:
+                if move["id"] not in current:
+                    continue
+                current.remove(move["id"])
+                position = move["newPosition"]
+                if position == "FIRST":
+                    current.insert(0, move["id"])
+                else:
+                    after = position.split(":", 1)[1]
+                    current.insert(current.index(after) + 1 if after in current else len(current), move["id"])
+        return {"productVariantReorderMedia": {"userErrors": []}}
+
+    def _metafieldsSet(self, variables):
+        if len(variables["metafields"]) > 25:
+            return {"metafieldsSet": {"metafields": [], "userErrors": [
+                {"field": ["metafields"], "message": "Exceeded the maximum metafields input limit of 25.",
+                 "code": "LESS_THAN_OR_EQUAL_TO"}]}}
+        out = []
+        with self._lock:
+            for mf in variables["metafields"]:
+                self.metafields[(mf["ownerId"], mf["namespace"], mf["key"])] = {"type": mf["type"], "value": mf["value"]}
+                out.append({"id": self._gid("Metafield"), "namespace": mf["namespace"], "key": mf["key"],
+                            "value": mf["value"], "type": mf["type"]})
+        return {"metafieldsSet": {"metafields": out, "userErrors": []}}
+
+    def _fileDelete(self, variables):
+        deleted = []
+        with self._lock:
+            for media_id in variables["fileIds"]:
+                m = self.media.pop(media_id, None)
+                if m is None:
+                    continue
+                self.product_media.get(m["product_id"], []).remove(media_id)
+                for attached in self.variant_media.values():
+                    if media_id in attached:
+                        attached.remove(media_id)
+                deleted.append(media_id)
+        return {"fileDelete": {"deletedFileIds": deleted, "userErrors": []}}
+
+    # ---------- products / variants ----------
+    def _variant_node(self, variant_id):
+        v = self.variants[variant_id]
+        return {"id": variant_id, "title": v["title"], "sku": v["sku"], "price": v["price"],
+                "inventoryPolicy": v["inventoryPolicy"], "selectedOptions": v["selectedOptions"]}
+
+    def _product_node(self, product_id):
+        p = self.products[product_id]
+        nodes = [self._variant_node(v) for v in p["variants"]]
+        return {"id": product_id, "title": p["input"].get("title"), "handle": p["input"].get("handle"),
+                "status": p["input"].get("status"), "totalVariants": len(nodes),
+                "options": [{"name": name, "position": i + 1, "values": [], "optionValues": []}
+                            for i, name in enumerate(p["options"])],
+                "variants": {"nodes": nodes, "edges": [{"node": n} for n in nodes]}}
+
+    def _new_variant(self, product_id, title, sku, price, selected_options):
+        variant_id = self._gid("ProductVariant")
+        self.variants[variant_id] = {"product_id": product_id, "title": title, "sku": sku, "price": price,
+                                     "inventoryPolicy": "DENY", "selectedOptions": selected_options,
+                                     "inventoryItem": {"id": self._gid("InventoryItem"), "tracked": True}}
+        self.products[product_id]["variants"].append(variant_id)
+        return variant_id
+
+    def _apply_variant_input(self, variant_id, item):
+        v = self.variants[variant_id]
+        if "optionValues" in item:
+            v["selectedOptions"] = [{"name": o["optionName"], "value": o["name"]} for o in item["optionValues"]]
+            v["title"] = " / ".join(o["value"] for o in v["selectedOptions"])
+        if "price" in item:
+            v["price"] = str(item["price"])
+        if "inventoryPolicy" in item:
+            v["inventoryPolicy"] = item["inventoryPolicy"]
+        inventory = item.get("inventoryItem") or {}
+        if "sku" in inventory:
+            v["sku"] = inventory["sku"]
+        if "tracked" in inventory:
+            v["inventoryItem"]["tracked"] = inventory["tracked"]
+
+    def _productCreate(self, variables):
+        product_id = self._gid("Product")
+        with self._lock:
+            self.products[product_id] = {"input": dict(variables["input"]), "options": [], "variants": []}
+            self._new_variant(product_id, "Default Title", "", "0.00", [{"name": "Title", "value": "Default Title"}])
+            return {"productCreate": {"product": self._product_node(product_id), "userErrors": []}}
+
+    def _productUpdate(self, variables):
+        fields = dict(variables["product"])
+        product_id = fields.pop("id")
+        with self._lock:
+            if product_id not in self.products:
+                return {"productUpdate": {"product": None, "userErrors": [{"field": ["id"], "message": "Product does not exist"}]}}
+            self.products[product_id]["input"].update(fields)
+            return {"productUpdate": {"product": self._product_node(product_id), "userErrors": []}}
+
+    def _productOptionsCreate(self, variables):
+        product_id = variables["productId"]
+        with self._lock:
+            p = self.products[product_id]
+            p["options"] = [o["name"] for o in variables["options"]]
+            for variant_id in p["variants"]:
+                v = self.variants[variant_id]
+                v["selectedOptions"] = [{"name": o["name"], "value": o["values"][0]["name"]} for o in variables["options"]]
+                v["title"] = " / ".join(o["value"] for o in v["selectedOptions"])
+            return {"productOptionsCreate": {"product": self._product_node(product_id), "userErrors": []}}
+
+    def _productVariantsBulkCreate(self, variables):
+        product_id = variables["productId"]
+        with self._lock:
+            for item in variables["variants"]:
+                variant_id = self._new_variant(product_id, "", "", "0.00", [])
+                self._apply_variant_input(variant_id, item)
+            return {"productVariantsBulkCreate": {"product": self._product_node(product_id), "userErrors": []}}
+
+    def _productVariantsBulkUpdate(self, variables):
+        out = []
+        with self._lock:
+            for item in variables["variants"]:
+                self._apply_variant_input(item["id"], item)
+                out.append({"id": item["id"], "sku": self.variants[item["id"]]["sku"],
+                            "inventoryPolicy": self.variants[item["id"]]["inventoryPolicy"]})
+        return {"productVariantsBulkUpdate": {"productVariants": out, "userErrors": []}}
+
+    def _productVariantsBulkDelete(self, variables):
+        product_id = variables["productId"]
+        with self._lock:
+            for variant_id in variables["variantsIds"]:
+                self.products[product_id]["variants"].remove(variant_id)
+                self.variants.pop(variant_id)
+            return {"productVariantsBulkDelete": {"product": {"id": product_id, "title": self.products[product_id]["input"].get("title")},
+                                                  "userErrors": []}}
+
+    def _inventoryItemUpdate(self, variables):
+        with self._lock:
+            for v in self.variants.values():
+                if v["inventoryItem"]["id"] == variables["id"]:
+                    v["inventoryItem"]["tracked"] = variables["input"]["tracked"] if "input" in variables else False
+                    return {"inventoryItemUpdate": {"inventoryItem": dict(v["inventoryItem"]), "userErrors": []}}
+        return {"inventoryItemUpdate": {"inventoryItem": None, "userErrors": [{"field": ["id"], "message": "not found"}]}}
+
+    def _product(self, variables):
+        with self._lock:
+            if variables["id"] not in self.products:
+                return {"product": None}
+            return {"product": self._product_node(variables["id"])}
+
+    def _owner_metafields(self, owner_id):
+        return [{"namespace": ns, "key": key, "type": v["type"], "value": v["value"]}
+                for (owner, ns, key), v in self.metafields.items() if owner == owner_id]
+
+    def _product_and_variant_metafields(self, variables):
+        product_id, variant_id = variables["productId"], variables["variantId"]
+        return {
+            "product": {"id": product_id, "title": "Stub Product", "handle": "stub-product",
+                        "metafields": {"nodes": self._owner_metafields(product_id)}},
+            "productVariant": {"id": variant_id, "title": "Stub Variant", "sku": "STUB-SKU",
+                               "selectedOptions": [], "metafields": {"nodes": self._owner_metafields(variant_id)}},
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the local Shopify stub.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--processing-s", type=float, default=1.0)
+    args = parser.parse_args()
+    stub = ShopifyStub(port=args.port, processing_s=args.processing_s)
+    print(f"Shopify stub at {stub.endpoint} (Ctrl-C to stop)")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
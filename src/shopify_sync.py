@@ -0,0 +1,506 @@
+"""
+Shopify Sync for The Shapes of Stories
+======================================
+
+create_shopify_product ran productCreate on every publish (so re-publishing
+a story made a second product), create_shopify_product_variant re-listed the
+product's variants twice, re-created them and re-ran the POD inventory fix
+(three calls) for every variant, and every mockup was uploaded again, even
+when nothing about the story had changed.
+
+This module keeps a state file next to the story JSON
+(<story>.shopify_state.json) with, per product type:
+    - the product id, a hash of its productInput and the options it has
+    - per SKU: variant id and a hash of its productVariantsBulk input
+    - a hash per metafield, for the product and for every variant
+    - per SKU: the mockup files (name + content hash) and their media ids / urls
+    - placeholder variants (the "_ / _ / _" one productCreate leaves) still to delete
+
+A sync builds what the product should be (build_product_spec /
+build_variant_specs), diffs it against that state into a plan of creates,
+updates and deletes, runs only the plan and saves the new state. An
+unchanged story plans nothing and makes no calls at all.
+
+A story that was published before this existed (shopify_product_id in the
+story JSON, no state file yet) is adopted with one read of the product: its
+variants are matched up by SKU and updated once.
+
+Metafields are diffed against the state hashes here and written with
+dedupe=False, so shopify_metafield_batch's snapshot doesn't drop a write
+the state says is needed (it only records what was written).
+
+Product status is never synced: products are created as DRAFT and made
+ACTIVE by hand, and an update must not put them back to DRAFT. Metafields
+that are no longer produced are left on Shopify, as before.
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import shopify_client
+from shopify_create_product import (
+    MUT_PRODUCT_CREATE,
+    PRODUCT_TYPE_MAP,
+    _coerce_value as _coerce_product_value,
+    build_product_spec,
+    set_product_options,
+)
+from shopify_create_product_variant import (
+    MUT_VARIANTS_BULK_CREATE,
+    VARIANT_TYPE_MAP,
+    _coerce_value as _coerce_variant_value,
+    build_variant_specs,
+    delete_variants,
+    ensure_pod_inventory_settings,
+    list_product_variants,
+)
+from shopify_metafield_batch import flush_active, set_metafields
+
+STATE_SUFFIX = ".shopify_state.json"
+STATE_VERSION = 1
+
+UNSYNCED_PRODUCT_FIELDS = ("status",)  # set by hand in the admin after review
+
+
+def gql(query: str, variables: dict = None):
+    return shopify_client.gql(query, variables)
+
+
+MUT_PRODUCT_UPDATE = """
+mutation($product: ProductUpdateInput!) {
+  productUpdate(product: $product) {
+    product { id handle }
+    userErrors { field message }
+  }
+}
+"""
+
+MUT_VARIANTS_BULK_UPDATE = """
+mutation($productId: ID!, $variants: [ProductVariantsBulkInput!]!) {
+  productVariantsBulkUpdate(productId: $productId, variants: $variants) {
+    productVariants { id sku }
+    userErrors { field message }
+  }
+}
+"""
+
+MUT_FILE_DELETE = """
+mutation fileDelete($fileIds: [ID!]!) {
+  fileDelete(fileIds: $fileIds) {
+    deletedFileIds
+    userErrors { field message }
+  }
+}
+"""
+
+Q_PRODUCT_SNAPSHOT = """
+query($id: ID!) {
+  product(id: $id) {
+    id
+    options { name }
+    variants(first: 250) {
+      nodes { id title sku selectedOptions { name value } }
+    }
+  }
+}
+"""
+
+
+# -------------------- state --------------------
+
+def content_hash(obj) -> str:
+    return hashlib.sha1(json.dumps(obj, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+
+def state_path_for(story_data_path: str) -> str:
+    return os.path.splitext(story_data_path)[0] + STATE_SUFFIX
+
+
+def load_state(story_data_path: str) -> Dict[str, Any]:
+    path = state_path_for(story_data_path)
+    shop = shopify_client.shop_domain()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        state = None
+    if state is not None and state.get("shop") != shop:
+        print(f"⚠️ {os.path.basename(path)} is for {state.get('shop')}, not {shop}; starting a fresh state")
+        state = None
+    return state or {"version": STATE_VERSION, "shop": shop, "products": {}}
+
+
+def save_state(story_data_path: str, state: Dict[str, Any]) -> None:
+    path = state_path_for(story_data_path)
+    state["synced_at"] = datetime.datetime.now().isoformat(timespec="seconds")
+    directory = os.path.dirname(path) or "."
+    with tempfile.NamedTemporaryFile("w", delete=False, dir=directory, suffix=".tmp", encoding="utf-8") as tmp:
+        json.dump(state, tmp, ensure_ascii=False, indent=2)
+        tmp.write("\n")
+        tmp_path = tmp.name
+    os.replace(tmp_path, path)
+
+
+def product_entry(state: Dict[str, Any], product_type: str) -> Dict[str, Any]:
+    entry = state["products"].setdefault(product_type, {})
+    entry.setdefault("product", {})
+    entry.setdefault("metafields", {})
+    entry.setdefault("variants", {})
+    entry.setdefault("placeholders", [])
+    entry.setdefault("mockups", {})
+    return entry
+
+
+def _save_story_data(story_data_path: str, story_data: Dict[str, Any]) -> None:
+    with open(story_data_path, "w", encoding="utf-8") as f:     # save it back to the same file
+        json.dump(story_data, f, ensure_ascii=False, indent=2)
+        f.write("\n")  # optional newline at EOF
+    time.sleep(1)
+
+
+# -------------------- metafields --------------------
+
+def _metafield_hashes(values: Dict[str, Any], type_map: Dict[str, str], coerce) -> Dict[str, str]:
+    hashes = {}
+    for dotted_key, val in values.items():
+        if dotted_key not in type_map:
+            raise ValueError(f"Unknown metafield key (no definition or not in map): {dotted_key}")
+        hashes[dotted_key] = content_hash([type_map[dotted_key], coerce(dotted_key, val)])
+    return hashes
+
+
+def _changed_metafields(values, type_map, coerce, recorded) -> List[str]:
+    hashes = _metafield_hashes(values, type_map, coerce)
+    return [k for k, h in hashes.items() if recorded.get(k) != h]
+
+
+def _metafield_inputs(owner_id, values, keys, type_map, coerce) -> List[Dict[str, Any]]:
+    out = []
+    for dotted_key in keys:
+        ns, key = dotted_key.split(".", 1)
+        out.append({"ownerId": owner_id, "namespace": ns, "key": key, "type": type_map[dotted_key],
+                    "value": coerce(dotted_key, values[dotted_key])})
+    return out
+
+
+# -------------------- adopting a product published before state existed --------------------
+
+def _looks_like_placeholder(node) -> bool:
+    so = node.get("selectedOptions") or []
+    return ((node.get("title") or "").strip().lower() == "default title"
+            or any(o.get("value") == "_" for o in so)
+            or not (node.get("sku") or "").strip())
+
+
+def adopt_existing_product(entry: Dict[str, Any], product_id: str) -> None:
+    """Fill an empty state entry from what's on Shopify (one read). Hashes stay empty, so everything updates once."""
+    product = gql(Q_PRODUCT_SNAPSHOT, {"id": product_id})["product"]
+    if product is None:
+        print(f"⚠️ Product {product_id} no longer exists on Shopify; it will be created again")
+        return
+    entry["product"] = {"id": product["id"], "options": [o["name"] for o in product["options"] or []]}
+    for node in product["variants"]["nodes"]:
+        if _looks_like_placeholder(node):
+            entry["placeholders"].append(node["id"])
+        else:
+            entry["variants"][node["sku"]] = {"id": node["id"]}
+    print(f"ℹ️ Adopted existing product {product_id}: {len(entry['variants'])} variants, "
+          f"{len(entry['placeholders'])} placeholders")
+
+
+# -------------------- product --------------------
+
+def plan_product(entry: Dict[str, Any], spec) -> Dict[str, Any]:
+    product_input, metafields, options = spec
+    synced_input = {k: v for k, v in product_input.items() if k not in UNSYNCED_PRODUCT_FIELDS}
+    recorded = entry["product"]
+
+    action = None
+    if not recorded.get("id"):
+        action = "create"
+    elif recorded.get("input_hash") != content_hash(synced_input):
+        action = "update"
+    return {
+        "action": action,
+        "input": product_input,
+        "synced_input": synced_input,
+        # productOptionsCreate is only for a product without options (what ensure_product_options did)
+        "options": options if options and not recorded.get("options") else None,
+        "metafields": metafields,
+        "changed_metafields": _changed_metafields(metafields, PRODUCT_TYPE_MAP, _coerce_product_value,
+                                                  entry["metafields"]),
+    }
+
+
+def apply_product_plan(entry: Dict[str, Any], plan: Dict[str, Any]) -> str:
+    """Run a plan_product plan, recording each step in entry. Returns the product id."""
+    recorded = entry["product"]
+    if plan["action"] == "create":
+        data = gql(MUT_PRODUCT_CREATE, {"input": plan["input"]})["productCreate"]
+        if data["userErrors"]:
+            raise RuntimeError(data["userErrors"])
+        recorded.clear()
+        recorded["id"] = data["product"]["id"]
+        entry["metafields"] = {}
+        print(f"✅ Created product: {recorded['id']}  handle={data['product']['handle']}")
+    elif plan["action"] == "update":
+        res = gql(MUT_PRODUCT_UPDATE, {"product": dict(plan["synced_input"], id=recorded["id"])})["productUpdate"]
+        if res["userErrors"]:
+            raise RuntimeError(res["userErrors"])
+        print(f"✅ Updated product: {recorded['id']}")
+    recorded["input_hash"] = content_hash(plan["synced_input"])
+    pid = recorded["id"]
+
+    if plan["options"]:
+        set_product_options(pid, plan["options"])
+        recorded["options"] = list(plan["options"])
+        print(f"✅ Set product options: {', '.join(plan['options'])}")
+    if plan["action"] == "create":
+        # the product's default variant ("Default Title", "_ / _ / _" once options exist)
+        # goes once real variants exist
+        entry["placeholders"] = [v["id"] for v in list_product_variants(pid)]
+
+    changed = plan["changed_metafields"] if plan["action"] != "create" else list(plan["metafields"])
+    if changed:
+        # the state hashes already picked out what changed; the metafield snapshot mustn't second-guess them
+        set_metafields(_metafield_inputs(pid, plan["metafields"], changed, PRODUCT_TYPE_MAP, _coerce_product_value),
+                       dedupe=False)
+        flush_active()  # the state only records what Shopify has accepted
+        print(f"✅ Set {len(changed)} product metafields")
+    entry["metafields"] = _metafield_hashes(plan["metafields"], PRODUCT_TYPE_MAP, _coerce_product_value)
+    return pid
+
+
+def sync_shopify_product(story_data_path: str, product_type: str, dry_run: bool = False) -> Optional[str]:
+    """Create or update the story's product so it matches build_product_spec. Returns the product id."""
+    with open(story_data_path, "r", encoding="utf-8") as f:
+        story_data = json.load(f)
+    spec = build_product_spec(story_data, product_type)
+    if spec is None:
+        return None
+
+    state = load_state(story_data_path)
+    entry = product_entry(state, product_type)
+    if not entry["product"].get("id") and story_data.get("shopify_product_id"):
+        adopt_existing_product(entry, story_data["shopify_product_id"])
+
+    plan = plan_product(entry, spec)
+    print(f"ℹ️ Product sync plan: {describe_product_plan(plan)}")
+    if dry_run:
+        return entry["product"].get("id")
+    if plan["action"] is None and not plan["options"] and not plan["changed_metafields"]:
+        return entry["product"]["id"]
+
+    try:
+        apply_product_plan(entry, plan)
+    finally:
+        # a product that did get created is recorded, so a retry doesn't make a second one
+        if entry["product"].get("id"):
+            save_state(story_data_path, state)
+    pid = entry["product"]["id"]
+    if story_data.get("shopify_product_id") != pid:
+        story_data["shopify_product_id"] = pid  # save shopify product id back to story_data
+        _save_story_data(story_data_path, story_data)
+        print("✅ Story Data Updated w/ Shopify Product ID")
+    return pid
+
+
+def describe_product_plan(plan: Dict[str, Any]) -> str:
+    parts = [plan["action"] or "unchanged"]
+    if plan["options"]:
+        parts.append("options")
+    n = len(plan["metafields"]) if plan["action"] == "create" else len(plan["changed_metafields"])
+    if n:
+        parts.append(f"{n} metafields")
+    return ", ".join(parts)
+
+
+# -------------------- variants --------------------
+
+def _variant_sku(variant_input: Dict[str, Any]) -> str:
+    return (variant_input.get("inventoryItem") or {}).get("sku")
+
+
+def plan_variants(entry: Dict[str, Any], variants_payload, metafields_by_sku, delete_placeholder_variants=True):
+    recorded = entry["variants"]
+    desired = {_variant_sku(v): v for v in variants_payload}
+    create = [sku for sku in desired if not (recorded.get(sku) or {}).get("id")]
+    update = [sku for sku in desired if sku not in create
+              and recorded[sku].get("input_hash") != content_hash(desired[sku])]
+    # variants on Shopify that the story file doesn't list (added by hand, or adopted by
+    # adopt_existing_product) are only removed when asked to, like create_shopify_product_variant did
+    delete = [sku for sku in recorded if sku not in desired] if delete_placeholder_variants else []
+    metafields = {}
+    for sku, values in (metafields_by_sku or {}).items():
+        if sku not in desired:
+            print(f"⚠️ Could not find variant for key '{sku}' to set metafields")
+            continue
+        recorded_mf = {} if sku in create else (recorded.get(sku) or {}).get("metafields") or {}
+        changed = _changed_metafields(values, VARIANT_TYPE_MAP, _coerce_variant_value, recorded_mf)
+        if changed:
+            metafields[sku] = changed
+    return {
+        "desired": desired,
+        "create": create,
+        "update": update,
+        "delete": delete,
+        "placeholders": list(entry["placeholders"]) if delete_placeholder_variants else [],
+        "metafields": metafields,
+        "metafield_values": metafields_by_sku or {},
+    }
+
+
+def describe_variant_plan(plan: Dict[str, Any]) -> str:
+    return (f"+{len(plan['create'])} ~{len(plan['update'])} -{len(plan['delete'])} variants, "
+            f"{len(plan['placeholders'])} placeholders, "
+            f"{sum(len(k) for k in plan['metafields'].values())} metafields on {len(plan['metafields'])} variants")
+
+
+def variant_plan_is_empty(plan: Dict[str, Any]) -> bool:
+    return not (plan["create"] or plan["update"] or plan["delete"] or plan["placeholders"] or plan["metafields"])
+
+
+def apply_variant_plan(entry: Dict[str, Any], plan: Dict[str, Any], product_id: str) -> None:
+    """Run a plan_variants plan, recording each step in entry."""
+    recorded = entry["variants"]
+    desired = plan["desired"]
+
+    if plan["create"]:
+        res = gql(MUT_VARIANTS_BULK_CREATE, {"productId": product_id,
+                                             "variants": [desired[sku] for sku in plan["create"]]})["productVariantsBulkCreate"]
+        if res["userErrors"]:
+            raise RuntimeError(res["userErrors"])
+        by_sku = {e["node"].get("sku"): e["node"] for e in res["product"]["variants"]["edges"]}
+        for sku in plan["create"]:
+            node = by_sku.get(sku)
+            if node is None:
+                raise RuntimeError(f"productVariantsBulkCreate didn't return a variant for SKU {sku}")
+            # --- POD: enforce inventory policy + untracking (new variants only) ---
+            ensure_pod_inventory_settings(product_id, node["id"])
+            recorded[sku] = {"id": node["id"], "input_hash": content_hash(desired[sku]), "metafields": {}}
+        print(f"✅ Created {len(plan['create'])} variants")
+
+    if plan["update"]:
+        res = gql(MUT_VARIANTS_BULK_UPDATE, {"productId": product_id,
+                                             "variants": [dict(desired[sku], id=recorded[sku]["id"]) for sku in plan["update"]]})["productVariantsBulkUpdate"]
+        if res["userErrors"]:
+            raise RuntimeError(res["userErrors"])
+        for sku in plan["update"]:
+            recorded[sku]["input_hash"] = content_hash(desired[sku])
+        print(f"✅ Updated {len(plan['update'])} variants")
+
+    doomed = [recorded[sku]["id"] for sku in plan["delete"]] + plan["placeholders"]
+    if doomed:
+        if not desired:
+            print("⚠️ Refusing to delete: would leave product with zero variants.")
+        else:
+            delete_variants(product_id, doomed)
+            orphaned_media = []
+            for sku in plan["delete"]:
+                recorded.pop(sku)
+                orphaned_media += [m["media_id"] for m in (entry["mockups"].pop(sku, None) or {}).get("media", [])]
+            entry["placeholders"] = [p for p in entry["placeholders"] if p not in plan["placeholders"]]
+            print(f"✅ Deleted placeholder/stray variants: {len(doomed)}")
+            if orphaned_media:
+                # the deleted variants' mockups would otherwise stay in the product gallery
+                res = gql(MUT_FILE_DELETE, {"fileIds": orphaned_media})["fileDelete"]
+                if res["userErrors"]:
+                    print(f"⚠️ Could not delete mockups of deleted variants: {res['userErrors']}")
+                else:
+                    print(f"🧹 Deleted {len(orphaned_media)} mockups of deleted variants")
+
+    if plan["metafields"]:
+        values = plan["metafield_values"]
+        for sku, keys in plan["metafields"].items():
+            set_metafields(_metafield_inputs(recorded[sku]["id"], values[sku], keys, VARIANT_TYPE_MAP, _coerce_variant_value),
+                           dedupe=False)  # already diffed against the state hashes
+        flush_active()  # the state only records what Shopify has accepted
+        for sku in plan["metafields"]:
+            recorded[sku]["metafields"] = _metafield_hashes(values[sku], VARIANT_TYPE_MAP, _coerce_variant_value)
+        print(f"✅ Set metafields on {len(plan['metafields'])} variants")
+
+
+def _save_variant_ids(story_data_path, story_data, product_type, product_id, recorded) -> None:
+    """Write shopify_variant_id / shopify_product_id into the story + variant JSONs, where they changed."""
+    product_variants = story_data["products"][product_type]
+    story_changed = False
+    for slug, entry in product_variants.items():
+        variant_id = (recorded.get(entry["sku"]) or {}).get("id")
+        if not variant_id or entry.get("shopify_variant_id") == variant_id:
+            continue
+        entry["shopify_variant_id"] = variant_id
+        story_changed = True
+
+        with open(entry["file_path"], "r", encoding="utf-8") as f:
+            product_variant_data = json.load(f)
+        product_variant_data['shopify_variant_id'] = variant_id
+        product_variant_data['shopify_product_id'] = product_id
+        _save_story_data(entry["file_path"], product_variant_data)
+        print("✅ Product Variant Data updated w/ Shopify Variant ID and Shopify Product ID")
+
+    if story_changed:
+        _save_story_data(story_data_path, story_data)
+        print("✅ Story Data updated w/ Shopify Variant ID")
+
+
+def sync_shopify_variants(story_data_path: str, product_type: str, product_slug: str = "ALL",
+                          delete_placeholder_variants: bool = True, dry_run: bool = False):
+    """Create / update / delete variants and variant metafields so they match build_variant_specs."""
+    with open(story_data_path, "r", encoding="utf-8") as f:
+        story_data = json.load(f)
+
+    shopify_product_id = story_data.get("shopify_product_id")
+    if not shopify_product_id:
+        print("❌ ERROR: Missing 'shopify_product_id' in story data.")
+        return
+    specs = build_variant_specs(story_data, product_type, product_slug)
+    if specs is None:
+        return
+    option_names, variants_payload, metafields_by_sku = specs
+
+    state = load_state(story_data_path)
+    entry = product_entry(state, product_type)
+    if entry["product"].get("id") != shopify_product_id:
+        # product made outside the sync (or state from an older product): start over from Shopify
+        state["products"][product_type] = {}
+        entry = product_entry(state, product_type)
+        adopt_existing_product(entry, shopify_product_id)
+    if option_names and not entry["product"].get("options"):
+        set_product_options(shopify_product_id, option_names)
+        entry["product"]["options"] = list(option_names)
+
+    plan = plan_variants(entry, variants_payload, metafields_by_sku, delete_placeholder_variants)
+    print(f"ℹ️ Variant sync plan: {describe_variant_plan(plan)}")
+    if dry_run or variant_plan_is_empty(plan):
+        if not dry_run:
+            _save_variant_ids(story_data_path, story_data, product_type, shopify_product_id, entry["variants"])
+        return plan
+
+    try:
+        apply_variant_plan(entry, plan, shopify_product_id)
+    finally:
+        # whatever did get applied is recorded, so a retry doesn't redo it
+        save_state(story_data_path, state)
+    _save_variant_ids(story_data_path, story_data, product_type, shopify_product_id, entry["variants"])
+    return plan
+
+
+# -------------------- mockups --------------------
+
+def plan_mockups(recorded: Dict[str, Any], files: List[Dict[str, Any]], variant_id: str) -> Dict[str, Any]:
+    """
+    files: [{"name", "digest", "path"}] in gallery order.
+    Media already uploaded for the same content is reused; only new files are uploaded.
+    """
+    previous = (recorded.get("media") or []) if recorded.get("variant_id") == variant_id else []
+    reuse = {m["digest"]: m for m in previous}
+    upload = [f for f in files if f["digest"] not in reuse]
+    kept = {reuse[f["digest"]]["media_id"] for f in files if f["digest"] in reuse}
+    stale = [m["media_id"] for m in (recorded.get("media") or []) if m["media_id"] not in kept]
+    unchanged = not upload and not stale and [m["digest"] for m in previous] == [f["digest"] for f in files]
+    return {"reuse": reuse, "upload": upload, "stale": stale, "unchanged": unchanged}
@@ -18,6 +18,9 @@ from gi.repository import Pango, PangoCairo
 from shapely.geometry import Polygon
 from shapely.affinity import rotate as shapely_rotate
 import shapely.affinity
+from glyph_metrics import get_glyph_metrics
+from curve_path import as_curve_path
+from render_profiler import profiled
 
 # Configuration constants - adjust these to tune behavior
 SPACE_MULTIPLIER_MIN = 0.8    # Minimum allowed space width multiplier
@@ -30,11 +33,7 @@ def get_standard_space_width(pangocairo_context, font_desc):
     """
     Gets the pixel width of a standard space character for the given font.
     """
-    layout = Pango.Layout.new(pangocairo_context)
-    layout.set_font_description(font_desc)
-    layout.set_text(" ", -1)
-    width, _ = layout.get_pixel_size()
-    return width if width > 0 else 1
+    return get_glyph_metrics(pangocairo_context, font_desc).space_width()
 
 
 def test_text_fit_on_curve(
@@ -48,13 +47,16 @@ def test_text_fit_on_curve(
     margin_x,
     margin_y,
     design_width,
-    design_height
+    design_height,
+    curve=None
 ):
     """
     Quick test if text fits on curve WITHOUT actually rendering.
     
     This is a lightweight version of draw_text_on_curve that only checks
-    if the text fits, without creating Cairo drawing commands.
+    if the text fits, without creating Cairo drawing commands. Every glyph
+    is located on the curve in one vectorized lookup; pass the arc's
+    CurvePath as `curve` to skip rebuilding it.
     
     Returns:
         tuple: (status, final_distance, total_curve_length)
@@ -62,43 +64,19 @@ def test_text_fit_on_curve(
             final_distance: how far along the curve the text ended
             total_curve_length: total length of the curve
     """
-    # Calculate curve properties
-    x_arr = np.array(x_values_scaled)
-    y_arr = np.array(y_values_scaled)
-    
-    segment_lengths = np.hypot(np.diff(x_arr), np.diff(y_arr))
-    total_curve_length = np.sum(segment_lengths)
-    cumulative_lengths = np.insert(np.cumsum(segment_lengths), 0, 0)
+    curve = as_curve_path(x_values_scaled, y_values_scaled, curve)
+    total_curve_length = curve.length
     
-    # Get standard space width for this font
-    standard_space_width = get_standard_space_width(pangocairo_context, font_desc)
+    # Glyph sizes come from the shared cache, not a new Pango layout per char
+    glyph_metrics = get_glyph_metrics(pangocairo_context, font_desc)
+    standard_space_width = glyph_metrics.space_width()
     
-    # Track position along curve
-    distance_along_curve = 0.0
-    idx_on_curve = 0
+    # Measure every character (spaces get their multiplier)
+    widths = np.empty(len(text))
+    heights = np.empty(len(text))
     space_count = 0
-    
-    def get_tangent_angle(idx):
-        if idx == 0:
-            dx = x_arr[1] - x_arr[0]
-            dy = y_arr[1] - y_arr[0]
-        elif idx >= len(x_arr) - 1:
-            dx = x_arr[-1] - x_arr[-2]
-            dy = y_arr[-1] - y_arr[-2]
-        else:
-            dx = x_arr[idx + 1] - x_arr[idx - 1]
-            dy = y_arr[idx + 1] - y_arr[idx - 1]
-        return math.atan2(dy, dx)
-    
-    # Process each character
-    for char in text:
-        # Measure character
-        layout = Pango.Layout.new(pangocairo_context)
-        layout.set_font_description(font_desc)
-        layout.set_text(char, -1)
-        char_width, char_height = layout.get_pixel_size()
-        
-        # Apply space multiplier if this is a space
+    for i, char in enumerate(text):
+        char_width, char_height = glyph_metrics.glyph_size(char)
         if char == ' ':
             try:
                 multiplier = spaces_width_multiplier.get(space_count, 1.0)
@@ -106,53 +84,39 @@ def test_text_fit_on_curve(
                 multiplier = spaces_width_multiplier.get(str(space_count), 1.0)
             char_width = standard_space_width * multiplier
             space_count += 1
-        
-        # Check if we'd go past the curve
-        if distance_along_curve + char_width > total_curve_length:
-            return "too_long", distance_along_curve, total_curve_length
-        
-        # Find position on curve for this character
-        target_distance = distance_along_curve + char_width / 2
-        
-        # Advance idx_on_curve as needed
-        while idx_on_curve < len(cumulative_lengths) - 1:
-            if cumulative_lengths[idx_on_curve + 1] >= target_distance:
-                break
-            idx_on_curve += 1
-        
-        # Check if we've run out of curve
-        if idx_on_curve >= len(cumulative_lengths) - 1:
-            return "too_long", distance_along_curve, total_curve_length
-        
-        # Calculate position for boundary check
-        segment_start = cumulative_lengths[idx_on_curve]
-        segment_end = cumulative_lengths[idx_on_curve + 1]
-        segment_length = segment_end - segment_start
-        
-        if segment_length > 1e-6:
-            ratio = (target_distance - segment_start) / segment_length
-            ratio = max(0, min(1, ratio))
-            
-            x = x_arr[idx_on_curve] + ratio * (x_arr[idx_on_curve + 1] - x_arr[idx_on_curve])
-            y = y_arr[idx_on_curve] + ratio * (y_arr[idx_on_curve + 1] - y_arr[idx_on_curve])
-            angle = get_tangent_angle(idx_on_curve)
-            
-            # Quick boundary check (without full collision detection for speed)
-            half_w = char_width / 2
-            half_h = char_height / 2
-            
-            # Check if character center is within margins
-            if (x - half_w < margin_x or 
-                x + half_w > design_width - margin_x or
-                y - half_h < margin_y or 
-                y + half_h > design_height - margin_y):
-                # Character would be out of bounds
-                return "too_long", distance_along_curve, total_curve_length
-        
-        # Advance along curve
-        distance_along_curve += char_width
+        widths[i] = char_width
+        heights[i] = char_height
+    
+    # Where each character starts (summed in order, like the running total did)
+    starts = np.cumsum(np.concatenate(([0.0], widths)))
+    distance_along_curve = starts[:-1]
+    
+    # Past the end of the curve
+    failed = distance_along_curve + widths > total_curve_length
+    
+    # Segment under each character's center
+    target_distance = distance_along_curve + widths / 2
+    segments = curve.segments_reaching(target_distance)
+    failed |= segments >= curve.end_index
+    
+    # Quick boundary check (without full collision detection for speed)
+    on_curve = np.flatnonzero(~failed)
+    checked = on_curve[curve.spans[segments[on_curve]] > 1e-6]
+    if len(checked):
+        x, y, _ = curve.points(target_distance[checked], segments[checked], clip=True)
+        half_w = widths[checked] / 2
+        half_h = heights[checked] / 2
+        failed[checked] = ((x - half_w < margin_x) |
+                           (x + half_w > design_width - margin_x) |
+                           (y - half_h < margin_y) |
+                           (y + half_h > design_height - margin_y))
+    
+    first_failure = np.flatnonzero(failed)
+    if len(first_failure):
+        return "too_long", float(distance_along_curve[first_failure[0]]), total_curve_length
     
     # Check how well we filled the curve
+    distance_along_curve = float(starts[-1])
     fill_ratio = distance_along_curve / total_curve_length
     
     if fill_ratio < (1.0 - FIT_TOLERANCE):
@@ -186,7 +150,8 @@ def optimize_spacing_binary_search(
     margin_y,
     design_width,
     design_height,
-    initial_status
+    initial_status,
+    curve=None
 ):
     """
     Use binary search to find the MINIMAL space adjustment needed to fit text.
@@ -203,6 +168,7 @@ def optimize_spacing_binary_search(
         margin_x, margin_y: Margins
         design_width, design_height: Canvas dimensions
         initial_status: "too_short" or "too_long" from initial test
+        curve: the arc's CurvePath, if the caller already has one
         
     Returns:
         tuple: (success: bool, final_multiplier: float, attempts: int)
@@ -221,6 +187,8 @@ def optimize_spacing_binary_search(
     
     best_fit_multiplier = None
     attempts = 0
+    # every iteration tests the same arc
+    curve = as_curve_path(x_values_scaled, y_values_scaled, curve)
     
     for iteration in range(BINARY_SEARCH_ITERATIONS):
         attempts += 1
@@ -241,7 +209,8 @@ def optimize_spacing_binary_search(
             margin_x=margin_x,
             margin_y=margin_y,
             design_width=design_width,
-            design_height=design_height
+            design_height=design_height,
+            curve=curve
         )
         
         if status == "fits":
@@ -319,6 +288,7 @@ def check_has_constraints(
 # INTEGRATION HELPER: Drop-in replacement for the spacing adjustment section
 # =============================================================================
 
+@profiled("spacing")
 def handle_spacing_adjustment_optimized(
     component,
     curve_length_status,
@@ -336,7 +306,8 @@ def handle_spacing_adjustment_optimized(
     original_arc_end_fortune_score_values,
     old_min_x, old_max_x,
     old_min_y, old_max_y,
-    recursive_mode
+    recursive_mode,
+    curve=None
 ):
     """
     Optimized spacing adjustment that replaces the iterative approach.
@@ -374,7 +345,8 @@ def handle_spacing_adjustment_optimized(
         margin_y=margin_y,
         design_width=design_width,
         design_height=design_height,
-        initial_status="too_short" if curve_length_status == "curve_too_short" else "too_long"
+        initial_status="too_short" if curve_length_status == "curve_too_short" else "too_long",
+        curve=curve
     )
     
     # Mark that we've tried optimization
@@ -1,5 +1,6 @@
 
-from llm import load_config, get_llm, extract_json
+from llm import load_config, get_llm, get_llm_client, gather_llm_calls, extract_json
+from llm_cache import get_llm_response_cache
 import yaml
 import tiktoken
 import json 
@@ -299,13 +300,10 @@ The descriptions in the example output demonstrate the minimum expected level of
 
 
     config = load_config(config_path=config_path)
-    llm = get_llm(llm_provider, llm_model, config, max_tokens=16384)
-
-    # Instead of building an LLMChain, use the pipe operator:
-    runnable = prompt | llm
+    llm_client = get_llm_client(llm_provider, llm_model, config, max_tokens=16384, response_cache=get_llm_response_cache(config))
 
     try:
-        output = runnable.invoke({
+        output = llm_client.invoke(prompt, {
             "author_name": author_name,
             "story_title": story_title,
             "protagonist": protagonist,
@@ -459,7 +457,7 @@ def get_story_components(config_path,story_title, story_summary, author, year, p
 
 import json
 from langchain_core.prompts import PromptTemplate
-from llm import load_config, get_llm, extract_json
+from llm import load_config, get_llm, get_llm_client, gather_llm_calls, extract_json
 
 def clean_distilled_scores(components, tolerance=1, strict=False):
     """
@@ -1612,15 +1610,13 @@ Output ONLY the JSON. No additional commentary.
     )
 
     config = load_config(config_path=config_path)
-    llm = get_llm(llm_provider, llm_model, config, max_tokens=16384)
+    llm_client = get_llm_client(llm_provider, llm_model, config, max_tokens=16384, response_cache=get_llm_response_cache(config))
 
     # Convert granular components to JSON string for prompt
     granular_json_str = json.dumps(granular_components, indent=2)
 
-    runnable = prompt | llm
-
     try:
-        output = runnable.invoke({
+        output = llm_client.invoke(prompt, {
             "story_summary": story_summary,
             "granular_components": granular_json_str,
             "story_title": story_title,
@@ -1835,7 +1831,7 @@ def visualize_distillation(detailed_components, distilled_components, story_titl
 
 
 
-def grade_story_components(config_path: str, story_components: dict, canonical_summary: str, title:str, author: str, protagonist: str, llm_provider: str, llm_model: str) -> dict:
+async def agrade_story_components(config_path: str, story_components: dict, canonical_summary: str, title:str, author: str, protagonist: str, llm_provider: str, llm_model: str) -> dict:
   """
   Grades the accuracy of a story's fortune shape using a two-phase analysis.
 
@@ -1975,9 +1971,8 @@ Provide your complete two-phase assessment in the following JSON format ONLY. Ou
       template=prompt_template
   )
   config = load_config(config_path=config_path)
-  llm = get_llm(llm_provider, llm_model, config, max_tokens=16384) # Increased tokens for the more detailed analysis
-  runnable = prompt | llm
-  output = runnable.invoke({
+  llm_client = get_llm_client(llm_provider, llm_model, config, max_tokens=16384, response_cache=get_llm_response_cache(config)) # Increased tokens for the more detailed analysis
+  output_text = await llm_client.ainvoke(prompt, {
         "generated_analysis": generated_analysis_str,
         "canonical_summary": canonical_summary,
         "title": title,
@@ -1985,11 +1980,6 @@ Provide your complete two-phase assessment in the following JSON format ONLY. Ou
         "protagonist": protagonist
     })
 
-  if hasattr(output, "content"):
-      output_text = output.content
-  else:
-      output_text = output
-
   ## --- FIXES ARE IN THIS FINAL SECTION --- ##
 
   extracted_text = extract_json(output_text)
@@ -2010,6 +2000,11 @@ Provide your complete two-phase assessment in the following JSON format ONLY. Ou
   return grades_dict
 
 
+def grade_story_components(config_path: str, story_components: dict, canonical_summary: str, title:str, author: str, protagonist: str, llm_provider: str, llm_model: str) -> dict:
+  """agrade_story_components, blocking. To run it alongside other LLM calls use llm.gather_llm_calls."""
+  return gather_llm_calls(agrade_story_components(config_path, story_components, canonical_summary, title, author, protagonist, llm_provider, llm_model))[0]
+
+
 #review story shape 
 
 # def review_story_shape(config_path, story_title, author, protagonist, story_summary, shape, llm_provider, llm_model):
@@ -2168,7 +2163,7 @@ Provide your complete two-phase assessment in the following JSON format ONLY. Ou
     
 #     return review_result
 
-def review_story_shape(config_path, story_title, author, protagonist, story_summary, shape, story_components, llm_provider, llm_model):
+async def areview_story_shape(config_path, story_title, author, protagonist, story_summary, shape, story_components, llm_provider, llm_model):
     """
     Reviews a story shape and determines if it passes the "glance test."
     
@@ -2349,13 +2344,12 @@ Now review the provided shape and respond with your JSON assessment.
     )
     
     config = load_config(config_path=config_path)
-    llm = get_llm(llm_provider, llm_model, config, max_tokens=1024)
-    runnable = prompt | llm
+    llm_client = get_llm_client(llm_provider, llm_model, config, max_tokens=1024)
     
     # Format story components as readable string
     components_str = json.dumps(story_components, indent=2)
     
-    output = runnable.invoke({
+    output_text = await llm_client.ainvoke(prompt, {
         "story_title": story_title,
         "author": author,
         "protagonist": protagonist,
@@ -2364,11 +2358,6 @@ Now review the provided shape and respond with your JSON assessment.
         "story_components": components_str
     })
 
-    if hasattr(output, "content"):
-        output_text = output.content
-    else:
-        output_text = output
-
     extracted_text = extract_json(output_text)
     
     try:
@@ -2381,6 +2370,11 @@ Now review the provided shape and respond with your JSON assessment.
     return review_result
 
 
+def review_story_shape(config_path, story_title, author, protagonist, story_summary, shape, story_components, llm_provider, llm_model):
+    """areview_story_shape, blocking. To run it alongside other LLM calls use llm.gather_llm_calls."""
+    return gather_llm_calls(areview_story_shape(config_path, story_title, author, protagonist, story_summary, shape, story_components, llm_provider, llm_model))[0]
+
+
 #TESTING!
 # #
 # story_components_detailed = [
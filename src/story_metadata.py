@@ -46,17 +46,19 @@ It will add/overwrite a "metadata" object with consolidated fields.
 """
 
 from __future__ import annotations
-import json, sys, time, re, argparse, logging, os, hashlib
+import json, sys, time, re, argparse, logging, threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from typing import Dict, Any, List, Optional
 import requests
 from urllib3.util.retry import Retry
+from http_cache import Fetcher
 
 # -----------------------
 # HTTP session with retries (polite) + constants
 # -----------------------
 HTTP_TIMEOUT = 20  # seconds
-CACHE_DIR = os.path.expanduser("~/.shapes_cache")
-os.makedirs(CACHE_DIR, exist_ok=True)
+SOURCE_WORKERS = 4  # OpenLibrary (+ Work), Google Books, Wikidata, Goodreads run side by side
 
 def _session() -> requests.Session:
     s = requests.Session()
@@ -76,23 +78,32 @@ def _session() -> requests.Session:
     s.mount("http://", adapter)
     return s
 
-def _cache_key(url: str, params: Dict[str, Any]) -> str:
-    payload = url + "?" + "&".join(f"{k}={params[k]}" for k in sorted(params))
-    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
-
-def _cached_get_json(session: requests.Session, url: str, params: Dict[str, Any], timeout: int = HTTP_TIMEOUT) -> Dict[str, Any]:
-    key = _cache_key(url, params)
-    path = os.path.join(CACHE_DIR, key + ".json")
-    if os.path.exists(path):
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    r = session.get(url, params=params, timeout=timeout)
-    r.raise_for_status()
-    data = r.json()
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False)
-    time.sleep(0.6)  # gentle throttle to be nice to public APIs
-    return data
+# every source goes through one http_cache.Fetcher: SQLite cache with TTL and
+# negative caching, per-host politeness limits instead of a fixed sleep
+_FETCHER: Optional[Fetcher] = None
+_FETCHER_LOCK = threading.Lock()
+
+def _fetcher() -> Fetcher:
+    global _FETCHER
+    with _FETCHER_LOCK:
+        if _FETCHER is None:
+            _FETCHER = Fetcher(session_factory=_session, timeout=HTTP_TIMEOUT)
+        return _FETCHER
+
+@contextmanager
+def use_fetcher(fetcher: Fetcher):
+    """Route the source fetchers through `fetcher` (e.g. a record / replay one) inside the block."""
+    global _FETCHER
+    with _FETCHER_LOCK:
+        previous, _FETCHER = _FETCHER, fetcher
+    try:
+        yield fetcher
+    finally:
+        with _FETCHER_LOCK:
+            _FETCHER = previous
+
+def _get_json(url: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    return _fetcher().get_json(url, params or {})
 
 # -----------------------
 # Tiny helpers
@@ -127,14 +138,11 @@ def _digits_isbn(s: str) -> str:
 # Source fetchers
 # -----------------------
 def fetch_openlibrary(title: str, author: Optional[str], year: Optional[int]) -> Dict[str, Any]:
-    ses = _session()
     url = "https://openlibrary.org/search.json"
     params = {"title": title, "limit": 10}  # was 3
     if author: params["author"] = author
     if year:   params["publish_year"] = year
-    r = ses.get(url, params=params, timeout=HTTP_TIMEOUT)
-    r.raise_for_status()
-    data = r.json()
+    data = _get_json(url, params)
     docs = data.get("docs", []) or []
     if not docs: return {}
 
@@ -186,10 +194,9 @@ def fetch_openlibrary_work(openlibrary_key: Optional[str]) -> Dict[str, Any]:
     """Enrich using the Work endpoint if we have a /works/OL... key."""
     if not openlibrary_key or not str(openlibrary_key).startswith("/works/"):
         return {}
-    ses = _session()
     url = f"https://openlibrary.org{openlibrary_key}.json"
     try:
-        data = _cached_get_json(ses, url, params={}, timeout=HTTP_TIMEOUT)
+        data = _get_json(url)
     except Exception as e:
         logging.info("OpenLibrary Work fetch failed: %s", e)
         return {}
@@ -203,11 +210,9 @@ def fetch_openlibrary_work(openlibrary_key: Optional[str]) -> Dict[str, Any]:
     }
 
 def fetch_googlebooks(title: str, author: Optional[str]) -> Dict[str, Any]:
-    ses = _session()
     base = {"maxResults": 15, "printType": "books", "orderBy": "relevance"}
     def call(q):
-        r = ses.get("https://www.googleapis.com/books/v1/volumes", params=dict(base, q=q), timeout=HTTP_TIMEOUT)
-        r.raise_for_status(); return r.json().get("items", []) or []
+        return _get_json("https://www.googleapis.com/books/v1/volumes", dict(base, q=q)).get("items", []) or []
 
     queries = [f'intitle:"{title}"' + (f' inauthor:"{author}"' if author else "")]
     # fallback looser query
@@ -273,7 +278,6 @@ LITWORK_P31_WHITELIST = {"Q7725634", "Q8261", "Q47461344"}  # literary work, nov
 EDITION_QID = "Q3331189"
 
 def _wiki_search_pageid(title: str, author: Optional[str]) -> Optional[int]:
-    ses = _session()
     query = f'intitle:"{title}"'
     if author: query += f' {author}'
     url = "https://en.wikipedia.org/w/api.php"
@@ -284,7 +288,7 @@ def _wiki_search_pageid(title: str, author: Optional[str]) -> Optional[int]:
         "srlimit": 5,
         "format": "json"
     }
-    data = _cached_get_json(ses, url, params, timeout=HTTP_TIMEOUT)
+    data = _get_json(url, params)
     hits = data.get("query", {}).get("search", [])
     if not hits: return None
     # Prefer exact (case-insensitive) title match
@@ -292,7 +296,6 @@ def _wiki_search_pageid(title: str, author: Optional[str]) -> Optional[int]:
     return hits[0].get("pageid")
 
 def _wiki_pageprops_qid(pageid: int) -> Optional[str]:
-    ses = _session()
     url = "https://en.wikipedia.org/w/api.php"
     params = {
         "action": "query",
@@ -300,7 +303,7 @@ def _wiki_pageprops_qid(pageid: int) -> Optional[str]:
         "pageids": pageid,
         "format": "json"
     }
-    data = _cached_get_json(ses, url, params, timeout=HTTP_TIMEOUT)
+    data = _get_json(url, params)
     pages = data.get("query", {}).get("pages", {})
     for p in pages.values():
         qid = p.get("pageprops", {}).get("wikibase_item")
@@ -313,9 +316,9 @@ def _resolve_qid_via_wikipedia(title: str, author: Optional[str]) -> Optional[st
     if not pid: return None
     return _wiki_pageprops_qid(pid)
 
-def _wd_get_entity(session: requests.Session, qid: str) -> dict:
+def _wd_get_entity(qid: str) -> dict:
     url = f"https://www.wikidata.org/wiki/Special:EntityData/{qid}.json"
-    data = _cached_get_json(session, url, params={}, timeout=HTTP_TIMEOUT)
+    data = _get_json(url)
     return data["entities"][qid]
 
 def _wd_claim_qids(ent: dict, prop: str) -> List[str]:
@@ -337,7 +340,7 @@ def _wd_time_year(ent: dict, prop: str) -> Optional[int]:
                 return y
     return None
 
-def _wd_labels_for(session: requests.Session, qids: List[str]) -> Dict[str, str]:
+def _wd_labels_for(qids: List[str]) -> Dict[str, str]:
     if not qids: return {}
     out = {}
     url = "https://www.wikidata.org/w/api.php"
@@ -350,7 +353,7 @@ def _wd_labels_for(session: requests.Session, qids: List[str]) -> Dict[str, str]
             "languages": "en",
             "format": "json"
         }
-        data = _cached_get_json(session, url, params, timeout=HTTP_TIMEOUT)
+        data = _get_json(url, params)
         for q, ent in data.get("entities", {}).items():
             lab = (ent.get("labels", {}).get("en") or {}).get("value")
             if lab: out[q] = lab
@@ -364,9 +367,9 @@ def _wd_is_literary_work(ent: dict) -> bool:
     if EDITION_QID in p31: return False
     return bool(p31 & LITWORK_P31_WHITELIST)
 
-def _wd_author_labels(session: requests.Session, ent: dict) -> List[str]:
+def _wd_author_labels(ent: dict) -> List[str]:
     author_q = _wd_claim_qids(ent, "P50")
-    labels = _wd_labels_for(session, author_q)
+    labels = _wd_labels_for(author_q)
     return [lab.lower() for lab in labels.values()]
 
 def fetch_wikidata_rest(title: str, author: Optional[str]) -> Dict[str, Any]:
@@ -376,7 +379,6 @@ def fetch_wikidata_rest(title: str, author: Optional[str]) -> Dict[str, Any]:
       2) Load entity JSON, ensure it's a work (not edition), confirm author if provided
       3) Extract P136/P179/P840/P495/P921/P166/P577 and resolve labels
     """
-    ses = _session()
     title_clean = _clean(title) or ""
     author_clean = (_clean(author) or "").lower() if author else None
 
@@ -395,14 +397,14 @@ def fetch_wikidata_rest(title: str, author: Optional[str]) -> Dict[str, Any]:
             "limit": 10,
             "format": "json",
         }
-        data = _cached_get_json(ses, url, params, timeout=HTTP_TIMEOUT)
+        data = _get_json(url, params)
         candidates = [it["id"] for it in data.get("search", []) if it.get("id")]
 
     best_ent, best_score = None, -1
     for q in candidates:
         if not q: continue
         try:
-            ent = _wd_get_entity(ses, q)
+            ent = _wd_get_entity(q)
         except Exception:
             continue
         if not _wd_is_literary_work(ent):
@@ -412,7 +414,7 @@ def fetch_wikidata_rest(title: str, author: Optional[str]) -> Dict[str, Any]:
         score = 0
         if label == title_clean.lower(): score += 2
         if author_clean:
-            auths = _wd_author_labels(ses, ent)
+            auths = _wd_author_labels(ent)
             if not auths or author_clean not in auths:
                 # If QID came from Wikipedia, allow leniency; else enforce author
                 if q != qid:
@@ -436,7 +438,7 @@ def fetch_wikidata_rest(title: str, author: Optional[str]) -> Dict[str, Any]:
     pub_year  = _wd_time_year(best_ent, "P577")
 
     all_qs = _dedupe_keep_order(genre_q + series_q + loc_q + country_q + theme_q + award_q)
-    labels = _wd_labels_for(ses, all_qs)
+    labels = _wd_labels_for(all_qs)
 
     return {
         "source": "wikidata",
@@ -529,7 +531,7 @@ def consolidate(openlib: Dict[str,Any], openlib_work: Dict[str,Any], gbooks: Dic
 # from langchain.prompts import PromptTemplate
 from langchain_core.prompts import PromptTemplate, ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from llm import load_config, get_llm, extract_json
+from llm import load_config, get_llm, get_llm_client, extract_json
 
 # Controlled vocab (seed; expand as you grow)
 # ---- Canon lists (compact but broad coverage) ----
@@ -733,10 +735,9 @@ You are a metadata librarian. Normalize the input to a strict JSON schema.
     )
 
     config = load_config(config_path=config_path) if config_path else load_config()
-    llm = get_llm(llm_provider, llm_model, config, max_tokens=1200)
+    llm_client = get_llm_client(llm_provider, llm_model, config, max_tokens=1200)
 
-    runnable = prompt | llm
-    out = runnable.invoke({
+    out = llm_client.invoke(prompt, {
         "canon_genres": json.dumps(CANON_GENRES, ensure_ascii=False),
         "canon_themes": json.dumps(CANON_THEMES, ensure_ascii=False),
         "input_json": json.dumps(pre, ensure_ascii=False)
@@ -777,6 +778,51 @@ You are a metadata librarian. Normalize the input to a strict JSON schema.
     # Remove the temporary description if present in caller's structure after we return
     return normalized
 
+# -----------------------
+# All sources at once
+# -----------------------
+def _safe(label: str, fn, *args) -> Dict[str, Any]:
+    # a source that fails just contributes nothing
+    try:
+        return fn(*args) or {}
+    except Exception as e:
+        logging.info("%s failed: %s", label, e)
+        return {}
+
+def fetch_sources(title: str, author: Optional[str], year: Optional[int],
+                  wikidata_mode: str="rest", goodreads: bool=True,
+                  max_workers: int=SOURCE_WORKERS) -> Dict[str, Dict[str, Any]]:
+    """
+    OpenLibrary (then its Work), Google Books, Wikidata and Goodreads don't
+    depend on each other, so they're fetched side by side (the fetcher keeps
+    each host polite). Returns {source: data}; failed sources come back {}.
+    """
+    def openlibrary():
+        ol = _safe("OpenLibrary fetch", fetch_openlibrary, title, author, year)
+        # Work enrichment (if key present)
+        return ol, _safe("OpenLibrary Work enrichment", fetch_openlibrary_work, ol.get("openlibrary_key"))
+
+    def wikidata():
+        if wikidata_mode == "off":
+            logging.info("WD: mode=off (skipping Wikidata)")
+            return {}
+        logging.info("WD: using Wikipedia→QID→REST path")
+        return _safe("Wikidata REST fetch", fetch_wikidata_rest, title, author)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        f_ol = pool.submit(openlibrary)
+        f_gb = pool.submit(_safe, "Google Books fetch", fetch_googlebooks, title, author)
+        f_wd = pool.submit(wikidata)
+        f_gr = pool.submit(_safe, "Goodreads fetch", fetch_goodreads_metadata_by_title, title) if goodreads else None
+        ol, ol_work = f_ol.result()
+        return {
+            "openlibrary": ol,
+            "openlibrary_work": ol_work,
+            "googlebooks": f_gb.result(),
+            "wikidata": f_wd.result(),
+            "goodreads": f_gr.result() if f_gr else {},
+        }
+
 # -----------------------
 # Top-level function
 # -----------------------
@@ -785,7 +831,22 @@ def get_story_metadata(story_json_path: str,
                        llm_provider: Optional[str]=None,
                        llm_model: Optional[str]=None,
                        wikidata_mode: str="rest",
-                       config_path: Optional[str]=None) -> Dict[str,Any]:
+                       config_path: Optional[str]=None,
+                       fixtures: Optional[str]=None,
+                       fixture_mode: str="replay") -> Dict[str,Any]:
+    """
+    fixtures: JSON file of recorded API responses. fixture_mode="record"
+    fetches live and saves every response there; "replay" serves only from
+    it (no network), for re-running the pipeline offline.
+    """
+    if fixtures:
+        fetcher = Fetcher(session_factory=_session, timeout=HTTP_TIMEOUT, mode=fixture_mode, fixtures_path=fixtures)
+        try:
+            with use_fetcher(fetcher):
+                return get_story_metadata(story_json_path, use_llm, llm_provider, llm_model,
+                                          wikidata_mode, config_path)
+        finally:
+            fetcher.save_fixtures()
 
     with open(story_json_path, "r", encoding="utf-8") as f:
         story = json.load(f)
@@ -797,34 +858,9 @@ def get_story_metadata(story_json_path: str,
     if not title:
         raise ValueError("story_data.json missing 'title'")
 
-    # 1) fetch
-    ol = {}; ol_work = {}; gb = {}; wd = {}
-    try:
-        ol = fetch_openlibrary(title, author, year)
-    except Exception as e:
-        logging.info("OpenLibrary fetch failed: %s", e)
-
-    # Work enrichment (if key present)
-    try:
-        ol_work = fetch_openlibrary_work(ol.get("openlibrary_key"))
-    except Exception as e:
-        logging.info("OpenLibrary Work enrichment failed: %s", e)
-
-    try:
-        gb = fetch_googlebooks(title, author)
-    except Exception as e:
-        logging.info("Google Books fetch failed: %s", e)
-
-    try:
-        if wikidata_mode == "off":
-            wd = {}
-            logging.info("WD: mode=off (skipping Wikidata)")
-        else:
-            wd = fetch_wikidata_rest(title, author)
-            logging.info("WD: using Wikipedia→QID→REST path")
-    except Exception as e:
-        logging.info("Wikidata REST fetch failed: %s", e)
-        wd = {}
+    # 1) fetch (all sources concurrently)
+    sources = fetch_sources(title, author, year, wikidata_mode=wikidata_mode)
+    ol, ol_work, gb, wd = sources["openlibrary"], sources["openlibrary_work"], sources["googlebooks"], sources["wikidata"]
 
     # 2) consolidate
     consolidated = consolidate(ol, ol_work, gb, wd)
@@ -842,7 +878,7 @@ def get_story_metadata(story_json_path: str,
     
 
     #overwrite some metadata field data with goodreads data if they exist --> goodreads better source of info
-    goodreads_metadata = fetch_goodreads_metadata_by_title(title)
+    goodreads_metadata = sources["goodreads"]
     
     #check if goodreads_metadata has any awards
     goodreads_awards = goodreads_metadata.get("work_details",{}).get("awards",[])
@@ -888,563 +924,16 @@ def get_story_metadata(story_json_path: str,
 #########################################
 #########################################
 
-import re, urllib.parse, requests, json
-from bs4 import BeautifulSoup
-from typing import Optional, Tuple, Dict, Any
-from paths import PATHS
-import time
-import os
-
-
-
-HDRS = {"User-Agent": "Mozilla/5.0", "Accept-Language": "en-US,en;q=0.9"}
-SIZE_RE = re.compile(r"(/books/\d+)([sml])(/[^/?#]+\.(?:jpe?g|png|webp))", re.I)
-
-
-# --- Literary awards (robust DOM + Next.js fallback) ---
-
-# --- Awards as a list[str] ---
-
-def _dedupe_preserve_case(seq: list[str]) -> list[str]:
-    seen, out = set(), []
-    for s in seq:
-        k = s.strip().lower()
-        if k and k not in seen:
-            seen.add(k); out.append(s.strip())
-    return out
-
-def _extract_awards_dom(soup: BeautifulSoup) -> list[str]:
-    names = []
-    for a in soup.select('span[data-testid="award"] a'):
-        txt = " ".join(a.stripped_strings)              # merge multi-line text
-        txt = txt.replace("“","").replace("”","").replace('"',"").strip()
-        txt = re.sub(r"\s*\(\d{4}\)\s*", "", txt)       # drop any (YYYY)
-        if txt:
-            names.append(txt)
-    return _dedupe_preserve_case(names)
-
-def _extract_awards_next(soup: BeautifulSoup) -> list[str]:
-    tag = soup.find("script", id="__NEXT_DATA__", attrs={"type":"application/json"})
-    if not tag or not tag.string:
-        return []
-    try:
-        data = json.loads(tag.string)
-    except Exception:
-        return []
-
-    found: list[str] = []
-    def add(v: Optional[str]):
-        v = (v or "").strip()
-        if v: found.append(v)
-
-    def walk(node):
-        if isinstance(node, dict):
-            for k, v in node.items():
-                if re.search(r"award", k, re.I) and isinstance(v, list):
-                    for it in v:
-                        if isinstance(it, dict):
-                            add(it.get("name") or it.get("awardName") or it.get("title"))
-                        elif isinstance(it, str):
-                            add(it)
-                else:
-                    walk(v)
-        elif isinstance(node, list):
-            for it in node: walk(it)
-
-    walk(data)
-    return _dedupe_preserve_case(found)
-
-
-# ---------- Genres ----------
-def _uniq_by_name(dicts):
-    seen = set(); out = []
-    for d in dicts:
-        nm = (d.get("name") or "").strip()
-        if not nm: 
-            continue
-        k = nm.lower()
-        if k in seen: 
-            continue
-        seen.add(k); out.append(d)
-    return out
-
-def _extract_genres_dom(soup: BeautifulSoup) -> list[dict]:
-    """Reads the 'Top genres for this book' chips."""
-    genres = []
-    for a in soup.select('[data-testid="genresList"] a[href*="/genres/"]'):
-        name = a.get_text(strip=True)
-        href = a.get("href")
-        url  = urllib.parse.urljoin("https://www.goodreads.com", href) if href else None
-        slug = None
-        if href:
-            m = re.search(r"/genres/([\w-]+)", href)
-            if m: slug = m.group(1)
-        if name:
-            rec = {"name": name}
-            if slug: rec["slug"] = slug
-            if url:  rec["url"]  = url
-            genres.append(rec)
-    return _uniq_by_name(genres)
-
-def _extract_genres_next(soup: BeautifulSoup) -> list[dict]:
-    """Fallback to Next.js boot payload (__NEXT_DATA__)."""
-    tag = soup.find("script", id="__NEXT_DATA__", attrs={"type": "application/json"})
-    if not tag or not tag.string:
-        return []
-    try:
-        data = json.loads(tag.string)
-    except Exception:
-        return []
-
-    found = []
-    def add(name=None, slug=None, url=None):
-        name = (name or "").strip()
-        if not name: return
-        rec = {"name": name}
-        if slug: rec["slug"] = slug
-        if url:  rec["url"]  = url
-        found.append(rec)
-
-    def walk(node):
-        if isinstance(node, dict):
-            # Common shapes seen in Goodreads payloads
-            for key in ("genres", "topGenres"):
-                if key in node and isinstance(node[key], list):
-                    for it in node[key]:
-                        if isinstance(it, dict):
-                            add(it.get("name") or it.get("genreName"),
-                                it.get("slug"),
-                                it.get("url") or it.get("webUrl"))
-                        elif isinstance(it, str):
-                            add(it)
-            for v in node.values():
-                walk(v)
-        elif isinstance(node, list):
-            for v in node:
-                walk(v)
-    walk(data)
-    return _uniq_by_name(found)
-
-def _extract_genres(soup: BeautifulSoup, names_only: bool = True):
-    genres = _extract_genres_dom(soup)
-    if not genres:
-        genres = _extract_genres_next(soup)
-    if names_only:
-        return [g["name"] for g in genres]
-    return genres
-
-
-# ---- utils ----
-def _uniq(seq):
-    seen = set(); out = []
-    for x in seq:
-        if not x: continue
-        key = json.dumps(x, sort_keys=True) if isinstance(x, dict) else str(x)
-        if key in seen: continue
-        seen.add(key); out.append(x)
-    return out
-
-def _get_dd_by_label(soup: BeautifulSoup, label: str) -> Optional[BeautifulSoup]:
-    dt = soup.find(lambda t: t.name == "dt" and t.get_text(strip=True).lower() == label.lower())
-    return _following_dd(dt)
-
-def _parse_awards_dd(dd) -> list:
-    """Extract awards like:
-       <span data-testid="award"><a>Pulitzer Prize for Fiction (1953)</a></span>, ...
-    """
-    def strip_quotes(s: str) -> str:
-        return s.replace("“","").replace("”","").replace('"',"").strip()
-
-    items = []
-
-    # Preferred: grab each award anchor; its text usually contains the year in parentheses.
-    for sp in dd.select("[data-testid='award']"):
-        a = sp.find("a")
-        if not a: 
-            continue
-        txt = strip_quotes(a.get_text(" ", strip=True))
-        # e.g. "Pulitzer Prize for Fiction (1953)"
-        m = re.search(r"\((\d{4})\)", txt)             # not anchored to end anymore
-        year = int(m.group(1)) if m else None
-        name = re.sub(r"\s*\(\d{4}\)\s*", "", txt).strip()
-        href = a.get("href")
-        url = urllib.parse.urljoin("https://www.goodreads.com", href) if href else None
-
-        if name:
-            rec = {"name": name}
-            if year: rec["year"] = year
-            if url:  rec["url"] = url
-            items.append(rec)
-
-    if items:
-        # de-dupe while preserving order
-        seen, out = set(), []
-        for it in items:
-            key = (it["name"], it.get("year"), it.get("url"))
-            if key in seen: 
-                continue
-            seen.add(key); out.append(it)
-        return out
-
-    # Fallback: parse visible text (commas between awards; keep years inside parentheses)
-    raw = strip_quotes(" ".join(dd.stripped_strings))
-    parts = re.split(r"\s*,\s*(?![^()]*\))", raw)  # split on commas not inside (...)
-    for p in parts:
-        p = p.strip()
-        if not p:
-            continue
-        m = re.search(r"\((\d{4})\)", p)
-        year = int(m.group(1)) if m else None
-        name = re.sub(r"\s*\(\d{4}\)\s*", "", p).strip()
-        if name:
-            items.append({"name": name, **({"year": year} if year else {})})
-
-    return items
-
-
-def _parse_links_or_csv(dd) -> list:
-    vals = [a.get_text(strip=True) for a in dd.select("a") if a.get_text(strip=True)]
-    if not vals:
-        raw = dd.get_text(" ", strip=True)
-        vals = [v.strip() for v in re.split(r"\s*,\s*|\s+and\s+", raw) if v.strip()]
-    return _uniq(vals)
-
-
-
-
-def _extract_work_details(soup: BeautifulSoup) -> Dict[str, Any]:
-    out: Dict[str, Any] = {}
-
-    awards = _extract_awards_dom(soup) or _extract_awards_next(soup)
-    if awards:
-        out["awards"] = awards
-
-    # settings / characters (DOM first, Next.js to fill gaps)
-    nxt = _extract_work_details_next(soup)
-    s_dom = _parse_links_or_csv(_get_dd_by_label(soup, "Setting")) or []
-    c_dom = _parse_links_or_csv(_get_dd_by_label(soup, "Characters")) or []
-    if s_dom or nxt.get("setting"):     out["setting"] = s_dom or nxt.get("setting")
-    if c_dom or nxt.get("characters"):  out["characters"] = c_dom or nxt.get("characters")
-
-    return out
-
-
-
-def _extract_from_next_data(soup: BeautifulSoup) -> Dict[str, str]:
-    """Parse Next.js boot JSON for edition identifiers."""
-    tag = soup.find("script", id="__NEXT_DATA__", attrs={"type": "application/json"})
-    if not tag or not tag.string:
-        return {}
-    try:
-        data = json.loads(tag.string)
-    except Exception:
-        return {}
-
-    found: Dict[str, str] = {}
-
-    def norm_isbn13(v: str) -> Optional[str]:
-        raw = re.sub(r"\D", "", str(v))
-        return raw if len(raw) == 13 else None
-
-    def norm_isbn10(v: str) -> Optional[str]:
-        raw = re.sub(r"[^0-9Xx]", "", str(v)).upper()
-        return raw if re.fullmatch(r"\d{9}[0-9X]", raw) else None
-
-    def norm_asin(v: str) -> Optional[str]:
-        raw = re.sub(r"[^A-Za-z0-9]", "", str(v)).upper()
-        m = re.search(r"[A-Z0-9]{10}", raw)
-        return m.group(0) if m else None
-
-    def walk(node):
-        if isinstance(node, dict):
-            # common keys seen in Goodreads Next data
-            for key in ("isbn", "isbn13", "isbn_13"):
-                if key in node and "isbn13" not in found:
-                    v = norm_isbn13(node[key])
-                    if v: found["isbn13"] = v
-            for key in ("isbn10", "isbn_10"):
-                if key in node and "isbn10" not in found:
-                    v = norm_isbn10(node[key])
-                    if v: found["isbn10"] = v
-            for key in ("asin", "ebookAsin", "ebook_asin", "kindleAsin", "kindle_asin"):
-                if key in node and "asin" not in found:
-                    v = norm_asin(node[key])
-                    if v: found["asin"] = v
-            for v in node.values():
-                walk(v)
-        elif isinstance(node, list):
-            for v in node:
-                walk(v)
-
-    walk(data)
-    return found
-
-
-def _size_variant(url: str, size: str) -> str:
-    m = SIZE_RE.search(url)
-    if not m or size.lower() not in {"s","m","l"}: return url
-    prefix = url[: m.start(1)]
-    books_part, _, tail = m.groups()
-    return f"{prefix}{books_part}{size.lower()}{tail}"
-
-def _fetch_img(url: str) -> Optional[bytes]:
-    r = requests.get(url, headers=HDRS, timeout=20)
-    return r.content if r.ok and r.headers.get("content-type","").startswith("image/") else None
-
-def _extract_ids_from_url(url: str) -> Dict[str, str]:
-    out: Dict[str, str] = {}
-    m = re.search(r"/book/show/(\d+)", url)
-    if m:
-        out["goodreads_book_id"] = m.group(1)
-    mw = re.search(r"/work(?:/(?:show|editions))?/(\d+)", url)
-    if mw:
-        out["goodreads_work_id"] = mw.group(1)
-    return out
-
-
-def _extract_ids_from_dom(soup: BeautifulSoup) -> Dict[str, str]:
-    out: Dict[str, str] = {}
-    # canonical or og:url often carry the clean /book/show/<id> URL
-    canon = soup.find("link", rel="canonical")
-    if canon and canon.get("href"):
-        out.update(_extract_ids_from_url(canon["href"]))
-        out.setdefault("canonical_url", canon["href"])
-    og_url = soup.find("meta", attrs={"property": "og:url"})
-    if og_url and og_url.get("content"):
-        out.update(_extract_ids_from_url(og_url["content"]))
-        out.setdefault("canonical_url", og_url["content"])
-    # look for any link to a work page to grab work_id
-    work_a = soup.select_one("a[href*='/work/']")
-    if work_a and work_a.get("href"):
-        out.update(_extract_ids_from_url(urllib.parse.urljoin("https://www.goodreads.com", work_a["href"])))
-    return out
-
-
-def _extract_work_details_next(soup: BeautifulSoup) -> Dict[str, Any]:
-    tag = soup.find("script", id="__NEXT_DATA__", attrs={"type": "application/json"})
-    if not tag or not tag.string:
-        return {}
-    try:
-        data = json.loads(tag.string)
-    except Exception:
-        return {}
-
-    awards, settings, characters = [], [], []
-
-    def add_award(name, year=None, url=None):
-        name = (name or "").strip()
-        if not name: return
-        rec = {"name": name}
-        if isinstance(year, int): rec["year"] = year
-        if url: rec["url"] = url
-        awards.append(rec)
-
-    def visit(node, path=""):
-        if isinstance(node, dict):
-            # Awards
-            if "awards" in node and isinstance(node["awards"], list):
-                for it in node["awards"]:
-                    if isinstance(it, dict):
-                        add_award(it.get("name") or it.get("awardName") or it.get("title"),
-                                  it.get("year") or it.get("yearAwarded"),
-                                  it.get("url"))
-            if "literaryAwards" in node and isinstance(node["literaryAwards"], list):
-                for it in node["literaryAwards"]:
-                    if isinstance(it, dict):
-                        add_award(it.get("name") or it.get("awardName") or it.get("title"),
-                                  it.get("year") or it.get("yearAwarded"),
-                                  it.get("url"))
-
-            # Settings / places
-            for k in ("settings", "places", "settingPlaces"):
-                if k in node and isinstance(node[k], list):
-                    for it in node[k]:
-                        if isinstance(it, dict):
-                            nm = it.get("name") or it.get("placeName")
-                            if nm: settings.append(nm.strip())
-                        elif isinstance(it, str):
-                            settings.append(it.strip())
-
-            # Characters
-            if "characters" in node and isinstance(node["characters"], list):
-                for it in node["characters"]:
-                    if isinstance(it, dict):
-                        nm = it.get("name") or it.get("characterName")
-                        if nm: characters.append(nm.strip())
-                    elif isinstance(it, str):
-                        characters.append(it.strip())
-
-            for v in node.values():
-                visit(v, path)
-        elif isinstance(node, list):
-            for v in node:
-                visit(v, path)
-
-    visit(data)
-
-    out: Dict[str, Any] = {}
-    if awards:    out["awards"] = _uniq(awards)
-    if settings:  out["setting"] = _uniq(settings)
-    if characters: out["characters"] = _uniq(characters)
-    return out
-
-
-def _extract_work_details(soup: BeautifulSoup) -> Dict[str, Any]:
-    out: Dict[str, Any] = {}
-
-    # Awards = list[str]
-    awards = _extract_awards_dom(soup) or _extract_awards_next(soup)
-    if awards:
-        out["awards"] = _dedupe_preserve_case(awards)
-
-    # Settings/Characters: DOM first
-    dd_setting = _get_dd_by_label(soup, "Setting")
-    dom_setting = _parse_links_or_csv(dd_setting) if dd_setting else []
-
-    dd_chars = _get_dd_by_label(soup, "Characters")
-    dom_chars = _parse_links_or_csv(dd_chars) if dd_chars else []
-
-    # Fill gaps from Next.js boot JSON
-    nxt = _extract_work_details_next(soup)  # returns {"setting": [...], "characters": [...]} if present
-    setting = dom_setting or nxt.get("setting", [])
-    characters = dom_chars or nxt.get("characters", [])
-
-    if setting:    out["setting"] = setting
-    if characters: out["characters"] = characters
-    return out
-
-
-# --- add near top with your other regexes ---
-ISBN13_RE = re.compile(r"\b97[89][\d\-]{10,16}\b")
-ISBN10_RE = re.compile(r"\b\d{9}[\dXx]\b")
-ASIN_RE   = re.compile(r"\bB0[A-Z0-9]{8}\b", re.I)  # Kindle-style ASIN; some pages reuse ISBN10
-
-def _following_dd(dt):
-    """Goodreads uses <dt>ISBN</dt><dd>...</dd> pairs inside .DescListItem."""
-    if not dt: return None
-    dd = dt.find_next_sibling("dd")
-    if dd: return dd
-    # some pages wrap dt+dd in a div; grab the dd inside that wrapper
-    if dt.parent and dt.parent.name != "dl":
-        dd = dt.parent.find("dd")
-    return dd
-
-def _extract_isbn_asin(soup: BeautifulSoup) -> Dict[str, str]:
-    out: Dict[str, str] = {}
-
-    # --- 1) Try DOM (works if server-rendered) ---
-    dt_isbn = soup.find(lambda t: t.name == "dt" and t.get_text(strip=True).lower() == "isbn")
-    dd_isbn = _following_dd(dt_isbn)
-    if dd_isbn:
-        text = dd_isbn.get_text(" ", strip=True)
-        m13 = ISBN13_RE.search(text)
-        if m13: out["isbn13"] = re.sub(r"\D", "", m13.group(0))
-        m10 = ISBN10_RE.search(text)
-        if m10: out["isbn10"] = m10.group(0).upper()
-
-    asin_span = soup.select_one("[data-testid='asin']")
-    if asin_span:
-        raw = asin_span.get_text(strip=True).upper()
-        if re.fullmatch(r"[A-Z0-9]{10}", raw):
-            out["asin"] = raw
-    else:
-        dt_asin = soup.find(lambda t: t.name == "dt" and t.get_text(strip=True).lower() == "asin")
-        dd_asin = _following_dd(dt_asin)
-        if dd_asin:
-            t = dd_asin.get_text(" ", strip=True)
-            m = ASIN_RE.search(t) or ISBN10_RE.search(t)
-            if m: out["asin"] = m.group(0).upper()
-
-    # --- 2) Next.js boot JSON (works when DOM is empty) ---
-    if not {"isbn13","isbn10","asin"} & out.keys():
-        out.update({k:v for k,v in _extract_from_next_data(soup).items() if k not in out})
-
-    # --- 3) JSON-LD fallback ---
-    if "isbn13" not in out or "isbn10" not in out:
-        for tag in soup.select('script[type="application/ld+json"]'):
-            if not tag.string: continue
-            try:
-                payload = json.loads(tag.string)
-            except Exception:
-                continue
-            def find_isbn(node):
-                if isinstance(node, dict):
-                    if "isbn" in node: return node["isbn"]
-                    for v in node.values():
-                        r = find_isbn(v)
-                        if r: return r
-                elif isinstance(node, list):
-                    for it in node:
-                        r = find_isbn(it)
-                        if r: return r
-                return None
-            val = find_isbn(payload)
-            if not val: continue
-            vals = val if isinstance(val, list) else [val]
-            for v in vals:
-                raw = re.sub(r"[^0-9Xx]", "", str(v))
-                if len(raw) == 13 and "isbn13" not in out: out["isbn13"] = raw
-                elif len(raw) == 10 and "isbn10" not in out: out["isbn10"] = raw.upper()
-            if "isbn13" in out and "isbn10" in out: break
-
-    return out
+from goodreads_scraper import lookup_title
 
 
 def fetch_goodreads_metadata_by_title(title) -> Optional[Dict[str, Any]]:
-   
-    # 1) search
-    q = urllib.parse.urlencode({"q": title.strip()})
-    search_url = f"https://www.goodreads.com/search?{q}"
-    sr = requests.get(search_url, headers=HDRS, timeout=20)
-    if sr.status_code != 200:
+    """Goodreads ids, genres and work details (setting, characters, awards) for the first hit on `title`."""
+    # same fetcher as the other sources, so fixtures record / replay Goodreads too
+    record = lookup_title(title, fetcher=_fetcher())
+    if not record:
         return None
-    soup = BeautifulSoup(sr.text, "html.parser")
-    row = soup.select_one("table.tableList tr")
-    if not row: return None
-    href_el = row.select_one("a.bookTitle")
-    if not href_el or not href_el.get("href"):
-        return None
-    book_url = urllib.parse.urljoin("https://www.goodreads.com", href_el["href"])
-
-    # 2) book page → og:image + ids + fields
-    br = requests.get(book_url, headers=HDRS, timeout=25)
-    if br.status_code != 200:
-        return None
-    bs = BeautifulSoup(br.text, "html.parser")
-
-   
-    genres = _extract_genres(bs)
-
-    # ids + metadata
-    data: Dict[str, Any] = {
-        "page_url": book_url,
-    }
-
-    data.update(_extract_ids_from_url(book_url))
-    data.update(_extract_ids_from_dom(bs))
-
-
-    ids = _extract_isbn_asin(bs)
-    if ids:
-        data.update(ids)                  # e.g., isbn13 / isbn10 / asin at top-level
-        data.setdefault("edition", {}).update(ids)  # also nested if you prefer grouping
-    
-    work_details = _extract_work_details(bs)
-    if work_details:
-        data.setdefault("work_details", {}).update(work_details)
-
-    # genres (top-level list of names)
-    
-    if genres:
-        data["genres"] = genres
-
-    #4 metadata fields from goodreads
-    # genres
-    # work_details
-    #   setting
-    #   characters
-    #   awards
-
+    data = {k: v for k, v in record.items() if k != "cover_image_url"}
     print(data)
     return data
 
@@ -1,10 +1,10 @@
-from llm import load_config, get_llm, extract_json
+from llm import load_config, get_llm, get_llm_client, extract_json
 # from langchain.chains import LLMChain
 # from langchain.prompts import PromptTemplate
 # from langchain_core.prompts import PromptTemplate
 from langchain_core.prompts import PromptTemplate, ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from llm import load_config, get_llm, extract_json
+from llm import load_config, get_llm, get_llm_client, extract_json
 import yaml
 import tiktoken
 import json 
@@ -213,7 +213,7 @@ Output:
     #VISIO SUPPORT
     # 1) Load config + model (unchanged)
     config = load_config(config_path)
-    llm = get_llm(llm_provider, llm_model, config, max_tokens=8192)
+    llm_client = get_llm_client(llm_provider, llm_model, config, max_tokens=8192)
 
     # 2) Optional image
     image_mime_type, base64_image = _encode_image_to_data_url(book_cover_path)
@@ -228,7 +228,7 @@ Output:
     message = HumanMessage(content=human_content)
 
     # 6) Invoke the model exactly like you already do
-    response = llm.invoke([message])
+    response = llm_client.invoke([message])
     response_text = response.content if hasattr(response, "content") else str(response)
     story_style = extract_json(response_text)
     print("STORY STYLE:")
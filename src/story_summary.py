@@ -19,7 +19,7 @@
 
 import json 
 import time
-from llm import load_config, get_llm, extract_json
+from llm import load_config, get_llm, get_llm_client, extract_json
 # from langchain.chains import LLMChain
 # from langchain.prompts import PromptTemplate
 from langchain_core.prompts import ChatPromptTemplate
@@ -213,11 +213,9 @@ def get_story_summary(story_title, story_author, story_protagonist, story_summar
     #print(chat_prompt)
 
     config = load_config(config_path=config_path)
-    llm = get_llm(llm_provider, llm_model, config, max_tokens=10000)
+    llm_client = get_llm_client(llm_provider, llm_model, config, max_tokens=10000)
 
-    runnable = chat_prompt | llm  # everything else stays the same
-
-    output = runnable.invoke({
+    output = llm_client.invoke(chat_prompt, {
         "title": story_title,
         "author": story_author,
         "protagonist": story_protagonist,
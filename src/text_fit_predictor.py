@@ -0,0 +1,207 @@
+"""
+Text Fit Predictor for The Shapes of Stories
+============================================
+
+When draw_text_on_curve reports curve_too_short / curve_too_long,
+create_shape_single_pass used to nudge the component's end point one step
+per pass (one x step of CubicSpline extrapolation to grow the arc, two arc
+samples back to shrink it) and re-render the whole design to see if that was
+enough. A single component could take dozens of full passes to settle.
+
+Everything needed to answer "where does the arc have to end?" is cheap to
+compute without rendering:
+    - the text's length along the curve is the sum of its glyph advances
+      (the same cached widths draw_text_on_curve steps by, including the
+      space multipliers when spacing is being adjusted)
+    - the arc's pixel length for a candidate end point comes from
+      re-evaluating the component's arc shape between its start and that end
+      point, mapping it onto the canvas and summing segment lengths (what
+      calculate_arc_length does for the rendered arc)
+
+predict_component_end() walks the same path the nudges walk (spline
+extrapolation past the end, or back along the current arc), brackets the
+end point whose arc length matches the text and refines it by bisection.
+The next pass renders it for real, so collisions or rounding that the
+prediction can't see still fall back to the regular nudges.
+"""
+
+import numpy as np
+from scipy.interpolate import CubicSpline
+
+# aim for the middle of the window draw_text_on_curve accepts as the correct
+# length (0 <= leftover curve <= one average character)
+TARGET_SLACK_CHARS = 0.5
+COARSE_SAMPLES = 48
+BISECTION_STEPS = 30
+LENGTH_TOLERANCE_PX = 0.25
+MAX_PREDICTIONS_PER_COMPONENT = 3
+
+
+def text_advance_length(text, glyph_metrics, spaces_width_multiplier=None, adjust_spacing=False):
+    """Distance draw_text_on_curve moves along the curve to lay out `text` (ignoring collision bumps)."""
+    total = 0.0
+    space_count = 0
+    for char in text:
+        char_width = glyph_metrics.glyph_size(char)[0]
+        if adjust_spacing and char == ' ' and spaces_width_multiplier:
+            multiplier = spaces_width_multiplier.get(space_count, spaces_width_multiplier.get(str(space_count), 1))
+            char_width = glyph_metrics.space_width() * multiplier
+            space_count += 1
+        total += char_width
+    return total
+
+
+class StoryCanvasMap:
+    """
+    The mapping create_shape_single_pass uses between story units
+    (end_time / end_fortune_score), transform_story_data's scaled x (1 - 10)
+    and canvas pixels.
+    """
+
+    def __init__(self, old_min_x, old_max_x, old_min_y, old_max_y,
+                 x_min, y_min, scale_x, scale_y, path_margin_x, path_bottom_y,
+                 new_min_x=1, new_max_x=10, new_min_y=-10, new_max_y=10):
+        self.old_min_x, self.old_max_x = old_min_x, old_max_x
+        self.old_min_y, self.old_max_y = old_min_y, old_max_y
+        self.x_min, self.y_min = x_min, y_min
+        self.scale_x, self.scale_y = scale_x, scale_y
+        self.path_margin_x = path_margin_x
+        self.path_bottom_y = path_bottom_y
+        self.new_min_x, self.new_max_x = new_min_x, new_max_x
+        self.new_min_y, self.new_max_y = new_min_y, new_max_y
+
+    def story_x(self, times):
+        times = np.asarray(times, dtype=float)
+        return (times - self.old_min_x) / (self.old_max_x - self.old_min_x) * (self.new_max_x - self.new_min_x) + self.new_min_x
+
+    def canvas_x(self, story_x):
+        return (np.asarray(story_x, dtype=float) - self.x_min) * self.scale_x + self.path_margin_x
+
+    def canvas_y(self, scores):
+        scores = np.asarray(scores, dtype=float)
+        if self.old_max_y == self.old_min_y:
+            scaled_y = np.full(scores.shape, float(self.new_min_y))
+        else:
+            scaled_y = (scores - self.old_min_y) / (self.old_max_y - self.old_min_y) * (self.new_max_y - self.new_min_y) + self.new_min_y
+        return self.path_bottom_y - (scaled_y - self.y_min) * self.scale_y
+
+
+def component_arc_length(canvas_map, start_time, start_score, end_time, end_score, arc, arc_function,
+                         x_delta=0.015, step_k=15, max_num_steps=3):
+    """Pixel length of the component's arc if it ended at (end_time, end_score)."""
+    x1 = float(canvas_map.story_x(start_time))
+    x2 = float(canvas_map.story_x(end_time))
+    if x2 <= x1:
+        return 0.0
+    # same sample spacing transform_story_data uses for the whole story
+    num_points = max(2, int(np.ceil((x2 - x1) / x_delta)) + 1)
+    xs = np.linspace(x1, x2, num_points)
+    ys = arc_function(x1, x2, start_score, end_score, arc, step_k, max_num_steps)(xs)
+    keep = ~np.isnan(ys)
+    if keep.sum() < 2:
+        return 0.0
+    px = canvas_map.canvas_x(xs[keep])
+    py = canvas_map.canvas_y(ys[keep])
+    return float(np.sum(np.hypot(np.diff(px), np.diff(py))))
+
+
+def _unique_sorted_arc(arc_times, arc_scores, tolerance=1e-12):
+    # same cleanup the CubicSpline nudge does before fitting
+    times = np.asarray(arc_times, dtype=float)
+    scores = np.asarray(arc_scores, dtype=float)
+    order = np.argsort(times)
+    times, scores = times[order], scores[order]
+    unique_indices = [0]
+    for i in range(1, len(times)):
+        if times[i] - times[unique_indices[-1]] > tolerance:
+            unique_indices.append(i)
+    return times[unique_indices], scores[unique_indices]
+
+
+def predict_component_end(curve_length_status, text_length, average_char_width,
+                          arc_times, arc_scores, arc, canvas_map, arc_function,
+                          x_delta=0.015, step_k=15, max_num_steps=3):
+    """
+    Solve for the end point that makes a component's arc as long as its text.
+
+    Parameters:
+    - curve_length_status: "curve_too_short" (grow along the spline
+      extrapolation past the current end) or "curve_too_long" (shrink back
+      along the current arc)
+    - text_length: text_advance_length() of the component's arc text
+    - average_char_width: the slack draw_text_on_curve allows
+    - arc_times / arc_scores: the component's current arc in story units
+      (original_arc_end_time_values / original_arc_end_fortune_score_values)
+    - arc: the component's arc shape; arc_function is
+      get_component_arc_function_vectorized
+
+    Returns:
+        tuple: (end_time, end_score, predicted_arc_length), or None if no end
+               point inside the story's bounds fits the text
+    """
+    times, scores = _unique_sorted_arc(arc_times, arc_scores)
+    if len(times) < 2:
+        return None
+
+    start_time, start_score = times[0], scores[0]
+    end_time = times[-1]
+    target = text_length + TARGET_SLACK_CHARS * average_char_width
+
+    if curve_length_status == "curve_too_short":
+        spline = CubicSpline(times, scores, extrapolate=True)
+        walk_end = canvas_map.old_max_x
+
+        def path(t):
+            return float(spline(t))
+    elif curve_length_status == "curve_too_long":
+        walk_end = start_time
+
+        def path(t):
+            return float(np.interp(t, times, scores))
+    else:
+        return None
+
+    if walk_end == end_time:
+        return None
+
+    def length_error(t):
+        return component_arc_length(canvas_map, start_time, start_score, t, path(t), arc, arc_function,
+                                    x_delta, step_k, max_num_steps) - target
+
+    def in_bounds(t):
+        score = path(t)
+        return (canvas_map.old_min_x <= t <= canvas_map.old_max_x
+                and canvas_map.old_min_y <= score <= canvas_map.old_max_y)
+
+    # coarse walk away from the current end until the length crosses the target
+    walk = np.linspace(end_time, walk_end, COARSE_SAMPLES + 1)
+    inside_t, inside_err = walk[0], length_error(walk[0])
+    starting_sign = np.sign(inside_err)
+    if starting_sign == 0:
+        return None
+    bracket = None
+    for t in walk[1:]:
+        if not in_bounds(t):
+            break
+        err = length_error(t)
+        if np.sign(err) != starting_sign:
+            bracket = (inside_t, inside_err, t, err)
+            break
+        inside_t, inside_err = t, err
+    if bracket is None:
+        return None
+
+    lo_t, lo_err, hi_t, hi_err = bracket
+    for _ in range(BISECTION_STEPS):
+        mid_t = (lo_t + hi_t) / 2
+        mid_err = length_error(mid_t)
+        if abs(mid_err) <= LENGTH_TOLERANCE_PX:
+            lo_t, lo_err = mid_t, mid_err
+            break
+        if np.sign(mid_err) == np.sign(lo_err):
+            lo_t, lo_err = mid_t, mid_err
+        else:
+            hi_t, hi_err = mid_t, mid_err
+    # take the side that leaves the text fitting (arc at least as long as the target)
+    best_t, best_err = (lo_t, lo_err) if lo_err >= -LENGTH_TOLERANCE_PX else (hi_t, hi_err)
+    return float(best_t), path(best_t), float(best_err + target)
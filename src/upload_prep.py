@@ -0,0 +1,281 @@
+"""
+Upload Prep for The Shapes of Stories
+=====================================
+
+normalize_for_shopify / downscale_to_20mp_inplace fully decoded every mockup,
+ran the ICC conversion and re-encoded it (PNG optimize) on every upload, even
+when the file was already small enough and plain sRGB, and
+printify_publish_product.upload_image read the whole design and base64'd it
+into one JSON string in memory.
+
+prepare_for_upload() is the one prep stage both uploads go through:
+    - it reads only the image header first; a PNG / JPEG that is already
+      8-bit RGB(A), untagged or sRGB, upright and inside the size limits is
+      returned as-is, with no decode and no re-encode
+    - otherwise the result is cached on disk (~/.shapes_cache/upload_prep)
+      keyed by a hash of the file's bytes and the prep settings, so
+      re-uploading the same mockup never redoes the work
+    - JPEGs that need shrinking are decoded with draft(), which lets libjpeg
+      scale by 1/2, 1/4 or 1/8 while decoding; PNGs are reduced by an integer
+      factor before the final LANCZOS resize (resize's reducing_gap)
+
+The source file is never modified; callers upload the returned path.
+
+Base64JSONBody streams a {"file_name": ..., "contents": <base64>} JSON
+body from disk for APIs (Printify) that want the file inline, so the
+request never holds more than a block of the file in memory.
+"""
+
+import base64
+import hashlib
+import io
+import json
+import os
+import tempfile
+
+from PIL import Image, ImageCms, ImageOps
+
+UPLOAD_PREP_CACHE_DIR = os.path.join(os.path.expanduser("~/.shapes_cache"), "upload_prep")
+MAX_CACHED_FILES = 200
+
+SHOPIFY_MAX_EDGE = 5000
+SHOPIFY_MAX_PIXELS = 20_000_000  # Shopify hard limit
+
+RESIZE_REDUCING_GAP = 3.0  # integer reduce first, LANCZOS for the last < 3x
+JPEG_SAVE_KWARGS = {"quality": 92, "optimize": True, "progressive": True}
+PNG_SAVE_KWARGS = {"compress_level": 6}  # optimize=True costs seconds per mockup for a few % of size
+
+HASH_BLOCK = 1 << 20
+BASE64_BLOCK = 3 * (1 << 18)  # multiple of 3 so the chunks concatenate into one valid base64 string
+
+
+def _target_size(size, max_edge, max_pixels):
+    w, h = size
+    scale = 1.0
+    if max_edge and max(w, h) > max_edge:
+        scale = min(scale, max_edge / float(max(w, h)))
+    if max_pixels and w * h > max_pixels:
+        scale = min(scale, (max_pixels / float(w * h)) ** 0.5)
+    if scale >= 1.0:
+        return size
+    return max(1, int(round(w * scale))), max(1, int(round(h * scale)))
+
+
+def _is_srgb(icc):
+    if not icc:
+        return True
+    try:
+        description = ImageCms.getProfileDescription(ImageCms.ImageCmsProfile(io.BytesIO(icc)))
+    except Exception:
+        return False
+    return "srgb" in (description or "").lower()
+
+
+def _orientation(im):
+    # a PNG's getexif() decodes the whole image to find a trailing eXIf chunk;
+    # only look when the chunk was already seen in the header
+    if im.format != "JPEG" and "exif" not in im.info:
+        return 1
+    try:
+        return im.getexif().get(0x0112, 1)
+    except Exception:
+        return 1
+
+
+def _high_bit_depth(im):
+    # Pillow opens 16-bit PNGs as mode RGB(A); the tile's raw mode ("RGB;16B") still says 16
+    for tile in im.tile:
+        args = tile[3]
+        rawmode = args if isinstance(args, str) else (args[0] if args and isinstance(args[0], str) else "")
+        if ";16" in rawmode:
+            return True
+    return im.info.get("bits", 8) > 8
+
+
+def needs_prep(im, max_edge=SHOPIFY_MAX_EDGE, max_pixels=SHOPIFY_MAX_PIXELS, flatten_bg=None):
+    """True if an opened (not yet decoded) image has to be converted, resized or re-encoded."""
+    if im.format not in ("PNG", "JPEG"):
+        return True
+    if im.mode not in ("RGB", "RGBA"):
+        return True
+    if _high_bit_depth(im):
+        return True
+    if flatten_bg is not None and im.mode == "RGBA":
+        return True
+    if _target_size(im.size, max_edge, max_pixels) != im.size:
+        return True
+    if _orientation(im) != 1:
+        return True
+    return not _is_srgb(im.info.get("icc_profile"))
+
+
+def file_digest(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _prune_cache(cache_dir):
+    try:
+        entries = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir)]
+    except OSError:
+        return
+    entries = [e for e in entries if os.path.isdir(e)]
+    if len(entries) <= MAX_CACHED_FILES:
+        return
+    entries.sort(key=os.path.getmtime)
+    for entry in entries[:len(entries) - MAX_CACHED_FILES]:
+        for name in os.listdir(entry):
+            try:
+                os.remove(os.path.join(entry, name))
+            except OSError:
+                pass
+        try:
+            os.rmdir(entry)
+        except OSError:
+            pass
+
+
+def _convert(im, max_edge, max_pixels, flatten_bg):
+    target = _target_size(im.size, max_edge, max_pixels)
+    if im.format == "JPEG" and target != im.size:
+        # let libjpeg do the coarse part of the downscale while decoding
+        im.draft(None, target)
+
+    icc = im.info.get("icc_profile")
+    im = ImageOps.exif_transpose(im)
+    if im.mode not in ("RGB", "RGBA"):
+        im = im.convert("RGBA" if "A" in im.getbands() or "transparency" in im.info else "RGB")
+
+    # Convert to sRGB if an ICC profile exists
+    if not _is_srgb(icc):
+        try:
+            src_prof = ImageCms.ImageCmsProfile(io.BytesIO(icc))
+            dst_prof = ImageCms.createProfile("sRGB")
+            im = ImageCms.profileToProfile(im, src_prof, dst_prof, outputMode=im.mode)
+        except Exception:
+            # If profile conversion fails, continue with current image
+            pass
+
+    if im.mode == "RGBA" and flatten_bg is not None:
+        bg = Image.new("RGB", im.size, flatten_bg)
+        bg.paste(im, mask=im.split()[-1])
+        im = bg
+
+    # target was computed on the stored orientation; limits don't care which side is which
+    final = _target_size(im.size, max_edge, max_pixels)
+    if final != im.size:
+        im = im.resize(final, Image.LANCZOS, reducing_gap=RESIZE_REDUCING_GAP)
+    return im
+
+
+def prepare_for_upload(src_path, max_edge=SHOPIFY_MAX_EDGE, max_pixels=SHOPIFY_MAX_PIXELS, flatten_bg=None,
+                       cache_dir=UPLOAD_PREP_CACHE_DIR):
+    """
+    Path of an 8-bit sRGB PNG / JPEG copy of src_path within the limits,
+    or src_path itself if it already is one.
+
+    JPEGs stay JPEG (no alpha to keep); everything else becomes PNG. The
+    prepared copy keeps the source's file name (inside a per-hash cache
+    folder) so it uploads under the same name.
+    """
+    with Image.open(src_path) as im:
+        if not needs_prep(im, max_edge, max_pixels, flatten_bg):
+            return src_path
+        is_jpeg = im.format == "JPEG"
+
+        settings = json.dumps([max_edge, max_pixels, flatten_bg, JPEG_SAVE_KWARGS, PNG_SAVE_KWARGS])
+        key = hashlib.sha1((file_digest(src_path) + settings).encode("utf-8")).hexdigest()
+        stem = os.path.splitext(os.path.basename(src_path))[0]
+        out_dir = os.path.join(cache_dir, key)
+        out_path = os.path.join(out_dir, stem + (".jpg" if is_jpeg else ".png"))
+        if os.path.exists(out_path):
+            os.utime(out_dir)  # keep recently used entries out of the prune
+            return out_path
+
+        w, h = im.size
+        prepared = _convert(im, max_edge, max_pixels, flatten_bg)
+
+    os.makedirs(out_dir, exist_ok=True)
+    with tempfile.NamedTemporaryFile(delete=False, dir=out_dir, suffix=".tmp") as tmp:
+        tmp_path = tmp.name
+    try:
+        if is_jpeg:
+            prepared.convert("RGB").save(tmp_path, format="JPEG", **JPEG_SAVE_KWARGS)
+        else:
+            prepared.save(tmp_path, format="PNG", **PNG_SAVE_KWARGS)
+        os.replace(tmp_path, out_path)
+    finally:
+        if os.path.exists(tmp_path):
+            try: os.remove(tmp_path)
+            except OSError: pass
+
+    if prepared.size != (w, h):
+        print(f"ℹ️ Prepared {os.path.basename(src_path)} for upload: {w}x{h} → {prepared.size[0]}x{prepared.size[1]}")
+    _prune_cache(cache_dir)
+    return out_path
+
+
+# -------------------- streamed base64 JSON --------------------
+
+class Base64JSONBody:
+    """
+    File-like JSON body {"file_name": ..., "contents": "<base64 of path>"}
+    read from disk a block at a time. Has a length, so requests sends it
+    with a Content-Length instead of chunked encoding:
+
+        requests.post(url, headers=headers, data=Base64JSONBody(path))
+    """
+
+    def __init__(self, path, file_name=None, **extra_fields):
+        self.path = path
+        fields = dict(extra_fields, file_name=file_name or os.path.basename(path))
+        head = json.dumps(fields)[:-1] + ', "contents": "'
+        self._head = head.encode("utf-8")
+        self._tail = b'"}'
+        size = os.path.getsize(path)
+        self._length = len(self._head) + 4 * ((size + 2) // 3) + len(self._tail)
+        self._file = None
+        self._pending = b""
+        self._stage = 0  # 0 head, 1 contents, 2 tail, 3 done
+
+    def __len__(self):
+        return self._length
+
+    def _next_chunk(self):
+        if self._stage == 0:
+            self._stage = 1
+            self._file = open(self.path, "rb")
+            return self._head
+        if self._stage == 1:
+            block = self._file.read(BASE64_BLOCK)
+            if block:
+                return base64.b64encode(block)
+            self._file.close()
+            self._stage = 2
+        if self._stage == 2:
+            self._stage = 3
+            return self._tail
+        return b""
+
+    def read(self, size=-1):
+        out = [self._pending]
+        have = len(self._pending)
+        while size is None or size < 0 or have < size:
+            chunk = self._next_chunk()
+            if not chunk:
+                break
+            out.append(chunk)
+            have += len(chunk)
+        data = b"".join(out)
+        if size is not None and size >= 0:
+            data, self._pending = data[:size], data[size:]
+        else:
+            self._pending = b""
+        return data
+
+    def close(self):
+        if self._file is not None and not self._file.closed:
+            self._file.close()